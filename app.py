@@ -2,11 +2,16 @@ import dash
 from dash import Dash, html, dcc, Input, Output, State
 from argparse import ArgumentParser
 import time
+import uuid
 import backend.settings as settings_backend
 import backend.profile as profile_backend
 import backend.friends as friends_backend
 import backend.rewards as rewards_backend
 import backend.login as login_backend
+import backend.db as db
+import backend.reader as reader
+import backend.reading_positions as reading_positions
+import backend.notification_events as notification_events
 
 
 app = Dash(
@@ -22,6 +27,16 @@ app = Dash(
 )
 
 app.validation_layout = None
+# WSGI entry point: gunicorn app:server (see README)
+server = app.server
+
+# every Dash callback is one Flask request; reuse one pooled DB connection for all of its queries
+db.init_app(app.server)
+# processed books for the reader are served as content-hashed files to renters
+reader.init_app(app.server)
+reading_positions.init_app(app.server)
+# notification changes are pushed to open pages (assets/notification_stream.js)
+notification_events.init_app(app.server)
 
 
 app.layout = html.Div(id="main-app-container", children=[
@@ -30,9 +45,15 @@ app.layout = html.Div(id="main-app-container", children=[
               data={"logged_in": False}),
     dcc.Store(id="remember-token-store", storage_type="local"),
     dcc.Store(id="search-data-store", storage_type="memory", data={}),
+    dcc.Store(id="search-request-store", storage_type="memory", data={}),
+    # Open Library results for a search request, applied only if it's still the latest one
+    dcc.Store(id="search-remote-store", storage_type="memory", data=None),
     dcc.Store(id="mobile-menu-store",
               storage_type="memory", data={"open": False}),
     dcc.Store(id="global-chat-history", storage_type="session", data=[]),
+    # set from assets/notification_stream.js when the server pushes a notification change
+    dcc.Store(id="notifications-push", storage_type="memory", data=None),
+    dcc.Store(id="notifications-stream-status", storage_type="memory", data={"connected": False}),
     html.Div(id='dummy-output', style={'display': 'none'}),
 
     html.Div(id='header', className="header", children=[
@@ -68,9 +89,10 @@ app.layout = html.Div(id="main-app-container", children=[
                             searchable=False,
                             className='search-type-dropdown',
                         ),
+                        # debounce: only search once typing pauses instead of on every keystroke
                         dcc.Input(id='header-search', placeholder='Search...',
                                   type='text', className='search-input',
-                                  style={'flex': '1'})
+                                  debounce=0.3, style={'flex': '1'})
                     ], style={'display': 'flex', 'align-items': 'center', 'width': '100%'}),
                     html.Div(id='search-results', className='search-results',
                              style={'display': 'none'})
@@ -364,17 +386,100 @@ def update_search_placeholder(search_type):
     return placeholders.get(search_type, 'Search...')
 
 
+def render_search_books(books):
+    results = []
+    for i, book in enumerate(books[:8]):  # Limit to 8 books
+        cover_url = book.get(
+            'cover_url') or '/assets/svg/default-book.svg'
+        author_name = book.get('author_name') or (
+            book.get('author_names')[0] if book.get(
+                'author_names') else 'Unknown Author'
+        )
+
+        book_item = html.Div([
+            html.Img(
+                src=cover_url,
+                className='search-book-cover',
+                style={
+                    'width': '30px',
+                    'height': '40px',
+                    'object-fit': 'contain',
+                    'margin-right': '10px',
+                    'border-radius': '2px'
+                }
+            ),
+            html.Div([
+                html.Div(book['title'], className='search-book-title'),
+                html.Div(f"by {author_name}", className='search-book-author',
+                         style={'font-size': '12px', 'color': '#666'})
+            ], style={'flex': '1'})
+        ], className='search-book-item', style={
+            'display': 'flex',
+            'align-items': 'center',
+            'padding': '8px',
+            'cursor': 'pointer',
+            'border-radius': '4px'
+        }, id={'type': 'search-book', 'index': i}, n_clicks=0)
+
+        results.append(book_item)
+    return results
+
+
+def render_search_authors(authors):
+    results = []
+    for i, author in enumerate(authors[:8]):  # Limit to 8 authors
+        image_url = author.get(
+            'image_url') or '/assets/svg/default-author.svg'
+
+        author_item = html.Div([
+            html.Img(
+                src=image_url,
+                className='search-author-image',
+                style={
+                    'width': '30px',
+                    'height': '30px',
+                    'border-radius': '50%',
+                    'object-fit': 'cover',
+                    'margin-right': '10px'
+                }
+            ),
+            html.Div([
+                html.Div(author['name'],
+                         className='search-author-name'),
+                html.Div(f"Works: {author.get('work_count', 'Unknown')}",
+                         className='search-author-works',
+                         style={'font-size': '12px', 'color': '#666'})
+            ], style={'flex': '1'})
+        ], className='search-author-item', style={
+            'display': 'flex',
+            'align-items': 'center',
+            'padding': '8px',
+            'cursor': 'pointer',
+            'border-radius': '4px'
+        }, id={'type': 'search-author', 'index': i}, n_clicks=0)
+
+        results.append(author_item)
+    return results
+
+
+def render_search_pending(results):
+    # Shown under the local results while Open Library is being queried
+    return results + [html.Div("Searching Open Library...", className='search-no-results')]
+
+
 @app.callback(
     [Output('search-results', 'children'),
      Output('search-results', 'style'),
-     Output('search-data-store', 'data')],
+     Output('search-data-store', 'data'),
+     Output('search-request-store', 'data')],
     [Input('header-search', 'value'),
      Input('search-type-dropdown', 'value')],
     prevent_initial_call=True
 )
 def handle_search(search_value, search_type):
+    # Local results render immediately; Open Library results follow in handle_remote_search
     if not search_value or len(search_value.strip()) < 2:
-        return [], {'display': 'none'}, {}
+        return [], {'display': 'none'}, {}, {}
 
     try:
         search_query = search_value.strip()
@@ -385,7 +490,7 @@ def handle_search(search_value, search_type):
             users = profile_backend.search_users(search_query)
 
             if not users:
-                return [html.Div("No users found", className='search-no-results')], {'display': 'block'}, {}
+                return [html.Div("No users found", className='search-no-results')], {'display': 'block'}, {}, {}
 
             results = []
             for user in users:
@@ -418,107 +523,101 @@ def handle_search(search_value, search_type):
                 )
                 results.append(user_link)
 
-            return results, {'display': 'block'}, {}
+            return results, {'display': 'block'}, {}, {}
 
         elif search_type == 'books':
-            # Search for books only
-            from backend.openlibrary import search_books_only
+            from backend.openlibrary import search_books_local
 
-            books = search_books_only(search_query)
+            books = search_books_local(search_query)
             search_data['books'] = books
+            request = {'id': uuid.uuid4().hex, 'type': 'books', 'query': search_query, 'local': books}
+            return render_search_pending(render_search_books(books)), {'display': 'block'}, search_data, request
 
-            if not books:
-                return [html.Div("No books found", className='search-no-results')], {'display': 'block'}, search_data
+        elif search_type == 'authors':
+            from backend.openlibrary import search_authors_local
 
-            results = []
-            for i, book in enumerate(books[:8]):  # Limit to 8 books
-                cover_url = book.get(
-                    'cover_url') or '/assets/svg/default-book.svg'
-                author_name = book.get('author_name') or (
-                    book.get('author_names')[0] if book.get(
-                        'author_names') else 'Unknown Author'
-                )
+            authors = search_authors_local(search_query)
+            search_data['authors'] = authors
+            request = {'id': uuid.uuid4().hex, 'type': 'authors', 'query': search_query, 'local': authors}
+            return render_search_pending(render_search_authors(authors)), {'display': 'block'}, search_data, request
 
-                book_item = html.Div([
-                    html.Img(
-                        src=cover_url,
-                        className='search-book-cover',
-                        style={
-                            'width': '30px',
-                            'height': '40px',
-                            'object-fit': 'contain',
-                            'margin-right': '10px',
-                            'border-radius': '2px'
-                        }
-                    ),
-                    html.Div([
-                        html.Div(book['title'], className='search-book-title'),
-                        html.Div(f"by {author_name}", className='search-book-author',
-                                 style={'font-size': '12px', 'color': '#666'})
-                    ], style={'flex': '1'})
-                ], className='search-book-item', style={
-                    'display': 'flex',
-                    'align-items': 'center',
-                    'padding': '8px',
-                    'cursor': 'pointer',
-                    'border-radius': '4px'
-                }, id={'type': 'search-book', 'index': i}, n_clicks=0)
-
-                results.append(book_item)
-
-            return results, {'display': 'block'}, search_data
+        return [], {'display': 'none'}, {}, {}
 
-        elif search_type == 'authors':
-            # Search for authors only
-            from backend.openlibrary import search_authors_only
+    except Exception as e:
+        print(f"Error in search: {e}")
+        return [html.Div("Search error", className='search-error')], {'display': 'block'}, {}, {}
+
+
+@app.callback(
+    Output('search-remote-store', 'data'),
+    Input('search-request-store', 'data'),
+    prevent_initial_call=True
+)
+def handle_remote_search(search_request):
+    if not search_request or not search_request.get('query'):
+        return dash.no_update
+
+    from backend.openlibrary import search_books_remote, search_authors_remote
 
-            authors = search_authors_only(search_query)
+    search_query = search_request['query']
+    local_results = search_request.get('local') or []
+    search_data = {'books': [], 'authors': []}
+
+    def result(children):
+        # Tagged with the request it answers; the clientside callback on search-remote-store
+        # drops it if a newer request has been made since
+        return {'id': search_request.get('id'), 'children': children, 'search_data': search_data}
+
+    try:
+        if search_request['type'] == 'books':
+            books = local_results + search_books_remote(search_query)
+            search_data['books'] = books
+
+            if not books:
+                return result([html.Div("No books found", className='search-no-results')])
+            return result(render_search_books(books))
+
+        elif search_request['type'] == 'authors':
+            existing_author_names = {author['name'].lower() for author in local_results}
+            authors = local_results + search_authors_remote(search_query, existing_author_names)
             search_data['authors'] = authors
 
             if not authors:
-                return [html.Div("No authors found", className='search-no-results')], {'display': 'block'}, search_data
+                return result([html.Div("No authors found", className='search-no-results')])
+            return result(render_search_authors(authors))
 
-            results = []
-            for i, author in enumerate(authors[:8]):  # Limit to 8 authors
-                image_url = author.get(
-                    'image_url') or '/assets/svg/default-author.svg'
+    except Exception as e:
+        print(f"Error in remote search: {e}")
+        # Keep showing whatever the local search found
+        if search_request['type'] == 'books':
+            search_data['books'] = local_results
+            return result(render_search_books(local_results))
+        search_data['authors'] = local_results
+        return result(render_search_authors(local_results))
 
-                author_item = html.Div([
-                    html.Img(
-                        src=image_url,
-                        className='search-author-image',
-                        style={
-                            'width': '30px',
-                            'height': '30px',
-                            'border-radius': '50%',
-                            'object-fit': 'cover',
-                            'margin-right': '10px'
-                        }
-                    ),
-                    html.Div([
-                        html.Div(author['name'],
-                                 className='search-author-name'),
-                        html.Div(f"Works: {author.get('work_count', 'Unknown')}",
-                                 className='search-author-works',
-                                 style={'font-size': '12px', 'color': '#666'})
-                    ], style={'flex': '1'})
-                ], className='search-author-item', style={
-                    'display': 'flex',
-                    'align-items': 'center',
-                    'padding': '8px',
-                    'cursor': 'pointer',
-                    'border-radius': '4px'
-                }, id={'type': 'search-author', 'index': i}, n_clicks=0)
-
-                results.append(author_item)
-
-            return results, {'display': 'block'}, search_data
-
-        return [], {'display': 'none'}, {}
+    return dash.no_update
 
-    except Exception as e:
-        print(f"Error in search: {e}")
-        return [html.Div("Search error", className='search-error')], {'display': 'block'}, {}
+
+# Runs in the browser once the remote results arrive, so it sees the request store as it
+# is now: if the user has typed something else (or switched type) since, a newer request
+# supersedes this one and its results are dropped.
+app.clientside_callback(
+    """
+    function(remote, current) {
+        const noUpdate = window.dash_clientside.no_update;
+        if (!remote || !current || remote.id !== current.id) {
+            return [noUpdate, noUpdate, noUpdate];
+        }
+        return [remote.children, {'display': 'block'}, remote.search_data];
+    }
+    """,
+    [Output('search-results', 'children', allow_duplicate=True),
+     Output('search-results', 'style', allow_duplicate=True),
+     Output('search-data-store', 'data', allow_duplicate=True)],
+    Input('search-remote-store', 'data'),
+    State('search-request-store', 'data'),
+    prevent_initial_call=True
+)
 
 
 @app.callback(
@@ -528,9 +627,10 @@ def handle_search(search_value, search_type):
      Output('hamburger-notification-badge', 'style'),
      Output('mobile-notification-badge', 'children'),
      Output('mobile-notification-badge', 'style')],
-    Input('user-session', 'data')
+    [Input('user-session', 'data'),
+     Input('notifications-push', 'data')]
 )
-def update_notifications(user_session):
+def update_notifications(user_session, notifications_push):
     # Check if user is logged in first
     if not user_session or not user_session.get('logged_in', False):
         return '', {'display': 'none'}
@@ -539,16 +639,14 @@ def update_notifications(user_session):
     if not user_id:
         return '', {'display': 'none'}
 
-    # Use cached notifications from session immediately after login
-    if 'notifications' in user_session:
-        notifications_data = user_session['notifications']
+    # Use cached notifications from session unless the server just pushed a change
+    if 'notifications' in user_session and dash.ctx.triggered_id != 'notifications-push':
+        count = user_session['notifications'].get('count', 0)
     else:
-        # Fallback: fetch fresh notifications
+        # Only the count is needed: one row from notification_counts, not the list
         import backend.notifications as notifications_backend
-        notifications_data = notifications_backend.get_user_notifications(
-            str(user_id))
-
-    count = notifications_data.get('count', 0)
+        summary = notifications_backend.get_notification_summary(str(user_id))
+        count = summary['count'] if summary else 0
     new_badge_text = str(count) if count > 0 else ''
 
     if count > 0:
@@ -0,0 +1,66 @@
+// push notification changes (see backend/notification_events.py)
+// Keeps one server-sent events stream open per tab while logged in. A 'changed' event
+// only says something changed; it is handed to Dash through the notifications-push store
+// and the callbacks refetch. notifications-stream-status tells the notifications page
+// whether it can skip its fallback poll.
+(function() {
+    const CHECK_INTERVAL = 2000;
+    const RETRY_DELAY = 30000;
+    let source = null;
+    let sourceUserId = null;
+    let retryAt = 0;
+
+    function currentUserId() {
+        try {
+            const session = JSON.parse(sessionStorage.getItem('user-session'));
+            return session && session.logged_in ? session.user_id : null;
+        } catch (e) {
+            return null;
+        }
+    }
+
+    function setProps(id, data) {
+        if (window.dash_clientside && window.dash_clientside.set_props && document.getElementById(id)) {
+            window.dash_clientside.set_props(id, {data: data});
+        }
+    }
+
+    function close() {
+        if (source) source.close();
+        source = null;
+        sourceUserId = null;
+        setProps('notifications-stream-status', {connected: false});
+    }
+
+    function open(userId) {
+        source = new EventSource(`/notifications/stream?user_id=${encodeURIComponent(userId)}`);
+        sourceUserId = userId;
+        source.addEventListener('ready', function() {
+            setProps('notifications-stream-status', {connected: true});
+        });
+        source.addEventListener('changed', function(event) {
+            setProps('notifications-push', {version: event.data, at: Date.now()});
+        });
+        // The browser reconnects on its own; until then the page polls
+        source.onerror = function() {
+            setProps('notifications-stream-status', {connected: false});
+        };
+    }
+
+    function check() {
+        const userId = currentUserId();
+        if (source && userId === sourceUserId) {
+            if (source.readyState !== EventSource.CLOSED) return;
+            // A 503 closes the stream for good; try again later rather than every check
+            close();
+            retryAt = Date.now() + RETRY_DELAY;
+            return;
+        }
+        if (source) close();
+        if (userId && window.EventSource && Date.now() >= retryAt) open(userId);
+    }
+
+    window.addEventListener('pagehide', close);
+    setInterval(check, CHECK_INTERVAL);
+    check();
+})();
@@ -0,0 +1,48 @@
+// reading position sync for the book reader
+// The reader iframe posts {type: 'readerPosition', ...} messages; only the latest one is kept
+// and sent to the server every few seconds, or with sendBeacon when the reader is closed.
+// The server takes the user from the book's reader_access cookie, which the browser sends
+// because the endpoint is under /reader/<book_id>/.
+(function() {
+    const SEND_INTERVAL = 10000;
+    let pending = null;
+    let lastSent = null;
+
+    function send(useBeacon) {
+        if (!pending) return;
+        const position = pending;
+        pending = null;
+
+        const key = `${position.book_id}:${position.chapter}:${position.anchor}`;
+        if (key === lastSent && !position.final) return;
+        lastSent = key;
+
+        const url = `/reader/${encodeURIComponent(position.book_id)}/position`;
+        const body = JSON.stringify({chapter: position.chapter, anchor: position.anchor, final: position.final});
+        if (useBeacon && navigator.sendBeacon) {
+            navigator.sendBeacon(url, new Blob([body], {type: 'application/json'}));
+        } else {
+            fetch(url, {
+                method: 'POST',
+                headers: {'Content-Type': 'application/json'},
+                body: body,
+                keepalive: true
+            }).catch(function() {});
+        }
+    }
+
+    window.addEventListener('message', function(event) {
+        if (event.origin !== window.location.origin) return;
+        const data = event.data;
+        if (!data || data.type !== 'readerPosition') return;
+        pending = {book_id: data.book_id, chapter: data.chapter, anchor: data.anchor, final: !!data.final};
+        if (pending.final) send(true);
+    });
+
+    window.addEventListener('pagehide', function() {
+        if (pending) pending.final = true;
+        send(true);
+    });
+
+    setInterval(function() { send(false); }, SEND_INTERVAL);
+})();
@@ -4,6 +4,7 @@
 from datetime import datetime
 from psycopg2 import Error
 from backend.db import get_conn
+from backend.recommendation_cache import mark_recommendations_stale
 import psycopg2.extras
 import psycopg2
 shelf_mapping = {
@@ -52,6 +53,7 @@ def add_to_bookshelf(user_id, book_id, shelf_type):
                     """
                     cursor.execute(update_query, (shelf_type, existing[0]))
                     conn.commit()
+                    mark_recommendations_stale(user_id)
                     return True, f"Book moved to {shelf_type} shelf"
                 else:
                     # Insert new entry
@@ -62,6 +64,7 @@ def add_to_bookshelf(user_id, book_id, shelf_type):
                     cursor.execute(
                         insert_query, (user_id, book_id, shelf_type))
                     conn.commit()
+                    mark_recommendations_stale(user_id)
                     return True, f"Book added to {shelf_type} shelf"
 
     except Error as e:
@@ -155,6 +158,7 @@ def remove_from_bookshelf(user_id, book_id):
 
                 if cursor.rowcount > 0:
                     conn.commit()
+                    mark_recommendations_stale(user_id)
                     return True, "Book removed from bookshelf"
                 else:
                     return False, "Book not found on bookshelf"
@@ -187,6 +191,7 @@ def update_shelf_status(user_id, book_id, new_status):
                 """
                 cursor.execute(update_query, (new_status, user_id, book_id))
                 conn.commit()
+                mark_recommendations_stale(user_id)
 
                 return True, f"Book status updated to {new_status}"
 
@@ -0,0 +1,331 @@
+# backend/collaborative.py
+"""
+Item-item collaborative filtering from bookshelf and reviews
+(extras/migrations/007_book_neighbors.sql).
+
+A background job loads every (user, book) interaction into a sparse user x book matrix,
+weighted by rating when the user reviewed the book and by shelf otherwise, and stores the
+top CF_NEIGHBORS books by cosine similarity for each book in book_neighbors. Similarities
+are computed a block of books at a time (one sparse product per block, sized so it holds
+at most CF_CHUNK_NNZ entries), so memory stays bounded by the interactions plus one
+block, and everything runs on a single core.
+
+Incremental runs only recompute books with shelf/review activity since the last build,
+plus the books in their new neighbour lists. Removed shelf entries and reviews are only
+picked up by a full build, which the job queue runs weekly:
+
+    python -m backend.collaborative          # incremental (full when there is no build yet)
+    python -m backend.collaborative --full
+"""
+import os
+import argparse
+from typing import Any, Callable, Dict, List, Optional
+import numpy as np
+import scipy.sparse as sp
+import psycopg2
+import psycopg2.extras
+from backend.db import get_conn
+from backend.cache import TTLCache
+from backend.ingestion import enqueue_book_neighbors_refresh
+import backend.content_recommender as content_recommender
+
+CF_NEIGHBORS = 30
+CF_MIN_SCORE = 0.05
+# Books with fewer readers than this get no neighbours and are nobody's neighbour
+CF_MIN_READERS = 2
+# Users with more books than this (bulk importers, test accounts) are left out: they
+# make nearly every pair of books co-occur and dominate the cost of every block
+CF_MAX_USER_BOOKS = 2000
+# Upper bound on similarity entries computed at once (about 20 bytes each while ranking)
+CF_CHUNK_NNZ = int(os.getenv("CF_CHUNK_NNZ", "2000000"))
+CF_FETCH_SIZE = 50_000
+# Share of the collaborative score in the hybrid ranking; the rest is content similarity
+CF_BLEND_WEIGHT = 0.6
+
+SHELF_WEIGHTS = {
+    'completed': 1.0,
+    'reading': 0.8,
+    'rented': 0.6,
+    'on-hold': 0.4,
+    'plan-to-read': 0.3,
+    'dropped': 0.1,
+}
+
+# Serializes builds across processes (full and incremental jobs have different dedup keys)
+_BUILD_LOCK_ID = 7_310_018
+
+# One row per (user, book): the average rating / 5 when reviewed, else the shelf weight
+_INTERACTIONS_SQL = f"""
+    SELECT user_id, book_id, COALESCE(r.weight, s.weight)::float8 AS weight
+    FROM (
+        SELECT user_id, book_id,
+               MAX(CASE shelf_type {' '.join(f"WHEN '{k}' THEN {v}" for k, v in SHELF_WEIGHTS.items())}
+                   ELSE 0.1 END) AS weight
+        FROM bookshelf
+        {{where}}
+        GROUP BY user_id, book_id
+    ) s
+    FULL OUTER JOIN (
+        SELECT user_id, book_id, AVG(rating) / 5.0 AS weight
+        FROM reviews
+        {{where}} {{and_}} rating IS NOT NULL
+        GROUP BY user_id, book_id
+    ) r USING (user_id, book_id)
+"""
+_ALL_INTERACTIONS_SQL = _INTERACTIONS_SQL.format(where='', and_='WHERE')
+_USER_INTERACTIONS_SQL = _INTERACTIONS_SQL.format(where='WHERE user_id = %(user_id)s', and_='AND')
+
+_CHANGED_BOOKS_SQL = """
+    SELECT book_id FROM bookshelf WHERE added_at >= %(since)s
+    UNION
+    SELECT book_id FROM reviews WHERE created_at >= %(since)s
+"""
+
+_USER_SCORES_SQL = f"""
+    WITH seeds AS ({_USER_INTERACTIONS_SQL})
+    SELECT n.neighbor_id AS book_id, SUM(n.score * s.weight) AS score
+    FROM seeds s
+    JOIN book_neighbors n ON n.book_id = s.book_id
+    WHERE NOT EXISTS (SELECT 1 FROM seeds WHERE seeds.book_id = n.neighbor_id)
+    GROUP BY n.neighbor_id
+    ORDER BY score DESC
+    LIMIT %(limit)s
+"""
+
+_similar_cache = TTLCache(maxsize=2048, ttl=600)
+
+
+class InteractionMatrix:
+    """Users x books interaction weights, with the per-book data the similarity blocks need"""
+
+    def __init__(self, user_ids, book_ids, weights):
+        # (user, book) pairs are unique, so occurrences of an id count its books/readers
+        _, inverse, books_read = np.unique(user_ids, return_inverse=True, return_counts=True)
+        keep = books_read[inverse] <= CF_MAX_USER_BOOKS
+        user_ids, book_ids, weights = user_ids[keep], book_ids[keep], weights[keep]
+        # Books read by too few users carry no signal and only widen every product
+        _, inverse, readers = np.unique(book_ids, return_inverse=True, return_counts=True)
+        keep = readers[inverse] >= CF_MIN_READERS
+        user_ids, book_ids, weights = user_ids[keep], book_ids[keep], weights[keep]
+
+        self.book_ids, book_index = np.unique(book_ids, return_inverse=True)
+        user_index = np.unique(user_ids, return_inverse=True)[1]
+        n_users = int(user_index.max()) + 1 if len(user_index) else 0
+        self.by_user = sp.csr_matrix((weights.astype(np.float32), (user_index, book_index)),
+                                     shape=(n_users, len(self.book_ids)))
+        self.by_book = self.by_user.T.tocsr()
+        norms = np.sqrt(np.asarray(self.by_book.multiply(self.by_book).sum(axis=1)).ravel())
+        self.inv_norm = np.divide(1.0, norms, out=np.zeros_like(norms), where=norms > 0).astype(np.float32)
+
+        # Entries in a book's similarity row are bounded by the books its readers read
+        user_degree = np.diff(self.by_user.indptr)
+        self.cost = np.minimum(
+            np.bincount(self.by_user.indices, weights=np.repeat(user_degree, user_degree),
+                        minlength=len(self.book_ids)), len(self.book_ids)).astype(np.int64)
+
+    def __len__(self):
+        return len(self.book_ids)
+
+    def positions(self, book_ids) -> np.ndarray:
+        """Row positions of the given book ids that are in the matrix"""
+        book_ids = np.asarray(list(book_ids), dtype=np.int64)
+        positions = np.searchsorted(self.book_ids, book_ids)
+        found = positions < len(self.book_ids)
+        found[found] = self.book_ids[positions[found]] == book_ids[found]
+        return np.unique(positions[found])
+
+    def chunks(self, positions: np.ndarray, budget: int = CF_CHUNK_NNZ):
+        """Split book positions into blocks whose similarity rows fit in `budget` entries"""
+        block, total = [], 0
+        for position, cost in zip(positions.tolist(), self.cost[positions].tolist()):
+            if block and total + cost > budget:
+                yield np.asarray(block)
+                block, total = [], 0
+            block.append(position)
+            total += cost
+        if block:
+            yield np.asarray(block)
+
+    def top_neighbors(self, block: np.ndarray, k: int = CF_NEIGHBORS, min_score: float = CF_MIN_SCORE):
+        """(source positions, neighbour positions, scores) for the k most similar books of each in `block`"""
+        sims = self.by_book[block].dot(self.by_user).tocoo()
+        scores = sims.data * self.inv_norm[block][sims.row] * self.inv_norm[sims.col]
+        keep = (sims.col != block[sims.row]) & (scores >= min_score)
+        rows, cols, scores = sims.row[keep], sims.col[keep], scores[keep]
+
+        # Sort by row, best score first (one float key: scores are in (0, 1]), then keep
+        # the first k of each row
+        order = np.argsort(rows + (1.0 - scores.astype(np.float64)) * 0.5)
+        rows, cols, scores = rows[order], cols[order], scores[order]
+        rank = np.arange(len(rows)) - np.searchsorted(rows, rows)
+        top = rank < k
+        return block[rows[top]], cols[top], scores[top]
+
+
+def _load_interactions(conn) -> InteractionMatrix:
+    # Named cursor: rows are streamed from the server in batches instead of all at once
+    with conn.cursor(name='cf_interactions') as cur:
+        cur.itersize = CF_FETCH_SIZE
+        cur.execute(_ALL_INTERACTIONS_SQL)
+        users, books, weights = [], [], []
+        while True:
+            rows = cur.fetchmany(CF_FETCH_SIZE)
+            if not rows:
+                break
+            user_col, book_col, weight_col = zip(*rows)
+            users.append(np.fromiter(user_col, np.int64, len(rows)))
+            books.append(np.fromiter(book_col, np.int64, len(rows)))
+            weights.append(np.fromiter(weight_col, np.float32, len(rows)))
+    if not users:
+        empty = np.zeros(0, dtype=np.int64)
+        return InteractionMatrix(empty, empty, np.zeros(0, dtype=np.float32))
+    return InteractionMatrix(np.concatenate(users), np.concatenate(books), np.concatenate(weights))
+
+
+def _write_neighbors(conn, book_ids, sources, neighbors, scores):
+    """Replace the neighbour rows of `book_ids` (ids with no neighbours just lose theirs)"""
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM book_neighbors WHERE book_id = ANY(%s)", (list(book_ids),))
+        psycopg2.extras.execute_values(
+            cur, "INSERT INTO book_neighbors (book_id, neighbor_id, score) VALUES %s",
+            zip(sources.tolist(), neighbors.tolist(), scores.tolist()), page_size=5000)
+    conn.commit()
+
+
+def _compute(conn, matrix: InteractionMatrix, positions: np.ndarray, progress: Callable[..., None]) -> np.ndarray:
+    """Recompute and store the neighbours of the books at `positions`. Returns all neighbour positions."""
+    found = []
+    done = 0
+    for block in matrix.chunks(positions):
+        sources, neighbors, scores = matrix.top_neighbors(block)
+        _write_neighbors(conn, matrix.book_ids[block].tolist(),
+                         matrix.book_ids[sources], matrix.book_ids[neighbors], scores)
+        found.append(neighbors)
+        done += len(block)
+        progress(books_done=done, books_total=len(positions))
+    return np.unique(np.concatenate(found)) if found else np.zeros(0, dtype=np.int64)
+
+
+def build_book_neighbors(full: bool = False, progress: Optional[Callable[..., None]] = None) -> int:
+    """
+    Recompute book_neighbors: every book when `full` (or when there is no earlier build),
+    otherwise the books with activity since the last build and their neighbours.
+    `progress(**fields)` is called after each block. Returns the number of books updated.
+    """
+    progress = progress or (lambda **fields: None)
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s)", (_BUILD_LOCK_ID,))
+        try:
+            cur.execute("SELECT MAX(started_at) FROM book_neighbors_builds WHERE finished_at IS NOT NULL")
+            since = cur.fetchone()[0]
+            full = full or since is None
+            cur.execute("""
+                INSERT INTO book_neighbors_builds (kind, started_at) VALUES (%s, now())
+                RETURNING build_id
+            """, ('full' if full else 'incremental',))
+            build_id = cur.fetchone()[0]
+            changed = []
+            if not full:
+                cur.execute(_CHANGED_BOOKS_SQL, {'since': since})
+                changed = [row[0] for row in cur.fetchall()]
+            # started_at is the transaction start, so it is not later than what the load below sees
+            matrix = _load_interactions(conn)
+            conn.commit()
+            print(f"DEBUG COLLABORATIVE_build_book_neighbors: {len(matrix)} books, "
+                  f"{matrix.by_user.nnz} interactions, {'full' if full else f'{len(changed)} changed books'}")
+
+            if full:
+                _compute(conn, matrix, np.arange(len(matrix)), progress)
+                # Books that dropped out of the matrix entirely
+                cur.execute("DELETE FROM book_neighbors WHERE NOT (book_id = ANY(%s))", (matrix.book_ids.tolist(),))
+                updated = len(matrix)
+            else:
+                positions = matrix.positions(changed)
+                # Changed books that no longer have enough readers to be in the matrix
+                gone = sorted(set(changed) - set(matrix.book_ids[positions].tolist()))
+                cur.execute("DELETE FROM book_neighbors WHERE book_id = ANY(%s)", (gone,))
+                conn.commit()
+                neighbors = _compute(conn, matrix, positions, progress)
+                # Their neighbours' lists may now include (or drop) the changed books
+                affected = np.setdiff1d(neighbors, positions)
+                _compute(conn, matrix, affected, progress)
+                updated = len(positions) + len(affected) + len(gone)
+
+            cur.execute("""
+                UPDATE book_neighbors_builds SET finished_at = now(), books_updated = %s WHERE build_id = %s
+            """, (updated, build_id))
+            conn.commit()
+        finally:
+            conn.rollback()
+            cur.execute("SELECT pg_advisory_unlock(%s)", (_BUILD_LOCK_ID,))
+            conn.commit()
+    _similar_cache.clear()
+    print(f"DEBUG COLLABORATIVE_build_book_neighbors: updated {updated} books")
+    return updated
+
+
+def get_similar_books(book_id: int, limit: int = 6) -> List[Dict[str, Any]]:
+    """Books most often shelved/rated highly by the same readers, best first"""
+    enqueue_book_neighbors_refresh()
+
+    def load():
+        try:
+            with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute("""
+                    SELECT b.book_id, b.title, b.cover_url, COALESCE(a.name, 'Unknown Author') AS author_name,
+                           n.score
+                    FROM book_neighbors n
+                    JOIN books b ON b.book_id = n.neighbor_id
+                    LEFT JOIN authors a ON a.author_id = b.author_id
+                    WHERE n.book_id = %s
+                    ORDER BY n.score DESC
+                    LIMIT %s
+                """, (book_id, limit))
+                return [dict(row) for row in cur.fetchall()]
+        except psycopg2.Error as e:
+            print(f"Error getting similar books for {book_id}: {e}")
+            return []
+
+    return _similar_cache.get_or_set((book_id, limit), load)
+
+
+def get_cf_scores(user_id: int, limit: int = 100) -> Dict[int, float]:
+    """Unread books scored by the similarity-weighted sum over everything the user shelved or rated"""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(_USER_SCORES_SQL, {'user_id': user_id, 'limit': limit})
+        return {book_id: float(score) for book_id, score in cur.fetchall()}
+
+
+def get_blended_recommendations(user_id: int, user_genres: List[str], limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Recommendations shaped like backend.home.get_ai_recommendations, ranked by
+    CF_BLEND_WEIGHT * collaborative score + the rest * content similarity, each scaled to 0..1.
+    Either signal alone is used when the other has nothing for this user.
+    """
+    enqueue_book_neighbors_refresh()
+    pool = limit * 5
+    cf = get_cf_scores(user_id, pool)
+    if cf:
+        top = max(cf.values())
+        cf = {book_id: score / top for book_id, score in cf.items()}
+
+    content = {}
+    index = content_recommender.get_index()
+    if index is not None:
+        seeds, on_shelf = content_recommender.user_seed_books(user_id)
+        content = dict(index.recommend(seeds, user_genres, exclude_ids=on_shelf, k=pool))
+
+    if not cf or not content:
+        blended = cf or content
+    else:
+        blended = {book_id: CF_BLEND_WEIGHT * cf.get(book_id, 0.0) + (1 - CF_BLEND_WEIGHT) * content.get(book_id, 0.0)
+                   for book_id in cf.keys() | content.keys()}
+    ranked = dict(sorted(blended.items(), key=lambda item: item[1], reverse=True)[:limit * 3])
+    return content_recommender.recommendation_rows(ranked, limit)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build book_neighbors from bookshelf and reviews")
+    parser.add_argument('--full', action='store_true', help='recompute every book instead of recent activity')
+    args = parser.parse_args()
+    print(f"Updated neighbours for {build_book_neighbors(full=args.full)} books")
@@ -0,0 +1,477 @@
+# backend/content_recommender.py
+"""
+Content-based book recommendations without an LLM round trip.
+
+Every book is a hashed bag-of-words TF-IDF vector built from its title, genre and
+description, stored as rows of one L2-normalized SciPy CSR matrix. A user is scored
+by the centroid of the books on their completed/reading shelves and their favorite
+books (or their favorite genres when they have none), so recommending is one sparse
+matrix-vector product plus a top-k selection.
+
+The matrix is persisted under RECOMMENDER_DIR as a base file plus append-only delta
+files, so ingesting books only writes the new rows. Books whose text was edited since the
+last refresh (books.text_updated_at, extras/migrations/014_books_text_updated_at.sql)
+are added again, replacing their old rows. Any process on the host picks up
+new files on its next request. Rebuild from scratch with:
+
+    python -m backend.content_recommender --rebuild
+"""
+import os
+import re
+import glob
+import zlib
+import argparse
+import tempfile
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import numpy as np
+import scipy.sparse as sp
+import psycopg2
+import psycopg2.extras
+from backend.db import get_conn
+
+RECOMMENDER_DIR = os.getenv(
+    "RECOMMENDER_DIR", os.path.join(os.path.dirname(__file__), ".recommender"))
+# Hashed feature space: no vocabulary to maintain, so new books never change existing columns
+FEATURE_BITS = 18
+N_FEATURES = 1 << FEATURE_BITS
+# Delta files are merged back into the base once there are this many
+MAX_DELTAS = 20
+REFRESH_BATCH = 5000
+# Edits are looked for this far before the last refresh, to catch transactions that were
+# still open when it ran (their text_updated_at is their start time)
+REFRESH_OVERLAP = 300
+
+# 'content' serves home page recommendations from this index instead of asking Gemini,
+# 'hybrid' blends it with item-item collaborative filtering (backend/collaborative.py)
+RECOMMENDER_BACKEND = os.getenv("RECOMMENDER_BACKEND", "ai")
+
+TITLE_WEIGHT = 2.0
+GENRE_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+_STOPWORDS = frozenset("""
+    a an and are as at be but by for from has have he her his in is it its of on or she
+    that the their there they this to was were which who will with you your not no into
+""".split())
+
+_BOOK_TEXT_SQL = """
+    SELECT book_id, title, genre, description
+    FROM books
+    WHERE book_id > %s
+    ORDER BY book_id
+    LIMIT %s
+"""
+
+# Already indexed books edited since the watermark, in (text_updated_at, book_id) order
+_CHANGED_BOOK_TEXT_SQL = """
+    SELECT book_id, title, genre, description, text_updated_at
+    FROM books
+    WHERE book_id <= %(max_book_id)s
+      AND text_updated_at > to_timestamp(%(since)s)
+      AND (text_updated_at, book_id) > (%(after_time)s, %(after_id)s)
+    ORDER BY text_updated_at, book_id
+    LIMIT %(limit)s
+"""
+
+
+def _feature(token: str) -> int:
+    # crc32 rather than hash(): it must be stable across processes and restarts
+    return zlib.crc32(token.encode('utf-8')) & (N_FEATURES - 1)
+
+
+def _tokens(text: Optional[str]) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or '').lower()) if len(t) > 1 and t not in _STOPWORDS]
+
+
+def book_terms(title: Optional[str], genre: Optional[str], description: Optional[str]) -> Dict[int, float]:
+    """Weighted term counts for one book, keyed by hashed feature"""
+    counts: Dict[int, float] = {}
+    for token in _tokens(title):
+        f = _feature(token)
+        counts[f] = counts.get(f, 0.0) + TITLE_WEIGHT
+    # Genres are comma-separated subjects; whole subjects and their words both count
+    for subject in (genre or '').split(','):
+        subject = subject.strip().lower()
+        if subject:
+            f = _feature(f"genre:{subject}")
+            counts[f] = counts.get(f, 0.0) + GENRE_WEIGHT
+        for token in _tokens(subject):
+            f = _feature(token)
+            counts[f] = counts.get(f, 0.0) + GENRE_WEIGHT / 2
+    for token in _tokens(description):
+        f = _feature(token)
+        counts[f] = counts.get(f, 0.0) + DESCRIPTION_WEIGHT
+    return counts
+
+
+def genre_terms(genres: Iterable[str]) -> Dict[int, float]:
+    """Query terms for a user with no seed books, from their favorite genres"""
+    counts: Dict[int, float] = {}
+    for genre in genres:
+        genre = (genre or '').strip().lower()
+        if genre:
+            counts[_feature(f"genre:{genre}")] = GENRE_WEIGHT
+            for token in _tokens(genre):
+                counts[_feature(token)] = counts.get(_feature(token), 0.0) + GENRE_WEIGHT / 2
+    return counts
+
+
+def _term_matrix(term_rows: Sequence[Dict[int, float]]) -> sp.csr_matrix:
+    indptr = np.zeros(len(term_rows) + 1, dtype=np.int64)
+    indices, data = [], []
+    for i, terms in enumerate(term_rows):
+        indices.extend(terms.keys())
+        data.extend(terms.values())
+        indptr[i + 1] = len(indices)
+    matrix = sp.csr_matrix((np.asarray(data, dtype=np.float32), np.asarray(indices, dtype=np.int32), indptr),
+                           shape=(len(term_rows), N_FEATURES))
+    matrix.sum_duplicates()
+    return matrix
+
+
+def _normalize_rows(matrix: sp.csr_matrix) -> sp.csr_matrix:
+    norms = np.sqrt(np.asarray(matrix.multiply(matrix).sum(axis=1)).ravel())
+    norms[norms == 0] = 1.0
+    return sp.csr_matrix(sp.diags(1.0 / norms).dot(matrix), dtype=np.float32)
+
+
+class ContentIndex:
+    """TF-IDF rows for a set of books, with document frequencies kept for incremental adds"""
+
+    def __init__(self):
+        self.df = np.zeros(N_FEATURES, dtype=np.int32)
+        self.n_docs = 0
+        # Database time (epoch seconds) the last refresh started; None = never refreshed
+        self.refreshed_at: Optional[float] = None
+        # (matrix, book_ids, active, book_id -> row). Never modified in place: adds build a
+        # new tuple and publish it with one assignment, so readers always see a consistent one.
+        self._state = (sp.csr_matrix((0, N_FEATURES), dtype=np.float32),
+                       np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool), {})
+
+    @property
+    def matrix(self) -> sp.csr_matrix:
+        return self._state[0]
+
+    @property
+    def book_ids(self) -> np.ndarray:
+        return self._state[1]
+
+    @property
+    def max_book_id(self) -> int:
+        book_ids = self.book_ids
+        return int(book_ids.max()) if len(book_ids) else 0
+
+    def __len__(self):
+        return len(self._state[3])
+
+    def idf(self) -> np.ndarray:
+        return np.log((1.0 + self.n_docs) / (1.0 + self.df)).astype(np.float32) + 1.0
+
+    def _weigh(self, terms: sp.csr_matrix) -> sp.csr_matrix:
+        # Sublinear tf, then idf, then unit length so a dot product is cosine similarity
+        weighted = terms.copy()
+        weighted.data = 1.0 + np.log(weighted.data)
+        weighted = weighted.multiply(self.idf()).tocsr()
+        return _normalize_rows(weighted)
+
+    def add(self, book_ids: Sequence[int], term_rows: Sequence[Dict[int, float]]) -> sp.csr_matrix:
+        """Append books (a book added again replaces its earlier row). Returns the new weighted rows."""
+        terms = _term_matrix(term_rows)
+        df = self.df + np.bincount(terms.indices, minlength=N_FEATURES).astype(np.int32)
+        # Replaced books stop counting towards the document frequencies
+        matrix, _, _, positions = self._state
+        replaced = [positions[b] for b in set(book_ids) if b in positions]
+        if replaced:
+            df -= np.bincount(matrix[replaced].indices, minlength=N_FEATURES).astype(np.int32)
+        self.df = df
+        self.n_docs += len(book_ids) - len(replaced)
+        rows = self._weigh(terms)
+        self._append(np.asarray(book_ids, dtype=np.int64), rows)
+        return rows
+
+    def _append(self, book_ids: np.ndarray, rows: sp.csr_matrix):
+        matrix, old_ids, active, positions = self._state
+        start = matrix.shape[0]
+        matrix = sp.vstack([matrix, rows], format='csr') if start else rows.tocsr()
+        active = np.concatenate([active, np.ones(len(book_ids), dtype=bool)])
+        positions = dict(positions)
+        for offset, book_id in enumerate(book_ids.tolist()):
+            previous = positions.get(book_id)
+            if previous is not None:
+                active[previous] = False
+            positions[book_id] = start + offset
+        self._state = (matrix, np.concatenate([old_ids, book_ids]), active, positions)
+
+    def query_vector(self, seed_book_ids: Iterable[int] = (), genres: Iterable[str] = ()) -> Optional[np.ndarray]:
+        """Dense unit-length centroid of the seed books' rows, or a genre query when none of them are indexed"""
+        return self._query_vector(self._state, seed_book_ids, genres)
+
+    def _query_vector(self, state, seed_book_ids, genres) -> Optional[np.ndarray]:
+        matrix, _, _, positions = state
+        rows = [positions[b] for b in seed_book_ids if b in positions]
+        if rows:
+            centroid = np.asarray(matrix[rows].sum(axis=0), dtype=np.float32).ravel()
+        else:
+            terms = genre_terms(genres)
+            if not terms:
+                return None
+            centroid = self._weigh(_term_matrix([terms])).toarray().ravel()
+        norm = np.linalg.norm(centroid)
+        return centroid / norm if norm else None
+
+    def recommend(self, seed_book_ids: Iterable[int] = (), genres: Iterable[str] = (),
+                  exclude_ids: Iterable[int] = (), k: int = 10) -> List[tuple]:
+        """Top k (book_id, score) pairs most similar to the seeds/genres"""
+        seed_book_ids = list(seed_book_ids)
+        # One state throughout, whatever a concurrent add() publishes meanwhile
+        state = self._state
+        matrix, book_ids, active, positions = state
+        query = self._query_vector(state, seed_book_ids, genres)
+        if query is None or not matrix.shape[0]:
+            return []
+        scores = matrix.dot(query)
+        scores[~active] = -1.0
+        for book_id in list(exclude_ids) + seed_book_ids:
+            row = positions.get(book_id)
+            if row is not None:
+                scores[row] = -1.0
+
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(book_ids[i]), float(scores[i])) for i in top if scores[i] > 0]
+
+    # -- persistence --------------------------------------------------------
+
+    def _save(self, path: str, book_ids: np.ndarray, rows: sp.csr_matrix, df: np.ndarray):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp.npz')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, data=rows.data, indices=rows.indices, indptr=rows.indptr,
+                     shape=np.asarray(rows.shape), book_ids=book_ids, df=df, n_docs=np.asarray(self.n_docs),
+                     refreshed_at=np.asarray(np.nan if self.refreshed_at is None else self.refreshed_at))
+        os.replace(tmp_path, path)
+
+    def save_base(self, directory: str):
+        """Write all active rows as the new base and drop the deltas"""
+        os.makedirs(directory, exist_ok=True)
+        matrix, book_ids, active, _ = self._state
+        active = np.flatnonzero(active)
+        self._save(os.path.join(directory, 'base.npz'), book_ids[active], matrix[active], self.df)
+        for path in glob.glob(os.path.join(directory, 'delta-*.npz')):
+            os.remove(path)
+
+    def save_delta(self, directory: str, book_ids: Sequence[int], rows: sp.csr_matrix):
+        os.makedirs(directory, exist_ok=True)
+        existing = _delta_paths(directory)
+        number = int(os.path.basename(existing[-1])[6:12]) + 1 if existing else 1
+        self._save(os.path.join(directory, f"delta-{number:06d}.npz"),
+                   np.asarray(book_ids, dtype=np.int64), rows, self.df)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional['ContentIndex']:
+        base = os.path.join(directory, 'base.npz')
+        if not os.path.exists(base):
+            return None
+        index = cls()
+        for path in [base] + _delta_paths(directory):
+            with np.load(path) as f:
+                rows = sp.csr_matrix((f['data'], f['indices'], f['indptr']), shape=tuple(f['shape']))
+                index._append(f['book_ids'], rows)
+                # Each file carries the document frequencies as of when it was written
+                index.df = f['df']
+                index.n_docs = int(f['n_docs'])
+                refreshed_at = float(f['refreshed_at']) if 'refreshed_at' in f.files else np.nan
+                index.refreshed_at = None if np.isnan(refreshed_at) else refreshed_at
+        return index
+
+
+def _delta_paths(directory: str) -> List[str]:
+    return sorted(glob.glob(os.path.join(directory, 'delta-[0-9][0-9][0-9][0-9][0-9][0-9].npz')))
+
+
+def _signature(directory: str):
+    try:
+        return tuple(sorted((e.name, e.stat().st_mtime_ns) for e in os.scandir(directory) if e.name.endswith('.npz')))
+    except OSError:
+        return ()
+
+
+_index: Optional[ContentIndex] = None
+_index_signature = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> Optional[ContentIndex]:
+    """This process's copy of the index, reloaded when another process wrote new files"""
+    global _index, _index_signature
+    signature = _signature(RECOMMENDER_DIR)
+    if _index is not None and signature == _index_signature:
+        return _index
+    with _index_lock:
+        if _index is None or signature != _index_signature:
+            _index = ContentIndex.load(RECOMMENDER_DIR)
+            _index_signature = signature
+        return _index
+
+
+def _fetch_books(after_id: int, limit: int) -> List[Dict[str, Any]]:
+    with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(_BOOK_TEXT_SQL, (after_id, limit))
+        return [dict(r) for r in cur.fetchall()]
+
+
+def _fetch_changed_books(max_book_id: int, since: float, after, limit: int) -> List[Dict[str, Any]]:
+    with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(_CHANGED_BOOK_TEXT_SQL, {'max_book_id': max_book_id, 'since': since,
+                                             'after_time': after[0], 'after_id': after[1], 'limit': limit})
+        return [dict(r) for r in cur.fetchall()]
+
+
+def _database_time() -> float:
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("SELECT EXTRACT(EPOCH FROM clock_timestamp())")
+        return float(cur.fetchone()[0])
+
+
+def rebuild_index() -> ContentIndex:
+    """Build the index from every book and write it as the new base"""
+    global _index, _index_signature
+    index = ContentIndex()
+    index.refreshed_at = _database_time()
+    last_id = 0
+    while True:
+        books = _fetch_books(last_id, REFRESH_BATCH)
+        if not books:
+            break
+        index.add([b['book_id'] for b in books],
+                  [book_terms(b['title'], b['genre'], b['description']) for b in books])
+        last_id = books[-1]['book_id']
+    with _index_lock:
+        index.save_base(RECOMMENDER_DIR)
+        _index, _index_signature = index, _signature(RECOMMENDER_DIR)
+    print(f"DEBUG CONTENT_RECOMMENDER_rebuild_index: indexed {len(index)} books")
+    return index
+
+
+def _add_books(index: ContentIndex, books: List[Dict[str, Any]]):
+    book_ids = [b['book_id'] for b in books]
+    rows = index.add(book_ids, [book_terms(b['title'], b['genre'], b['description']) for b in books])
+    index.save_delta(RECOMMENDER_DIR, book_ids, rows)
+
+
+def refresh_index() -> int:
+    """
+    Add books ingested since the index was last written (book_id above the highest
+    indexed id), and again the indexed books whose text changed since the last refresh,
+    as delta files. Builds the whole index if there is none yet.
+    Returns the number of books added or replaced.
+    """
+    global _index_signature
+    index = get_index()
+    if index is None:
+        return len(rebuild_index())
+
+    added = 0
+    with _index_lock:
+        started_at = _database_time()
+        max_book_id = index.max_book_id
+        while True:
+            books = _fetch_books(index.max_book_id, REFRESH_BATCH)
+            if not books:
+                break
+            _add_books(index, books)
+            added += len(books)
+
+        # An index written before edits were tracked takes every tracked edit
+        since = index.refreshed_at - REFRESH_OVERLAP if index.refreshed_at is not None else 0.0
+        after = ('-infinity', 0)
+        index.refreshed_at = started_at
+        while True:
+            books = _fetch_changed_books(max_book_id, since, after, REFRESH_BATCH)
+            if not books:
+                break
+            _add_books(index, books)
+            added += len(books)
+            after = (books[-1]['text_updated_at'], books[-1]['book_id'])
+        if len(_delta_paths(RECOMMENDER_DIR)) > MAX_DELTAS:
+            index.save_base(RECOMMENDER_DIR)
+        _index_signature = _signature(RECOMMENDER_DIR)
+    if added:
+        print(f"DEBUG CONTENT_RECOMMENDER_refresh_index: added or replaced {added} books")
+    return added
+
+
+def user_seed_books(user_id: int):
+    """
+    (seed book ids, book ids on any shelf) for a user: the seeds are their completed/reading
+    shelves plus favorite books, and nothing on a shelf should be recommended back to them
+    """
+    with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute("""
+            SELECT book_id, shelf_type FROM public.bookshelf WHERE user_id = %s
+        """, (user_id,))
+        shelves = cur.fetchall()
+        cur.execute("SELECT favorite_books FROM public.users WHERE user_id = %s", (user_id,))
+        row = cur.fetchone()
+
+    read = {s['book_id'] for s in shelves if s['shelf_type'] in ('completed', 'reading', 'currently reading')}
+    seeds = list(read | set((row or {}).get('favorite_books') or []))
+    return seeds, {s['book_id'] for s in shelves}
+
+
+def recommendation_rows(score_of: Dict[int, float], limit: int) -> List[Dict[str, Any]]:
+    """
+    Books for {book_id: score}, shaped like backend.home.get_ai_recommendations:
+    best score first, books without a cover after those with one
+    """
+    if not score_of:
+        return []
+    with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute("""
+            SELECT
+                b.book_id,
+                b.title,
+                COALESCE(b.cover_url, '') AS cover_url,
+                COALESCE(a.name, '') AS author,
+                b.description AS description,
+                COALESCE(rs.review_count, 0) AS total_ratings,
+                ROUND(rs.rating_sum::numeric / NULLIF(rs.rating_count, 0), 1) AS avg_rating
+            FROM public.books b
+            LEFT JOIN public.authors a ON b.author_id = a.author_id
+            LEFT JOIN public.book_rating_stats rs ON rs.book_id = b.book_id
+            WHERE b.book_id = ANY(%s)
+        """, (list(score_of),))
+        books = [dict(r) for r in cur.fetchall()]
+
+    books.sort(key=lambda b: (bool(b['cover_url'].strip()), score_of[b['book_id']]), reverse=True)
+    for b in books:
+        if not b['cover_url'].strip():
+            b['cover_url'] = "/assets/svg/default-book.svg"
+    return books[:limit]
+
+
+def get_content_recommendations(user_id: int, user_genres: List[str], limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Recommendations shaped like backend.home.get_ai_recommendations, scored against the
+    user's completed/reading shelves and favorite books. Returns [] when there is no index yet.
+    """
+    index = get_index()
+    if index is None:
+        return []
+
+    seeds, on_shelf = user_seed_books(user_id)
+    # A few extra so books without a cover can drop to the end
+    ranked = index.recommend(seeds, user_genres, exclude_ids=on_shelf, k=limit * 3)
+    return recommendation_rows(dict(ranked), limit)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build or update the content-based recommendation index")
+    parser.add_argument('--rebuild', action='store_true', help='rebuild from every book instead of adding new ones')
+    args = parser.parse_args()
+    if args.rebuild:
+        print(f"Indexed {len(rebuild_index())} books into {RECOMMENDER_DIR}")
+    else:
+        print(f"Added {refresh_index()} books to {RECOMMENDER_DIR}")
@@ -1,8 +1,13 @@
 # backend/db.py
 import os
+import time
+import threading
+import contextvars
+from collections import deque
 from contextlib import contextmanager
 from dotenv import load_dotenv
 import psycopg2
+import psycopg2.extensions
 import psycopg2.extras
 
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
@@ -13,15 +18,361 @@ DB_HOST = os.getenv("host")
 DB_PORT = os.getenv("port")
 DB_NAME = os.getenv("dbname")
 
+# Pool sizing is per process, so under gunicorn the total number of
+# connections to Supabase is roughly workers * DB_POOL_MAX.
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN", "1"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX", "10"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))           # seconds to wait for a free connection
+POOL_MAX_AGE = float(os.getenv("DB_POOL_MAX_AGE", "1800"))         # recycle connections older than this
+POOL_MAX_IDLE = float(os.getenv("DB_POOL_MAX_IDLE", "300"))        # drop connections idle longer than this
+POOL_CHECK_AFTER = float(os.getenv("DB_POOL_CHECK_AFTER", "30"))   # ping connections idle longer than this
+
+
+class PoolTimeout(psycopg2.OperationalError):
+    """Raised when no connection becomes available within POOL_TIMEOUT."""
+
+
 def _conn():
     return psycopg2.connect(
         user=DB_USER, password=DB_PASSWORD, host=DB_HOST, port=DB_PORT, dbname=DB_NAME
     )
 
+
+def dedicated_conn():
+    """
+    A connection outside the pool for long-lived sessions such as LISTEN; the caller closes it.
+    LISTEN needs a session-mode connection, so listen_host/listen_port can point past a
+    transaction-mode pooler (on Supabase: the direct host, or the pooler's port 5432, not 6543).
+    """
+    return psycopg2.connect(
+        user=DB_USER, password=DB_PASSWORD, dbname=DB_NAME,
+        host=os.getenv("listen_host") or DB_HOST, port=os.getenv("listen_port") or DB_PORT
+    )
+
+
+class _PooledConnection:
+    """Bookkeeping for one physical connection owned by the pool."""
+    __slots__ = ("conn", "created_at", "last_used")
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of psycopg2 connections.
+    Connections are health-checked on checkout and recycled by age and idle time.
+    """
+
+    def __init__(self, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE, timeout=POOL_TIMEOUT,
+                 max_age=POOL_MAX_AGE, max_idle=POOL_MAX_IDLE, check_after=POOL_CHECK_AFTER,
+                 connect=_conn):
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.timeout = timeout
+        self.max_age = max_age
+        self.max_idle = max_idle
+        self.check_after = check_after
+        self._connect = connect
+        self._cond = threading.Condition(threading.Lock())
+        self._idle = deque()
+        self._in_use = {}
+        self._size = 0
+        self._pid = os.getpid()
+        self._stats = {
+            "checkouts": 0,
+            "wait_time_total": 0.0,
+            "wait_time_max": 0.0,
+            "timeouts": 0,
+            "connections_created": 0,
+            "connections_closed": 0,
+            "connections_recycled": 0,
+            "health_check_failures": 0,
+        }
+
+    # ---- internal helpers ----
+
+    def _check_fork(self):
+        # Connections must not be shared across processes (gunicorn --preload forks after import).
+        # Forget the parent's connections without closing them; the parent still owns the sockets.
+        if self._pid != os.getpid():
+            self._idle.clear()
+            self._in_use.clear()
+            self._size = 0
+            self._pid = os.getpid()
+
+    def _is_expired(self, entry, now):
+        if entry.conn.closed:
+            return True
+        if self.max_age and now - entry.created_at > self.max_age:
+            return True
+        # Idle recycling never shrinks the pool below min_size
+        if self.max_idle and now - entry.last_used > self.max_idle and self._size > self.min_size:
+            return True
+        return False
+
+    def _is_healthy(self, entry, now):
+        if entry.conn.closed:
+            return False
+        if now - entry.last_used < self.check_after:
+            return True
+        try:
+            with entry.conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            entry.conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, entry):
+        try:
+            if not entry.conn.closed:
+                entry.conn.close()
+        except psycopg2.Error:
+            pass
+        with self._cond:
+            self._stats["connections_closed"] += 1
+
+    def _new_entry(self):
+        try:
+            entry = _PooledConnection(self._connect())
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["connections_created"] += 1
+        return entry
+
+    # ---- public API ----
+
+    def getconn(self):
+        """Check a connection out of the pool, waiting up to `timeout` seconds."""
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            entry = None
+            create = False
+            with self._cond:
+                self._check_fork()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timeouts"] += 1
+                        raise PoolTimeout(
+                            f"Timed out after {self.timeout}s waiting for a database connection "
+                            f"(pool size {self._size}/{self.max_size})")
+                    self._cond.wait(remaining)
+                if self._idle:
+                    entry = self._idle.pop()
+                else:
+                    self._size += 1
+                    create = True
+
+            now = time.monotonic()
+            if create:
+                entry = self._new_entry()
+            elif self._is_expired(entry, now):
+                with self._cond:
+                    self._size -= 1
+                    self._stats["connections_recycled"] += 1
+                self._discard(entry)
+                continue
+            elif not self._is_healthy(entry, now):
+                with self._cond:
+                    self._size -= 1
+                    self._stats["health_check_failures"] += 1
+                self._discard(entry)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._in_use[id(entry.conn)] = entry
+                self._stats["checkouts"] += 1
+                self._stats["wait_time_total"] += waited
+                self._stats["wait_time_max"] = max(self._stats["wait_time_max"], waited)
+            return entry.conn
+
+    def putconn(self, conn):
+        """Return a connection to the pool, rolling back any transaction left open."""
+        with self._cond:
+            entry = self._in_use.pop(id(conn), None)
+        if entry is None:
+            # Checked out before a fork or already returned. Closing it here could
+            # tear down a socket another process or caller still owns, so just drop it.
+            return
+
+        keep = not conn.closed
+        if keep and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            # Matches the old close-without-commit behaviour: uncommitted work is discarded
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                keep = False
+
+        now = time.monotonic()
+        if keep and self.max_age and now - entry.created_at > self.max_age:
+            keep = False
+            with self._cond:
+                self._stats["connections_recycled"] += 1
+
+        if keep:
+            entry.last_used = now
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+        else:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            self._discard(entry)
+
+    def prefill(self):
+        """Open connections up to min_size so the first requests don't pay the connect cost."""
+        with self._cond:
+            missing = self.min_size - self._size
+        conns = []
+        try:
+            for _ in range(max(0, missing)):
+                conns.append(self.getconn())
+        finally:
+            for conn in conns:
+                self.putconn(conn)
+
+    def closeall(self):
+        """Close every idle connection. Connections in use are closed when returned."""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+        for entry in idle:
+            self._discard(entry)
+
+    def stats(self):
+        """Snapshot of pool counters, useful for sizing DB_POOL_MAX."""
+        with self._cond:
+            stats = dict(self._stats)
+            stats["size"] = self._size
+            stats["idle"] = len(self._idle)
+            stats["in_use"] = len(self._in_use)
+            stats["max_size"] = self.max_size
+        checkouts = stats["checkouts"]
+        stats["wait_time_avg"] = stats["wait_time_total"] / checkouts if checkouts else 0.0
+        return stats
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool()
+    return _pool
+
+
+def get_pool_stats():
+    return get_pool().stats()
+
+
+# Connection bound to the current request (see request_scope). None when no scope is active,
+# a dict while a scope is active ("conn" is filled lazily by the first get_conn call and
+# "depth" counts nested get_conn blocks so only the outermost one resets the transaction).
+_request_binding = contextvars.ContextVar("db_request_binding", default=None)
+
+
+def _reset_transaction(conn):
+    # Leave the shared connection the way a fresh one would be for the next caller
+    if not conn.closed and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+        try:
+            conn.rollback()
+        except psycopg2.Error:
+            pass
+
+
 @contextmanager
 def get_conn():
-    conn = _conn()
+    binding = _request_binding.get()
+    if binding is not None:
+        if binding["conn"] is None or binding["conn"].closed:
+            if binding["conn"] is not None:
+                get_pool().putconn(binding["conn"])
+            binding["conn"] = get_pool().getconn()
+        conn = binding["conn"]
+        binding["depth"] += 1
+        try:
+            yield conn
+        finally:
+            binding["depth"] -= 1
+            if binding["depth"] == 0:
+                _reset_transaction(conn)
+        return
+
+    pool = get_pool()
+    conn = pool.getconn()
     try:
         yield conn
     finally:
-        conn.close()
+        pool.putconn(conn)
+
+
+def begin_request_scope():
+    """Start binding a single pooled connection to the current request/context."""
+    if _request_binding.get() is not None:
+        return None
+    return _request_binding.set({"conn": None, "depth": 0})
+
+
+def end_request_scope(token=None):
+    """Return the request-bound connection (if one was used) to the pool."""
+    binding = _request_binding.get()
+    if binding is None:
+        return
+    conn = binding["conn"]
+    binding["conn"] = None
+    if token is not None:
+        _request_binding.reset(token)
+    else:
+        _request_binding.set(None)
+    if conn is not None:
+        get_pool().putconn(conn)
+
+
+@contextmanager
+def request_scope():
+    """
+    Reuse one pooled connection for every get_conn() call inside the block.
+    The connection is only checked out if something actually queries the database.
+    """
+    token = begin_request_scope()
+    if token is None:
+        # Already inside a scope, the outer one owns the connection
+        yield
+        return
+    try:
+        yield
+    finally:
+        end_request_scope(token)
+
+
+def init_app(server):
+    """Bind one pooled connection per Flask request (every Dash callback is a request)."""
+    try:
+        get_pool().prefill()
+    except psycopg2.Error as e:
+        print(f"Warning: could not prefill database pool: {e}")
+
+    @server.before_request
+    def _begin_db_scope():
+        begin_request_scope()
+
+    @server.teardown_request
+    def _end_db_scope(exc=None):
+        end_request_scope()
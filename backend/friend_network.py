@@ -0,0 +1,171 @@
+# backend/friend_network.py
+"""
+Friends-of-friends graph for the profile friends tab.
+
+One query returns a user's friends, their friends (excluding the user's own friends),
+and the edges between them. Node positions are computed with numpy: friends on a circle
+around the user, and each friend of a friend on an outer circle at the average angle of
+the friends that connect to it. Very large neighbourhoods are capped (the best connected
+friends of friends are kept) so the tab stays readable and the query stays small.
+
+Results are cached per user for FRIEND_NETWORK_CACHE_TTL. backend/friends.py calls
+invalidate_friend_network() when a friendship is added or removed; other processes
+pick the change up when their entry expires.
+"""
+from typing import Any, Dict, List, Optional
+import numpy as np
+import psycopg2
+import psycopg2.extras
+from backend.db import get_conn
+from backend.cache import TTLCache
+
+FRIEND_NETWORK_MAX_FRIENDS = 150      # friends drawn (the earliest ones)
+FRIEND_NETWORK_MAX_FOF = 200          # friends of friends drawn (the best connected ones)
+FRIEND_NETWORK_CACHE_TTL = 300
+
+NETWORK_CENTER = (300, 300)
+FRIEND_RADIUS = 120
+FOF_RADIUS = 180
+FOF_SPREAD = 0.5                      # radians shared by friends of friends at the same angle
+
+_network_cache = TTLCache(maxsize=1024, ttl=FRIEND_NETWORK_CACHE_TTL)
+
+# Nodes and edges of the 2-hop neighbourhood in one statement. kind is 'friend' (other =
+# position around the circle), 'fof', or 'edge' (id -> other, from a friend to a friend
+# or to a friend of a friend).
+_NETWORK_SQL = """
+    WITH direct AS (
+        SELECT friend_id AS user_id, created_at
+        FROM friends
+        WHERE user_id = %(user_id)s
+    ),
+    shown AS (
+        SELECT user_id, ROW_NUMBER() OVER (ORDER BY created_at, user_id) - 1 AS idx
+        FROM direct
+        ORDER BY created_at, user_id
+        LIMIT %(max_friends)s
+    ),
+    hop AS (
+        SELECT s.user_id AS friend_id, f.friend_id AS other_id
+        FROM shown s
+        JOIN friends f ON f.user_id = s.user_id
+        WHERE f.friend_id <> %(user_id)s
+    ),
+    fof AS (
+        SELECT h.other_id AS user_id
+        FROM hop h
+        WHERE NOT EXISTS (SELECT 1 FROM direct d WHERE d.user_id = h.other_id)
+        GROUP BY h.other_id
+        ORDER BY COUNT(*) DESC, h.other_id
+        LIMIT %(max_fof)s
+    )
+    SELECT 'friend' AS kind, s.user_id AS id, s.idx AS other, u.username, u.profile_image_url
+    FROM shown s
+    JOIN users u ON u.user_id = s.user_id
+    UNION ALL
+    SELECT 'fof', f.user_id, NULL, u.username, u.profile_image_url
+    FROM fof f
+    JOIN users u ON u.user_id = f.user_id
+    UNION ALL
+    SELECT 'edge', h.friend_id, h.other_id, NULL, NULL
+    FROM hop h
+    WHERE (h.friend_id < h.other_id AND h.other_id IN (SELECT user_id FROM shown))
+       OR h.other_id IN (SELECT user_id FROM fof)
+"""
+
+
+def _layout(friend_ids: List[int], fof_ids: List[int], fof_edges: np.ndarray):
+    """(friend positions, fof positions) as n x 2 arrays; fof_edges holds (friend idx, fof idx) rows"""
+    cx, cy = NETWORK_CENTER
+    friend_angles = 2 * np.pi * np.arange(len(friend_ids)) / max(len(friend_ids), 1)
+    friend_pos = np.column_stack((cx + FRIEND_RADIUS * np.cos(friend_angles),
+                                  cy + FRIEND_RADIUS * np.sin(friend_angles)))
+    if not fof_ids:
+        return friend_pos, np.empty((0, 2))
+
+    # Average angle of the friends each friend of a friend is connected to
+    sums = np.bincount(fof_edges[:, 1], weights=friend_angles[fof_edges[:, 0]], minlength=len(fof_ids))
+    counts = np.bincount(fof_edges[:, 1], minlength=len(fof_ids))
+    avg = sums / np.maximum(counts, 1)
+
+    # Friends of friends that share an angle fan out over FOF_SPREAD radians
+    groups, group_of, group_sizes = np.unique(avg, return_inverse=True, return_counts=True)
+    order = np.argsort(group_of, kind='stable')
+    rank = np.empty(len(fof_ids), dtype=np.int64)
+    rank[order] = np.arange(len(fof_ids)) - np.repeat(np.cumsum(group_sizes) - group_sizes, group_sizes)
+    n = group_sizes[group_of]
+    angles = avg + (rank - (n - 1) / 2) * (FOF_SPREAD / np.maximum(n - 1, 1))
+    fof_pos = np.column_stack((cx + FOF_RADIUS * np.cos(angles), cy + FOF_RADIUS * np.sin(angles)))
+    return friend_pos, fof_pos
+
+
+def _load_friend_network(user_id: int) -> Dict[str, Any]:
+    with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(_NETWORK_SQL, {'user_id': user_id, 'max_friends': FRIEND_NETWORK_MAX_FRIENDS,
+                                   'max_fof': FRIEND_NETWORK_MAX_FOF})
+        rows = cur.fetchall()
+
+    friends = sorted((r for r in rows if r['kind'] == 'friend'), key=lambda r: r['other'])
+    fofs = sorted((r for r in rows if r['kind'] == 'fof'), key=lambda r: r['username'])
+    friend_index = {r['id']: i for i, r in enumerate(friends)}
+    fof_index = {r['id']: i for i, r in enumerate(fofs)}
+
+    edges = []
+    fof_edges = []
+    for r in rows:
+        if r['kind'] != 'edge':
+            continue
+        source = friends[friend_index[r['id']]]['username']
+        if r['other'] in friend_index:
+            edges.append({'source': source, 'target': friends[friend_index[r['other']]]['username'],
+                          'type': 'mutual'})
+        else:
+            j = fof_index[r['other']]
+            fof_edges.append((friend_index[r['id']], j))
+            edges.append({'source': source, 'target': fofs[j]['username'], 'type': 'friend_to_fof'})
+
+    friend_pos, fof_pos = _layout([r['id'] for r in friends], [r['id'] for r in fofs],
+                                  np.array(fof_edges, dtype=np.int64).reshape(-1, 2))
+
+    def nodes(rs, pos):
+        return [{'user_id': r['id'], 'username': r['username'], 'profile_image_url': r['profile_image_url'],
+                 'x': float(x), 'y': float(y)} for r, (x, y) in zip(rs, pos)]
+
+    return {
+        'friends': nodes(friends, friend_pos),
+        'friends_of_friends': nodes(fofs, fof_pos),
+        'edges': edges,
+    }
+
+
+def get_friend_network(user_id: int) -> Optional[Dict[str, Any]]:
+    """
+    {'friends': [...], 'friends_of_friends': [...], 'edges': [...]} for the user's friends
+    graph. Nodes carry user_id, username, profile_image_url and x/y; edges carry source and
+    target usernames and type ('mutual' or 'friend_to_fof'). None if it couldn't be loaded.
+    """
+    try:
+        return _network_cache.get_or_set(int(user_id), lambda: _load_friend_network(int(user_id)))
+    except psycopg2.Error as e:
+        print(f"Error loading friend network for user {user_id}: {e}")
+        return None
+
+
+def invalidate_friend_network(*user_ids):
+    """
+    Drop cached graphs affected by a friendship change between `user_ids`: theirs and
+    their friends' (whose friends of friends changed).
+    """
+    ids = [int(u) for u in user_ids]
+    affected = set(ids)
+    try:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("SELECT friend_id FROM friends WHERE user_id = ANY(%s)", (ids,))
+            affected.update(row[0] for row in cur.fetchall())
+    except psycopg2.Error as e:
+        # Without the friend lists, drop everything rather than serve stale graphs
+        print(f"Error invalidating friend networks: {e}")
+        _network_cache.clear()
+        return
+    for user_id in affected:
+        _network_cache.delete(user_id)
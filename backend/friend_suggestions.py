@@ -0,0 +1,187 @@
+# backend/friend_suggestions.py
+"""
+"People you may know" (extras/migrations/012_friend_suggestions.sql).
+
+A background job loads every friendship into a CSR adjacency matrix and counts mutual
+friends with a sparse product of a block of users' rows against the whole graph (2-hop
+paths), a block at a time so memory stays bounded. The FS_CANDIDATES users with the most
+mutual friends are then ranked by mutual friends plus books they both have on their
+shelves, and the top FS_SUGGESTIONS per user are stored in friend_suggestions.
+
+Users with more than FS_MAX_DEGREE friends still get suggestions but don't count as a
+mutual friend: they would make almost everyone "know" each other and dominate every block.
+friends.get_friend_suggestions() reads the stored rows, filtering out anyone who became
+a friend or has a request pending since the last build. The job queue rebuilds daily:
+
+    python -m backend.friend_suggestions
+"""
+import os
+from typing import Callable, Optional
+import numpy as np
+import scipy.sparse as sp
+import psycopg2
+import psycopg2.extras
+from backend.db import get_conn
+
+FS_SUGGESTIONS = 20
+FS_CANDIDATES = 100                   # most-mutual candidates per user that shared books re-rank
+FS_MAX_DEGREE = 1000
+FS_SHARED_BOOKS_WEIGHT = 0.5          # per log(1 + shared books); one mutual friend counts 1
+# Upper bound on 2-hop entries computed at once (about 20 bytes each while ranking)
+FS_CHUNK_NNZ = int(os.getenv("FS_CHUNK_NNZ", "2000000"))
+FS_FETCH_SIZE = 50_000
+
+# Serializes builds across processes
+_BUILD_LOCK_ID = 7_310_024
+
+
+def _top_k(rows: np.ndarray, keys: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest keys (ties broken by position) within each run of equal rows"""
+    # One float sort key per entry: row, then key descending (keys scaled into [0, 0.5))
+    scaled = keys / (2.0 * (keys.max() + 1.0)) if len(keys) else keys
+    order = np.argsort(rows + (0.5 - scaled), kind='stable')
+    sorted_rows = rows[order]
+    rank = np.arange(len(order)) - np.searchsorted(sorted_rows, sorted_rows)
+    return order[rank < k]
+
+
+class FriendGraph:
+    """Friendships as a CSR adjacency matrix over user positions, plus each user's shelf"""
+
+    def __init__(self, user_ids, friend_ids, shelf_user_ids, shelf_book_ids):
+        self.user_ids = np.unique(np.concatenate([user_ids, friend_ids]))
+        n = len(self.user_ids)
+        src = np.searchsorted(self.user_ids, user_ids)
+        dst = np.searchsorted(self.user_ids, friend_ids)
+        # Friendships are stored in both directions; symmetrize in case one row is missing
+        rows, cols = np.concatenate([src, dst]), np.concatenate([dst, src])
+        self.adjacency = sp.csr_matrix((np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(n, n))
+        self.adjacency.data[:] = 1.0
+        self.degree = np.diff(self.adjacency.indptr)
+
+        # Paths only go through users with at most FS_MAX_DEGREE friends
+        via = (self.degree <= FS_MAX_DEGREE).astype(np.float32)
+        self.via = sp.diags(via).dot(self.adjacency).tocsr()
+        # 2-hop entries in a user's row are bounded by their friends' (usable) degrees
+        self.cost = np.asarray(self.adjacency.dot(via * self.degree)).astype(np.int64)
+
+        # Shelves of the users in the graph only; nobody else can be suggested
+        in_graph = np.isin(shelf_user_ids, self.user_ids)
+        shelf_rows = np.searchsorted(self.user_ids, shelf_user_ids[in_graph])
+        book_ids, shelf_cols = np.unique(shelf_book_ids[in_graph], return_inverse=True)
+        self.shelves = sp.csr_matrix((np.ones(len(shelf_rows), dtype=np.float32), (shelf_rows, shelf_cols)),
+                                     shape=(n, len(book_ids)))
+        self.shelves.data[:] = 1.0
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def chunks(self, positions: np.ndarray, budget: int = FS_CHUNK_NNZ):
+        """Split user positions into blocks whose 2-hop rows fit in `budget` entries"""
+        block, total = [], 0
+        for position, cost in zip(positions.tolist(), self.cost[positions].tolist()):
+            if block and total + cost > budget:
+                yield np.asarray(block)
+                block, total = [], 0
+            block.append(position)
+            total += cost
+        if block:
+            yield np.asarray(block)
+
+    def suggestions(self, block: np.ndarray, k: int = FS_SUGGESTIONS, candidates: int = FS_CANDIDATES):
+        """(user positions, suggested positions, mutual friends, shared books, scores) for `block`"""
+        friends = self.adjacency[block]
+        paths = friends.dot(self.via)
+        # Not themselves and not someone they're already friends with
+        known = friends + sp.csr_matrix((np.ones(len(block), dtype=np.float32), (np.arange(len(block)), block)),
+                                        shape=friends.shape)
+        paths = (paths - paths.multiply(known)).tocoo()
+        keep = paths.data > 0
+        rows, cols, mutual = paths.row[keep], paths.col[keep], paths.data[keep]
+
+        top = _top_k(rows, mutual, candidates)
+        rows, cols, mutual = rows[top], cols[top], mutual[top]
+        shared = np.asarray(self.shelves[block[rows]].multiply(self.shelves[cols]).sum(axis=1)).ravel()
+        scores = mutual + FS_SHARED_BOOKS_WEIGHT * np.log1p(shared)
+
+        top = _top_k(rows, scores, k)
+        return (block[rows[top]], cols[top], mutual[top].astype(np.int64),
+                shared[top].astype(np.int64), scores[top])
+
+
+def _fetch_pairs(conn, name: str, sql: str):
+    # Named cursor: rows are streamed from the server in batches instead of all at once
+    with conn.cursor(name=name) as cur:
+        cur.itersize = FS_FETCH_SIZE
+        cur.execute(sql)
+        left, right = [], []
+        while True:
+            rows = cur.fetchmany(FS_FETCH_SIZE)
+            if not rows:
+                break
+            left_col, right_col = zip(*rows)
+            left.append(np.fromiter(left_col, np.int64, len(rows)))
+            right.append(np.fromiter(right_col, np.int64, len(rows)))
+    if not left:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    return np.concatenate(left), np.concatenate(right)
+
+
+def _load_graph(conn) -> FriendGraph:
+    user_ids, friend_ids = _fetch_pairs(conn, 'fs_friends', "SELECT user_id, friend_id FROM friends")
+    shelf_users, shelf_books = _fetch_pairs(conn, 'fs_shelves', "SELECT DISTINCT user_id, book_id FROM bookshelf")
+    return FriendGraph(user_ids, friend_ids, shelf_users, shelf_books)
+
+
+def _write_suggestions(conn, user_ids, users, suggested, mutual, shared, scores):
+    """Replace the suggestion rows of `user_ids`"""
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM friend_suggestions WHERE user_id = ANY(%s)", (list(user_ids),))
+        psycopg2.extras.execute_values(
+            cur, """INSERT INTO friend_suggestions (user_id, suggested_id, mutual_friends, shared_books, score)
+                    VALUES %s""",
+            zip(users.tolist(), suggested.tolist(), mutual.tolist(), shared.tolist(), scores.tolist()),
+            page_size=5000)
+    conn.commit()
+
+
+def build_friend_suggestions(progress: Optional[Callable[..., None]] = None) -> int:
+    """
+    Recompute friend_suggestions for every user with at least one friend.
+    `progress(**fields)` is called after each block. Returns the number of users updated.
+    """
+    progress = progress or (lambda **fields: None)
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("SELECT pg_advisory_lock(%s)", (_BUILD_LOCK_ID,))
+        try:
+            cur.execute("INSERT INTO friend_suggestion_builds (started_at) VALUES (now()) RETURNING build_id")
+            build_id = cur.fetchone()[0]
+            graph = _load_graph(conn)
+            conn.commit()
+            print(f"DEBUG FRIEND_SUGGESTIONS_build: {len(graph)} users, {graph.adjacency.nnz} friendships, "
+                  f"{graph.shelves.nnz} shelved books")
+
+            done = 0
+            for block in graph.chunks(np.arange(len(graph))):
+                users, suggested, mutual, shared, scores = graph.suggestions(block)
+                _write_suggestions(conn, graph.user_ids[block].tolist(), graph.user_ids[users],
+                                   graph.user_ids[suggested], mutual, shared, scores)
+                done += len(block)
+                progress(users_done=done, users_total=len(graph))
+            # Users who no longer have any friends
+            cur.execute("DELETE FROM friend_suggestions WHERE NOT (user_id = ANY(%s))", (graph.user_ids.tolist(),))
+
+            cur.execute("""
+                UPDATE friend_suggestion_builds SET finished_at = now(), users_updated = %s WHERE build_id = %s
+            """, (len(graph), build_id))
+            conn.commit()
+        finally:
+            conn.rollback()
+            cur.execute("SELECT pg_advisory_unlock(%s)", (_BUILD_LOCK_ID,))
+            conn.commit()
+    print(f"DEBUG FRIEND_SUGGESTIONS_build: updated {len(graph)} users")
+    return len(graph)
+
+
+if __name__ == "__main__":
+    print(f"Updated suggestions for {build_friend_suggestions()} users")
@@ -3,6 +3,8 @@ from typing import Optional, List, Dict, Any
 import psycopg2
 import psycopg2.extras
 from .db import get_conn
+from .friend_network import invalidate_friend_network
+from .ingestion import enqueue_friend_suggestions_refresh
 
 # ---- FRIEND REQUESTS ----
 
@@ -121,6 +123,7 @@ def respond_to_friend_request(receiver_id: str, sender_id: str, accept: bool) ->
             """, (int(sender_id), int(receiver_id)))
 
             conn.commit()
+            invalidate_friend_network(receiver_id, sender_id)
             return {"success": True, "message": "Friend request accepted"}
         else:
             # Mark as declined
@@ -182,6 +185,7 @@ def remove_friend(user_id: str, friend_id: str) -> Dict[str, Any]:
         """, (int(user_id), int(friend_id), int(friend_id), int(user_id)))
 
         conn.commit()
+        invalidate_friend_network(user_id, friend_id)
         return {"success": True, "message": "Friend removed"}
 
 
@@ -202,6 +206,35 @@ def get_friends_list(user_id: str) -> List[Dict[str, Any]]:
         return [dict(friend) for friend in friends]
 
 
+def get_friend_suggestions(user_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    "People you may know" for a user, best first, from the precomputed friend_suggestions
+    (see backend/friend_suggestions.py). Anyone who became a friend or has a friend
+    request with the user in either direction since the last build is left out.
+    """
+    enqueue_friend_suggestions_refresh()
+    sql = """
+    SELECT s.suggested_id AS user_id, u.username, u.profile_image_url, s.mutual_friends, s.shared_books
+      FROM public.friend_suggestions s
+      JOIN public.users u ON u.user_id = s.suggested_id
+     WHERE s.user_id = %(user_id)s
+       AND NOT EXISTS (SELECT 1 FROM public.friends f
+                        WHERE f.user_id = s.user_id AND f.friend_id = s.suggested_id)
+       AND NOT EXISTS (SELECT 1 FROM public.friend_requests fr
+                        WHERE (fr.sender_id = s.user_id AND fr.receiver_id = s.suggested_id)
+                           OR (fr.sender_id = s.suggested_id AND fr.receiver_id = s.user_id))
+     ORDER BY s.score DESC, s.suggested_id
+     LIMIT %(limit)s
+    """
+    try:
+        with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(sql, {'user_id': int(user_id), 'limit': limit})
+            return [dict(r) for r in cur.fetchall()]
+    except psycopg2.Error as e:
+        print(f"Error getting friend suggestions for user {user_id}: {e}")
+        return []
+
+
 def get_friendship_status(user1_id: str, user2_username: str) -> Dict[str, Any]:
     """
     Check the friendship status between two users.
@@ -1,7 +1,8 @@
-import requests
 from bs4 import BeautifulSoup
 from backend.settings import supabase
 from backend.db import get_conn
+from backend.http_cache import cached_get
+from backend.reader import build_reader_artifacts
 from typing import List, Dict, Any
 
 
@@ -17,7 +18,7 @@ def search_gutenberg_books_by_author(author_name: str) -> List[Dict[str, Any]]:
         search_query = author_name.replace(' ', '+')
         search_url = f"https://www.gutenberg.org/ebooks/search/?query={search_query}"
 
-        response = requests.get(search_url, timeout=15)
+        response = cached_get(search_url, timeout=15)
         if response.status_code != 200:
             return books
 
@@ -72,7 +73,7 @@ def search_gutenberg_books_by_author(author_name: str) -> List[Dict[str, Any]]:
 
                 # Get book details page
                 book_url = "https://www.gutenberg.org" + href
-                book_response = requests.get(book_url, timeout=10)
+                book_response = cached_get(book_url, timeout=10)
                 if book_response.status_code != 200:
                     continue
 
@@ -121,7 +122,7 @@ def get_gutenberg_description(book_title, author_name):
         search_query = f"{book_title} {author_name}".replace(' ', '+')
         search_url = f"https://www.gutenberg.org/ebooks/search/?query={search_query}"
         
-        response = requests.get(search_url, timeout=10)
+        response = cached_get(search_url, timeout=10)
         if response.status_code != 200:
             return None
         
@@ -135,7 +136,7 @@ def get_gutenberg_description(book_title, author_name):
                 if ebook_id.isdigit():
                     # get book detail page
                     detail_url = f"https://www.gutenberg.org/ebooks/{ebook_id}"
-                    detail_response = requests.get(detail_url, timeout=10)
+                    detail_response = cached_get(detail_url, timeout=10)
                     if detail_response.status_code == 200:
                         detail_soup = BeautifulSoup(detail_response.text, 'html.parser')
                         
@@ -157,21 +158,25 @@ def get_gutenberg_description(book_title, author_name):
         return None
 
 
-def search_and_download_gutenberg_html(book_title, author_name, book_id):
+def search_and_download_gutenberg_html(book_title, author_name, book_id, raise_errors=False):
     """
     Search for a book on Project Gutenberg by title, download its HTML version if available,
     upload to Supabase storage, and update the database with the path.
+    Returns the public URL, or None if Gutenberg doesn't have it. With raise_errors,
+    network/storage failures raise instead of also returning None, so callers can retry them.
     """
+    author_name = author_name or ''
+    last_name = author_name.split()[-1] if author_name.split() else ''
     try:
         # Try different search queries
         search_queries = [
             book_title.replace(' ', '+'),  # Just title
             # Title + last name
-            f"{book_title} {author_name.split()[-1]}".replace(' ', '+'),
+            f"{book_title} {last_name}".strip().replace(' ', '+'),
             book_title.replace('The ', '').replace(
                 ' ', '+'),  # Title without 'The'
             # Title without 'The' + last name
-            f"{book_title.replace('The ', '')} {author_name.split()[-1]}".replace(
+            f"{book_title.replace('The ', '')} {last_name}".strip().replace(
                 ' ', '+'),
         ]
 
@@ -182,9 +187,13 @@ def search_and_download_gutenberg_html(book_title, author_name, book_id):
                 f"DEBUG GUTENBERG_search_and_download_gutenberg_html: Trying search query: {search_query}")
             search_url = f"https://www.gutenberg.org/ebooks/search/?query={search_query}"
 
-            response = requests.get(search_url, timeout=15)
+            response = cached_get(search_url, timeout=15)
             if response.status_code != 200:
                 print(f"Failed to search Gutenberg with query {search_query}")
+                # Rate limits and outages aren't "no match": only finish as not found
+                # once the searches actually came back empty
+                if raise_errors and response.status_code != 404:
+                    raise RuntimeError(f"Gutenberg search returned {response.status_code}")
                 continue
 
             soup = BeautifulSoup(response.text, 'html.parser')
@@ -247,9 +256,11 @@ def search_and_download_gutenberg_html(book_title, author_name, book_id):
             f"DEBUG GUTENBERG_search_and_download_gutenberg_html: Accessing book page: {book_url}")
 
         # Get the book page
-        book_response = requests.get(book_url, timeout=15)
+        book_response = cached_get(book_url, timeout=15)
         if book_response.status_code != 200:
             print(f"Failed to access book page {book_url}")
+            if raise_errors:
+                raise RuntimeError(f"Gutenberg book page returned {book_response.status_code}")
             return None
 
         soup = BeautifulSoup(book_response.text, 'html.parser')
@@ -306,9 +317,11 @@ def search_and_download_gutenberg_html(book_title, author_name, book_id):
             return None
 
         # Download the HTML content
-        html_response = requests.get(html_link, timeout=30)
+        html_response = cached_get(html_link, timeout=30)
         if html_response.status_code != 200:
             print(f"Failed to download HTML for {book_title}")
+            if raise_errors:
+                raise RuntimeError(f"Gutenberg HTML download returned {html_response.status_code}")
             return None
 
         html_content = html_response.text
@@ -341,6 +354,8 @@ def search_and_download_gutenberg_html(book_title, author_name, book_id):
                     else:
                         print(
                             f"Failed to upload to Supabase: {upload_response.json()}")
+                        if raise_errors:
+                            raise RuntimeError("Supabase upload failed")
                         return None
             else:
                 # Handle UploadResponse object
@@ -351,6 +366,8 @@ def search_and_download_gutenberg_html(book_title, author_name, book_id):
                         f"DEBUG GUTENBERG_search_and_download_gutenberg_html: File already exists in storage: {file_path}")
                 elif 'error' in str(upload_response).lower():
                     print(f"Failed to upload to Supabase: {upload_response}")
+                    if raise_errors:
+                        raise RuntimeError("Supabase upload failed")
                     return None
         except Exception as e:
             if 'already exists' in str(e).lower():
@@ -358,6 +375,8 @@ def search_and_download_gutenberg_html(book_title, author_name, book_id):
                     f"DEBUG GUTENBERG_search_and_download_gutenberg_html: File already exists in storage: {file_path}")
             else:
                 print(f"Exception during upload: {e}")
+                if raise_errors:
+                    raise
                 return None
 
         # Get public URL
@@ -373,8 +392,16 @@ def search_and_download_gutenberg_html(book_title, author_name, book_id):
                 conn.commit()
 
         print(f"Successfully stored HTML for book {book_id} at {public_url}")
+
+        # Pre-build the reader artifacts while we have the HTML in hand
+        try:
+            build_reader_artifacts(book_id, html_content, public_url)
+        except Exception as e:
+            print(f"Error building reader artifacts for book {book_id}: {e}")
         return public_url
 
     except Exception as e:
         print(f"Error processing Gutenberg HTML for book {book_id}: {e}")
+        if raise_errors:
+            raise
         return None
@@ -1,11 +1,14 @@
 import psycopg2.extras
-from datetime import datetime, timezone, timedelta
+from datetime import datetime, timezone
 from backend.db import get_conn
 from backend.gemini_helper import get_book_recommendation_chat, select_books_from_list
 from backend.gutenberg import get_gutenberg_description
-import difflib
-import json
-import pytz
+from backend.openlibrary import normalize_title
+from backend.ingestion import enqueue_content_index_refresh
+import backend.content_recommender as content_recommender
+import backend.collaborative as collaborative
+import backend.recommendation_cache as recommendation_cache
+from backend import jobs
 
 def format_timestamp(dt):
     if not dt:
@@ -40,11 +43,12 @@ def get_friend_activity(user_id, limit=10):
             b.cover_url,
             bs.shelf_type,
             bs.added_at,
-            (SELECT COUNT(*) FROM public.reviews WHERE book_id = b.book_id) AS total_ratings,
-            (SELECT ROUND(AVG(rating)::numeric, 1) FROM public.reviews WHERE book_id = b.book_id) AS avg_rating
+            COALESCE(rs.review_count, 0) AS total_ratings,
+            ROUND(rs.rating_sum::numeric / NULLIF(rs.rating_count, 0), 1) AS avg_rating
         FROM public.bookshelf bs
         JOIN public.books b ON bs.book_id = b.book_id
         JOIN public.users u ON bs.user_id = u.user_id
+        LEFT JOIN public.book_rating_stats rs ON rs.book_id = b.book_id
         WHERE bs.user_id IN (
             SELECT friend_id FROM public.friends WHERE user_id = %s
         )
@@ -91,11 +95,12 @@ def get_recent_reviews(limit=10):
             COALESCE(u.profile_image_url, '/assets/svg/default-profile.svg') AS profile_image_url,
             b.title AS book_title,
             b.cover_url,
-            (SELECT COUNT(*) FROM public.reviews WHERE book_id = r.book_id) AS total_ratings,
-            (SELECT ROUND(AVG(rating)::numeric, 1) FROM public.reviews WHERE book_id = r.book_id) AS avg_rating
+            COALESCE(rs.review_count, 0) AS total_ratings,
+            ROUND(rs.rating_sum::numeric / NULLIF(rs.rating_count, 0), 1) AS avg_rating
         FROM public.reviews r
         JOIN public.users u ON r.user_id = u.user_id
         JOIN public.books b ON r.book_id = b.book_id
+        LEFT JOIN public.book_rating_stats rs ON rs.book_id = r.book_id
         ORDER BY r.created_at DESC
         LIMIT %s;
     """
@@ -116,241 +121,198 @@ def get_recent_reviews(limit=10):
 
     return records
 
-def get_ai_recommendations(user_id, user_genres, limit=10):
-    if not user_genres:
-        return []
+# Books sent to the LLM per request: the catalog is narrowed to this many candidates in SQL first
+AI_CANDIDATE_POOL = 200
+# Genre-matched books ranked by quality/ratings before bookshelf popularity is counted for them
+AI_CANDIDATE_PREFILTER = 1000
+# Minimum trigram similarity for an AI title that doesn't match a candidate exactly
+AI_TITLE_MATCH_THRESHOLD = 0.5
 
+_CANDIDATES_SQL = """
+    WITH pool AS (
+        SELECT
+            b.book_id,
+            b.title,
+            COALESCE(b.cover_url, '') AS cover_url,
+            COALESCE(a.name, '') AS author,
+            b.description AS description,
+            COALESCE(rs.review_count, 0) AS total_ratings,
+            ROUND(rs.rating_sum::numeric / NULLIF(rs.rating_count, 0), 1) AS avg_rating,
+            -- cover + description > cover only > no cover
+            CASE WHEN NULLIF(TRIM(b.cover_url), '') IS NULL THEN 0
+                 WHEN NULLIF(TRIM(b.description), '') IS NULL THEN 1
+                 ELSE 2 END AS quality
+        FROM public.books b
+        LEFT JOIN public.authors a ON b.author_id = a.author_id
+        LEFT JOIN public.book_rating_stats rs ON rs.book_id = b.book_id
+        WHERE {genre_filter}
+          AND NOT (b.book_id = ANY(%(excluded)s::integer[]))
+        ORDER BY quality DESC, total_ratings DESC
+        LIMIT %(prefilter)s
+    )
+    SELECT p.*, (SELECT COUNT(*) FROM public.bookshelf bs WHERE bs.book_id = p.book_id) AS shelf_count
+    FROM pool p
+    ORDER BY p.quality DESC, shelf_count DESC, p.total_ratings DESC, p.avg_rating DESC NULLS LAST
+    LIMIT %(pool_size)s
+"""
+# LOWER(b.genre) matches the trigram index from extras/migrations/006_recommendation_candidates.sql
+_GENRE_CANDIDATES_SQL = _CANDIDATES_SQL.format(genre_filter="LOWER(b.genre) LIKE ANY(%(genre_patterns)s)")
+_OTHER_CANDIDATES_SQL = _CANDIDATES_SQL.format(
+    genre_filter="NOT COALESCE(LOWER(b.genre) LIKE ANY(%(genre_patterns)s), false)")
+
+_RECOMMENDATION_FIELDS = ('book_id', 'title', 'cover_url', 'author', 'description', 'total_ratings', 'avg_rating')
+
+
+def _genre_patterns(user_genres):
+    patterns = []
+    for genre in user_genres:
+        genre = (genre or '').strip().lower()
+        if genre:
+            escaped = genre.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            patterns.append(f"%{escaped}%")
+    return patterns
+
+
+def get_recommendation_candidates(user_id, user_genres, pool_size=AI_CANDIDATE_POOL):
+    """
+    Up to pool_size books the user hasn't read or started, best first: books in the user's
+    genres ranked by quality (cover/description), bookshelf popularity and ratings, then
+    other books if the genres don't fill the pool.
+    """
     with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-
         cur.execute("""
             SELECT book_id FROM public.bookshelf
             WHERE user_id = %s AND shelf_type IN ('completed', 'reading', 'currently reading');
         """, (user_id,))
-        excluded_ids = {row["book_id"] for row in cur.fetchall()}
+        excluded_ids = [row["book_id"] for row in cur.fetchall()]
 
-        cur.execute("""
-            SELECT 
-                b.book_id,
-                b.title,
-                COALESCE(b.cover_url, '') AS cover_url,
-                COALESCE(a.name, '') AS author,
-                b.description AS description,
-                (SELECT COUNT(*) FROM public.reviews WHERE book_id = b.book_id) AS total_ratings,
-                (SELECT ROUND(AVG(rating)::numeric, 1) FROM public.reviews WHERE book_id = b.book_id) AS avg_rating
-            FROM public.books b
-            LEFT JOIN public.authors a ON b.author_id = a.author_id
-        """)
-        all_books = cur.fetchall()
-        print(f"DEBUG: Fetched {len(all_books)} books from database")
-        for book in all_books[:3]:  # Print first 3 books
-            print(f"  Book: {book['title']}, Description exists: {bool(book.get('description'))}, Length: {len(book.get('description', '') or '')}")
-
-    if not all_books:
-        return []
+        params = {'genre_patterns': _genre_patterns(user_genres) or ['%'], 'excluded': excluded_ids,
+                  'prefilter': max(pool_size, AI_CANDIDATE_PREFILTER), 'pool_size': pool_size}
+        cur.execute(_GENRE_CANDIDATES_SQL, params)
+        candidates = [dict(r) for r in cur.fetchall()]
+
+        if len(candidates) < pool_size:
+            params['pool_size'] = params['prefilter'] = pool_size - len(candidates)
+            cur.execute(_OTHER_CANDIDATES_SQL, params)
+            candidates.extend(dict(r) for r in cur.fetchall())
+
+    return candidates
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def build_title_index(books):
+    """Exact (normalized title -> book) lookup plus trigram sets for fuzzy matching, built once per request"""
+    exact = {}
+    fuzzy = []
+    for book in books:
+        key = normalize_title(book["title"])
+        if key and key not in exact:
+            exact[key] = book
+            fuzzy.append((_trigrams(book["title"].lower()), book))
+    return exact, fuzzy
+
+
+def match_title(title_index, title, threshold=AI_TITLE_MATCH_THRESHOLD):
+    """The book whose title matches `title` exactly (ignoring case/punctuation) or most closely, or None"""
+    exact, fuzzy = title_index
+    book = exact.get(normalize_title(title))
+    if book is not None:
+        return book
+
+    wanted = _trigrams(title.lower())
+    best, best_score = None, threshold
+    for grams, candidate in fuzzy:
+        score = len(wanted & grams) / len(wanted | grams)
+        if score >= best_score:
+            best, best_score = candidate, score
+    return best
 
-    # Filter out completed/currently-reading books
-    available_books = [
-        b for b in all_books
-        if b["book_id"] not in excluded_ids
-    ]
 
-    if not available_books:
+def get_ai_recommendations(user_id, user_genres, limit=10):
+    if not user_genres:
         return []
 
-    # Prioritize books by quality: cover + description > cover only > neither
-    books_with_both = [b for b in available_books 
-                       if b["cover_url"] not in (None, "", " ") 
-                       and b.get("description") and b["description"].strip()]
-    books_with_cover_only = [b for b in available_books 
-                             if b["cover_url"] not in (None, "", " ") 
-                             and (not b.get("description") or not b["description"].strip())]
-    books_with_neither = [b for b in available_books 
-                          if b["cover_url"] in (None, "", " ")]
-
-    # AI selects books from DB titles using dedicated function
-    book_titles_list = [b["title"] for b in available_books]
-    success, ai_output = select_books_from_list(book_titles_list, user_genres, limit)
-    
+    candidates = get_recommendation_candidates(user_id, user_genres)
+    print(f"DEBUG HOME_get_ai_recommendations: {len(candidates)} candidates for user {user_id}")
+    if not candidates:
+        return []
+
+    # AI picks from the candidate titles only, not the whole catalog
+    success, ai_output = select_books_from_list([b["title"] for b in candidates], user_genres, limit)
+
     matched_recs = []
     used_ids = set()
-    
-    # Try to match AI-selected titles if successful, prioritizing complete books
+
+    # Books with a cover that the AI picked come first, cover + description before cover only
     if success and ai_output:
-        ai_titles = [t.strip() for t in ai_output.split("\n") if t.strip()]
-        ai_titles_clean = {t.lower() for t in ai_titles}
-
-        # First pass: match books with both cover and description
-        for title_lower in ai_titles_clean:
-            best = difflib.get_close_matches(
-                title_lower,
-                [b["title"].lower() for b in books_with_both],
-                n=1,
-                cutoff=0.7
-            )
-            if best:
-                match_title = best[0]
-                book = next(b for b in books_with_both if b["title"].lower() == match_title)
-                if book["book_id"] not in used_ids:
-                    matched_recs.append(book)
-                    used_ids.add(book["book_id"])
-                    if len(matched_recs) >= limit:
-                        break
-
-        # Second pass: match remaining AI titles from books with cover only
-        if len(matched_recs) < limit:
-            for title_lower in ai_titles_clean:
-                best = difflib.get_close_matches(
-                    title_lower,
-                    [b["title"].lower() for b in books_with_cover_only],
-                    n=1,
-                    cutoff=0.7
-                )
-                if best:
-                    match_title = best[0]
-                    book = next(b for b in books_with_cover_only if b["title"].lower() == match_title)
-                    if book["book_id"] not in used_ids:
-                        matched_recs.append(book)
-                        used_ids.add(book["book_id"])
-                        if len(matched_recs) >= limit:
-                            break
-
-    # Fill remaining slots with books that have both cover and description
-    if len(matched_recs) < limit:
-        for b in books_with_both:
-            if b["book_id"] not in used_ids:
-                matched_recs.append(b)
-                used_ids.add(b["book_id"])
-                if len(matched_recs) >= limit:
-                    break
-
-    # Then fill with books that have cover only
-    if len(matched_recs) < limit:
-        for b in books_with_cover_only:
-            if b["book_id"] not in used_ids:
-                matched_recs.append(b)
-                used_ids.add(b["book_id"])
-                if len(matched_recs) >= limit:
-                    break
-
-    # Finally add books without covers as last resort
-    if len(matched_recs) < limit:
-        for b in books_with_neither:
-            if b["book_id"] not in used_ids:
+        title_index = build_title_index(candidates)
+        picked = []
+        for title in ai_output.split("\n"):
+            book = match_title(title_index, title.strip()) if title.strip() else None
+            if book is not None and book["quality"] > 0 and book["book_id"] not in used_ids:
+                picked.append(book)
+                used_ids.add(book["book_id"])
+        picked.sort(key=lambda b: b["quality"], reverse=True)
+        matched_recs.extend(picked[:limit])
+
+    # Fill remaining slots from the candidates, which are already ranked best first
+    for b in candidates:
+        if len(matched_recs) >= limit:
+            break
+        if b["book_id"] not in used_ids:
+            if b["quality"] == 0:
                 b["cover_url"] = "/assets/svg/default-book.svg"
-                matched_recs.append(b)
-                used_ids.add(b["book_id"])
-                if len(matched_recs) >= limit:
-                    break
-
-    # Debug: print what descriptions we have
-    for rec in matched_recs:
-        print(f"Book: {rec['title']}, Has description: {bool(rec.get('description'))}, Description: {rec.get('description', '')[:50] if rec.get('description') else 'None'}")
-
-    return matched_recs[:limit]
-
-
-def get_next_refresh_time():
-    """Calculate next 7 PM ET refresh time"""
-    eastern = pytz.timezone('US/Eastern')
-    now_et = datetime.now(eastern)
-    
-    # Set to today at 7 PM ET
-    refresh_time = now_et.replace(hour=19, minute=0, second=0, microsecond=0)
-    
-    # If it's already past 7 PM, move to tomorrow
-    if now_et >= refresh_time:
-        refresh_time += timedelta(days=1)
-    
-    return refresh_time
-
-
-def should_refresh_cache(created_at):
-    """Check if cache should be refreshed (past 7 PM ET)"""
-    if not created_at:
-        return True
-    
-    eastern = pytz.timezone('US/Eastern')
-    now_et = datetime.now(eastern)
-    
-    # Convert created_at to Eastern time
-    if created_at.tzinfo is None:
-        created_at = pytz.utc.localize(created_at)
-    created_at_et = created_at.astimezone(eastern)
-    
-    # Get last 7 PM ET
-    last_refresh = now_et.replace(hour=19, minute=0, second=0, microsecond=0)
-    if now_et < last_refresh:
-        # Haven't hit today's 7 PM yet, so last refresh was yesterday
-        last_refresh -= timedelta(days=1)
-    
-    # Cache should refresh if it was created before the last 7 PM ET
-    return created_at_et < last_refresh
-
-
-def get_cached_recommendations(user_id):
-    """Get cached recommendations for user, or None if cache invalid"""
-    try:
-        with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute("""
-                SELECT rec_data, created_at
-                FROM public.ai_recommendation_cache
-                WHERE user_id = %s
-            """, (user_id,))
-            
-            result = cur.fetchone()
-            if not result:
-                return None
-            
-            # Check if cache should be refreshed
-            if should_refresh_cache(result['created_at']):
-                return None
-            
-            return result['rec_data']
-    except Exception as e:
-        print(f"Error getting cached recommendations: {e}")
-        return None
-
-
-def cache_recommendations(user_id, recommendations):
-    """Store recommendations in cache"""
-    try:
-        with get_conn() as conn, conn.cursor() as cur:
-            # Use upsert to insert or update
-            cur.execute("""
-                INSERT INTO public.ai_recommendation_cache (user_id, rec_data, created_at)
-                VALUES (%s, %s, CURRENT_TIMESTAMP)
-                ON CONFLICT (user_id) 
-                DO UPDATE SET rec_data = EXCLUDED.rec_data, created_at = CURRENT_TIMESTAMP
-            """, (user_id, json.dumps(recommendations)))
-            conn.commit()
-            return True
-    except Exception as e:
-        print(f"Error caching recommendations: {e}")
-        return False
+            matched_recs.append(b)
+            used_ids.add(b["book_id"])
 
+    return [{field: b[field] for field in _RECOMMENDATION_FIELDS} for b in matched_recs[:limit]]
 
-def get_ai_recommendations_with_cache(user_id, user_genres, limit=10):
-    """Get AI recommendations with caching - refreshes daily at 7 PM ET"""
+
+def generate_recommendations(user_id, user_genres, limit=10):
+    """Fresh recommendations from the configured backend, falling back to the Gemini picker"""
     if not user_genres:
         return []
-    
-    # Try to get from cache first
-    cached = get_cached_recommendations(user_id)
-    if cached is not None:
-        print(f"Returning cached recommendations for user {user_id}")
-        # Re-sort cached results to prioritize books with cover + description
-        sorted_cached = sorted(cached, key=lambda b: (
-            bool(b.get("cover_url") and b["cover_url"] not in ("", " ", "/assets/svg/default-book.svg") and b.get("description") and b["description"].strip()),
-            bool(b.get("cover_url") and b["cover_url"] not in ("", " ", "/assets/svg/default-book.svg"))
-        ), reverse=True)
-        return sorted_cached
-    
-    # Generate fresh recommendations
+
     print(f"Generating fresh recommendations for user {user_id}")
-    recommendations = get_ai_recommendations(user_id, user_genres, limit)
-    
-    # Cache the results
-    if recommendations:
-        cache_recommendations(user_id, recommendations)
-    
-    return recommendations
+    recommendations = None
+    if content_recommender.RECOMMENDER_BACKEND in ('content', 'hybrid'):
+        if content_recommender.RECOMMENDER_BACKEND == 'hybrid':
+            recommendations = collaborative.get_blended_recommendations(user_id, user_genres, limit)
+        else:
+            recommendations = content_recommender.get_content_recommendations(user_id, user_genres, limit)
+        if not recommendations and content_recommender.get_index() is None:
+            # No index on this host yet: build it in the background and ask Gemini meanwhile
+            enqueue_content_index_refresh()
+    if not recommendations:
+        recommendations = get_ai_recommendations(user_id, user_genres, limit)
+    return recommendations or []
+
+
+def get_ai_recommendations_with_cache(user_id, user_genres, limit=10):
+    """
+    Cached recommendations, never generated during the page load: a missing, stale or
+    expired entry is regenerated by a background job (see backend.recommendation_cache).
+    Returns None while the user's first recommendations are still being prepared.
+    """
+    if not user_genres:
+        return []
+
+    cached, needs_refresh = recommendation_cache.get_cached_recommendations(user_id)
+    if needs_refresh:
+        # The user is waiting on the page for a first set; a refresh can queue behind others
+        recommendation_cache.request_refresh(
+            user_id, jobs.PRIORITY_HIGH if cached is None else jobs.PRIORITY_NORMAL)
+    if cached is None:
+        return None if needs_refresh else []
+
+    print(f"Returning cached recommendations for user {user_id}")
+    # Re-sort cached results to prioritize books with cover + description
+    sorted_cached = sorted(cached, key=lambda b: (
+        bool(b.get("cover_url") and b["cover_url"] not in ("", " ", "/assets/svg/default-book.svg") and b.get("description") and b["description"].strip()),
+        bool(b.get("cover_url") and b["cover_url"] not in ("", " ", "/assets/svg/default-book.svg"))
+    ), reverse=True)
+    return sorted_cached[:limit]
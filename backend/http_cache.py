@@ -0,0 +1,272 @@
+# backend/http_cache.py
+"""
+Shared HTTP session with an on-disk response cache, used by the Open Library client.
+
+Responses are stored in a small SQLite database keyed by the full request URL.
+How long an entry is fresh depends on the endpoint (see CACHE_RULES). Stale entries
+that carry an ETag or Last-Modified header are revalidated with a conditional
+request, so an unchanged document costs a 304 instead of a full download.
+404s are cached too (negative caching) so missing works/authors aren't re-requested
+on every page view. Everything that actually goes out over the network is paced by
+backend.rate_limit.
+"""
+import os
+import re
+import json
+import time
+import sqlite3
+import threading
+import logging
+from typing import Any, Dict, Optional
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+from . import rate_limit
+
+logger = logging.getLogger(__name__)
+
+# Set HTTP_CACHE_PATH to an empty string to disable the on-disk cache (the pooled session is still used)
+HTTP_CACHE_PATH = os.getenv(
+    "HTTP_CACHE_PATH", os.path.join(os.path.dirname(__file__), ".http_cache.sqlite"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "20"))    # keep-alive connections per host
+HTTP_CACHE_MAX_STALE = float(os.getenv("HTTP_CACHE_MAX_STALE", str(30 * 86400)))  # keep expired entries this long for revalidation
+HTTP_USER_AGENT = os.getenv("HTTP_USER_AGENT", "Bookmarkd/1.0")
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# (url regex, seconds a 200 response stays fresh), first match wins. Unlisted URLs are not cached.
+CACHE_RULES = [
+    (re.compile(r"/works/OL\w+/editions\.json"), DAY),
+    (re.compile(r"/works/OL\w+\.json"), 7 * DAY),
+    (re.compile(r"/authors/OL\w+/works\.json"), DAY),
+    (re.compile(r"/authors/OL\w+\.json"), 7 * DAY),
+    (re.compile(r"/search(/authors)?\.json"), HOUR),
+]
+
+# How long a 404 is remembered
+NEGATIVE_TTL = 6 * HOUR
+
+_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS responses (
+        url TEXT PRIMARY KEY,
+        status INTEGER NOT NULL,
+        headers TEXT NOT NULL,
+        body BLOB NOT NULL,
+        etag TEXT,
+        last_modified TEXT,
+        fetched_at REAL NOT NULL,
+        expires_at REAL NOT NULL
+    )
+"""
+
+
+def ttl_for_url(url: str) -> float:
+    """Freshness lifetime for a successful response from `url` (0 = don't cache)"""
+    path = url.split("?", 1)[0]
+    for pattern, ttl in CACHE_RULES:
+        if pattern.search(path):
+            return ttl
+    return 0
+
+
+def _build_response(url, status, headers, body):
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response._content = body
+    response.encoding = "utf-8"
+    response.reason = "OK" if status == 200 else "Not Found" if status == 404 else ""
+    return response
+
+
+class HTTPCache:
+    """SQLite-backed response store. One sqlite connection per thread, WAL for concurrent readers."""
+
+    def __init__(self, path=HTTP_CACHE_PATH, max_stale=HTTP_CACHE_MAX_STALE):
+        self.path = path
+        self.max_stale = max_stale
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "negative_hits": 0,
+                       "revalidated": 0, "stores": 0, "errors": 0}
+        with self._db() as db:
+            db.execute(_SCHEMA)
+        self.prune()
+
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=5)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def count(self, name):
+        with self._lock:
+            self._stats[name] += 1
+
+    def lookup(self, url):
+        """Return the stored entry for `url` as a dict, or None"""
+        try:
+            row = self._db().execute(
+                "SELECT status, headers, body, etag, last_modified, expires_at FROM responses WHERE url = ?",
+                (url,)).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"HTTP cache read failed: {e}")
+            self.count("errors")
+            return None
+        if row is None:
+            return None
+        status, headers, body, etag, last_modified, expires_at = row
+        return {"status": status, "headers": json.loads(headers), "body": body,
+                "etag": etag, "last_modified": last_modified, "expires_at": expires_at}
+
+    def store(self, url, status, headers, body, ttl):
+        now = time.time()
+        try:
+            with self._db() as db:
+                db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, status, json.dumps(headers), body, headers.get("ETag"),
+                     headers.get("Last-Modified"), now, now + ttl))
+            self.count("stores")
+        except sqlite3.Error as e:
+            logger.warning(f"HTTP cache write failed: {e}")
+            self.count("errors")
+
+    def touch(self, url, ttl):
+        """Mark an entry fresh again after a 304"""
+        now = time.time()
+        try:
+            with self._db() as db:
+                db.execute("UPDATE responses SET fetched_at = ?, expires_at = ? WHERE url = ?",
+                           (now, now + ttl, url))
+        except sqlite3.Error as e:
+            logger.warning(f"HTTP cache update failed: {e}")
+            self.count("errors")
+
+    def prune(self):
+        """Drop entries that have been expired for longer than max_stale"""
+        try:
+            with self._db() as db:
+                db.execute("DELETE FROM responses WHERE expires_at < ?", (time.time() - self.max_stale,))
+        except sqlite3.Error as e:
+            logger.warning(f"HTTP cache prune failed: {e}")
+
+    def clear(self):
+        with self._db() as db:
+            db.execute("DELETE FROM responses")
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats["hits"] + stats["negative_hits"] + stats["revalidated"] + stats["misses"]
+        stats["hit_rate"] = (lookups - stats["misses"]) / lookups if lookups else 0.0
+        return stats
+
+
+class CachingSession:
+    """
+    requests.Session with pooled keep-alive connections plus HTTPCache in front of GETs.
+    get() returns a requests.Response either way, so callers don't care where it came from.
+    """
+
+    def __init__(self, cache: Optional[HTTPCache] = None, pool_maxsize=HTTP_POOL_MAXSIZE):
+        self.cache = cache
+        self.session = requests.Session()
+        # Retries are handled by make_request_with_retry, not urllib3
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_maxsize, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers["User-Agent"] = HTTP_USER_AGENT
+
+    def get(self, url: str, params: Dict[str, Any] = None, timeout: float = 10) -> requests.Response:
+        full_url = requests.Request("GET", url, params=params).prepare().url
+        ttl = ttl_for_url(full_url) if self.cache else 0
+        if not ttl:
+            return self._send(full_url, {}, timeout)
+
+        entry = self.cache.lookup(full_url)
+        now = time.time()
+        if entry is not None and entry["expires_at"] > now:
+            self.cache.count("negative_hits" if entry["status"] == 404 else "hits")
+            return _build_response(full_url, entry["status"], entry["headers"], entry["body"])
+
+        headers = {}
+        if entry is not None and entry["status"] == 200:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        response = self._send(full_url, headers, timeout)
+
+        if response.status_code == 304 and entry is not None:
+            self.cache.count("revalidated")
+            self.cache.touch(full_url, ttl)
+            return _build_response(full_url, entry["status"], entry["headers"], entry["body"])
+
+        self.cache.count("misses")
+        if response.status_code == 200:
+            self.cache.store(full_url, 200, _cacheable_headers(response), response.content, ttl)
+        elif response.status_code == 404:
+            self.cache.store(full_url, 404, _cacheable_headers(response), response.content, NEGATIVE_TTL)
+        return response
+
+
+    def _send(self, url, headers, timeout):
+        # Foreground callers won't wait longer for a token than for the response itself;
+        # background ingestion just queues.
+        wait = timeout if rate_limit.current_priority() == rate_limit.FOREGROUND else None
+        try:
+            rate_limit.acquire(url, timeout=wait)
+        except rate_limit.RateLimitTimeout as e:
+            raise requests.exceptions.Timeout(f"{e} for {url}")
+
+        response = self.session.get(url, headers=headers, timeout=timeout)
+        if response.status_code in (429, 503):
+            retry_after = rate_limit.parse_retry_after(response.headers.get("Retry-After"))
+            if retry_after is not None:
+                # Shared: every thread talking to this host waits it out
+                rate_limit.backoff(url, retry_after)
+        return response
+
+
+def _cacheable_headers(response):
+    keep = ("Content-Type", "ETag", "Last-Modified")
+    return {name: response.headers[name] for name in keep if name in response.headers}
+
+
+_session = None
+_session_pid = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> CachingSession:
+    global _session, _session_pid
+    # Like the DB pool, sockets must not be shared with a forked child
+    if _session is None or _session_pid != os.getpid():
+        with _session_lock:
+            if _session is None or _session_pid != os.getpid():
+                cache = None
+                if HTTP_CACHE_PATH:
+                    try:
+                        cache = HTTPCache(HTTP_CACHE_PATH)
+                    except sqlite3.Error as e:
+                        logger.warning(f"HTTP cache disabled, could not open {HTTP_CACHE_PATH}: {e}")
+                _session = CachingSession(cache)
+                _session_pid = os.getpid()
+    return _session
+
+
+def cached_get(url: str, params: Dict[str, Any] = None, timeout: float = 10) -> requests.Response:
+    """Drop-in replacement for requests.get(url, params=..., timeout=...)"""
+    return get_session().get(url, params=params, timeout=timeout)
+
+
+def get_http_cache_stats() -> Dict[str, Any]:
+    cache = get_session().cache
+    return cache.stats() if cache else {}
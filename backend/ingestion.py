@@ -0,0 +1,234 @@
+# backend/ingestion.py
+"""
+Background ingestion jobs:
+- authors: pulling an author's Open Library works and extra Open Library/Gutenberg
+  matches into the local database
+- Gutenberg HTML: finding and storing the readable HTML for a book
+- content index: adding newly ingested books to backend.content_recommender
+- book neighbours: refreshing backend.collaborative's item-item similarities
+- friend suggestions: rebuilding backend.friend_suggestions' "people you may know"
+
+Pages call the enqueue_* functions and poll the matching *_status function;
+the work itself runs on the backend.jobs worker pool.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict
+from backend.authors import get_author_details
+from backend.books import get_book_details
+from backend import jobs
+
+AUTHOR_WORKS_JOB = 'author_works'
+AUTHOR_ADDITIONAL_JOB = 'author_additional_books'
+AUTHOR_JOB_KINDS = [AUTHOR_WORKS_JOB, AUTHOR_ADDITIONAL_JOB]
+
+# Don't re-ingest an author that was fully ingested less than a day ago
+AUTHOR_REFRESH_AFTER = 24 * 3600
+
+CONTENT_INDEX_JOB = 'content_index'
+
+BOOK_NEIGHBORS_JOB = 'book_neighbors'
+# Recent shelf/review activity is folded in hourly, everything is recomputed weekly
+BOOK_NEIGHBORS_REFRESH_AFTER = 3600
+BOOK_NEIGHBORS_REBUILD_AFTER = 7 * 24 * 3600
+
+FRIEND_SUGGESTIONS_JOB = 'friend_suggestions'
+FRIEND_SUGGESTIONS_REBUILD_AFTER = 24 * 3600
+
+GUTENBERG_HTML_JOB = 'gutenberg_html'
+# A book Gutenberg doesn't have is looked up again after a week
+GUTENBERG_RETRY_AFTER = 7 * 24 * 3600
+
+
+def author_job_key(author_data: Dict[str, Any]) -> str:
+    """Deduplication key: the Open Library key when we have one, so the same author is shared across ids"""
+    key = author_data.get('openlibrary_key')
+    if key:
+        return key if key.startswith('/authors/') else f"/authors/{key}"
+    return f"author:{author_data['author_id']}"
+
+
+def _run_author_works(payload: Dict[str, Any], report_progress):
+    from backend.openlibrary import get_or_create_author_with_books
+
+    author_data = get_author_details(payload['author_id'])
+    if not author_data:
+        return  # author was deleted, nothing to do
+    if get_or_create_author_with_books(author_data, progress_callback=report_progress) is None:
+        raise RuntimeError(f"Could not fetch Open Library author {author_data.get('openlibrary_key')}")
+    enqueue_content_index_refresh()
+
+
+def _run_author_additional(payload: Dict[str, Any], report_progress):
+    from backend.openlibrary import search_additional_books_by_author
+
+    author_data = get_author_details(payload['author_id'])
+    if not author_data:
+        return
+    search_additional_books_by_author(
+        author_data['name'], author_data['author_id'], progress_callback=report_progress)
+    enqueue_content_index_refresh()
+
+
+def _run_content_index(payload: Dict[str, Any], report_progress):
+    from backend.content_recommender import refresh_index
+
+    report_progress(books_added=refresh_index())
+
+
+def _run_book_neighbors(payload: Dict[str, Any], report_progress):
+    from backend.collaborative import build_book_neighbors
+
+    # Progress after every block also keeps the job's lease alive during long builds
+    report_progress(books_updated=build_book_neighbors(full=payload.get('full', False), progress=report_progress))
+
+
+def _run_friend_suggestions(payload: Dict[str, Any], report_progress):
+    from backend.friend_suggestions import build_friend_suggestions
+
+    report_progress(users_updated=build_friend_suggestions(progress=report_progress))
+
+
+def _run_gutenberg_html(payload: Dict[str, Any], report_progress):
+    from backend.gutenberg import search_and_download_gutenberg_html
+
+    book_data = get_book_details(payload['book_id'])
+    if not book_data:
+        return
+    if book_data.get('html_path'):
+        report_progress(found=True)
+        return
+    # Network and storage errors raise so the job is retried; "not on Gutenberg" finishes
+    # the job with found=False, which keeps it from being re-queued until the retry window passes.
+    html_path = search_and_download_gutenberg_html(
+        book_data['title'], book_data.get('author_name'), book_data['book_id'], raise_errors=True)
+    report_progress(found=bool(html_path))
+
+
+jobs.register_handler(AUTHOR_WORKS_JOB, _run_author_works)
+jobs.register_handler(AUTHOR_ADDITIONAL_JOB, _run_author_additional)
+jobs.register_handler(GUTENBERG_HTML_JOB, _run_gutenberg_html)
+jobs.register_handler(CONTENT_INDEX_JOB, _run_content_index)
+jobs.register_handler(BOOK_NEIGHBORS_JOB, _run_book_neighbors)
+jobs.register_handler(FRIEND_SUGGESTIONS_JOB, _run_friend_suggestions)
+
+
+def enqueue_author_ingestion(author_data: Dict[str, Any], priority: int = jobs.PRIORITY_HIGH) -> str:
+    """
+    Queue background ingestion for an author (no-op if it is already queued, running,
+    or finished recently in any process). Returns the key to poll status with.
+    """
+    key = author_job_key(author_data)
+    payload = {'author_id': author_data['author_id']}
+    if author_data.get('openlibrary_key'):
+        jobs.enqueue(AUTHOR_WORKS_JOB, key, payload, priority=priority,
+                     refresh_after=AUTHOR_REFRESH_AFTER)
+    jobs.enqueue(AUTHOR_ADDITIONAL_JOB, key, payload, priority=priority + 10,
+                 refresh_after=AUTHOR_REFRESH_AFTER)
+    return key
+
+
+def get_author_ingestion_status(job_key: str) -> Dict[str, Any]:
+    """
+    Summary of an author's ingestion jobs for polling:
+    {'active': bool, 'books_added': int, 'failed': bool}
+    """
+    statuses = jobs.get_jobs_status(job_key, AUTHOR_JOB_KINDS)
+    return {
+        'active': any(s['status'] in jobs.ACTIVE_STATUSES for s in statuses),
+        'books_added': sum(int((s['progress'] or {}).get('books_added', 0)) for s in statuses),
+        'failed': any(s['status'] == 'failed' for s in statuses),
+    }
+
+
+def enqueue_content_index_refresh():
+    """
+    Queue adding newly ingested books to the content-based recommender index. Only used
+    when it is the configured backend; ingestion bursts collapse into one queued job.
+    """
+    from backend.content_recommender import RECOMMENDER_BACKEND
+
+    if RECOMMENDER_BACKEND in ('content', 'hybrid'):
+        jobs.enqueue(CONTENT_INDEX_JOB, 'content_index', priority=jobs.PRIORITY_LOW)
+
+
+_book_neighbors_checked = 0.0
+
+
+def enqueue_book_neighbors_refresh():
+    """
+    Keep book_neighbors current: an incremental build at most hourly and a full one weekly.
+    Cheap enough to call on every page view; the database is only asked once a minute per process.
+    """
+    global _book_neighbors_checked
+    now = time.monotonic()
+    if now - _book_neighbors_checked < 60:
+        return
+    _book_neighbors_checked = now
+    jobs.enqueue(BOOK_NEIGHBORS_JOB, 'incremental', priority=jobs.PRIORITY_LOW,
+                 refresh_after=BOOK_NEIGHBORS_REFRESH_AFTER)
+    jobs.enqueue(BOOK_NEIGHBORS_JOB, 'full', {'full': True}, priority=jobs.PRIORITY_LOW,
+                 refresh_after=BOOK_NEIGHBORS_REBUILD_AFTER)
+
+
+_friend_suggestions_checked = 0.0
+
+
+def enqueue_friend_suggestions_refresh():
+    """
+    Keep friend_suggestions current: a full rebuild at most daily.
+    Cheap enough to call on every page view; the database is only asked once a minute per process.
+    """
+    global _friend_suggestions_checked
+    now = time.monotonic()
+    if now - _friend_suggestions_checked < 60:
+        return
+    _friend_suggestions_checked = now
+    jobs.enqueue(FRIEND_SUGGESTIONS_JOB, 'full', priority=jobs.PRIORITY_LOW,
+                 refresh_after=FRIEND_SUGGESTIONS_REBUILD_AFTER)
+
+
+def gutenberg_job_key(book_id: int) -> str:
+    return f"book:{book_id}"
+
+
+def enqueue_gutenberg_fetch(book_id: int, priority: int = jobs.PRIORITY_HIGH) -> str:
+    """
+    Queue a background Gutenberg lookup for a book without html_path. A book that
+    Gutenberg didn't have is not looked up again until GUTENBERG_RETRY_AFTER has passed.
+    """
+    key = gutenberg_job_key(book_id)
+    jobs.enqueue(GUTENBERG_HTML_JOB, key, {'book_id': book_id}, priority=priority,
+                 refresh_after=GUTENBERG_RETRY_AFTER)
+    return key
+
+
+def get_gutenberg_fetch_status(book_id: int) -> Dict[str, Any]:
+    """
+    {'state': 'pending' | 'found' | 'not_found' | 'failed' | None, 'retry_after': datetime or None}
+    None means no lookup has been queued for this book.
+    """
+    statuses = jobs.get_jobs_status(gutenberg_job_key(book_id), [GUTENBERG_HTML_JOB])
+    if not statuses:
+        return {'state': None, 'retry_after': None}
+
+    job = statuses[0]
+    if job['status'] in jobs.ACTIVE_STATUSES:
+        return {'state': 'pending', 'retry_after': None}
+    if job['status'] == 'failed':
+        return {'state': 'failed', 'retry_after': None}
+    if (job['progress'] or {}).get('found'):
+        return {'state': 'found', 'retry_after': None}
+    finished_at = job['finished_at'] or datetime.now()
+    return {'state': 'not_found', 'retry_after': finished_at + timedelta(seconds=GUTENBERG_RETRY_AFTER)}
+
+
+if __name__ == "__main__":
+    # Dedicated worker process: python -m backend.ingestion (set JOB_WORKERS=0 on the web processes)
+    import time
+    # Modules that register job handlers outside this one
+    import backend.recommendation_cache as recommendation_cache
+    jobs.ensure_workers(max(1, jobs.JOB_WORKERS))
+    recommendation_cache.ensure_scheduler()
+    while True:
+        time.sleep(60)
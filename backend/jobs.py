@@ -0,0 +1,254 @@
+# backend/jobs.py
+"""
+Durable background job queue backed by the ingestion_jobs table
+(extras/migrations/002_ingestion_jobs.sql).
+
+enqueue() is deduplicated by (kind, dedup_key) in the database, so every gunicorn
+worker can call it for the same author and only one job exists. Each process runs a
+small pool of worker threads (started on first enqueue) that claim jobs in priority
+order with FOR UPDATE SKIP LOCKED. Failed jobs are retried with exponential backoff,
+and a job whose worker died is picked up again once its lease expires. Workers only
+claim kinds whose handler is registered in their own process.
+"""
+import os
+import json
+import time
+import socket
+import threading
+import traceback
+from typing import Any, Callable, Dict, List, Optional
+import psycopg2
+import psycopg2.extras
+from backend.db import get_conn
+from backend.rate_limit import background_priority
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))               # per process, 0 = don't run jobs here
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "5"))  # seconds between polls when idle
+JOB_LEASE = int(os.getenv("JOB_LEASE", "900"))                  # reclaim running jobs silent for this long
+JOB_RETRY_BASE = 30                                             # first retry after 30s, then 60s, 120s...
+JOB_RETRY_MAX = 3600
+JOB_RETENTION_DAYS = 30
+
+PRIORITY_HIGH = 10
+PRIORITY_NORMAL = 50
+PRIORITY_LOW = 100
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+# kind -> handler(payload, report_progress)
+_handlers: Dict[str, Callable[[Dict[str, Any], Callable[..., None]], None]] = {}
+
+_ENQUEUE_SQL = """
+    INSERT INTO ingestion_jobs (kind, dedup_key, payload, priority, max_attempts)
+    SELECT %(kind)s, %(key)s, %(payload)s, %(priority)s, %(max_attempts)s
+    WHERE NOT EXISTS (
+        SELECT 1 FROM ingestion_jobs
+        WHERE kind = %(kind)s AND dedup_key = %(key)s AND status = 'done'
+          AND finished_at > now() - %(refresh_after)s * interval '1 second'
+    )
+    ON CONFLICT (kind, dedup_key) WHERE status IN ('queued', 'running') DO NOTHING
+    RETURNING job_id
+"""
+
+_CLAIM_SQL = """
+    UPDATE ingestion_jobs SET
+        status = 'running', attempts = attempts + 1,
+        locked_by = %(worker)s, locked_at = now(), updated_at = now()
+    WHERE job_id = (
+        SELECT job_id FROM ingestion_jobs
+        WHERE kind = ANY(%(kinds)s)
+          AND ((status = 'queued' AND run_after <= now())
+               OR (status = 'running' AND locked_at < now() - %(lease)s * interval '1 second'))
+        ORDER BY priority, run_after
+        LIMIT 1
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING job_id, kind, dedup_key, payload, attempts, max_attempts
+"""
+
+
+def register_handler(kind: str, handler: Callable[[Dict[str, Any], Callable[..., None]], None]):
+    """Register the function that runs jobs of `kind`. It receives (payload, report_progress)."""
+    _handlers[kind] = handler
+
+
+def enqueue(kind: str, dedup_key: str, payload: Optional[Dict[str, Any]] = None,
+            priority: int = PRIORITY_NORMAL, max_attempts: int = 5,
+            refresh_after: int = 0) -> Optional[int]:
+    """
+    Queue a job unless one with the same (kind, dedup_key) is already queued/running,
+    or finished successfully within the last `refresh_after` seconds.
+    Returns the new job_id, or None if nothing was queued.
+    """
+    params = {
+        'kind': kind, 'key': dedup_key, 'payload': json.dumps(payload or {}),
+        'priority': priority, 'max_attempts': max_attempts, 'refresh_after': refresh_after,
+    }
+    try:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(_ENQUEUE_SQL, params)
+            row = cur.fetchone()
+            if row is None:
+                # Already queued: let a more urgent request bump its priority
+                cur.execute("""
+                    UPDATE ingestion_jobs SET priority = %(priority)s, updated_at = now()
+                    WHERE kind = %(kind)s AND dedup_key = %(key)s
+                      AND status = 'queued' AND priority > %(priority)s
+                """, params)
+            conn.commit()
+    except psycopg2.Error as e:
+        print(f"Error enqueuing {kind} job for {dedup_key}: {e}")
+        return None
+
+    ensure_workers()
+    if row is not None:
+        print(f"DEBUG JOBS_enqueue: queued {kind} job {row[0]} for {dedup_key}")
+        _wakeup.set()
+        return row[0]
+    return None
+
+
+def get_jobs_status(dedup_key: str, kinds: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Latest job of each kind for `dedup_key`: status, attempts, progress and timestamps"""
+    try:
+        with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute("""
+                SELECT DISTINCT ON (kind) job_id, kind, status, attempts, max_attempts,
+                       progress, last_error, created_at, updated_at, finished_at
+                FROM ingestion_jobs
+                WHERE dedup_key = %s AND (%s::varchar[] IS NULL OR kind = ANY(%s::varchar[]))
+                ORDER BY kind, created_at DESC
+            """, (dedup_key, kinds, kinds))
+            return [dict(row) for row in cur.fetchall()]
+    except psycopg2.Error as e:
+        print(f"Error getting job status for {dedup_key}: {e}")
+        return []
+
+
+def _report_progress(job_id: int, fields: Dict[str, Any]):
+    # Also renews the lease so long jobs aren't reclaimed while still making progress
+    try:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                UPDATE ingestion_jobs SET progress = progress || %s::jsonb,
+                       locked_at = now(), updated_at = now()
+                WHERE job_id = %s
+            """, (json.dumps(fields), job_id))
+            conn.commit()
+    except psycopg2.Error as e:
+        print(f"Error reporting progress for job {job_id}: {e}")
+
+
+def _finish(job_id: int, error: Optional[str], attempts: int, max_attempts: int):
+    with get_conn() as conn, conn.cursor() as cur:
+        if error is None:
+            cur.execute("""
+                UPDATE ingestion_jobs SET status = 'done', last_error = NULL, locked_by = NULL,
+                       finished_at = now(), updated_at = now()
+                WHERE job_id = %s
+            """, (job_id,))
+        elif attempts < max_attempts:
+            delay = min(JOB_RETRY_BASE * 2 ** (attempts - 1), JOB_RETRY_MAX)
+            cur.execute("""
+                UPDATE ingestion_jobs SET status = 'queued', last_error = %s, locked_by = NULL,
+                       run_after = now() + %s * interval '1 second', updated_at = now()
+                WHERE job_id = %s
+            """, (error, delay, job_id))
+        else:
+            cur.execute("""
+                UPDATE ingestion_jobs SET status = 'failed', last_error = %s, locked_by = NULL,
+                       finished_at = now(), updated_at = now()
+                WHERE job_id = %s
+            """, (error, job_id))
+        conn.commit()
+
+
+def _claim(worker_name: str) -> Optional[Dict[str, Any]]:
+    # Only kinds this process can run; the rest are left for a process that registered them
+    with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(_CLAIM_SQL, {'worker': worker_name, 'lease': JOB_LEASE, 'kinds': list(_handlers)})
+        row = cur.fetchone()
+        conn.commit()
+        return dict(row) if row else None
+
+
+def run_one(worker_name: str = "inline") -> bool:
+    """Claim and run a single job. Returns False if there was nothing to do."""
+    job = _claim(worker_name)
+    if job is None:
+        return False
+
+    job_id = job['job_id']
+    handler = _handlers.get(job['kind'])
+    error = None
+    started = time.monotonic()
+    if handler is None:
+        error = f"No handler registered for job kind {job['kind']!r}"
+    else:
+        try:
+            # Job traffic yields to interactive requests in the outbound rate limiter
+            with background_priority():
+                handler(job['payload'], lambda **fields: _report_progress(job_id, fields))
+        except Exception as e:
+            error = f"{e}\n{traceback.format_exc(limit=5)}"
+
+    print(f"DEBUG JOBS_run_one: {job['kind']} job {job_id} ({job['dedup_key']}) "
+          f"{'done' if error is None else 'failed'} in {time.monotonic() - started:.1f}s "
+          f"(attempt {job['attempts']}/{job['max_attempts']})")
+    try:
+        _finish(job_id, error, job['attempts'], job['max_attempts'])
+    except psycopg2.Error as e:
+        # The lease will expire and another worker will pick the job up again
+        print(f"Error finishing job {job_id}: {e}")
+    return True
+
+
+def prune_jobs(days: int = JOB_RETENTION_DAYS):
+    """Delete finished jobs older than `days`"""
+    try:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                DELETE FROM ingestion_jobs
+                WHERE status IN ('done', 'failed') AND finished_at < now() - %s * interval '1 day'
+            """, (days,))
+            conn.commit()
+    except psycopg2.Error as e:
+        print(f"Error pruning jobs: {e}")
+
+
+_wakeup = threading.Event()
+_workers: List[threading.Thread] = []
+_workers_pid = None
+_workers_lock = threading.Lock()
+
+
+def _worker_loop(worker_name: str):
+    while True:
+        try:
+            if run_one(worker_name):
+                continue
+        except psycopg2.Error as e:
+            print(f"Error in job worker {worker_name}: {e}")
+        _wakeup.wait(JOB_POLL_INTERVAL)
+        _wakeup.clear()
+
+
+def ensure_workers(count: int = JOB_WORKERS):
+    """Start this process's worker threads if they aren't running yet (safe after fork)."""
+    global _workers, _workers_pid
+    if count <= 0:
+        return
+    if _workers_pid == os.getpid() and _workers:
+        return
+    with _workers_lock:
+        if _workers_pid == os.getpid() and _workers:
+            return
+        prune_jobs()
+        base = f"{socket.gethostname()}:{os.getpid()}"
+        _workers = []
+        for i in range(count):
+            thread = threading.Thread(target=_worker_loop, args=(f"{base}:{i}",),
+                                      daemon=True, name=f"job-worker-{i}")
+            thread.start()
+            _workers.append(thread)
+        _workers_pid = os.getpid()
@@ -1,74 +1,139 @@
+# backend/leaderboards.py
+"""
+Reading leaderboards (extras/migrations/013_leaderboard_daily.sql).
+
+Triggers on bookshelf keep leaderboard_daily up to date: completed books per user, day
+and genre. A board sums the rows for the days in its window and ranks users with
+RANK(), so tied users share a rank. Windows are whole days ending today, and any
+window or genre reads the same table.
+
+The global top LEADERBOARD_SIZE is cached per window and genre for
+LEADERBOARD_CACHE_TTL, together with how many users finished each number of books, so
+a viewer outside the top gets their own rank from one indexed lookup of their row.
+Friend boards are cached per viewer.
+"""
+import bisect
+from typing import Any, Dict, List, Optional
+import psycopg2
 import psycopg2.extras
 from backend.db import get_conn
+from backend.cache import TTLCache
 
+# Days in each window; None = all time
+LEADERBOARD_WINDOWS = {'week': 7, 'month': 30, 'year': 365, 'all': None}
+LEADERBOARD_SIZE = 100
+LEADERBOARD_CACHE_TTL = 60
 
-def get_friend_leaderboard(user_id, time_window='month'):
-    """Return leaderboard data for a user and their friends within a rolling time window."""
-    if time_window not in ['week', 'month', 'year']:
-        time_window = 'month'
-
-    if time_window == 'week':
-        time_sql = "now() - interval '7 days'"
-    elif time_window == 'month':
-        time_sql = "now() - interval '30 days'"
-    elif time_window == 'year':
-        time_sql = "now() - interval '365 days'"
-    else:
-        time_sql = "now() - interval '30 days'"
-
-    sql = f"""
-        SELECT 
-            u.user_id,
-            u.username,
-            COALESCE(u.profile_image_url, '/assets/svg/default-profile.svg') AS profile_image_url,
-            COUNT(b.book_id) AS books_completed
-        FROM public.bookshelf b
-        JOIN public.users u ON b.user_id = u.user_id
-        WHERE 
-            b.shelf_type = 'completed'
-            AND b.added_at >= {time_sql}
-            AND b.user_id IN (
-                SELECT friend_id FROM public.friends WHERE user_id = %s
-                UNION
-                SELECT %s
-            )
-        GROUP BY u.user_id, u.username, u.profile_image_url
-        ORDER BY books_completed DESC, u.username ASC;
-    """
+_global_cache = TTLCache(maxsize=64, ttl=LEADERBOARD_CACHE_TTL)
+_friends_cache = TTLCache(maxsize=2048, ttl=LEADERBOARD_CACHE_TTL)
+
+# Completed books per user in the window (%(genre)s NULL = every genre)
+_TOTALS_SQL = """
+    SELECT user_id, SUM(completed) AS books_completed
+    FROM leaderboard_daily
+    WHERE (%(days)s::integer IS NULL OR day > CURRENT_DATE - %(days)s::integer)
+      AND (%(genre)s::text IS NULL OR genre = %(genre)s::text)
+      {users}
+    GROUP BY user_id
+    HAVING SUM(completed) > 0
+"""
+
+_RANKED_SQL = """
+    SELECT t.user_id, u.username,
+           COALESCE(u.profile_image_url, '/assets/svg/default-profile.svg') AS profile_image_url,
+           t.books_completed,
+           RANK() OVER (ORDER BY t.books_completed DESC) AS rank
+    FROM totals t
+    JOIN users u ON u.user_id = t.user_id
+    ORDER BY t.books_completed DESC, u.username ASC
+"""
+
+# kind 'row' is a top entry; kind 'count' is how many users (n) finished books_completed books
+_GLOBAL_SQL = f"""
+    WITH totals AS ({_TOTALS_SQL.format(users='')}),
+    top AS ({_RANKED_SQL} LIMIT %(limit)s)
+    SELECT 'row' AS kind, user_id, username, profile_image_url, books_completed, rank, NULL AS n
+    FROM top
+    UNION ALL
+    SELECT 'count', NULL, NULL, NULL, books_completed, NULL, COUNT(*)
+    FROM totals
+    GROUP BY books_completed
+"""
+
+_FRIENDS_SQL = f"""
+    WITH members AS (
+        SELECT friend_id AS user_id FROM friends WHERE user_id = %(user_id)s
+        UNION
+        SELECT %(user_id)s
+    ),
+    totals AS ({_TOTALS_SQL.format(users='AND user_id IN (SELECT user_id FROM members)')})
+    {_RANKED_SQL}
+"""
+
+_VIEWER_SQL = f"""
+    WITH totals AS ({_TOTALS_SQL.format(users='AND user_id = %(user_id)s')})
+    {_RANKED_SQL}
+"""
+
+
+def _window(time_window: str) -> str:
+    return time_window if time_window in LEADERBOARD_WINDOWS else 'month'
+
+
+def _params(time_window: str, genre: Optional[str]) -> Dict[str, Any]:
+    return {'days': LEADERBOARD_WINDOWS[time_window], 'genre': genre}
+
+
+def _load_global(time_window: str, genre: Optional[str]):
+    """(top rows, [(books_completed, users)] ascending) for a window"""
     with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-        cur.execute(sql, (user_id, user_id))
-        return [dict(r) for r in cur.fetchall()]
-
-
-def get_global_leaderboard(time_window='month'):
-    """Return global leaderboard data for all users within a rolling time window."""
-    if time_window not in ['week', 'month', 'year']:
-        time_window = 'month'
-
-    if time_window == 'week':
-        time_sql = "now() - interval '7 days'"
-    elif time_window == 'month':
-        time_sql = "now() - interval '30 days'"
-    elif time_window == 'year':
-        time_sql = "now() - interval '365 days'"
-    else:
-        time_sql = "now() - interval '30 days'"
-
-    sql = f"""
-        SELECT 
-            u.user_id,
-            u.username,
-            COALESCE(u.profile_image_url, '/assets/svg/default-profile.svg') AS profile_image_url,
-            COUNT(b.book_id) AS books_completed
-        FROM public.bookshelf b
-        JOIN public.users u ON b.user_id = u.user_id
-        WHERE 
-            b.shelf_type = 'completed'
-            AND b.added_at >= {time_sql}
-        GROUP BY u.user_id, u.username, u.profile_image_url
-        ORDER BY books_completed DESC, u.username ASC
-        LIMIT 100;
+        cur.execute(_GLOBAL_SQL, {**_params(time_window, genre), 'limit': LEADERBOARD_SIZE})
+        rows = cur.fetchall()
+    top = [{k: r[k] for k in ('user_id', 'username', 'profile_image_url', 'books_completed', 'rank')}
+           for r in rows if r['kind'] == 'row']
+    top.sort(key=lambda r: (r['rank'], r['username']))
+    counts = sorted((r['books_completed'], r['n']) for r in rows if r['kind'] == 'count')
+    return top, counts
+
+
+def _rank_of(books_completed: int, counts) -> int:
+    """RANK() of a user with `books_completed` books: 1 + users with more"""
+    i = bisect.bisect_right(counts, (books_completed, float('inf')))
+    return 1 + sum(n for _, n in counts[i:])
+
+
+def get_friend_leaderboard(user_id, time_window='month', genre=None) -> List[Dict[str, Any]]:
+    """Leaderboard of a user and their friends for a window ('week', 'month', 'year' or 'all')."""
+    time_window = _window(time_window)
+    key = (int(user_id), time_window, genre)
+    try:
+        def load():
+            with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.execute(_FRIENDS_SQL, {**_params(time_window, genre), 'user_id': int(user_id)})
+                return [dict(r) for r in cur.fetchall()]
+        return _friends_cache.get_or_set(key, load)
+    except psycopg2.Error as e:
+        print(f"Error loading friend leaderboard for user {user_id}: {e}")
+        return []
+
+
+def get_global_leaderboard(time_window='month', user_id=None, genre=None) -> List[Dict[str, Any]]:
     """
-    with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-        cur.execute(sql)
-        return [dict(r) for r in cur.fetchall()]
+    Top LEADERBOARD_SIZE readers for a window ('week', 'month', 'year' or 'all'). When
+    `user_id` has completed books in the window but isn't in the top, their own row is
+    appended with their rank.
+    """
+    time_window = _window(time_window)
+    try:
+        top, counts = _global_cache.get_or_set((time_window, genre), lambda: _load_global(time_window, genre))
+        if user_id is None or any(r['user_id'] == user_id for r in top):
+            return top
+        with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(_VIEWER_SQL, {**_params(time_window, genre), 'user_id': int(user_id)})
+            viewer = cur.fetchone()
+    except psycopg2.Error as e:
+        print(f"Error loading global leaderboard: {e}")
+        return []
+    if viewer is None:
+        return top
+    return top + [dict(viewer, rank=_rank_of(viewer['books_completed'], counts))]
@@ -1,38 +1,33 @@
-import os
 import hashlib
-import psycopg2
 import json
 import secrets
 from datetime import datetime, timedelta
-from dotenv import load_dotenv
 from psycopg2 import Error
+from backend.db import get_conn
 from backend.moderation import moderate_review
 import backend.email_utils as email_utils
+from backend.recommendation_cache import mark_recommendations_stale
 
-# load environment variables from .env file
-load_dotenv()
 
-USER = os.getenv("user")
-PASSWORD = os.getenv("password")
-HOST = os.getenv("host")
-PORT = os.getenv("port")
-DBNAME = os.getenv("dbname")
+# columns needed to build a user session, in the order user_record_to_dict expects
+USER_SESSION_COLUMNS = """
+    user_id, username, email, profile_image_url, created_at, first_login, favorite_genres, display_mode, email_verified
+"""
 
 
-# create the database connection and return it
-def get_db_connection():
-    try:
-        connection = psycopg2.connect(
-            user=USER,
-            password=PASSWORD,
-            host=HOST,
-            port=PORT,
-            dbname=DBNAME
-        )
-        return connection
-    except Error as e:
-        print(f"Error connecting to database: {e}")
-        return None
+def user_record_to_dict(user_record):
+    """Map a row selected with USER_SESSION_COLUMNS to the user data dict stored in the session"""
+    return {
+        "user_id": user_record[0],
+        "username": user_record[1],
+        "email": user_record[2],
+        "profile_image_url": user_record[3],
+        "created_at": user_record[4].isoformat() if user_record[4] else None,
+        "first_login": user_record[5],
+        "favorite_genres": user_record[6],
+        "display_mode": user_record[7],
+        "email_verified": user_record[8]
+    }
 
 # hash the password for security
 
@@ -42,63 +37,51 @@ def hash_password(password):
 
 
 def signup_user(username, email, password):
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed"
-
-    cursor = connection.cursor()
-
     # Moderate Username
     is_approved, reason, layer = moderate_review(username, context="username")
     if not is_approved:
-        cursor.close()
-        connection.close()
         return False, "Username contains inappropriate content. Please choose another."
 
-    # if username already exists
-    cursor.execute(
-        "SELECT user_id FROM users WHERE username = %s", (username,))
-    if cursor.fetchone():
-        cursor.close()
-        connection.close()
-        return False, "Username already exists"
-
-    # if email already exists
-    cursor.execute("SELECT user_id FROM users WHERE email = %s", (email,))
-    if cursor.fetchone():
-        cursor.close()
-        connection.close()
-        return False, "Email already exists"
-
-    hashed_password = hash_password(password)
-
-    # insert new user with email_verified = false
-    insert_query = """
-        INSERT INTO users (username, email, password, display_mode, email_verified) 
-        VALUES (%s, %s, %s, 'light', false)
-        RETURNING user_id
-    """
-    cursor.execute(insert_query, (username, email, hashed_password))
-    user_id = cursor.fetchone()[0]
-
-    connection.commit()
+    try:
+        with get_conn() as connection, connection.cursor() as cursor:
+            # if username already exists
+            cursor.execute(
+                "SELECT user_id FROM users WHERE username = %s", (username,))
+            if cursor.fetchone():
+                return False, "Username already exists"
+
+            # if email already exists
+            cursor.execute("SELECT user_id FROM users WHERE email = %s", (email,))
+            if cursor.fetchone():
+                return False, "Email already exists"
+
+            hashed_password = hash_password(password)
+
+            # insert new user with email_verified = false
+            insert_query = """
+                INSERT INTO users (username, email, password, display_mode, email_verified) 
+                VALUES (%s, %s, %s, 'light', false)
+                RETURNING user_id
+            """
+            cursor.execute(insert_query, (username, email, hashed_password))
+            user_id = cursor.fetchone()[0]
+
+            connection.commit()
+    except Error as e:
+        print(f"Error signing up user: {e}")
+        return False, "Database connection failed"
 
     # generate and store verification token
     token = email_utils.generate_token()
     success, message = email_utils.store_verification_token(user_id, token)
 
     if not success:
-        cursor.close()
-        connection.close()
         return False, "Error generating verification token"
 
     # send verification email
     success, message = email_utils.send_verification_email(
         email, username, token)
 
-    cursor.close()
-    connection.close()
-
     if success:
         return True, "Account created! Please check your email to verify your account."
     else:
@@ -110,135 +93,82 @@ def generate_remember_token(user_id, remember_me=False):
     if not remember_me:
         return None
 
-    connection = get_db_connection()
-    if not connection:
-        return None
-
-    cursor = connection.cursor()
-
     try:
-        # generate secure token
-        token = secrets.token_urlsafe(32)
-        expires_at = datetime.now() + timedelta(days=30)
-
-        # store token in database
-        cursor.execute(
-            "UPDATE users SET remember_token = %s, remember_token_expires = %s WHERE user_id = %s",
-            (token, expires_at, user_id)
-        )
-        connection.commit()
-        cursor.close()
-        connection.close()
-
-        return token
+        with get_conn() as connection, connection.cursor() as cursor:
+            # generate secure token
+            token = secrets.token_urlsafe(32)
+            expires_at = datetime.now() + timedelta(days=30)
+
+            # store token in database
+            cursor.execute(
+                "UPDATE users SET remember_token = %s, remember_token_expires = %s WHERE user_id = %s",
+                (token, expires_at, user_id)
+            )
+            connection.commit()
+
+            return token
     except Error as e:
         print(f"Error generating remember token: {e}")
-        cursor.close()
-        connection.close()
         return None
 
 
 def verify_remember_token(token):
     """Verify remember me token and return user data if valid"""
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed", None
-
-    cursor = connection.cursor()
-
     try:
-        # check if token exists and is not expired
-        query = """
-            SELECT user_id, username, email, profile_image_url, created_at, first_login, favorite_genres, display_mode, email_verified
-            FROM users 
-            WHERE remember_token = %s AND remember_token_expires > NOW()
-        """
-        cursor.execute(query, (token,))
-        user_record = cursor.fetchone()
-
-        cursor.close()
-        connection.close()
+        with get_conn() as connection, connection.cursor() as cursor:
+            # check if token exists and is not expired
+            query = f"""
+                SELECT {USER_SESSION_COLUMNS}
+                FROM users 
+                WHERE remember_token = %s AND remember_token_expires > NOW()
+            """
+            cursor.execute(query, (token,))
+            user_record = cursor.fetchone()
 
         if user_record:
-            user_data = {
-                "user_id": user_record[0],
-                "username": user_record[1],
-                "email": user_record[2],
-                "profile_image_url": user_record[3],
-                "created_at": user_record[4].isoformat() if user_record[4] else None,
-                "first_login": user_record[5],
-                "favorite_genres": user_record[6],
-                "display_mode": user_record[7],
-                "email_verified": user_record[8]
-            }
-            return True, "Token valid", user_data
+            return True, "Token valid", user_record_to_dict(user_record)
         else:
             return False, "Invalid or expired token", None
     except Error as e:
         print(f"Error verifying remember token: {e}")
-        cursor.close()
-        connection.close()
         return False, "Error verifying token", None
 
 
 def clear_remember_token(user_id):
     """Clear remember me token on logout"""
-    connection = get_db_connection()
-    if not connection:
-        return False
-
-    cursor = connection.cursor()
-
     try:
-        cursor.execute(
-            "UPDATE users SET remember_token = NULL, remember_token_expires = NULL WHERE user_id = %s",
-            (user_id,)
-        )
-        connection.commit()
-        cursor.close()
-        connection.close()
-        return True
+        with get_conn() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE users SET remember_token = NULL, remember_token_expires = NULL WHERE user_id = %s",
+                (user_id,)
+            )
+            connection.commit()
+            return True
     except Error as e:
         print(f"Error clearing remember token: {e}")
-        cursor.close()
-        connection.close()
         return False
 
 
 def login_user(username, password, remember_me=False):
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed", None, None
-
-    cursor = connection.cursor()
-
     hashed_password = hash_password(password)
 
     # check login credentials and get all user data including email_verified
-    login_query = """
-        SELECT user_id, username, email, profile_image_url, created_at, first_login, favorite_genres, display_mode, email_verified
+    login_query = f"""
+        SELECT {USER_SESSION_COLUMNS}
         FROM users 
         WHERE username = %s AND password = %s
     """
-    cursor.execute(login_query, (username, hashed_password))
-    user_record = cursor.fetchone()
-
-    cursor.close()
-    connection.close()
+    try:
+        with get_conn() as connection, connection.cursor() as cursor:
+            cursor.execute(login_query, (username, hashed_password))
+            user_record = cursor.fetchone()
+    except Error as e:
+        print(f"Error logging in user: {e}")
+        return False, "Database connection failed", None, None
 
     if user_record:
         # Return all user data as a dictionary (allow login even if email not verified)
-        user_data = {
-            "user_id": user_record[0],
-            "username": user_record[1],
-            "email": user_record[2],
-            "profile_image_url": user_record[3],
-            "created_at": user_record[4].isoformat() if user_record[4] else None,
-            "first_login": user_record[5],
-            "favorite_genres": user_record[6],
-            "display_mode": user_record[7],
-            "email_verified": user_record[8]  # include email_verified status
-        }
+        user_data = user_record_to_dict(user_record)
 
         # generate remember me token if requested
         remember_token = generate_remember_token(user_record[0], remember_me)
@@ -250,46 +180,25 @@ def login_user(username, password, remember_me=False):
 
 def refresh_user_session_data(user_id):
     """Refresh user session data from database"""
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed", None
-
-    cursor = connection.cursor()
-
     try:
-        # Get all user data
-        query = """
-            SELECT user_id, username, email, profile_image_url, created_at, first_login, favorite_genres, display_mode, email_verified
-            FROM users 
-            WHERE user_id = %s
-        """
-        cursor.execute(query, (user_id,))
-        user_record = cursor.fetchone()
-
-        cursor.close()
-        connection.close()
+        with get_conn() as connection, connection.cursor() as cursor:
+            # Get all user data
+            query = f"""
+                SELECT {USER_SESSION_COLUMNS}
+                FROM users 
+                WHERE user_id = %s
+            """
+            cursor.execute(query, (user_id,))
+            user_record = cursor.fetchone()
 
         if user_record:
             # Return updated session data
-            session_data = {
-                "logged_in": True,
-                "user_id": user_record[0],
-                "username": user_record[1],
-                "email": user_record[2],
-                "profile_image_url": user_record[3],
-                "created_at": user_record[4].isoformat() if user_record[4] else None,
-                "first_login": user_record[5],
-                "favorite_genres": user_record[6],
-                "display_mode": user_record[7],
-                "email_verified": user_record[8]
-            }
+            session_data = {"logged_in": True, **user_record_to_dict(user_record)}
             return True, "Session data refreshed successfully", session_data
         else:
             return False, "User not found", None
 
     except Error as e:
-        cursor.close()
-        connection.close()
         return False, f"Error refreshing session data: {e}", None
 
 # Update User Genre backend
@@ -297,49 +206,32 @@ def refresh_user_session_data(user_id):
 
 def update_user_genres(user_id, favorite_genres):
     """Update user's favorite genres and mark first login as complete"""
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed"
-
-    cursor = connection.cursor()
-
     try:
-        update_preference_query = """
-            UPDATE users 
-            SET favorite_genres = %s, first_login = %s 
-            WHERE user_id = %s
-        """
-        cursor.execute(update_preference_query,
-                       (json.dumps(favorite_genres), False, user_id))
-        connection.commit()
-
-        cursor.close()
-        connection.close()
+        with get_conn() as connection, connection.cursor() as cursor:
+            update_preference_query = """
+                UPDATE users 
+                SET favorite_genres = %s, first_login = %s 
+                WHERE user_id = %s
+            """
+            cursor.execute(update_preference_query,
+                           (json.dumps(favorite_genres), False, user_id))
+            connection.commit()
+        mark_recommendations_stale(user_id)
 
         return True, "User's favorite genres have been updated!"
 
     except Error as e:
-        cursor.close()
-        connection.close()
         return False, f"Error updating genres: {e}"
 
 
 def request_password_reset(email):
     """Request password reset - send reset email if email exists"""
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed"
-
-    cursor = connection.cursor()
-
     try:
         # check if email exists
-        cursor.execute(
-            "SELECT user_id, username FROM users WHERE email = %s", (email,))
-        user = cursor.fetchone()
-
-        cursor.close()
-        connection.close()
+        with get_conn() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT user_id, username FROM users WHERE email = %s", (email,))
+            user = cursor.fetchone()
 
         if not user:
             # don't reveal if email exists or not for security
@@ -378,20 +270,12 @@ def reset_password(token, new_password):
     # hash new password
     hashed_password = hash_password(new_password)
 
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed"
-
-    cursor = connection.cursor()
-
     try:
         # update password
-        cursor.execute(
-            "UPDATE users SET password = %s WHERE user_id = %s", (hashed_password, user_id))
-        connection.commit()
-
-        cursor.close()
-        connection.close()
+        with get_conn() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                "UPDATE users SET password = %s WHERE user_id = %s", (hashed_password, user_id))
+            connection.commit()
 
         # clear reset token
         email_utils.clear_reset_token(user_id)
@@ -399,42 +283,28 @@ def reset_password(token, new_password):
         return True, "Password reset successfully"
 
     except Error as e:
-        cursor.close()
-        connection.close()
         return False, f"Error resetting password: {e}"
 
 
 def change_password(user_id, old_password, new_password):
     """Change password for authenticated user"""
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed"
-
-    cursor = connection.cursor()
-
     try:
-        # verify old password
-        hashed_old = hash_password(old_password)
-        cursor.execute(
-            "SELECT user_id FROM users WHERE user_id = %s AND password = %s", (user_id, hashed_old))
-
-        if not cursor.fetchone():
-            cursor.close()
-            connection.close()
-            return False, "Current password is incorrect"
+        with get_conn() as connection, connection.cursor() as cursor:
+            # verify old password
+            hashed_old = hash_password(old_password)
+            cursor.execute(
+                "SELECT user_id FROM users WHERE user_id = %s AND password = %s", (user_id, hashed_old))
 
-        # update to new password
-        hashed_new = hash_password(new_password)
-        cursor.execute(
-            "UPDATE users SET password = %s WHERE user_id = %s", (hashed_new, user_id))
-        connection.commit()
+            if not cursor.fetchone():
+                return False, "Current password is incorrect"
 
-        cursor.close()
-        connection.close()
+            # update to new password
+            hashed_new = hash_password(new_password)
+            cursor.execute(
+                "UPDATE users SET password = %s WHERE user_id = %s", (hashed_new, user_id))
+            connection.commit()
 
         return True, "Password changed successfully"
 
     except Error as e:
-        cursor.close()
-        connection.close()
         return False, f"Error changing password: {e}"
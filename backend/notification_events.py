@@ -0,0 +1,169 @@
+# backend/notification_events.py
+"""
+Push notification changes to open pages (extras/migrations/009_notification_events.sql).
+
+Triggers on friend_requests, recommendations, reading_goals and users.email_verified
+NOTIFY the affected user's id on the user_notifications channel. One listener thread per
+process LISTENs on a dedicated connection and bumps that user's version in memory, and
+GET /notifications/stream (server-sent events) wakes up for the user and sends a
+'changed' event. The browser (assets/notification_stream.js) then has Dash refetch.
+Only "something changed" is ever sent, never notification content.
+
+The stream takes user_id from the query string unverified: the login session lives in
+the browser (the user-session store), so the server has no credential to check it
+against. Anyone can therefore learn *when* a given user's notifications change, but not
+what changed; the content is only ever fetched through the page's own callbacks.
+
+Each open stream holds a server thread (or greenlet) for up to NOTIFICATION_STREAM_MAX_AGE,
+after which the browser reconnects. Under gunicorn that needs a threaded or async worker
+(--worker-class gthread --threads N, or gevent) with NOTIFICATION_MAX_STREAMS below the
+thread count, so normal requests still get served; see the README. A sync worker serves
+one request at a time, so there the endpoint answers 503, as it does at the stream cap or
+when the listener isn't connected, and pages fall back to slow polling.
+"""
+import os
+import sys
+import time
+import select
+import threading
+from typing import Dict
+import psycopg2
+import psycopg2.extensions
+from flask import Response, request
+from backend.db import dedicated_conn
+
+NOTIFY_CHANNEL = 'user_notifications'
+NOTIFICATION_STREAM_HEARTBEAT = 25                # seconds; keeps proxies from closing idle streams
+NOTIFICATION_STREAM_MAX_AGE = 300                 # seconds before the browser has to reconnect
+# Per process; keep it below the worker's thread count (gevent workers can go much higher)
+NOTIFICATION_MAX_STREAMS = int(os.getenv("NOTIFICATION_MAX_STREAMS", "16"))
+NOTIFICATION_RECONNECT_DELAY = 5
+
+# user_id -> number of changes seen by this process
+_versions: Dict[int, int] = {}
+_changed = threading.Condition()
+_streams = 0
+_listening = False
+_listener_pid = None
+_listener_lock = threading.Lock()
+
+
+def publish(user_id: int):
+    """Wake this process's streams for `user_id`"""
+    with _changed:
+        _versions[user_id] = _versions.get(user_id, 0) + 1
+        _changed.notify_all()
+
+
+def _listen_once():
+    global _listening
+    conn = dedicated_conn()
+    try:
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f"LISTEN {NOTIFY_CHANNEL}")
+        _listening = True
+        print(f"DEBUG NOTIFICATION_EVENTS_listen: listening on {NOTIFY_CHANNEL}")
+        while True:
+            # Wake up now and then even when idle, so a dead connection is noticed
+            if select.select([conn], [], [], 60) == ([], [], []):
+                with conn.cursor() as cur:
+                    cur.execute("SELECT 1")
+                continue
+            conn.poll()
+            while conn.notifies:
+                notify = conn.notifies.pop(0)
+                try:
+                    publish(int(notify.payload))
+                except ValueError:
+                    pass
+    finally:
+        with _changed:
+            _listening = False
+            _changed.notify_all()
+        conn.close()
+
+
+def _listener_loop():
+    while True:
+        try:
+            _listen_once()
+        except (psycopg2.Error, OSError) as e:
+            print(f"Error in notification listener, reconnecting: {e}")
+        time.sleep(NOTIFICATION_RECONNECT_DELAY)
+
+
+def ensure_listener():
+    """Start this process's LISTEN thread if it isn't running yet (safe after fork)."""
+    global _listener_pid
+    if _listener_pid == os.getpid():
+        return
+    with _listener_lock:
+        if _listener_pid == os.getpid():
+            return
+        threading.Thread(target=_listener_loop, daemon=True, name="notification-listener").start()
+        _listener_pid = os.getpid()
+
+
+def _stream(user_id: int):
+    with _changed:
+        seen = _versions.get(user_id, 0)
+    # retry: how long the browser waits before reconnecting after the stream ends
+    yield f"retry: 3000\nevent: ready\ndata: {seen}\n\n"
+    deadline = time.monotonic() + NOTIFICATION_STREAM_MAX_AGE
+    while time.monotonic() < deadline:
+        with _changed:
+            _changed.wait_for(lambda: _versions.get(user_id, 0) != seen or not _listening,
+                              timeout=NOTIFICATION_STREAM_HEARTBEAT)
+            version = _versions.get(user_id, 0)
+        if not _listening:
+            # Changes can't be seen any more; the browser reconnects and gets a 503 until they can
+            break
+        if version != seen:
+            seen = version
+            yield f"event: changed\ndata: {version}\n\n"
+        else:
+            yield ": heartbeat\n\n"
+
+
+def _can_stream(environ) -> bool:
+    """Whether this server can spare a thread for a long-lived response"""
+    if environ.get('wsgi.multithread'):
+        return True
+    # gevent workers don't set wsgi.multithread, but a stream only holds a greenlet
+    monkey = sys.modules.get('gevent.monkey')
+    return bool(monkey and monkey.is_module_patched('socket'))
+
+
+def _stream_closed():
+    global _streams
+    with _changed:
+        _streams -= 1
+
+
+def init_app(server):
+    """Server-sent events endpoint the header and notifications page subscribe to."""
+    ensure_listener()
+
+    @server.route('/notifications/stream')
+    def _notification_stream():
+        global _streams
+        # Not authenticated (see the module docstring): only change timing is exposed
+        try:
+            user_id = int(request.args['user_id'])
+        except (KeyError, ValueError):
+            return Response(status=400)
+        if not _can_stream(request.environ):
+            return Response(status=503)
+        ensure_listener()
+        with _changed:
+            if not _listening or _streams >= NOTIFICATION_MAX_STREAMS:
+                return Response(status=503)
+            _streams += 1
+        response = Response(_stream(user_id), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no',      # don't let nginx buffer the stream
+        })
+        # Runs when the server closes the response, whether or not the stream ever started
+        response.call_on_close(_stream_closed)
+        return response
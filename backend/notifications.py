@@ -1,113 +1,229 @@
 # backend/notifications.py
-from typing import List, Dict, Any
+from datetime import date
+from typing import List, Dict, Any, Optional
+import psycopg2
+import psycopg2.extras
+from backend.db import get_conn
 import backend.friends as friends_backend
 import backend.recommendations as recommendations_backend
 
 
-def get_user_notifications(user_id: str, email_verified: bool = True) -> Dict[str, Any]:
+NOTIFICATIONS_PAGE_SIZE = 50      # notifications returned per call by default
+NOTIFICATIONS_KIND_CAP = 500      # newest notifications of each kind that can be paged through
+
+# Counts and change version for one user (extras/migrations/011_notification_counts.sql).
+# Friend request and recommendation counts are maintained by triggers; goal reminders
+# depend on today's date, so they are counted here.
+_SUMMARY_SQL = """
+    SELECT u.email_verified,
+           COALESCE(c.pending_friend_requests, 0) AS friend_requests,
+           COALESCE(c.recommendations, 0) AS recommendations,
+           (SELECT COUNT(*) FROM reading_goals g
+            WHERE g.user_id = u.user_id AND g.reminder_enabled
+              AND g.progress < g.target_books
+              AND (g.end_date IS NULL OR g.end_date >= CURRENT_DATE)) AS reading_goals,
+           COALESCE(c.version, 0) AS version
+    FROM users u
+    LEFT JOIN notification_counts c ON c.user_id = u.user_id
+    WHERE u.user_id = %(user_id)s
+"""
+
+# Every kind of notification, newest first, in one statement. Each branch takes at most
+# %(per_kind)s rows (enough to fill the requested page) before joining anything, so a user
+# with thousands of old recommendations doesn't pull them all; the counts still cover everything.
+_NOTIFICATIONS_SQL = f"""
+    WITH items AS (
+        (SELECT 'friend_request' AS type, fr.sender_id AS item_id, fr.created_at,
+                u.user_id AS sender_id, u.username AS sender_username,
+                u.profile_image_url AS sender_profile_image_url,
+                NULL::integer AS book_id, NULL::text AS book_title, NULL::text AS book_cover_url,
+                NULL::text AS reason, NULL::integer AS progress, NULL::integer AS target_books,
+                NULL::date AS end_date
+         FROM (SELECT * FROM friend_requests
+               WHERE receiver_id = %(user_id)s AND status = 'pending'
+               ORDER BY created_at DESC
+               LIMIT %(per_kind)s) fr
+         JOIN users u ON u.user_id = fr.sender_id)
+        UNION ALL
+        (SELECT 'book_recommendation', r.rec_id, r.created_at,
+                u.user_id, u.username, u.profile_image_url,
+                b.book_id, b.title, b.cover_url, r.reason, NULL, NULL, NULL
+         FROM (SELECT * FROM recommendations
+               WHERE receiver_id = %(user_id)s
+               ORDER BY created_at DESC
+               LIMIT %(per_kind)s) r
+         JOIN books b ON b.book_id = r.book_id
+         JOIN users u ON u.user_id = r.user_id)
+        UNION ALL
+        -- Goals have no creation time; start_date stands in for it
+        (SELECT 'reading_goal_reminder', g.goal_id, g.start_date,
+                NULL, NULL, NULL, NULL, g.book_name, NULL, NULL, g.progress, g.target_books, g.end_date
+         FROM reading_goals g
+         WHERE g.user_id = %(user_id)s AND g.reminder_enabled
+           AND g.progress < g.target_books
+           AND (g.end_date IS NULL OR g.end_date >= CURRENT_DATE)
+         ORDER BY g.start_date DESC
+         LIMIT %(per_kind)s)
+    ),
+    page AS (
+        SELECT * FROM items
+        ORDER BY created_at DESC, type, item_id DESC
+        LIMIT %(limit)s OFFSET %(offset)s
+    ),
+    totals AS ({_SUMMARY_SQL})
+    SELECT page.*, totals.*
+    FROM totals
+    LEFT JOIN page ON true
+    ORDER BY page.created_at DESC, page.type, page.item_id DESC
+"""
+
+
+def _reading_goal_notification(goal: Dict[str, Any]) -> Dict[str, Any]:
+    # Calculate progress percentage
+    progress = goal.get('progress', 0) or 0
+    target = goal.get('target_books', 1) or 1
+    percentage = int((progress / target) * 100) if target else 0
+
+    # Calculate days left
+    end_date = goal.get('end_date')
+    days_left_text = ""
+    if end_date:
+        days_left = (end_date - date.today()).days
+        if days_left > 0:
+            days_left_text = f"{days_left} day{'s' if days_left != 1 else ''} left"
+        elif days_left == 0:
+            days_left_text = "Due today!"
+        else:
+            days_left_text = "Overdue"
+
+    # Create message
+    if goal.get('book_title'):
+        message = f"Reading goal: {goal['book_title']} - {percentage}% complete"
+    else:
+        message = f" Reading goal: {percentage}% complete ({progress}/{target})"
+
+    if days_left_text:
+        message += f" • {days_left_text}"
+
+    return {
+        'type': 'reading_goal_reminder',
+        'id': f"reading_goal_{goal['item_id']}",
+        'goal_id': goal['item_id'],
+        'book_id': None,
+        'book_title': goal.get('book_title'),
+        'book_cover_url': None,
+        'progress': progress,
+        'target': target,
+        'percentage': percentage,
+        'end_date': end_date,
+        'days_left_text': days_left_text,
+        'created_at': goal.get('created_at'),
+        'message': message
+    }
+
+
+def _version(totals: Dict[str, Any]) -> str:
+    # Goal reminders also lapse with the date, without any write bumping the version
+    return f"{totals['version']}.{totals['reading_goals']}"
+
+
+def get_notification_summary(user_id: str) -> Optional[Dict[str, Any]]:
     """
-    Get all notifications for a user.
-    Currently includes pending friend requests, book recommendations, email verification, and reading goal reminders.
-    Returns a dict with notification count and details.
+    The badge count and current change version for a user, without building the list.
+    Returns {'count', 'version', 'email_verified'}, or None if it couldn't be read.
+    """
+    try:
+        with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(_SUMMARY_SQL, {'user_id': int(user_id)})
+            row = cur.fetchone()
+        if row is None:
+            return None
+        return {
+            'count': row['friend_requests'] + row['recommendations'] + row['reading_goals']
+                     + (0 if row['email_verified'] else 1),
+            'version': _version(row),
+            'email_verified': bool(row['email_verified'])
+        }
+    except (psycopg2.Error, ValueError) as e:
+        print(f"Error getting notification summary for user {user_id}: {e}")
+        return None
+
+
+def get_user_notifications(user_id: str, email_verified: bool = True,
+                           limit: int = NOTIFICATIONS_PAGE_SIZE, offset: int = 0) -> Dict[str, Any]:
+    """
+    Get one page of a user's notifications, newest first: pending friend requests, book
+    recommendations and reading goal reminders, plus email verification at the top of the
+    first page. Returns {'count': total across all pages, 'notifications': [...], 'has_more': bool,
+    'version'} where version matches get_notification_summary() until something changes.
     """
     try:
         notifications = []
 
         # add email verification notification if not verified (always at top, cannot be dismissed)
         if not email_verified:
-            notifications.append({
-                'type': 'email_verification',
-                'id': 'email_verification',
-                'message': 'Please verify your email address to secure your account',
-                'created_at': None,
-                'dismissible': False  # cannot be dismissed
-            })
+            if offset == 0:
+                notifications.append({
+                    'type': 'email_verification',
+                    'id': 'email_verification',
+                    'message': 'Please verify your email address to secure your account',
+                    'created_at': None,
+                    'dismissible': False  # cannot be dismissed
+                })
+                limit -= 1
+            else:
+                offset -= 1
 
-        # Get pending friend requests
-        pending_requests = friends_backend.get_pending_friend_requests(user_id)
-        for request in pending_requests:
-            notifications.append({
-                'type': 'friend_request',
-                'id': f"friend_request_{request['sender_id']}",
-                'sender_id': request['sender_id'],
-                'sender_username': request['username'],
-                'sender_profile_image_url': request.get('profile_image_url'),
-                'created_at': request['created_at'],
-                'message': f"{request['username']} sent you a friend request"
+        per_kind = min(offset + limit, NOTIFICATIONS_KIND_CAP)
+        with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute(_NOTIFICATIONS_SQL, {
+                'user_id': int(user_id), 'per_kind': per_kind,
+                'limit': max(limit, 0), 'offset': offset,
             })
+            rows = cur.fetchall()
 
-        # Get book recommendations
-        book_recommendations = recommendations_backend.get_user_recommendations(int(user_id))
-        for rec in book_recommendations:
-            notifications.append({
-                'type': 'book_recommendation',
-                'id': f"book_recommendation_{rec['rec_id']}",
-                'rec_id': rec['rec_id'],
-                'sender_id': rec['user_id'],
-                'sender_username': rec['sender_username'],
-                'sender_profile_image_url': rec.get('sender_profile_image_url'),
-                'book_id': rec['book_id'],
-                'book_title': rec['book_title'],
-                'book_cover_url': rec.get('cover_url'),
-                'reason': rec['reason'],
-                'created_at': rec['created_at'],
-                'message': f"{rec['sender_username']} recommended '{rec['book_title']}' to you"
-            })
+        totals = rows[0]
+        kind_counts = (totals['friend_requests'], totals['recommendations'], totals['reading_goals'])
+        reachable = sum(min(n, NOTIFICATIONS_KIND_CAP) for n in kind_counts)
 
-        # Get reading goal reminders
-        goal_reminders = get_reading_goal_reminders(int(user_id))
-        for goal in goal_reminders:
-            # Calculate progress percentage
-            progress = goal.get('progress', 0) or 0
-            target = goal.get('target_books', 1) or 1
-            percentage = int((progress / target) * 100) if target else 0
-            
-            # Calculate days left
-            end_date = goal.get('end_date')
-            days_left_text = ""
-            if end_date:
-                from datetime import date
-                if hasattr(end_date, 'date'):
-                    end_date = end_date.date()
-                days_left = (end_date - date.today()).days
-                if days_left > 0:
-                    days_left_text = f"{days_left} day{'s' if days_left != 1 else ''} left"
-                elif days_left == 0:
-                    days_left_text = "Due today!"
-                else:
-                    days_left_text = "Overdue"
-            
-            # Create message
-            if goal.get('book_title'):
-                message = f"Reading goal: {goal['book_title']} - {percentage}% complete"
-            else:
-                message = f" Reading goal: {percentage}% complete ({progress}/{target})"
-            
-            if days_left_text:
-                message += f" • {days_left_text}"
-            
-            notifications.append({
-                'type': 'reading_goal_reminder',
-                'id': f"reading_goal_{goal['goal_id']}",
-                'goal_id': goal['goal_id'],
-                'book_id': goal.get('book_id'),
-                'book_title': goal.get('book_title'),
-                'book_cover_url': goal.get('book_cover_url'),
-                'progress': progress,
-                'target': target,
-                'percentage': percentage,
-                'end_date': goal.get('end_date'),
-                'days_left_text': days_left_text,
-                'created_at': goal.get('created_at'),
-                'message': message
-            })
+        for row in rows:
+            if row['type'] == 'friend_request':
+                notifications.append({
+                    'type': 'friend_request',
+                    'id': f"friend_request_{row['sender_id']}",
+                    'sender_id': row['sender_id'],
+                    'sender_username': row['sender_username'],
+                    'sender_profile_image_url': row['sender_profile_image_url'],
+                    'created_at': row['created_at'],
+                    'message': f"{row['sender_username']} sent you a friend request"
+                })
+            elif row['type'] == 'book_recommendation':
+                notifications.append({
+                    'type': 'book_recommendation',
+                    'id': f"book_recommendation_{row['item_id']}",
+                    'rec_id': row['item_id'],
+                    'sender_id': row['sender_id'],
+                    'sender_username': row['sender_username'],
+                    'sender_profile_image_url': row['sender_profile_image_url'],
+                    'book_id': row['book_id'],
+                    'book_title': row['book_title'],
+                    'book_cover_url': row['book_cover_url'],
+                    'reason': row['reason'],
+                    'created_at': row['created_at'],
+                    'message': f"{row['sender_username']} recommended '{row['book_title']}' to you"
+                })
+            elif row['type'] == 'reading_goal_reminder':
+                notifications.append(_reading_goal_notification(row))
 
         return {
-            'count': len(notifications),
-            'notifications': notifications
+            'count': sum(kind_counts) + (0 if email_verified else 1),
+            'notifications': notifications,
+            'has_more': offset + max(limit, 0) < reachable,
+            'version': _version(totals)
         }
 
     except Exception as e:
+        print(f"Error getting notifications for user {user_id}: {e}")
         return {
             'count': 0,
             'notifications': []
@@ -5,8 +5,13 @@ from typing import List, Dict, Any, Optional
 import psycopg2
 import psycopg2.extras
 from .db import get_conn
+from .search import search_local, normalize_query
+from .cache import TTLCache, SingleFlight
+from .http_cache import cached_get
+from . import rate_limit
 import logging
 import concurrent.futures
+import contextvars
 import time
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
@@ -17,20 +22,34 @@ logger = logging.getLogger(__name__)
 
 def make_request_with_retry(url: str, timeout: int = 10, max_retries: int = 5, params: Dict[str, Any] = None) -> Optional[requests.Response]:
     """
-    Make HTTP request with retry logic for 429 errors and exponential backoff
+    Make HTTP request with retry logic for 429 errors and exponential backoff.
+    Request pacing itself is handled by backend.rate_limit.
     """
     for attempt in range(max_retries):
         try:
-            response = requests.get(url, params=params, timeout=timeout)
+            response = cached_get(url, params=params, timeout=timeout)
 
-            if response.status_code == 429:
-                # Too Many Requests - wait with exponential backoff
+            if response.status_code == 404:
+                # Missing documents won't appear on retry (and the 404 is cached)
+                logger.info(f"404 Not Found for {url}")
+                return None
+            elif response.status_code == 429:
+                if attempt == max_retries - 1:
+                    logger.warning(f"429 Too Many Requests for {url}, giving up")
+                    break
+                # Too Many Requests - pause the whole host, not just this thread. The session has
+                # already applied Retry-After if the server sent one, otherwise back off exponentially.
                 wait_time = min(2 ** attempt, 30)  # Cap at 30 seconds
                 logger.warning(
-                    f"429 Too Many Requests for {url}, attempt {attempt + 1}, waiting {wait_time}s")
-                time.sleep(wait_time)
+                    f"429 Too Many Requests for {url}, attempt {attempt + 1}, backing off {wait_time}s")
+                if not rate_limit.parse_retry_after(response.headers.get('Retry-After')):
+                    if not rate_limit.backoff(url, wait_time):
+                        time.sleep(wait_time)
                 continue
             elif response.status_code >= 500:
+                if attempt == max_retries - 1:
+                    logger.warning(f"Server error {response.status_code} for {url}, giving up")
+                    break
                 # Server errors - retry with shorter backoff
                 wait_time = min(1 * (attempt + 1), 10)  # Cap at 10 seconds
                 logger.warning(
@@ -60,7 +79,7 @@ class OpenLibraryAPI:
     COVERS_URL = "https://covers.openlibrary.org"
 
     @staticmethod
-    def search_books(query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def search_books(query: str, limit: int = 10, timeout: int = 10, max_retries: int = 5) -> List[Dict[str, Any]]:
         """Search for books using Open Library API"""
         try:
             url = f"{OpenLibraryAPI.BASE_URL}/search.json"
@@ -70,7 +89,8 @@ class OpenLibraryAPI:
                 'fields': 'key,title,author_name,author_key,first_publish_year,cover_i,isbn,subject,publisher'
             }
 
-            response = make_request_with_retry(url, timeout=10, params=params)
+            response = make_request_with_retry(
+                url, timeout=timeout, max_retries=max_retries, params=params)
             if not response:
                 return []
 
@@ -106,7 +126,7 @@ class OpenLibraryAPI:
             return []
 
     @staticmethod
-    def search_authors(query: str, limit: int = 10) -> List[Dict[str, Any]]:
+    def search_authors(query: str, limit: int = 10, timeout: int = 10, max_retries: int = 5) -> List[Dict[str, Any]]:
         """Search for authors using Open Library API"""
         try:
             url = f"{OpenLibraryAPI.BASE_URL}/search/authors.json"
@@ -115,7 +135,8 @@ class OpenLibraryAPI:
                 'limit': limit
             }
 
-            response = make_request_with_retry(url, timeout=10, params=params)
+            response = make_request_with_retry(
+                url, timeout=timeout, max_retries=max_retries, params=params)
             if not response:
                 return []
 
@@ -188,7 +209,7 @@ class OpenLibraryAPI:
             # Get editions data for additional metadata
             editions_url = f"{OpenLibraryAPI.BASE_URL}{book_key}/editions.json"
             try:
-                editions_response = requests.get(editions_url, timeout=10)
+                editions_response = cached_get(editions_url, timeout=10)
                 if editions_response.status_code == 200:
                     editions_data = editions_response.json()
 
@@ -295,7 +316,7 @@ class OpenLibraryAPI:
                 try:
                     # Get editions to find ISBN and publication details
                     editions_url = f"{OpenLibraryAPI.BASE_URL}{book_key}/editions.json"
-                    editions_response = requests.get(editions_url, timeout=10)
+                    editions_response = cached_get(editions_url, timeout=10)
                     if editions_response.status_code == 200:
                         editions_data = editions_response.json()
 
@@ -348,7 +369,7 @@ class OpenLibraryAPI:
             print(
                 f"DEBUG OPENLIBRARY_get_author_details: Requesting author details from URL: {url}")
 
-            response = requests.get(url, timeout=10)
+            response = cached_get(url, timeout=10)
             response.raise_for_status()
 
             data = response.json()
@@ -536,11 +557,7 @@ def merge_book_data(books_data: List[Dict[str, Any]]) -> Dict[str, Any]:
         for subject in subjects:
             if subject and subject not in all_subjects:
                 # Filter out unwanted subjects
-                if not any(skip in subject.lower() for skip in [
-                    'nyt:', 'collection', 'open library', 'staff picks', 'protected daisy',
-                    'accessible book', 'lending library', 'in library', 'internet archive',
-                    'overdrive', 'library', 'ebook', 'kindle', 'epub'
-                ]):
+                if not any(skip in subject.lower() for skip in NON_GENRE_SUBJECTS):
                     all_subjects.append(subject)
 
     # Take first 5 unique genres
@@ -550,7 +567,7 @@ def merge_book_data(books_data: List[Dict[str, Any]]) -> Dict[str, Any]:
     # Pick best description (longest non-empty)
     best_description = ''
     for book in books_data:
-        desc = book.get('description', '').strip()
+        desc = (book.get('description') or '').strip()
         if desc and len(desc) > len(best_description):
             best_description = desc
 
@@ -606,33 +623,110 @@ def merge_book_data(books_data: List[Dict[str, Any]]) -> Dict[str, Any]:
     return merged
 
 
+# Subjects that are library/collection tags rather than genres
+NON_GENRE_SUBJECTS = [
+    'nyt:', 'collection', 'open library', 'staff picks', 'protected daisy',
+    'accessible book', 'lending library', 'in library', 'internet archive',
+    'overdrive', 'library', 'ebook', 'kindle', 'epub'
+]
+
+# Titles that are usually compilations rather than a single work
+UNWANTED_TITLE_KEYWORDS = [
+    'untitled', 'series collection', 'box set', 'book set',
+    'complete series', 'omnibus', 'anthology'
+]
+
+BOOK_UPSERT_COLUMNS = ['isbn', 'genre', 'release_date', 'description', 'cover_url',
+                       'language', 'page_count', 'openlibrary_key']
+
+
+def normalize_title(title: str) -> str:
+    """
+    Normalize title for duplicate detection (remove punctuation, lowercase).
+    Must match the books.normalized_title generated column (extras/migrations/003_books_normalized_title.sql).
+    """
+    return re.sub(r'[^a-zA-Z0-9]', '', (title or '').lower())
+
+
+def is_unwanted_title(title: str) -> bool:
+    """Skip compilations and very short/empty titles"""
+    return any(keyword in title.lower() for keyword in UNWANTED_TITLE_KEYWORDS) or len(title) < 3
+
+
+def prepare_enhanced_book_row(book_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values for inserting an Open Library work into books"""
+    isbn = None
+    if book_data.get('isbn_13'):
+        isbn = book_data['isbn_13'][0] if isinstance(
+            book_data['isbn_13'], list) else book_data['isbn_13']
+    elif book_data.get('isbn_10'):
+        isbn = book_data['isbn_10'][0] if isinstance(
+            book_data['isbn_10'], list) else book_data['isbn_10']
+    elif book_data.get('isbn'):
+        isbn = book_data['isbn'][0] if isinstance(
+            book_data['isbn'], list) else book_data['isbn']
+
+    subjects = book_data.get('subjects', [])
+    # Store all genres as a comma-separated string for database compatibility
+    # Filter out non-genre subjects like "Open Library Staff Picks", nyt: prefixes, etc.
+    filtered_genres = [subject for subject in subjects
+                       if not any(skip in subject.lower() for skip in NON_GENRE_SUBJECTS)]
+
+    # Take the first 5 genres to avoid overwhelming the database
+    genre = ', '.join(filtered_genres[:5]) if filtered_genres else None
+
+    # Parse release date
+    release_date = None
+    date_fields = ['publish_date',
+                   'first_publish_year', 'first_publish_date']
+    for field in date_fields:
+        if book_data.get(field) and not release_date:
+            try:
+                date_str = str(book_data[field]).strip()
+                if date_str:
+                    year_match = re.search(r'\b(\d{4})\b', date_str)
+                    if year_match:
+                        year = year_match.group(1)
+                        release_date = f"{year}-01-01"
+                        break
+            except Exception as e:
+                logger.warning(
+                    f"Error parsing date field {field}: {e}")
+
+    # Generate cover URL
+    cover_url = None
+    if book_data.get('cover_id'):
+        cover_url = f"{OpenLibraryAPI.COVERS_URL}/b/id/{book_data['cover_id']}-L.jpg"
+
+    # Core fields only (no ratings, external IDs, or classifications)
+    return {
+        'title': book_data['title'],
+        'isbn': isbn,
+        'genre': genre,
+        'release_date': release_date,
+        'description': book_data.get('description', ''),
+        'cover_url': cover_url,
+        'language': book_data.get('language', 'en'),
+        'page_count': book_data.get('page_count'),
+        'openlibrary_key': book_data.get('key', '').replace('/works/', ''),
+    }
+
+
 def save_enhanced_book_to_db(book_data: Dict[str, Any], author_id: int = None) -> Optional[int]:
     """Save book with enhanced data to database, ensuring ISBN uniqueness and filtering duplicates"""
     try:
         # Filter out unwanted books first
         title = book_data.get('title', '').strip()
 
-        # Skip books with problematic titles
-        skip_keywords = [
-            'untitled', 'series collection', 'box set', 'book set',
-            'complete series', 'omnibus', 'anthology'
-        ]
-
-        if any(keyword in title.lower() for keyword in skip_keywords):
+        if is_unwanted_title(title):
             print(
-                f"DEBUG OPENLIBRARY_save_enhanced_book_to_db: Skipping book '{title}' - contains unwanted keywords")
-            return None
-
-        # Skip very short or empty titles
-        if len(title) < 3:
-            print(
-                f"DEBUG OPENLIBRARY_save_enhanced_book_to_db: Skipping book '{title}' - title too short")
+                f"DEBUG OPENLIBRARY_save_enhanced_book_to_db: Skipping book '{title}' - unwanted or too short title")
             return None
 
         with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
             # Check for similar titles by normalizing them
             # Remove spaces, punctuation, and convert to lowercase for comparison
-            normalized_current = re.sub(r'[^a-zA-Z0-9]', '', title.lower())
+            normalized_current = normalize_title(title)
 
             print(
                 f"DEBUG OPENLIBRARY_save_enhanced_book_to_db: Checking for duplicates of '{title}' (normalized: '{normalized_current}')")
@@ -643,14 +737,14 @@ def save_enhanced_book_to_db(book_data: Dict[str, Any], author_id: int = None) -
                     SELECT book_id, title, isbn, genre, release_date, description, cover_url, language, page_count
                     FROM books 
                     WHERE author_id = %s AND 
-                          REGEXP_REPLACE(LOWER(title), '[^a-zA-Z0-9]', '', 'g') = %s
+                          normalized_title = %s
                 """, (author_id, normalized_current))
             else:
                 # For different/unknown authors, be more strict
                 cur.execute("""
                     SELECT book_id, title, isbn, genre, release_date, description, cover_url, language, page_count
                     FROM books 
-                    WHERE REGEXP_REPLACE(LOWER(title), '[^a-zA-Z0-9]', '', 'g') = %s
+                    WHERE normalized_title = %s
                 """, (normalized_current,))
 
             similar_books = cur.fetchall()
@@ -716,61 +810,7 @@ def save_enhanced_book_to_db(book_data: Dict[str, Any], author_id: int = None) -
             print(
                 f"DEBUG OPENLIBRARY_save_enhanced_book_to_db: No similar books found, inserting new book")
 
-            # Prepare data for insertion (same logic as before)
-            isbn = None
-            if book_data.get('isbn_13'):
-                isbn = book_data['isbn_13'][0] if isinstance(
-                    book_data['isbn_13'], list) else book_data['isbn_13']
-            elif book_data.get('isbn_10'):
-                isbn = book_data['isbn_10'][0] if isinstance(
-                    book_data['isbn_10'], list) else book_data['isbn_10']
-            elif book_data.get('isbn'):
-                isbn = book_data['isbn'][0] if isinstance(
-                    book_data['isbn'], list) else book_data['isbn']
-
-            subjects = book_data.get('subjects', [])
-            # Store all genres as a comma-separated string for database compatibility
-            # Filter out non-genre subjects like "Open Library Staff Picks", nyt: prefixes, etc.
-            filtered_genres = []
-            for subject in subjects:
-                # Skip technical subjects and library-specific tags
-                if any(skip in subject.lower() for skip in [
-                    'nyt:', 'collection', 'open library', 'staff picks', 'protected daisy',
-                    'accessible book', 'lending library', 'in library', 'internet archive',
-                    'overdrive', 'library', 'ebook', 'kindle', 'epub'
-                ]):
-                    continue
-                filtered_genres.append(subject)
-
-            # Take the first 5 genres to avoid overwhelming the database
-            genre = ', '.join(filtered_genres[:5]) if filtered_genres else None
-
-            # Parse release date
-            release_date = None
-            date_fields = ['publish_date',
-                           'first_publish_year', 'first_publish_date']
-            for field in date_fields:
-                if book_data.get(field) and not release_date:
-                    try:
-                        date_str = str(book_data[field]).strip()
-                        if date_str:
-                            year_match = re.search(r'\b(\d{4})\b', date_str)
-                            if year_match:
-                                year = year_match.group(1)
-                                release_date = f"{year}-01-01"
-                                break
-                    except Exception as e:
-                        logger.warning(
-                            f"Error parsing date field {field}: {e}")
-
-            # Generate cover URL
-            cover_url = None
-            if book_data.get('cover_id'):
-                cover_url = f"{OpenLibraryAPI.COVERS_URL}/b/id/{book_data['cover_id']}-L.jpg"
-
-            # Prepare core fields only (no ratings, external IDs, or classifications)
-            language = book_data.get('language', 'en')
-            page_count = book_data.get('page_count')
+            row = prepare_enhanced_book_row(book_data)
 
             print(
                 f"DEBUG OPENLIBRARY_save_enhanced_book_to_db: Inserting new book with enhanced data")
@@ -782,10 +822,9 @@ def save_enhanced_book_to_db(book_data: Dict[str, Any], author_id: int = None) -
             """
 
             cur.execute(insert_sql, (
-                book_data['title'], isbn, genre, release_date,
-                book_data.get('description', ''), cover_url, author_id,
-                language, page_count, book_data.get(
-                    'key', '').replace('/works/', '')
+                row['title'], row['isbn'], row['genre'], row['release_date'],
+                row['description'], row['cover_url'], author_id,
+                row['language'], row['page_count'], row['openlibrary_key']
             ))
 
             result = cur.fetchone()
@@ -956,6 +995,26 @@ def save_book_to_db(book_data: Dict[str, Any], author_id: int = None) -> Optiona
         return None
 
 
+def get_existing_author_names(names: List[str]) -> set:
+    """
+    Return the lowercased names from `names` that already exist in the authors table.
+    Only the candidate names are sent, and LOWER(name) = ANY(...) uses the
+    authors_name_lower_pattern_idx functional index, so cost scales with len(names).
+    """
+    candidates = list({name.lower() for name in names if name})
+    if not candidates:
+        return set()
+
+    try:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(
+                "SELECT LOWER(name) FROM authors WHERE LOWER(name) = ANY(%s)", (candidates,))
+            return {row[0] for row in cur.fetchall()}
+    except Exception as e:
+        logger.error(f"Error checking existing authors: {e}")
+        return set()
+
+
 def search_books_and_authors(query: str) -> Dict[str, List[Dict[str, Any]]]:
     """
     Combined search function that searches both local database and Open Library API
@@ -971,53 +1030,19 @@ def search_books_and_authors(query: str) -> Dict[str, List[Dict[str, Any]]]:
     existing_author_names = set()
 
     try:
-        with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            # Search local database for books
-            cur.execute("""
-                SELECT b.book_id, b.title, b.isbn, b.genre, b.release_date, 
-                       b.description, b.cover_url, b.author_id,
-                       a.name as author_name
-                FROM books b
-                LEFT JOIN authors a ON b.author_id = a.author_id
-                WHERE LOWER(b.title) LIKE LOWER(%s)
-                ORDER BY b.title
-                LIMIT 5
-            """, (f"%{query}%",))
-
-            local_books = cur.fetchall()
-            for book in local_books:
-                book_dict = dict(book)
-                book_dict['source'] = 'local'
-                results['books'].append(book_dict)
-
-            # Search local database for authors
-            cur.execute("""
-                SELECT a.author_id, a.name, a.bio, a.birth_date, a.death_date, a.nationality, 
-                       a.author_image_url, a.created_at,
-                       COUNT(b.book_id) as work_count
-                FROM authors a
-                LEFT JOIN books b ON a.author_id = b.author_id
-                WHERE LOWER(a.name) LIKE LOWER(%s)
-                GROUP BY a.author_id, a.name, a.bio, a.birth_date, a.death_date, 
-                         a.nationality, a.author_image_url, a.created_at
-                ORDER BY a.name
-                LIMIT 5
-            """, (f"%{query}%",))
-
-            local_authors = cur.fetchall()
-            for author in local_authors:
-                author_dict = dict(author)
-                author_dict['source'] = 'local'
-                # Map author_image_url to image_url for consistency
-                author_dict['image_url'] = author_dict.get('author_image_url')
-                results['authors'].append(author_dict)
-                existing_author_names.add(author_dict['name'].lower())
+        # Search local database for books and authors (indexed, ranked)
+        local = search_local(query, kinds=('books', 'authors'), limit=5)
+
+        for book in local['books']:
+            book['source'] = 'local'
+            results['books'].append(book)
 
-            # Get all author names from database to filter API results
-            cur.execute("SELECT LOWER(name) as name FROM authors")
-            all_existing = cur.fetchall()
-            for row in all_existing:
-                existing_author_names.add(row['name'])
+        for author_dict in local['authors']:
+            author_dict['source'] = 'local'
+            # Map author_image_url to image_url for consistency
+            author_dict['image_url'] = author_dict.get('author_image_url')
+            results['authors'].append(author_dict)
+            existing_author_names.add(author_dict['name'].lower())
 
     except Exception as e:
         logger.error(f"Error searching local database: {e}")
@@ -1030,6 +1055,9 @@ def search_books_and_authors(query: str) -> Dict[str, List[Dict[str, Any]]]:
     api_authors = OpenLibraryAPI.search_authors(
         query, limit=10)  # Get more to account for filtering
 
+    existing_author_names |= get_existing_author_names(
+        [author.get('name', '') for author in api_authors])
+
     filtered_api_authors = []
     for author in api_authors:
         author_name_lower = author.get('name', '').lower()
@@ -1043,88 +1071,91 @@ def search_books_and_authors(query: str) -> Dict[str, List[Dict[str, Any]]]:
     return results
 
 
-def search_books_only(query: str) -> List[Dict[str, Any]]:
-    """
-    Search for books only from both local database and Open Library API
-    """
-    books = []
+# Header search caches, keyed by (type, normalized query). Local results go stale as
+# books/authors are ingested so they are kept briefly; Open Library results much longer.
+LOCAL_SEARCH_CACHE = TTLCache(maxsize=512, ttl=30)
+REMOTE_SEARCH_CACHE = TTLCache(maxsize=1024, ttl=600)
+# Failed or empty Open Library responses are retried sooner
+REMOTE_SEARCH_EMPTY_TTL = 30
+_remote_search_flight = SingleFlight()
 
-    try:
-        # Search local database
-        with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute("""
-                SELECT b.book_id, b.title, b.isbn, b.genre, b.release_date, 
-                       b.description, b.cover_url, b.author_id,
-                       a.name as author_name
-                FROM books b
-                LEFT JOIN authors a ON b.author_id = a.author_id
-                WHERE LOWER(b.title) LIKE LOWER(%s)
-                ORDER BY b.title
-                LIMIT 5
-            """, (f"%{query}%",))
-
-            local_books = cur.fetchall()
-            for book in local_books:
-                book_dict = dict(book)
-                book_dict['source'] = 'local'
-                books.append(book_dict)
+# Interactive searches fail fast instead of retrying with backoff
+SEARCH_REQUEST_TIMEOUT = 5
+SEARCH_MAX_RETRIES = 1
 
-    except Exception as e:
-        logger.error(f"Error searching local books: {e}")
 
-    # Search Open Library API
-    api_books = OpenLibraryAPI.search_books(query, limit=8)
-    books.extend(api_books)
+def _copy_results(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    # callers annotate/mutate result dicts, so never hand out the cached objects
+    return [dict(r) for r in results]
 
-    return books
 
+def search_books_local(query: str) -> List[Dict[str, Any]]:
+    """Search local books (cached briefly). Never touches Open Library."""
+    def load():
+        books = []
+        try:
+            for book in search_local(query, kinds=('books',), limit=5)['books']:
+                book['source'] = 'local'
+                books.append(book)
+        except Exception as e:
+            logger.error(f"Error searching local books: {e}")
+        return books
 
-def search_authors_only(query: str) -> List[Dict[str, Any]]:
-    """
-    Search for authors only from both local database and Open Library API
-    Excludes API authors that are already in the database
-    """
-    authors = []
-    existing_author_names = set()
+    return _copy_results(LOCAL_SEARCH_CACHE.get_or_set(('books', normalize_query(query)), load))
 
-    try:
-        # Search local database
-        with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-            cur.execute("""
-                SELECT a.author_id, a.name, a.bio, a.birth_date, a.death_date, a.nationality, 
-                       a.author_image_url, a.created_at,
-                       COUNT(b.book_id) as work_count
-                FROM authors a
-                LEFT JOIN books b ON a.author_id = b.author_id
-                WHERE LOWER(a.name) LIKE LOWER(%s)
-                GROUP BY a.author_id, a.name, a.bio, a.birth_date, a.death_date, 
-                         a.nationality, a.author_image_url, a.created_at
-                ORDER BY a.name
-                LIMIT 5
-            """, (f"%{query}%",))
-
-            local_authors = cur.fetchall()
-            for author in local_authors:
-                author_dict = dict(author)
+
+def search_authors_local(query: str) -> List[Dict[str, Any]]:
+    """Search local authors (cached briefly). Never touches Open Library."""
+    def load():
+        authors = []
+        try:
+            for author_dict in search_local(query, kinds=('authors',), limit=5)['authors']:
                 author_dict['source'] = 'local'
                 # Map author_image_url to image_url for consistency
                 author_dict['image_url'] = author_dict.get('author_image_url')
                 authors.append(author_dict)
-                # Track existing author names (case-insensitive)
-                existing_author_names.add(author_dict['name'].lower())
+        except Exception as e:
+            logger.error(f"Error searching local authors: {e}")
+        return authors
 
-            # Also get all author names from database to filter API results
-            cur.execute("SELECT LOWER(name) as name FROM authors")
-            all_existing = cur.fetchall()
-            for row in all_existing:
-                existing_author_names.add(row['name'])
+    return _copy_results(LOCAL_SEARCH_CACHE.get_or_set(('authors', normalize_query(query)), load))
 
-    except Exception as e:
-        logger.error(f"Error searching local authors: {e}")
 
-    # Search Open Library API and filter out existing authors
-    api_authors = OpenLibraryAPI.search_authors(
-        query, limit=15)  # Get more to account for filtering
+def _cached_remote_search(search_type: str, query: str, fetch) -> List[Dict[str, Any]]:
+    """
+    Serve an Open Library search from REMOTE_SEARCH_CACHE. On a miss, identical
+    in-flight queries (from any thread) share a single request.
+    """
+    key = (search_type, normalize_query(query))
+    cached = REMOTE_SEARCH_CACHE.get(key)
+    if cached is not None:
+        return _copy_results(cached)
+
+    def load():
+        results = fetch()
+        REMOTE_SEARCH_CACHE.set(key, results, None if results else REMOTE_SEARCH_EMPTY_TTL)
+        return results
+
+    return _copy_results(_remote_search_flight.do(key, load))
+
+
+def search_books_remote(query: str) -> List[Dict[str, Any]]:
+    """Search Open Library for books (cached, coalesced, fail-fast)"""
+    return _cached_remote_search('books', query, lambda: OpenLibraryAPI.search_books(
+        query, limit=8, timeout=SEARCH_REQUEST_TIMEOUT, max_retries=SEARCH_MAX_RETRIES))
+
+
+def search_authors_remote(query: str, exclude_names: Optional[set] = None) -> List[Dict[str, Any]]:
+    """
+    Search Open Library for authors (cached, coalesced, fail-fast).
+    Authors we already have locally, or whose lowercased name is in exclude_names, are dropped.
+    """
+    api_authors = _cached_remote_search('authors', query, lambda: OpenLibraryAPI.search_authors(
+        query, limit=15, timeout=SEARCH_REQUEST_TIMEOUT, max_retries=SEARCH_MAX_RETRIES))  # Get more to account for filtering
+
+    existing_author_names = set(exclude_names or ())
+    existing_author_names |= get_existing_author_names(
+        [author.get('name', '') for author in api_authors])
 
     filtered_api_authors = []
     for author in api_authors:
@@ -1135,9 +1166,29 @@ def search_authors_only(query: str) -> List[Dict[str, Any]]:
             if len(filtered_api_authors) >= 8:
                 break
 
-    authors.extend(filtered_api_authors)
+    return filtered_api_authors
+
 
-    return authors
+def search_books_only(query: str) -> List[Dict[str, Any]]:
+    """
+    Search for books only from both local database and Open Library API
+    """
+    return search_books_local(query) + search_books_remote(query)
+
+
+def search_authors_only(query: str) -> List[Dict[str, Any]]:
+    """
+    Search for authors only from both local database and Open Library API
+    Excludes API authors that are already in the database
+    """
+    authors = search_authors_local(query)
+    existing_author_names = {author['name'].lower() for author in authors}
+    return authors + search_authors_remote(query, existing_author_names)
+
+
+def _submit_with_context(executor, fn, *args):
+    # Worker threads don't inherit contextvars, so carry over the caller's request priority
+    return executor.submit(contextvars.copy_context().run, fn, *args)
 
 
 def fetch_work_details_with_retry(work: Dict[str, Any]) -> Optional[Dict[str, Any]]:
@@ -1181,15 +1232,13 @@ def fetch_basic_work_details(work_key: str) -> Optional[Dict[str, Any]]:
     for attempt in range(2):  # Reduced to 2 attempts for speed
         try:
             work_url = f"{OpenLibraryAPI.BASE_URL}{work_key}.json"
-            work_response = requests.get(
+            work_response = cached_get(
                 work_url, timeout=10)  # Reduced timeout
             work_response.raise_for_status()
             work_details = work_response.json()
             break
         except Exception as e:
-            if attempt < 1:
-                time.sleep(0.2)  # Very short delay
-            else:
+            if attempt >= 1:
                 return None
 
     if not work_details:
@@ -1231,7 +1280,7 @@ def fetch_basic_work_details(work_key: str) -> Optional[Dict[str, Any]]:
             not book_data['publish_date'] and not book_data['first_publish_date']) or not book_data['cover_url']:
         try:
             editions_url = f"{OpenLibraryAPI.BASE_URL}{work_key}/editions.json"
-            editions_response = requests.get(
+            editions_response = cached_get(
                 editions_url, timeout=5)  # Very short timeout
             if editions_response.status_code == 200:
                 editions_data = editions_response.json()
@@ -1273,10 +1322,11 @@ def get_or_create_author_from_api(author_data: Dict[str, Any]) -> Optional[int]:
     return save_author_to_db(merged_data)
 
 
-def get_or_create_author_with_books(author_data: Dict[str, Any]) -> Optional[int]:
+def get_or_create_author_with_books(author_data: Dict[str, Any], progress_callback=None) -> Optional[int]:
     """
     Get detailed author info from API, save to database with all their books
     Uses bulk inserts and checks for existing authors by name and birth year
+    progress_callback(books_added=..., works_seen=...) is called after each inserted batch
     Returns author_id
     """
     import time
@@ -1390,7 +1440,7 @@ def get_or_create_author_with_books(author_data: Dict[str, Any]) -> Optional[int
 
             # Also get existing book titles (normalized) to catch books without keys
             cur.execute("""
-                SELECT DISTINCT REGEXP_REPLACE(LOWER(title), '[^a-zA-Z0-9]', '', 'g') as normalized_title
+                SELECT DISTINCT normalized_title
                 FROM books 
                 WHERE author_id = %s
             """, (author_id,))
@@ -1405,6 +1455,8 @@ def get_or_create_author_with_books(author_data: Dict[str, Any]) -> Optional[int
 
         # Collect works using pagination, but limit to 500 and skip existing ones
         all_works = []
+        books_added = 0
+        works_seen = 0
         offset = 0
         limit = 50  # Max per request
         max_works = 500  # Limit total works to fetch
@@ -1416,7 +1468,7 @@ def get_or_create_author_with_books(author_data: Dict[str, Any]) -> Optional[int
             for attempt in range(3):
                 try:
                     params = {'limit': limit, 'offset': offset}
-                    response = requests.get(
+                    response = cached_get(
                         works_url, params=params, timeout=15)
                     response.raise_for_status()
                     works_data = response.json()
@@ -1435,14 +1487,14 @@ def get_or_create_author_with_books(author_data: Dict[str, Any]) -> Optional[int
                 break
 
             current_works = works_data.get('entries', [])
+            works_seen += len(current_works)
 
             # Filter out works that already exist
             new_works = []
             for work in current_works:
                 work_key = work.get('key', '')
                 work_title = work.get('title', '')
-                normalized_title = re.sub(
-                    r'[^a-zA-Z0-9]', '', work_title.lower()) if work_title else ''
+                normalized_title = normalize_title(work_title)
 
                 # Strip /works/ prefix for comparison with stored keys
                 clean_work_key = work_key.replace('/works/', '')
@@ -1478,7 +1530,7 @@ def get_or_create_author_with_books(author_data: Dict[str, Any]) -> Optional[int
                 # First attempt
                 with ThreadPoolExecutor(max_workers=5) as executor:
                     future_to_work = {
-                        executor.submit(fetch_work_details_with_retry, work): work
+                        _submit_with_context(executor, fetch_work_details_with_retry, work): work
                         for work in batch
                     }
 
@@ -1503,7 +1555,7 @@ def get_or_create_author_with_books(author_data: Dict[str, Any]) -> Optional[int
 
                     with ThreadPoolExecutor(max_workers=3) as executor:
                         future_to_work = {
-                            executor.submit(fetch_work_details_with_retry, work): work
+                            _submit_with_context(executor, fetch_work_details_with_retry, work): work
                             for work in failed_works
                         }
 
@@ -1523,10 +1575,9 @@ def get_or_create_author_with_books(author_data: Dict[str, Any]) -> Optional[int
                 if batch_results:
                     print(
                         f"DEBUG OPENLIBRARY_get_or_create_author_with_books: Bulk inserting {len(batch_results)} books from incremental batch")
-                    bulk_insert_books(batch_results, author_id)
-
-                # Delay between batches
-                time.sleep(1.0)
+                    books_added += bulk_insert_books(batch_results, author_id)[0]
+                if progress_callback:
+                    progress_callback(books_added=books_added, works_seen=works_seen)
 
             # If we got fewer works than the limit, we've reached the end
             if len(current_works) < limit:
@@ -1541,8 +1592,6 @@ def get_or_create_author_with_books(author_data: Dict[str, Any]) -> Optional[int
                 break
 
             offset += limit
-            # Small delay between requests
-            time.sleep(0.5)
 
         # Process any remaining works
         if all_works:
@@ -1554,7 +1603,7 @@ def get_or_create_author_with_books(author_data: Dict[str, Any]) -> Optional[int
 
             with ThreadPoolExecutor(max_workers=5) as executor:
                 future_to_work = {
-                    executor.submit(fetch_work_details_with_retry, work): work
+                    _submit_with_context(executor, fetch_work_details_with_retry, work): work
                     for work in all_works
                 }
 
@@ -1575,7 +1624,7 @@ def get_or_create_author_with_books(author_data: Dict[str, Any]) -> Optional[int
                 retry_results = []
                 with ThreadPoolExecutor(max_workers=3) as executor:
                     future_to_work = {
-                        executor.submit(fetch_work_details_with_retry, work): work
+                        _submit_with_context(executor, fetch_work_details_with_retry, work): work
                         for work in failed_works
                     }
 
@@ -1594,7 +1643,9 @@ def get_or_create_author_with_books(author_data: Dict[str, Any]) -> Optional[int
             if batch_results:
                 print(
                     f"DEBUG OPENLIBRARY_get_or_create_author_with_books: Bulk inserting remaining {len(batch_results)} books")
-                bulk_insert_books(batch_results, author_id)
+                books_added += bulk_insert_books(batch_results, author_id)[0]
+            if progress_callback:
+                progress_callback(books_added=books_added, works_seen=works_seen)
 
     except Exception as e:
         logger.error(f"Error fetching author's works: {e}")
@@ -1602,39 +1653,160 @@ def get_or_create_author_with_books(author_data: Dict[str, Any]) -> Optional[int
     return author_id
 
 
+_BATCH_CANDIDATES_SQL = """
+    SELECT book_id, title, isbn, genre, release_date, description, cover_url, language, page_count,
+           normalized_title
+    FROM books
+    WHERE author_id = %s AND normalized_title = ANY(%s)
+    ORDER BY book_id
+"""
+
+# Same COALESCE rules as the single-book update in save_enhanced_book_to_db. An ISBN
+# already used by another book is left alone instead of failing the whole batch.
+_BATCH_UPDATE_SQL = """
+    UPDATE books AS b
+    SET isbn = CASE WHEN NULLIF(v.isbn, '') IS NULL
+                      OR EXISTS (SELECT 1 FROM books o WHERE o.isbn = v.isbn AND o.book_id <> b.book_id)
+                    THEN b.isbn ELSE v.isbn END,
+        genre = COALESCE(NULLIF(v.genre, ''), b.genre),
+        release_date = COALESCE(v.release_date, b.release_date),
+        description = COALESCE(NULLIF(v.description, ''), b.description),
+        cover_url = COALESCE(NULLIF(v.cover_url, ''), b.cover_url),
+        language = COALESCE(NULLIF(v.language, ''), b.language),
+        page_count = COALESCE(v.page_count, b.page_count),
+        openlibrary_key = COALESCE(NULLIF(v.openlibrary_key, ''), b.openlibrary_key)
+    FROM (VALUES %s) AS v(book_id, isbn, genre, release_date, description, cover_url,
+                          language, page_count, openlibrary_key)
+    WHERE b.book_id = v.book_id
+"""
+_BATCH_UPDATE_TEMPLATE = "(%s::int, %s, %s, %s::date, %s, %s, %s, %s::int, %s)"
+
+# Books whose ISBN already exists are skipped, like a failed single insert
+_BATCH_INSERT_SQL = """
+    INSERT INTO books (title, isbn, genre, release_date, description, cover_url, author_id,
+                       language, page_count, openlibrary_key)
+    VALUES %s
+    ON CONFLICT (isbn) DO NOTHING
+    RETURNING book_id
+"""
+_BATCH_INSERT_TEMPLATE = "(%s, %s, %s, %s::date, %s, %s, %s, %s, %s::int, %s)"
+
+
+def _coalesce_row(preferred: Dict[str, Any], fallback: Dict[str, Any]) -> Dict[str, Any]:
+    # Empty values in `preferred` fall back to `fallback` (the SQL COALESCE(NULLIF(x, ''), y) rule)
+    return {column: preferred.get(column) if preferred.get(column) not in (None, '') else fallback.get(column)
+            for column in fallback}
+
+
+def _merge_into_existing(group: List[Dict[str, Any]], existing: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Merge prepared rows rather than raw works so release dates and cover URLs take part too
+    rows = [prepare_enhanced_book_row(b) for b in group]
+    merged = merge_book_data(rows + existing)
+    # Latest non-empty key wins, as it did when books were saved one at a time
+    merged['openlibrary_key'] = next((r['openlibrary_key'] for r in reversed(rows) if r['openlibrary_key']), '')
+    merged['book_id'] = existing[0]['book_id']
+    return merged
+
+
+def _merge_new_group(group: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # First work provides the row, later works with the same normalized title fill its gaps
+    rows = [prepare_enhanced_book_row(b) for b in group]
+    row = rows[0]
+    if len(rows) > 1:
+        merged = merge_book_data(rows[1:] + [row])
+        merged['openlibrary_key'] = next((r['openlibrary_key'] for r in reversed(rows[1:]) if r['openlibrary_key']), '')
+        row = {'title': row['title'], **_coalesce_row(merged, {k: row[k] for k in BOOK_UPSERT_COLUMNS})}
+    return row
+
+
+def bulk_upsert_books(books_data: List[Dict[str, Any]], author_id: int):
+    """
+    Save a batch of Open Library works for one author in a single transaction.
+    Titles are normalized in Python, all duplicate candidates are fetched with one query,
+    merged in memory with merge_book_data, then written with one UPDATE ... FROM VALUES
+    and one INSERT ... ON CONFLICT. Returns (saved, skipped).
+    Raises psycopg2.Error if the batch could not be written (nothing is committed then).
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    skipped = 0
+    for book_data in books_data:
+        title = (book_data.get('title') or '').strip()
+        if is_unwanted_title(title):
+            skipped += 1
+            continue
+        groups.setdefault(normalize_title(title), []).append(book_data)
+
+    if not groups:
+        return 0, skipped
+
+    with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(_BATCH_CANDIDATES_SQL, (author_id, list(groups)))
+        candidates: Dict[str, List[Dict[str, Any]]] = {}
+        for row in cur.fetchall():
+            candidates.setdefault(row['normalized_title'], []).append(dict(row))
+
+        updates, inserts = [], []
+        batch_isbns = set()
+        for normalized, group in groups.items():
+            if normalized in candidates:
+                row = _merge_into_existing(group, candidates[normalized])
+            else:
+                row = _merge_new_group(group)
+            # Two rows of one batch must not claim the same ISBN
+            if row.get('isbn'):
+                if row['isbn'] in batch_isbns:
+                    row['isbn'] = None
+                else:
+                    batch_isbns.add(row['isbn'])
+
+            if 'book_id' in row:
+                updates.append((row['book_id'], *[row.get(c) for c in BOOK_UPSERT_COLUMNS]))
+            else:
+                inserts.append((row['title'], row['isbn'], row['genre'], row['release_date'],
+                                row['description'], row['cover_url'], author_id,
+                                row['language'], row['page_count'], row['openlibrary_key']))
+
+        try:
+            if updates:
+                psycopg2.extras.execute_values(
+                    cur, _BATCH_UPDATE_SQL, updates, template=_BATCH_UPDATE_TEMPLATE, page_size=500)
+            inserted = []
+            if inserts:
+                inserted = psycopg2.extras.execute_values(
+                    cur, _BATCH_INSERT_SQL, inserts, template=_BATCH_INSERT_TEMPLATE,
+                    page_size=500, fetch=True)
+            conn.commit()
+        except psycopg2.Error:
+            conn.rollback()
+            raise
+
+    skipped += len(inserts) - len(inserted)
+    return len(updates) + len(inserted), skipped
+
+
 def bulk_insert_books(books_data: List[Dict[str, Any]], author_id: int):
-    """Bulk insert books with enhanced data into database, skipping duplicates with individual transactions"""
+    """
+    Bulk insert books with enhanced data into database, merging duplicates.
+    Uses one batched transaction; if that fails, falls back to saving books one at a time.
+    """
+    try:
+        successful_inserts, failed_inserts = bulk_upsert_books(books_data, author_id)
+        print(
+            f"DEBUG OPENLIBRARY_bulk_insert_books: Bulk upsert completed. Successful: {successful_inserts}, Skipped: {failed_inserts}")
+        return successful_inserts, failed_inserts
+    except Exception as e:
+        logger.warning(f"Batched upsert failed for author {author_id}, saving books individually: {e}")
+
     try:
         successful_inserts = 0
         failed_inserts = 0
 
         for book_data in books_data:
-            # Try to insert each book individually with retries
-            for attempt in range(3):
-                try:
-                    # Use the enhanced save function
-                    book_id = save_enhanced_book_to_db(book_data, author_id)
-
-                    if book_id:
-                        successful_inserts += 1
-                        print(
-                            f"DEBUG OPENLIBRARY_bulk_insert_books: Successfully saved book '{book_data['title'][:50]}...' with ID {book_id}")
-                        break
-                    else:
-                        print(
-                            f"DEBUG OPENLIBRARY_bulk_insert_books: Failed to save book '{book_data['title'][:50]}...' (attempt {attempt + 1})")
-                        if attempt == 2:  # Last attempt
-                            failed_inserts += 1
-                        else:
-                            time.sleep(0.5)  # Brief pause before retry
-
-                except Exception as e:
-                    print(
-                        f"DEBUG OPENLIBRARY_bulk_insert_books: Error saving book '{book_data['title'][:50]}...' (attempt {attempt + 1}): {e}")
-                    if attempt == 2:  # Last attempt
-                        failed_inserts += 1
-                    else:
-                        time.sleep(0.5)  # Brief pause before retry
+            book_id = save_enhanced_book_to_db(book_data, author_id)
+            if book_id:
+                successful_inserts += 1
+            else:
+                failed_inserts += 1
 
         print(
             f"DEBUG OPENLIBRARY_bulk_insert_books: Bulk insert completed. Successful: {successful_inserts}, Failed: {failed_inserts}")
@@ -1676,15 +1848,17 @@ def get_or_create_book_from_api(book_data: Dict[str, Any]) -> Optional[int]:
     return save_book_to_db(book_data, author_id)
 
 
-def search_additional_books_by_author(author_name: str, author_id: int) -> None:
+def search_additional_books_by_author(author_name: str, author_id: int, progress_callback=None) -> None:
     """
     Search for additional books by an author that might not be in their OpenLibrary works list.
     Uses OpenLibrary search API and Gutenberg search to find missing books.
+    progress_callback(books_added=...) is called whenever a book is saved
     """
     print(
         f"DEBUG OPENLIBRARY_search_additional_books_by_author: Searching for additional books by {author_name}")
 
     found_books = set()  # Track titles to avoid duplicates
+    books_added = 0
 
     # Get existing books by this author to avoid duplicates
     try:
@@ -1709,7 +1883,7 @@ def search_additional_books_by_author(author_name: str, author_id: int) -> None:
             'fields': 'key,title,author_name,author_key,first_publish_year,cover_i,isbn,subject,publisher'
         }
 
-        response = requests.get(url, params=params, timeout=15)
+        response = cached_get(url, params=params, timeout=15)
         response.raise_for_status()
 
         data = response.json()
@@ -1762,8 +1936,9 @@ def search_additional_books_by_author(author_name: str, author_id: int) -> None:
                     print(
                         f"DEBUG OPENLIBRARY_search_additional_books_by_author: Added additional book: {title}")
                     existing_titles.add(title_lower)
-                    # Small delay to respect API limits
-                    time.sleep(0.5)
+                    books_added += 1
+                    if progress_callback:
+                        progress_callback(books_added=books_added)
             except Exception as e:
                 print(f"Error saving additional book {title}: {e}")
 
@@ -1794,8 +1969,9 @@ def search_additional_books_by_author(author_name: str, author_id: int) -> None:
                     print(
                         f"DEBUG OPENLIBRARY_search_additional_books_by_author: Added Gutenberg book: {title}")
                     existing_titles.add(title_lower)
-                    # Small delay to respect API limits
-                    time.sleep(0.5)
+                    books_added += 1
+                    if progress_callback:
+                        progress_callback(books_added=books_added)
             except Exception as e:
                 print(f"Error saving Gutenberg book {title}: {e}")
 
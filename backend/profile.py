@@ -4,6 +4,7 @@ import json
 import psycopg2
 import psycopg2.extras
 from .db import get_conn
+from .search import search_local
 from backend.moderation import moderate_review
 # ---- READ ----
 
@@ -147,16 +148,7 @@ def search_users(query: str) -> List[Dict[str, Any]]:
     """
     Search for users by username, returns matching users
     """
-    sql = """
-    select user_id, username, profile_image_url
-      from public.users
-     where lower(username) like lower(%s)
-     order by username
-     limit 10
-    """
-    with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-        cur.execute(sql, (f"%{query}%",))
-        return [dict(r) for r in cur.fetchall()]
+    return search_local(query, kinds=('users',), limit=10)['users']
 
 
 def search_all(query: str) -> Dict[str, List[Dict[str, Any]]]:
@@ -0,0 +1,230 @@
+# backend/rate_limit.py
+"""
+Process-wide outbound rate limiting, one token bucket per host.
+
+Every request made through backend.http_cache takes a token from its host's bucket
+first, so concurrent author ingestions and user searches share one request budget
+instead of each thread backing off on its own. When a host answers 429/503 with
+Retry-After, the whole bucket pauses until then.
+
+Requests are foreground (someone is waiting on the page) by default. Ingestion code
+wraps itself in `with background_priority():`; when both kinds are queued, foreground
+requests go first but every BACKGROUND_EVERY-th token goes to background so
+ingestion never starves completely.
+"""
+import os
+import time
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Optional
+from urllib.parse import urlsplit
+
+FOREGROUND = 0
+BACKGROUND = 1
+
+# tokens/sec and burst size per host, overridable with e.g. RATE_LIMIT_OPENLIBRARY_ORG="5,10"
+DEFAULT_HOST_LIMITS = {
+    "openlibrary.org": (4.0, 8),
+    "covers.openlibrary.org": (10.0, 20),
+    "gutenberg.org": (2.0, 4),
+}
+
+BACKGROUND_EVERY = int(os.getenv("RATE_LIMIT_BACKGROUND_EVERY", "4"))
+
+# Never honour a Retry-After longer than this
+MAX_RETRY_AFTER = 120.0
+
+_priority = contextvars.ContextVar("http_priority", default=FOREGROUND)
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a token could not be acquired within the caller's timeout."""
+
+
+def _host_limits(host):
+    env_name = "RATE_LIMIT_" + host.upper().replace(".", "_")
+    rate, burst = DEFAULT_HOST_LIMITS[host]
+    value = os.getenv(env_name)
+    if value:
+        parts = value.split(",")
+        rate = float(parts[0])
+        burst = int(parts[1]) if len(parts) > 1 else burst
+    return rate, burst
+
+
+class TokenBucket:
+    """Thread-safe token bucket with FIFO queues for foreground and background waiters."""
+
+    def __init__(self, rate, burst, background_every=BACKGROUND_EVERY):
+        self.rate = float(rate)
+        self.burst = max(1, int(burst))
+        self.background_every = max(1, background_every)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._cond = threading.Condition(threading.Lock())
+        self._queues = (deque(), deque())
+        self._foreground_streak = 0
+        self._stats = {"acquired": 0, "waited": 0, "wait_time_total": 0.0,
+                       "retry_after_pauses": 0, "timeouts": 0}
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _my_turn(self, priority, waiter):
+        queue = self._queues[priority]
+        if queue[0] is not waiter:
+            return False
+        other = self._queues[1 - priority]
+        if not other:
+            return True
+        # Both classes waiting: background gets every background_every-th token
+        background_turn = self._foreground_streak >= self.background_every - 1
+        return (priority == BACKGROUND) == background_turn
+
+    def acquire(self, priority=None, timeout=None):
+        """Block until a token is available. Raises RateLimitTimeout after `timeout` seconds."""
+        if priority is None:
+            priority = _priority.get()
+        started = time.monotonic()
+        deadline = None if timeout is None else started + timeout
+        waiter = object()
+
+        with self._cond:
+            queue = self._queues[priority]
+            queue.append(waiter)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    if now >= self._blocked_until and self._tokens >= 1 and self._my_turn(priority, waiter):
+                        break
+
+                    if now < self._blocked_until:
+                        wait = self._blocked_until - now
+                    elif self._tokens < 1:
+                        wait = (1 - self._tokens) / self.rate
+                    else:
+                        wait = None  # a token is free but it's someone else's turn
+                    if deadline is not None:
+                        remaining = deadline - now
+                        if remaining <= 0:
+                            self._stats["timeouts"] += 1
+                            raise RateLimitTimeout(f"No request token within {timeout}s")
+                        wait = remaining if wait is None else min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                queue.remove(waiter)
+                self._cond.notify_all()
+
+            self._tokens -= 1
+            if priority == FOREGROUND and self._queues[BACKGROUND]:
+                self._foreground_streak += 1
+            else:
+                self._foreground_streak = 0
+            waited = time.monotonic() - started
+            self._stats["acquired"] += 1
+            self._stats["wait_time_total"] += waited
+            if waited > 0.001:
+                self._stats["waited"] += 1
+
+    def pause(self, seconds):
+        """Stop handing out tokens for `seconds` (server asked us to back off)."""
+        seconds = min(max(0.0, seconds), MAX_RETRY_AFTER)
+        with self._cond:
+            until = time.monotonic() + seconds
+            if until > self._blocked_until:
+                self._blocked_until = until
+                self._stats["retry_after_pauses"] += 1
+            self._cond.notify_all()
+
+    def paused_for(self):
+        with self._cond:
+            return max(0.0, self._blocked_until - time.monotonic())
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats["rate"] = self.rate
+            stats["queued_foreground"] = len(self._queues[FOREGROUND])
+            stats["queued_background"] = len(self._queues[BACKGROUND])
+        stats["paused_for"] = self.paused_for()
+        return stats
+
+
+_buckets = {}
+_buckets_lock = threading.Lock()
+
+
+def _bucket_host(url) -> Optional[str]:
+    host = (urlsplit(url).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host if host in DEFAULT_HOST_LIMITS else None
+
+
+def get_bucket(url) -> Optional[TokenBucket]:
+    """The bucket for url's host, or None if that host isn't rate limited"""
+    host = _bucket_host(url)
+    if host is None:
+        return None
+    bucket = _buckets.get(host)
+    if bucket is None:
+        with _buckets_lock:
+            bucket = _buckets.get(host)
+            if bucket is None:
+                bucket = _buckets[host] = TokenBucket(*_host_limits(host))
+    return bucket
+
+
+def acquire(url, timeout=None):
+    bucket = get_bucket(url)
+    if bucket is not None:
+        bucket.acquire(timeout=timeout)
+
+
+def parse_retry_after(value) -> Optional[float]:
+    """Retry-After is either delay-seconds or an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(url, seconds) -> bool:
+    """Pause every request to url's host for `seconds`. False if the host isn't rate limited."""
+    bucket = get_bucket(url)
+    if bucket is None:
+        return False
+    bucket.pause(seconds)
+    return True
+
+
+def get_rate_limit_stats():
+    with _buckets_lock:
+        buckets = dict(_buckets)
+    return {host: bucket.stats() for host, bucket in buckets.items()}
+
+
+@contextmanager
+def background_priority():
+    """Mark outbound requests made inside the block (in this thread/context) as background traffic."""
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
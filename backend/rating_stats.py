@@ -0,0 +1,126 @@
+# backend/rating_stats.py
+"""
+Per-book rating aggregates (extras/migrations/005_book_rating_stats.sql).
+
+book_rating_stats is kept up to date by a trigger on reviews, so feed queries can join
+one row per book instead of counting/averaging reviews per row. This module reads the
+aggregates and can verify or rebuild them from reviews:
+
+    python -m backend.rating_stats          # report books whose stats drifted
+    python -m backend.rating_stats --fix    # report, then rebuild those books
+    python -m backend.rating_stats --rebuild-all
+"""
+import argparse
+from typing import Any, Dict, List, Optional
+import psycopg2
+import psycopg2.extras
+from backend.db import get_conn
+
+STAT_COLUMNS = ['review_count', 'rating_count', 'rating_sum',
+                'rating_1', 'rating_2', 'rating_3', 'rating_4', 'rating_5']
+
+# Aggregates recomputed from reviews; %(book_ids)s NULL means every book
+_ACTUAL_SQL = """
+    SELECT book_id, COUNT(*) AS review_count, COUNT(rating) AS rating_count,
+           COALESCE(SUM(rating), 0) AS rating_sum,
+           COUNT(*) FILTER (WHERE rating = 1) AS rating_1, COUNT(*) FILTER (WHERE rating = 2) AS rating_2,
+           COUNT(*) FILTER (WHERE rating = 3) AS rating_3, COUNT(*) FILTER (WHERE rating = 4) AS rating_4,
+           COUNT(*) FILTER (WHERE rating = 5) AS rating_5
+    FROM reviews
+    WHERE %(book_ids)s::integer[] IS NULL OR book_id = ANY(%(book_ids)s::integer[])
+    GROUP BY book_id
+"""
+
+_CHECK_SQL = f"""
+    WITH actual AS ({_ACTUAL_SQL})
+    SELECT COALESCE(a.book_id, s.book_id) AS book_id,
+           {', '.join(f'COALESCE(a.{c}, 0) AS actual_{c}, COALESCE(s.{c}, 0) AS stored_{c}' for c in STAT_COLUMNS)}
+    FROM actual a
+    FULL OUTER JOIN (
+        SELECT * FROM book_rating_stats
+        WHERE %(book_ids)s::integer[] IS NULL OR book_id = ANY(%(book_ids)s::integer[])
+    ) s ON s.book_id = a.book_id
+    WHERE {' OR '.join(f'COALESCE(a.{c}, 0) <> COALESCE(s.{c}, 0)' for c in STAT_COLUMNS)}
+    ORDER BY 1
+    LIMIT %(limit)s
+"""
+
+_REBUILD_SQL = f"""
+    WITH actual AS ({_ACTUAL_SQL}),
+    upserted AS (
+        INSERT INTO book_rating_stats AS s (book_id, {', '.join(STAT_COLUMNS)}, updated_at)
+        SELECT book_id, {', '.join(STAT_COLUMNS)}, now() FROM actual
+        ON CONFLICT (book_id) DO UPDATE SET
+            {', '.join(f'{c} = EXCLUDED.{c}' for c in STAT_COLUMNS)}, updated_at = now()
+        WHERE ({', '.join(f's.{c}' for c in STAT_COLUMNS)})
+              IS DISTINCT FROM ({', '.join(f'EXCLUDED.{c}' for c in STAT_COLUMNS)})
+        RETURNING book_id
+    ),
+    emptied AS (
+        -- Books whose reviews are all gone
+        DELETE FROM book_rating_stats s
+        WHERE (%(book_ids)s::integer[] IS NULL OR s.book_id = ANY(%(book_ids)s::integer[]))
+          AND NOT EXISTS (SELECT 1 FROM actual a WHERE a.book_id = s.book_id)
+        RETURNING book_id
+    )
+    SELECT (SELECT COUNT(*) FROM upserted) + (SELECT COUNT(*) FROM emptied)
+"""
+
+
+def get_book_rating_stats(book_id: int) -> Dict[str, Any]:
+    """
+    Review count, average rating and 1-5 star histogram for a book:
+    {'review_count': int, 'rating_count': int, 'avg_rating': float or None, 'histogram': [n1..n5]}
+    """
+    empty = {'review_count': 0, 'rating_count': 0, 'avg_rating': None, 'histogram': [0] * 5}
+    try:
+        with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute("SELECT * FROM book_rating_stats WHERE book_id = %s", (book_id,))
+            row = cur.fetchone()
+    except psycopg2.Error as e:
+        print(f"Error getting rating stats for book {book_id}: {e}")
+        return empty
+    if not row:
+        return empty
+    return {
+        'review_count': row['review_count'],
+        'rating_count': row['rating_count'],
+        'avg_rating': round(row['rating_sum'] / row['rating_count'], 1) if row['rating_count'] else None,
+        'histogram': [row[f'rating_{i}'] for i in range(1, 6)],
+    }
+
+
+def check_rating_stats(book_ids: Optional[List[int]] = None, limit: int = 1000) -> List[Dict[str, Any]]:
+    """Books whose stored aggregates differ from their reviews (actual_* vs stored_* columns)"""
+    with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        cur.execute(_CHECK_SQL, {'book_ids': book_ids, 'limit': limit})
+        return [dict(row) for row in cur.fetchall()]
+
+
+def rebuild_rating_stats(book_ids: Optional[List[int]] = None) -> int:
+    """Recompute aggregates from reviews (all books when book_ids is None). Returns rows changed."""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute(_REBUILD_SQL, {'book_ids': book_ids})
+        changed = cur.fetchone()[0]
+        conn.commit()
+    return changed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check or rebuild book_rating_stats")
+    parser.add_argument('--fix', action='store_true', help='rebuild the books that drifted')
+    parser.add_argument('--rebuild-all', action='store_true', help='rebuild every book')
+    args = parser.parse_args()
+
+    if args.rebuild_all:
+        print(f"Rebuilt rating stats: {rebuild_rating_stats()} rows changed")
+    else:
+        drifted = check_rating_stats()
+        for row in drifted:
+            diffs = ', '.join(f"{c} {row[f'stored_{c}']} != {row[f'actual_{c}']}"
+                              for c in STAT_COLUMNS if row[f'stored_{c}'] != row[f'actual_{c}'])
+            print(f"book {row['book_id']}: {diffs}")
+        print(f"{len(drifted)} books with drifted rating stats")
+        if drifted and args.fix:
+            changed = rebuild_rating_stats([row['book_id'] for row in drifted])
+            print(f"Rebuilt rating stats: {changed} rows changed")
@@ -0,0 +1,743 @@
+# backend/reader.py
+"""
+Reader artifacts for Gutenberg books.
+
+A book's HTML is processed once (at ingest time, or on the first open on a host
+that doesn't have it yet) into:
+- book.html: the cleaned document with header ids, the navigation panel and the
+  reader scripts already injected, ready to be served as the iframe src
+- paged.html: a small reader shell that loads one chapter at a time
+- index.json: headers/TOC and chapter list
+- anchors.json: anchor id -> chapter map, for links that point into another chapter
+- chapters/NNNN.html: the body split into chapter fragments
+
+Artifacts live on disk under READER_CACHE_DIR/<book_id>/<content_hash>/, where the
+hash covers the source HTML and READER_PIPELINE_VERSION, so the files behind a URL
+never change. They are still only served to a renter: read_book sets a signed cookie
+scoped to /reader/<book_id>/ after checking the rental, and every request (including
+the browser's revalidations) checks the cookie and that the rental is still active.
+"""
+import os
+import re
+import json
+import shutil
+import hashlib
+import secrets
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+import requests
+from bs4 import BeautifulSoup
+from flask import abort, request, send_file
+from itsdangerous import BadSignature, URLSafeTimedSerializer
+from backend.cache import TTLCache, SingleFlight
+from backend.rentals import check_book_rental_status
+
+READER_CACHE_DIR = os.getenv(
+    "READER_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".reader_cache"))
+# Bump when the processing below changes so existing artifacts are rebuilt
+READER_PIPELINE_VERSION = 3
+READER_DOWNLOAD_TIMEOUT = 30
+# Signs reader access cookies. Without it each host keeps a random one in READER_CACHE_DIR,
+# so set it when several hosts serve the same users.
+READER_SECRET = os.getenv("READER_SECRET")
+READER_ACCESS_COOKIE = 'reader_access'
+READER_ACCESS_MAX_AGE = 24 * 3600        # reopening the book issues a new cookie
+
+# Chapters bigger than this are split further, and books without usable headers
+# are split into pages of roughly this size
+READER_PAGE_BYTES = 120_000
+
+_INDEX_CACHE = TTLCache(maxsize=256, ttl=600)
+_RENTAL_CHECKS = TTLCache(maxsize=4096, ttl=60)
+_builds = SingleFlight()
+_secret = None
+
+_HASH_RE = re.compile(r'^[0-9a-f]{16}$')
+_ARTIFACT_RE = re.compile(r'^(book\.html|paged\.html|anchors\.json|chapters/\d{4}\.html)$')
+_HEADER_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+_EXTERNAL_LINK_RE = re.compile(r'<a([^>]+href="(?:https?|ftp)://[^"]*")>')
+_BODY_TAG_RE = re.compile(r'(<body[^>]*>)')
+
+GUTENBERG_HEADER_START = 'The Project Gutenberg eBook of '
+GUTENBERG_HEADER_END = '*** START OF THE PROJECT GUTENBERG '
+
+
+def strip_gutenberg_header(html_content: str) -> str:
+    """Remove everything from 'The Project Gutenberg eBook of' through the '*** START OF ... ***' line"""
+    start = html_content.find(GUTENBERG_HEADER_START)
+    if start == -1:
+        return html_content
+    marker = html_content.find(GUTENBERG_HEADER_END, start)
+    if marker == -1:
+        return html_content
+    end = html_content.find('***', marker + len(GUTENBERG_HEADER_END))
+    if end == -1:
+        return html_content
+    return html_content[:start] + html_content[end + 3:]
+
+
+def _normalize_heading(text: str) -> str:
+    return re.sub(r'\s+', ' ', text.lower().strip()).rstrip('.,!?')
+
+
+def _index_headers(soup) -> List[Tuple[Any, Dict[str, Any]]]:
+    """
+    Assign ids to h1-h6 tags (taking them from the book's table of contents where
+    the text matches) and return (tag, header) pairs for the navigation headers:
+    ACT headers and headers linked from the table of contents.
+    """
+    # First, try to find table of contents and extract proper ID mappings
+    toc_mappings = {}
+    toc_section = None
+    for element in soup.find_all(['div', 'section', 'nav']):
+        text = element.get_text()
+        if text.strip().startswith('Contents') or 'CONTENTS' in text.upper():
+            toc_section = element
+            break
+
+    if toc_section:
+        for link in toc_section.find_all('a', href=lambda x: x and x.startswith('#')):
+            # The first TOC entry with a given text wins
+            toc_mappings.setdefault(_normalize_heading(link.get_text()), link.get('href')[1:])
+    toc_ids = set(toc_mappings.values())
+
+    indexed = []
+    for position, header_tag in enumerate(soup.find_all(_HEADER_TAGS)):
+        header_text = header_tag.get_text().strip()
+        header_id = toc_mappings.get(_normalize_heading(header_text))
+
+        if header_id:
+            header_tag['id'] = header_id
+        elif not header_tag.get('id'):
+            header_id = re.sub(r'[^a-zA-Z0-9]', '_', header_text.lower())
+            header_id = re.sub(r'_+', '_', header_id).strip('_')
+            if not header_id:
+                header_id = f"header_{position}"
+            header_tag['id'] = header_id
+        else:
+            header_id = header_tag.get('id')
+
+        if header_text.upper().startswith('ACT ') or header_id in toc_ids:
+            indexed.append((header_tag, {
+                'id': header_id,
+                'text': header_text,
+                'level': int(header_tag.name[1]),  # h1 -> 1, h2 -> 2, etc.
+                'tag': header_tag.name
+            }))
+    return indexed
+
+
+def extract_headers_from_html(html_content: str):
+    """Extract navigation headers from HTML content; returns (headers, html with header ids)"""
+    soup = BeautifulSoup(html_content, 'html.parser')
+    headers = [header for _, header in _index_headers(soup)]
+    return headers, str(soup)
+
+
+def _top_level_child(tag, container):
+    """The ancestor of `tag` (or `tag` itself) that is a direct child of `container`"""
+    node = tag
+    while node is not None and node.parent is not container:
+        node = node.parent
+    return node
+
+
+def _split_chapters(soup, indexed) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Split the body into chapter fragments at the navigation headers, falling back to
+    fixed-size pages. Returns (chapters, anchor id -> chapter index).
+    """
+    body = soup.body or soup
+    header_tags = [tag for tag, _ in indexed]
+
+    # Descend through wrapper elements (e.g. one <div> around the whole book) until
+    # the headers sit under different children of the container
+    container = body
+    while header_tags:
+        children = {id(_top_level_child(tag, container)) for tag in header_tags}
+        child = _top_level_child(header_tags[0], container)
+        if len(children) != 1 or child is header_tags[0] or child is None:
+            break
+        container = child
+
+    starts = {}
+    for tag, header in indexed:
+        child = _top_level_child(tag, container)
+        if child is not None:
+            starts.setdefault(id(child), header)
+
+    # Content around the wrapper goes into the first/last chapter
+    before, after = [], []
+    node = container
+    while node is not body and node is not None and node.parent is not None:
+        before = list(reversed(list(node.previous_siblings))) + before
+        after = after + list(node.next_siblings)
+        node = node.parent
+
+    chunks = [{'title': None, 'header_id': None, 'nodes': list(before)}]
+    for child in container.contents:
+        header = starts.get(id(child))
+        if header is not None and any(not isinstance(n, str) or n.strip() for n in chunks[-1]['nodes']):
+            chunks.append({'title': header['text'], 'header_id': header['id'], 'nodes': []})
+        elif header is not None and chunks[-1]['title'] is None:
+            chunks[-1].update(title=header['text'], header_id=header['id'])
+        chunks[-1]['nodes'].append(child)
+    chunks[-1]['nodes'].extend(after)
+
+    chapters = []
+    anchors = {}
+    for chunk in chunks:
+        title = chunk['title']
+        part, size, nodes = 1, 0, []
+
+        def flush():
+            if not nodes:
+                return
+            if title:
+                label = title if part == 1 else f"{title} ({part})"
+            else:
+                label = f"Page {len(chapters) + 1}"
+            chapters.append({'title': label, 'header_id': chunk['header_id'] if part == 1 else None,
+                             'html': ''.join(str(n) for n in nodes)})
+
+        for child in chunk['nodes']:
+            fragment_size = len(str(child))
+            if nodes and size + fragment_size > READER_PAGE_BYTES:
+                flush()
+                part, size, nodes = part + 1, 0, []
+            nodes.append(child)
+            size += fragment_size
+            if not isinstance(child, str):
+                if child.get('id'):
+                    anchors.setdefault(child['id'], len(chapters))
+                for element in child.find_all(id=True):
+                    anchors.setdefault(element['id'], len(chapters))
+        flush()
+
+    return chapters, anchors
+
+
+def create_navigation_panel(headers, paged=False):
+    """Create the navigation panel with headers (in paged mode, links load their chapter on demand)"""
+    if not headers:
+        return ""
+
+    nav_items = []
+    for i, header in enumerate(headers):
+        indent_class = f"nav-indent-{header['level']}"
+        chapter_attr = ''
+        if paged and header.get('chapter') is not None:
+            chapter_attr = f' data-chapter="{header["chapter"]}"'
+        nav_items.append(
+            '<a href="#{}"{} class="nav-link {}" style="display:block;padding:5px 10px;text-decoration:none;color:#333;cursor:pointer;margin-left:{}px;">{}</a>'.format(
+                header["id"],
+                chapter_attr,
+                indent_class,
+                (header["level"]-1)*16,
+                header["text"][:50] +
+                ("..." if len(header["text"]) > 50 else "")
+            )
+        )
+
+    # Fixed sidebar TOC, always visible on the left
+    nav_html = '''
+    <style>
+    .nav-panel-fixed, html, body {{
+        background: var(--secondary-bg, #f5f5f5) !important;
+    }}
+    .nav-panel-fixed {{
+        position: fixed;
+        top: 0;
+        left: 0;
+        width: 250px;
+        height: 100vh;
+        overflow-y: auto;
+        border-right: 1px solid #ddd;
+        z-index: 1000;
+        background: var(--secondary-bg) !important;
+    }}
+    .toc-book-content-fixed {{
+        margin-left: 270px;
+        padding: 20px 20px 20px 0;
+        min-width: 0;
+        box-sizing: border-box;
+        background: var(--secondary-bg) !important;
+    }}
+    /* Fallback: if book content is not moved, offset body */
+    body:not(:has(.toc-book-content-fixed > *)) {{margin-left: 270px !important;}}
+
+    /* Mobile responsive styles */
+    @media (max-width: 1024px) {{
+        .nav-panel-fixed {{
+            width: 150px;
+        }}
+        .toc-book-content-fixed {{
+            margin-left: 170px;
+            padding: 15px 15px 15px 0;
+        }}
+        body:not(:has(.toc-book-content-fixed > *)) {{
+            margin-left: 170px !important;
+        }}
+        .nav-panel-fixed h3 {{
+            font-size: 14px;
+            padding: 8px;
+        }}
+        .nav-link {{
+            font-size: 12px !important;
+            padding: 4px 8px !important;
+        }}
+    }}
+    </style>
+    <div class="card nav-panel-fixed">
+      <h3 style="padding:10px;margin:0;border-bottom:1px solid #ddd;background:var(--secondary-bg, #f5f5f5);">Table of Contents</h3>
+      <div class="nav-links">{nav_items}</div>
+    </div>
+    <div class="card toc-book-content-fixed" id="toc-book-content-fixed" style="background:var(--secondary-bg, #f5f5f5);">
+      <!-- BOOK CONTENT WILL BE MOVED HERE BY JS -->
+    </div>
+    <script>
+    document.addEventListener('DOMContentLoaded', function() {{
+        // Move all book content except the nav-panel into the .toc-book-content-fixed
+        var wrapper = document.getElementById('toc-book-content-fixed');
+        var navPanel = document.querySelector('.nav-panel-fixed');
+        if (wrapper && navPanel) {{
+            // Move all siblings after navPanel into wrapper
+            var next = navPanel.nextSibling;
+            var nodesToMove = [];
+            while (next) {{
+                // Only move elements that are not the wrapper itself
+                if (next !== wrapper) nodesToMove.push(next);
+                next = next.nextSibling;
+            }}
+            nodesToMove.forEach(function(node) {{
+                wrapper.appendChild(node);
+            }});
+        }}
+        document.querySelectorAll('.nav-link').forEach(function(link) {{
+            link.addEventListener('click', function(e) {{
+                e.preventDefault();
+                var targetId = this.getAttribute('href').substring(1);
+                if (this.dataset.chapter && window.readerShowChapter) {{
+                    window.readerShowChapter(parseInt(this.dataset.chapter, 10), targetId);
+                    return false;
+                }}
+                var targetElement = document.getElementById(targetId);
+                if (targetElement) {{
+                    targetElement.scrollIntoView({{ behavior: 'smooth' }});
+                }}
+                return false;
+            }});
+        }});
+    }});
+    </script>
+    '''.format(nav_items=''.join(nav_items))
+    return nav_html
+
+
+READER_ANCHOR_SCRIPT = '''
+<script>
+document.addEventListener('DOMContentLoaded', function() {
+    // Handle all anchor links
+    document.querySelectorAll('a[href^="#"]').forEach(function(link) {
+        link.addEventListener('click', function(e) {
+            e.preventDefault();
+            var targetId = this.getAttribute('href').substring(1);
+            var targetElement = document.getElementById(targetId);
+            if (targetElement) {
+                targetElement.scrollIntoView({ behavior: 'smooth' });
+            }
+            return false;
+        });
+    });
+
+    // Listen for messages from parent window (navigation panel)
+    window.addEventListener('message', function(event) {
+        if (event.data && event.data.type === 'scrollToElement') {
+            var targetElement = document.getElementById(event.data.elementId);
+            if (targetElement) {
+                targetElement.scrollIntoView({ behavior: 'smooth' });
+            }
+        }
+    });
+});
+</script>
+'''
+
+READER_HEAD = ('<base target="_self"><style>html { scroll-behavior: smooth; } '
+               'html, body { background: var(--secondary-bg) !important; }</style>' + READER_ANCHOR_SCRIPT)
+
+
+def _decorate_document(html_content: str, headers: List[Dict[str, Any]]) -> str:
+    """Add the reader head (base tag, background, anchor handling) and the navigation panel"""
+    if '<head>' in html_content:
+        html_content = html_content.replace('<head>', f'<head>{READER_HEAD}', 1)
+    elif '<html>' in html_content:
+        html_content = html_content.replace('<html>', f'<html><head>{READER_HEAD}</head>', 1)
+    else:
+        html_content = f'<head>{READER_HEAD}</head>{html_content}'
+
+    # Only external links open in a new tab; internal anchors stay in the iframe
+    html_content = _EXTERNAL_LINK_RE.sub(r'<a\1 target="_blank">', html_content)
+
+    nav_panel_html = create_navigation_panel(headers)
+    if '<body' in html_content:
+        return _BODY_TAG_RE.sub(lambda m: m.group(1) + nav_panel_html, html_content, count=1)
+    return nav_panel_html + html_content
+
+
+READER_PAGER_STYLE = '''
+<style>
+.reader-pager { display: flex; justify-content: space-between; align-items: center; gap: 12px; margin: 24px 0; }
+.reader-pager button { padding: 8px 16px; border: none; border-radius: 6px; background: #1976d2; color: #fff; cursor: pointer; }
+.reader-pager button:disabled { background: #ccc; color: #666; cursor: default; }
+.reader-pager span { font-size: 0.9rem; color: #555; text-align: center; }
+#reader-chapter.reader-loading { opacity: 0.5; }
+</style>
+'''
+
+READER_PAGER = '''
+<div class="reader-pager"><button type="button" class="reader-prev">&larr; Previous</button>
+<span class="reader-label"></span><button type="button" class="reader-next">Next &rarr;</button></div>
+'''
+
+# Loads chapter fragments on demand and prefetches the neighbours. Fragments are private,
+# no-cache responses (access is checked on every request), so revisiting a chapter
+# revalidates it: an unchanged fragment costs a 304 and is then read from the browser cache.
+READER_PAGED_SCRIPT = '''
+<script>
+(function() {
+    var bookId = %d;
+    var chapters = %s;
+    var base = location.pathname.replace(/[^/]*$/, '');
+    var loaded = {};
+    var anchors = null;
+    var current = -1;
+    var container = document.getElementById('reader-chapter');
+
+    function load(i) {
+        if (!loaded[i]) {
+            loaded[i] = fetch(base + chapters[i].file).then(function(r) {
+                if (!r.ok) { throw new Error('HTTP ' + r.status); }
+                return r.text();
+            });
+            loaded[i].catch(function() { delete loaded[i]; });
+        }
+        return loaded[i];
+    }
+
+    function updatePager() {
+        document.querySelectorAll('.reader-prev').forEach(function(b) { b.disabled = current <= 0; });
+        document.querySelectorAll('.reader-next').forEach(function(b) { b.disabled = current >= chapters.length - 1; });
+        document.querySelectorAll('.reader-label').forEach(function(s) {
+            s.textContent = chapters[current].title + ' (' + (current + 1) + '/' + chapters.length + ')';
+        });
+    }
+
+    function show(i, targetId) {
+        if (i < 0 || i >= chapters.length) { return; }
+        container.classList.add('reader-loading');
+        load(i).then(function(fragment) {
+            container.innerHTML = fragment;
+            container.classList.remove('reader-loading');
+            current = i;
+            updatePager();
+            var target = targetId && document.getElementById(targetId);
+            if (target) { target.scrollIntoView(); } else { window.scrollTo(0, 0); }
+            history.replaceState(null, '', '?chapter=' + i);
+            document.dispatchEvent(new CustomEvent('reader:chapter', { detail: { chapter: i } }));
+            reportPosition(false);
+            if (i + 1 < chapters.length) { load(i + 1); }
+            if (i > 0) { load(i - 1); }
+        }).catch(function(err) {
+            container.classList.remove('reader-loading');
+            container.textContent = 'Could not load this chapter (' + err.message + ').';
+        });
+    }
+
+    function goTo(targetId) {
+        var target = document.getElementById(targetId);
+        if (target) { target.scrollIntoView({ behavior: 'smooth' }); return; }
+        if (!anchors) {
+            anchors = fetch(base + 'anchors.json').then(function(r) { return r.json(); });
+        }
+        anchors.then(function(map) {
+            if (map[targetId] !== undefined) { show(map[targetId], targetId); }
+        });
+    }
+
+    // Position reports go to the parent page (assets/reader_position.js), which sends them
+    // to the server; scrolling reports at most every couple of seconds
+    function visibleAnchor() {
+        var elements = container.querySelectorAll('[id]');
+        for (var k = 0; k < elements.length; k++) {
+            if (elements[k].getBoundingClientRect().bottom > 0) { return elements[k].id; }
+        }
+        return null;
+    }
+
+    function reportPosition(final) {
+        if (current < 0 || window.parent === window) { return; }
+        window.parent.postMessage({ type: 'readerPosition', book_id: bookId, chapter: current,
+                                    anchor: visibleAnchor(), final: final }, location.origin);
+    }
+
+    var reportTimer = null;
+    window.addEventListener('scroll', function() {
+        if (reportTimer) { return; }
+        reportTimer = setTimeout(function() { reportTimer = null; reportPosition(false); }, 2000);
+    }, { passive: true });
+    window.addEventListener('pagehide', function() { reportPosition(true); });
+
+    window.readerShowChapter = show;
+    window.readerGoTo = goTo;
+
+    document.addEventListener('click', function(e) {
+        var el = e.target;
+        if (el.closest('.reader-prev')) { show(current - 1); return; }
+        if (el.closest('.reader-next')) { show(current + 1); return; }
+        var link = el.closest('#reader-chapter a[href^="#"]');
+        if (link) {
+            e.preventDefault();
+            goTo(link.getAttribute('href').substring(1));
+        }
+    });
+
+    window.addEventListener('message', function(event) {
+        if (event.data && event.data.type === 'scrollToElement') { goTo(event.data.elementId); }
+    });
+
+    // Opening at a saved position loads that chapter directly, not the ones before it
+    var params = new URLSearchParams(location.search);
+    var start = parseInt(params.get('chapter') || '0', 10);
+    show(isNaN(start) ? 0 : Math.min(Math.max(start, 0), chapters.length - 1), params.get('anchor'));
+})();
+</script>
+'''
+
+
+def _paged_document(index: Dict[str, Any], head_html: str) -> str:
+    """Reader shell for paged mode: book styles, navigation panel and an empty chapter container"""
+    chapters = [{'title': c['title'], 'file': c['file']} for c in index['chapters']]
+    # json.dumps doesn't escape '</', which would end the script element early
+    chapters_json = json.dumps(chapters).replace('</', '<\\/')
+    return (
+        '<!DOCTYPE html><html><head><meta charset="utf-8">'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        '<base target="_self"><style>html, body { background: var(--secondary-bg) !important; }</style>'
+        f'{head_html}{READER_PAGER_STYLE}</head><body>'
+        f'{create_navigation_panel(index["headers"], paged=True)}'
+        f'{READER_PAGER}<div id="reader-chapter"></div>{READER_PAGER}'
+        f'{READER_PAGED_SCRIPT % (index["book_id"], chapters_json)}</body></html>'
+    )
+
+
+def content_hash(html_content: str) -> str:
+    digest = hashlib.sha256(f"v{READER_PIPELINE_VERSION}\n".encode('utf-8'))
+    digest.update(html_content.encode('utf-8'))
+    return digest.hexdigest()[:16]
+
+
+def process_book_html(html_content: str) -> Dict[str, Any]:
+    """Parse a book once: cleaned reader document, navigation headers and chapter fragments"""
+    soup = BeautifulSoup(strip_gutenberg_header(html_content), 'html.parser')
+    indexed = _index_headers(soup)
+    headers = [header for _, header in indexed]
+
+    # Styles from the book's <head> are needed to render chapter fragments on their own
+    head_html = ''
+    if soup.head:
+        head_html = ''.join(str(tag) for tag in soup.head.find_all(['style', 'link'])
+                            if tag.name == 'style' or 'stylesheet' in (tag.get('rel') or []))
+
+    document = _decorate_document(str(soup), headers)
+    chapters, anchors = _split_chapters(soup, indexed)
+    for header in headers:
+        header['chapter'] = anchors.get(header['id'])
+    return {'document': document, 'headers': headers, 'head_html': head_html,
+            'chapters': chapters, 'anchors': anchors}
+
+
+def _book_dir(book_id: int) -> str:
+    return os.path.join(READER_CACHE_DIR, str(int(book_id)))
+
+
+def _write_json_atomic(path: str, data: Dict[str, Any]):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def _load_index(book_id: int) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(_book_dir(book_id), 'current.json'), encoding='utf-8') as f:
+            current = json.load(f)
+        with open(os.path.join(_book_dir(book_id), current['hash'], 'index.json'), encoding='utf-8') as f:
+            index = json.load(f)
+    except (OSError, ValueError, KeyError):
+        return None
+    if index.get('version') != READER_PIPELINE_VERSION:
+        return None
+    return index
+
+
+def build_reader_artifacts(book_id: int, html_content: str, html_path: str) -> Dict[str, Any]:
+    """Process a book's HTML and store the artifacts on disk. Returns the index."""
+    book_dir = _book_dir(book_id)
+    os.makedirs(book_dir, exist_ok=True)
+    digest = content_hash(html_content)
+    target = os.path.join(book_dir, digest)
+
+    if not os.path.isdir(target):
+        processed = process_book_html(html_content)
+        index = {
+            'version': READER_PIPELINE_VERSION, 'book_id': book_id, 'hash': digest,
+            'html_path': html_path, 'headers': processed['headers'],
+            'chapters': [{'title': c['title'], 'header_id': c['header_id'],
+                          'file': f"chapters/{i:04d}.html", 'bytes': len(c['html'].encode('utf-8'))}
+                         for i, c in enumerate(processed['chapters'])],
+        }
+
+        # Build in a scratch directory and rename it into place, so readers never see partial output
+        tmp_dir = tempfile.mkdtemp(dir=book_dir, prefix='.build-')
+        try:
+            os.makedirs(os.path.join(tmp_dir, 'chapters'))
+            with open(os.path.join(tmp_dir, 'book.html'), 'w', encoding='utf-8') as f:
+                f.write(processed['document'])
+            with open(os.path.join(tmp_dir, 'paged.html'), 'w', encoding='utf-8') as f:
+                f.write(_paged_document(index, processed['head_html']))
+            with open(os.path.join(tmp_dir, 'anchors.json'), 'w', encoding='utf-8') as f:
+                json.dump(processed['anchors'], f)
+            for meta, chapter in zip(index['chapters'], processed['chapters']):
+                with open(os.path.join(tmp_dir, meta['file']), 'w', encoding='utf-8') as f:
+                    f.write(chapter['html'])
+            with open(os.path.join(tmp_dir, 'index.json'), 'w', encoding='utf-8') as f:
+                json.dump(index, f)
+            os.rename(tmp_dir, target)
+        except OSError:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not os.path.isdir(target):  # lost a race with another process is fine
+                raise
+        print(f"DEBUG READER_build_reader_artifacts: book {book_id} -> {digest} "
+              f"({len(index['headers'])} headers, {len(index['chapters'])} chapters)")
+    else:
+        with open(os.path.join(target, 'index.json'), encoding='utf-8') as f:
+            index = json.load(f)
+        index['html_path'] = html_path
+
+    _write_json_atomic(os.path.join(book_dir, 'current.json'), {'hash': digest, 'html_path': html_path})
+    for name in os.listdir(book_dir):
+        if name != digest and _HASH_RE.match(name):
+            shutil.rmtree(os.path.join(book_dir, name), ignore_errors=True)
+
+    _INDEX_CACHE.set(book_id, index)
+    return index
+
+
+def _download_and_build(book_id: int, html_path: str) -> Dict[str, Any]:
+    response = requests.get(html_path, timeout=READER_DOWNLOAD_TIMEOUT)
+    response.raise_for_status()
+    return build_reader_artifacts(book_id, response.text, html_path)
+
+
+def get_reader_index(book_id: int, html_path: str) -> Dict[str, Any]:
+    """
+    Index for a book's reader artifacts, building them (one download and parse per
+    host, shared by concurrent callers) if they are missing or out of date.
+    """
+    index = _INDEX_CACHE.get(book_id)
+    if index is not None and index.get('html_path') == html_path:
+        return index
+
+    index = _load_index(book_id)
+    if index is None or index.get('html_path') != html_path:
+        return _builds.do(book_id, lambda: _download_and_build(book_id, html_path),
+                          timeout=READER_DOWNLOAD_TIMEOUT * 2)
+    _INDEX_CACHE.set(book_id, index)
+    return index
+
+
+def reader_url(index: Dict[str, Any], name: str = 'book.html') -> str:
+    return f"/reader/{index['book_id']}/{index['hash']}/{name}"
+
+
+def _access_serializer() -> URLSafeTimedSerializer:
+    global _secret
+    if _secret is None:
+        _secret = READER_SECRET or _host_secret()
+    return URLSafeTimedSerializer(_secret, salt='reader-access')
+
+
+def _host_secret() -> str:
+    """A random secret shared by the processes on this host (created once, atomically)"""
+    path = os.path.join(READER_CACHE_DIR, 'secret')
+    if not os.path.exists(path):
+        os.makedirs(READER_CACHE_DIR, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=READER_CACHE_DIR)
+        with os.fdopen(fd, 'w') as f:
+            f.write(secrets.token_hex(32))
+        try:
+            os.link(tmp_path, path)
+        except FileExistsError:
+            pass  # another process got there first; use theirs
+        finally:
+            os.unlink(tmp_path)
+    with open(path, encoding='utf-8') as f:
+        return f.read().strip()
+
+
+def grant_reader_access(response, user_id: int, book_id: int):
+    """Let this browser load the book's reader artifacts. Call only after checking the rental."""
+    token = _access_serializer().dumps([int(user_id), int(book_id)])
+    response.set_cookie(READER_ACCESS_COOKIE, token, max_age=READER_ACCESS_MAX_AGE,
+                        path=f"/reader/{int(book_id)}/", httponly=True, samesite='Lax',
+                        secure=request.is_secure)
+
+
+def reader_user(book_id: int) -> Optional[int]:
+    """
+    The user the request's access cookie was issued to for this book, if it is valid.
+    Only requests under /reader/<book_id>/ carry the cookie.
+    """
+    token = request.cookies.get(READER_ACCESS_COOKIE)
+    if not token:
+        return None
+    try:
+        user_id, token_book_id = _access_serializer().loads(token, max_age=READER_ACCESS_MAX_AGE)
+    except (BadSignature, TypeError, ValueError):
+        return None
+    return user_id if token_book_id == book_id else None
+
+
+def has_rental(user_id: int, book_id: int) -> bool:
+    """Whether the user has an active rental of the book (confirmed rentals are trusted for a minute)"""
+    key = (user_id, book_id)
+    if _RENTAL_CHECKS.get(key):
+        return True
+    allowed = check_book_rental_status(user_id, book_id) is not None
+    if allowed:
+        _RENTAL_CHECKS.set(key, True)
+    return allowed
+
+
+def init_app(server):
+    """
+    Serve reader artifacts from the disk cache to users with an active rental. Responses
+    are private and revalidated on every use (a cheap 304 while the rental lasts);
+    send_file handles conditional and byte-range requests.
+    """
+
+    @server.route('/reader/<int:book_id>/<content_hash>/<path:name>')
+    def _serve_reader_artifact(book_id, content_hash, name):
+        if not _HASH_RE.match(content_hash) or not _ARTIFACT_RE.match(name):
+            abort(404)
+        user_id = reader_user(book_id)
+        if user_id is None or not has_rental(user_id, book_id):
+            abort(403)
+        path = os.path.join(_book_dir(book_id), content_hash, *name.split('/'))
+        if not os.path.isfile(path):
+            abort(404)
+        mimetype = 'application/json' if name.endswith('.json') else 'text/html'
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=f"{content_hash}-{name}")
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
@@ -0,0 +1,139 @@
+# backend/reading_positions.py
+"""
+Where each user stopped reading each book (extras/migrations/004_reading_positions.sql).
+
+The reader reports its position every few seconds while the user scrolls, so updates
+are coalesced in memory (latest position per user and book) and written in one
+execute_values upsert every READING_POSITION_FLUSH_INTERVAL seconds, or straight away
+when the reader is closed.
+"""
+import os
+import atexit
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+import psycopg2
+import psycopg2.extras
+from flask import jsonify, request
+from backend.db import get_conn
+from backend.reader import has_rental, reader_user
+
+READING_POSITION_FLUSH_INTERVAL = float(os.getenv("READING_POSITION_FLUSH_INTERVAL", "10"))
+MAX_ANCHOR_LENGTH = 200
+
+# (user_id, book_id) -> (chapter, anchor, updated_at)
+_pending: Dict[Tuple[int, int], Tuple[int, Optional[str], datetime]] = {}
+_pending_lock = threading.Lock()
+
+_wakeup = threading.Event()
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+_UPSERT_SQL = """
+    INSERT INTO reading_positions (user_id, book_id, chapter, anchor, updated_at)
+    VALUES %s
+    ON CONFLICT (user_id, book_id) DO UPDATE SET
+        chapter = EXCLUDED.chapter, anchor = EXCLUDED.anchor, updated_at = EXCLUDED.updated_at
+    WHERE reading_positions.updated_at <= EXCLUDED.updated_at
+"""
+
+
+def record_reading_position(user_id: int, book_id: int, chapter: int, anchor: Optional[str] = None):
+    """Buffer a position update; only the latest one per user and book is written"""
+    with _pending_lock:
+        _pending[(user_id, book_id)] = (chapter, anchor, datetime.now())
+    ensure_flusher()
+
+
+def flush_reading_positions() -> int:
+    """Write all buffered positions in one batch. Returns the number of rows sent."""
+    with _pending_lock:
+        if not _pending:
+            return 0
+        batch = dict(_pending)
+        _pending.clear()
+
+    rows = [(user_id, book_id, chapter, anchor, updated_at)
+            for (user_id, book_id), (chapter, anchor, updated_at) in batch.items()]
+    try:
+        with get_conn() as conn, conn.cursor() as cur:
+            psycopg2.extras.execute_values(cur, _UPSERT_SQL, rows, page_size=500)
+            conn.commit()
+    except psycopg2.Error as e:
+        print(f"Error flushing {len(rows)} reading positions: {e}")
+        # Keep the positions for the next flush unless a newer one arrived meanwhile
+        with _pending_lock:
+            for key, value in batch.items():
+                _pending.setdefault(key, value)
+        return 0
+    return len(rows)
+
+
+def get_reading_position(user_id: int, book_id: int) -> Optional[Dict[str, Any]]:
+    """{'chapter': int, 'anchor': str or None} for where the user stopped, or None"""
+    with _pending_lock:
+        pending = _pending.get((user_id, book_id))
+    if pending is not None:
+        return {'chapter': pending[0], 'anchor': pending[1]}
+
+    try:
+        with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute("""
+                SELECT chapter, anchor FROM reading_positions
+                WHERE user_id = %s AND book_id = %s
+            """, (user_id, book_id))
+            row = cur.fetchone()
+            return dict(row) if row else None
+    except psycopg2.Error as e:
+        print(f"Error getting reading position: {e}")
+        return None
+
+
+def _flusher_loop():
+    while True:
+        _wakeup.wait(READING_POSITION_FLUSH_INTERVAL)
+        _wakeup.clear()
+        try:
+            flush_reading_positions()
+        except Exception as e:
+            print(f"Error in reading position flusher: {e}")
+
+
+def ensure_flusher():
+    """Start this process's flush thread if it isn't running yet (safe after fork)."""
+    global _flusher_pid
+    if _flusher_pid == os.getpid():
+        return
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        threading.Thread(target=_flusher_loop, daemon=True, name="reading-position-flusher").start()
+        atexit.register(flush_reading_positions)
+        _flusher_pid = os.getpid()
+
+
+def init_app(server):
+    """
+    Endpoint the reader posts positions to (fetch while reading, sendBeacon when leaving).
+    It sits under /reader/<book_id>/ so the browser sends the book's reader_access cookie,
+    and the user is the one that cookie was issued to.
+    """
+
+    @server.route('/reader/<int:book_id>/position', methods=['POST'])
+    def _report_reading_position(book_id):
+        data = request.get_json(force=True, silent=True) or {}
+        try:
+            chapter = max(0, int(data.get('chapter') or 0))
+        except (TypeError, ValueError):
+            return jsonify({'ok': False}), 400
+        anchor = data.get('anchor')
+        anchor = str(anchor)[:MAX_ANCHOR_LENGTH] if anchor else None
+
+        user_id = reader_user(book_id)
+        if user_id is None or not has_rental(user_id, book_id):
+            return jsonify({'ok': False}), 403
+        record_reading_position(user_id, book_id, chapter, anchor)
+        if data.get('final'):
+            # The reader is closing: don't leave its last position waiting for the timer
+            _wakeup.set()
+        return jsonify({'ok': True})
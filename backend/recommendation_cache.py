@@ -0,0 +1,226 @@
+# backend/recommendation_cache.py
+"""
+Home page recommendation cache (ai_recommendation_cache, extras/migrations/008_recommendation_cache_refresh.sql).
+
+Page loads only ever read the cache. When the entry is missing, stale or past its expiry,
+the page gets what is cached (or nothing yet) and a 'recommendations' job regenerates it
+in the background (stale-while-revalidate).
+
+Entries still expire at 7 PM Eastern, but nobody waits for that: each entry gets a
+refresh_after somewhere in the RECS_REFRESH_SPREAD before its expiry, and a scheduler
+thread in each process enqueues the due entries of recently active users a few at a
+time. At most RECS_MAX_PENDING of those jobs are queued or running at once, so the
+LLM sees a steady trickle instead of every user at 7 PM.
+
+Shelf and genre changes call mark_recommendations_stale(), which brings the entry's
+refresh forward by RECS_STALE_DELAY (so a burst of changes is regenerated once).
+"""
+import os
+import json
+import time
+import random
+import threading
+from decimal import Decimal
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+import pytz
+import psycopg2
+import psycopg2.extras
+from backend.db import get_conn
+from backend import jobs
+
+RECS_JOB = 'recommendations'
+RECS_REFRESH_HOUR = 19                                        # entries expire at 7 PM Eastern
+RECS_REFRESH_SPREAD = 4 * 3600                                # precompute within this long before expiry
+RECS_STALE_DELAY = 120                                        # debounce after a shelf/genre change
+RECS_ACTIVE_DAYS = 14                                         # only precompute for users seen this recently
+RECS_SCHEDULER = os.getenv("RECS_SCHEDULER", "1") == "1"      # 0 = don't schedule from this process
+RECS_SCHEDULER_INTERVAL = float(os.getenv("RECS_SCHEDULER_INTERVAL", "60"))
+RECS_MAX_PENDING = int(os.getenv("RECS_MAX_PENDING", "10"))   # recommendation jobs queued/running at once
+RECS_CLAIM_LEASE = 3600                                       # a claimed entry is retried after this long
+RECS_TOUCH_INTERVAL = 3600                                    # last_served_at is updated at most hourly
+
+_EASTERN = pytz.timezone('US/Eastern')
+
+_CLAIM_DUE_SQL = """
+    UPDATE ai_recommendation_cache c
+    SET refresh_after = now() + %(lease)s * interval '1 second'
+    WHERE c.user_id IN (
+        SELECT user_id FROM ai_recommendation_cache
+        WHERE COALESCE(refresh_after, created_at) <= now()
+          AND last_served_at > now() - %(active_days)s * interval '1 day'
+        ORDER BY COALESCE(refresh_after, created_at)
+        LIMIT %(limit)s
+        FOR UPDATE SKIP LOCKED
+    )
+    RETURNING c.user_id
+"""
+
+_STORE_SQL = """
+    INSERT INTO ai_recommendation_cache (user_id, rec_data, created_at, expires_at, refresh_after, last_served_at)
+    VALUES (%(user_id)s, %(rec_data)s, now(), %(expires_at)s, %(refresh_after)s, now())
+    ON CONFLICT (user_id) DO UPDATE SET
+        rec_data = EXCLUDED.rec_data, created_at = now(),
+        expires_at = EXCLUDED.expires_at, refresh_after = EXCLUDED.refresh_after,
+        -- A change made while we were generating still needs another pass
+        stale_since = CASE WHEN ai_recommendation_cache.stale_since > %(started_at)s
+                           THEN ai_recommendation_cache.stale_since END
+"""
+
+
+def next_refresh_time(after: Optional[datetime] = None) -> datetime:
+    """The first 7 PM Eastern after `after` (default now)"""
+    after = (after or datetime.now(pytz.utc)).astimezone(_EASTERN)
+    refresh_time = _EASTERN.localize(
+        after.replace(tzinfo=None, hour=RECS_REFRESH_HOUR, minute=0, second=0, microsecond=0))
+    if after >= refresh_time:
+        refresh_time = _EASTERN.localize(refresh_time.replace(tzinfo=None) + timedelta(days=1))
+    return refresh_time
+
+
+def _schedule(generated_at: datetime) -> Tuple[datetime, datetime]:
+    """(expires_at, refresh_after) for an entry generated at `generated_at`"""
+    # Generated inside the precompute window, it already counts for the next day
+    expires_at = next_refresh_time(generated_at + timedelta(seconds=RECS_REFRESH_SPREAD))
+    refresh_after = expires_at - timedelta(seconds=random.uniform(0, RECS_REFRESH_SPREAD))
+    return expires_at, max(refresh_after, generated_at)
+
+
+def _json_default(value):
+    # avg_rating comes back from ROUND(...) as a Decimal
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def get_cached_recommendations(user_id: int) -> Tuple[Optional[List[Dict[str, Any]]], bool]:
+    """
+    (cached recommendations or None, whether they should be regenerated).
+    Also records that the user was active, for the scheduler.
+    """
+    ensure_scheduler()
+    try:
+        with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+            cur.execute("""
+                SELECT rec_data,
+                       stale_since IS NOT NULL OR COALESCE(expires_at, created_at) <= now() AS needs_refresh,
+                       last_served_at IS NULL
+                           OR last_served_at < now() - %s * interval '1 second' AS touch
+                FROM ai_recommendation_cache
+                WHERE user_id = %s
+            """, (RECS_TOUCH_INTERVAL, user_id))
+            row = cur.fetchone()
+            if row is None:
+                return None, True
+            if row['touch']:
+                cur.execute("UPDATE ai_recommendation_cache SET last_served_at = now() WHERE user_id = %s",
+                            (user_id,))
+                conn.commit()
+            return row['rec_data'], row['needs_refresh']
+    except psycopg2.Error as e:
+        print(f"Error getting cached recommendations: {e}")
+        return None, False
+
+
+def store_recommendations(user_id: int, recommendations: List[Dict[str, Any]],
+                          started_at: Optional[datetime] = None) -> bool:
+    """
+    Cache freshly generated recommendations (an empty list is cached too, so the page
+    stops waiting). `started_at` is when generation began; staleness marked after
+    that is kept.
+    """
+    now = datetime.now(pytz.utc)
+    expires_at, refresh_after = _schedule(now)
+    try:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute(_STORE_SQL, {
+                'user_id': user_id, 'rec_data': json.dumps(recommendations, default=_json_default),
+                'expires_at': expires_at, 'refresh_after': refresh_after, 'started_at': started_at or now,
+            })
+            conn.commit()
+        return True
+    except psycopg2.Error as e:
+        print(f"Error caching recommendations: {e}")
+        return False
+
+
+def mark_recommendations_stale(user_id: int):
+    """The user's shelves or genres changed: regenerate their recommendations shortly"""
+    try:
+        with get_conn() as conn, conn.cursor() as cur:
+            cur.execute("""
+                UPDATE ai_recommendation_cache SET
+                    stale_since = COALESCE(stale_since, now()),
+                    refresh_after = LEAST(COALESCE(refresh_after, now()), now() + %s * interval '1 second')
+                WHERE user_id = %s
+            """, (RECS_STALE_DELAY, user_id))
+            conn.commit()
+    except psycopg2.Error as e:
+        print(f"Error marking recommendations stale for user {user_id}: {e}")
+
+
+def request_refresh(user_id: int, priority: int = jobs.PRIORITY_NORMAL) -> Optional[int]:
+    """Queue regenerating one user's recommendations (deduplicated per user)"""
+    ensure_scheduler()
+    return jobs.enqueue(RECS_JOB, f"user:{user_id}", {'user_id': user_id}, priority=priority, max_attempts=3)
+
+
+def _run_refresh(payload: Dict[str, Any], report_progress):
+    from backend.home import generate_recommendations
+
+    user_id = payload['user_id']
+    started_at = datetime.now(pytz.utc)
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("SELECT favorite_genres FROM users WHERE user_id = %s", (user_id,))
+        row = cur.fetchone()
+    recommendations = generate_recommendations(user_id, (row[0] if row else None) or [])
+    store_recommendations(user_id, recommendations, started_at)
+    report_progress(recommendations=len(recommendations))
+
+
+jobs.register_handler(RECS_JOB, _run_refresh)
+
+
+def schedule_due_refreshes() -> int:
+    """Enqueue regeneration for due entries of recently active users. Returns how many were queued."""
+    with get_conn() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT COUNT(*) FROM ingestion_jobs WHERE kind = %s AND status IN ('queued', 'running')
+        """, (RECS_JOB,))
+        room = RECS_MAX_PENDING - cur.fetchone()[0]
+        if room <= 0:
+            return 0
+        cur.execute(_CLAIM_DUE_SQL, {'lease': RECS_CLAIM_LEASE, 'active_days': RECS_ACTIVE_DAYS, 'limit': room})
+        user_ids = [row[0] for row in cur.fetchall()]
+        conn.commit()
+    for user_id in user_ids:
+        jobs.enqueue(RECS_JOB, f"user:{user_id}", {'user_id': user_id}, priority=jobs.PRIORITY_LOW, max_attempts=3)
+    if user_ids:
+        print(f"DEBUG RECOMMENDATION_CACHE_schedule_due_refreshes: queued {len(user_ids)} users")
+    return len(user_ids)
+
+
+_scheduler_pid = None
+_scheduler_lock = threading.Lock()
+
+
+def _scheduler_loop():
+    while True:
+        # Jittered so processes started together don't poll in lockstep
+        time.sleep(RECS_SCHEDULER_INTERVAL * random.uniform(0.5, 1.5))
+        try:
+            schedule_due_refreshes()
+        except Exception as e:
+            print(f"Error in recommendation scheduler: {e}")
+
+
+def ensure_scheduler():
+    """Start this process's scheduler thread if it isn't running yet (safe after fork)."""
+    global _scheduler_pid
+    if not RECS_SCHEDULER or _scheduler_pid == os.getpid():
+        return
+    with _scheduler_lock:
+        if _scheduler_pid == os.getpid():
+            return
+        threading.Thread(target=_scheduler_loop, daemon=True, name="recommendation-scheduler").start()
+        _scheduler_pid = os.getpid()
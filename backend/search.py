@@ -0,0 +1,181 @@
+# backend/search.py
+"""
+Local (database) search for books, authors and users.
+
+Matches are ranked exact > prefix > word prefix > substring > fuzzy, and every
+tier is backed by an index from extras/migrations/001_search_indexes.sql
+(pg_trgm for substring/typo matching, a 'simple' tsvector for word prefixes and
+text_pattern_ops btrees for short prefix queries).
+"""
+import re
+from typing import Dict, List, Any, Iterable, Optional
+import psycopg2.extras
+from backend.db import get_conn
+
+SEARCH_KINDS = ('books', 'authors', 'users')
+
+# Queries shorter than this have no trigrams, so only the prefix and word indexes can help
+MIN_TRIGRAM_QUERY_LENGTH = 3
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase and collapse whitespace so equivalent queries share plans and cache keys"""
+    return " ".join((query or "").lower().split())
+
+
+def _like_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _prefix_tsquery(query: str) -> Optional[str]:
+    """'harry pot' -> 'harry:* & pot:*' (only word characters, so it is always valid tsquery syntax)"""
+    words = _WORD_RE.findall(query)
+    if not words:
+        return None
+    return " & ".join(f"{w}:*" for w in words)
+
+
+# Match tiers in rank order: (name, condition, order of the capped candidates or None).
+# Each tier is a separate, index-backed query capped at CANDIDATES_PER_TIER rows, and
+# later tiers only run if earlier ones didn't fill the limit. Only the capped rows are
+# ranked (_order_by), so a very common word never forces us to sort thousands of rows:
+# the prefix tier reads its candidates in text_pattern_ops index order (a title comes
+# right before its longer continuations) and the other tiers take any CANDIDATES_PER_TIER
+# matches.
+_TIERS = (
+    ('exact', "LOWER({col}) = %(q)s", None),
+    ('prefix', "LOWER({col}) LIKE %(prefix)s", "LOWER({col}) USING ~<~"),
+    ('word', "to_tsvector('simple', COALESCE({col}, '')) @@ to_tsquery('simple', %(tsq)s)", None),
+    ('substring', "LOWER({col}) LIKE %(substring)s", None),
+    # word_similarity lets "harry poter" find "Harry Potter and the ..."
+    ('fuzzy', "%(q)s <%% LOWER({col})", None),
+)
+
+CANDIDATES_PER_TIER = 50
+
+# pg_trgm's default (0.6) misses single-letter typos in short words ("rowlng")
+FUZZY_WORD_SIMILARITY = 0.5
+
+
+def _tier_conditions(column: str, query: str, params: Dict[str, Any]):
+    for name, condition, order in _TIERS:
+        if name == 'word' and not params['tsq']:
+            continue
+        if name in ('substring', 'fuzzy') and len(query) < MIN_TRIGRAM_QUERY_LENGTH:
+            continue
+        yield condition.format(col=column), f"ORDER BY {order.format(col=column)}" if order else ""
+
+
+def _order_by(column: str) -> str:
+    """Within a tier: exact match first, then closest, then shortest"""
+    return f"LOWER({column}) = %(q)s DESC, word_similarity(%(q)s, LOWER({column})) DESC, LENGTH({column}), {column}"
+
+
+def _run_tiers(cur, sql_template: str, column: str, id_key: str, query: str, limit: int) -> List[Dict[str, Any]]:
+    escaped = _like_escape(query)
+    params = {
+        'q': query,
+        'prefix': f"{escaped}%",
+        'substring': f"%{escaped}%",
+        'tsq': _prefix_tsquery(query),
+        'cap': CANDIDATES_PER_TIER,
+    }
+
+    rows = []
+    seen = []
+    for condition, order in _tier_conditions(column, query, params):
+        params['limit'] = limit - len(rows)
+        params['seen'] = seen
+        cur.execute(sql_template.format(where=condition, order=order), params)
+        for row in cur.fetchall():
+            rows.append(dict(row))
+            seen.append(row[id_key])
+        if len(rows) >= limit:
+            break
+    return rows
+
+
+_BOOKS_SQL = """
+    SELECT c.book_id, c.title, c.isbn, c.genre, c.release_date,
+           c.description, c.cover_url, c.author_id,
+           a.name as author_name
+    FROM (
+        SELECT b.* FROM books b
+        WHERE ({where}) AND NOT (b.book_id = ANY(%(seen)s::int[]))
+        {order}
+        LIMIT %(cap)s
+    ) c
+    LEFT JOIN authors a ON c.author_id = a.author_id
+    ORDER BY """ + _order_by("c.title") + """
+    LIMIT %(limit)s
+"""
+
+_AUTHORS_SQL = """
+    SELECT c.author_id, c.name, c.bio, c.birth_date, c.death_date, c.nationality,
+           c.author_image_url, c.created_at,
+           (SELECT COUNT(*) FROM books b WHERE b.author_id = c.author_id) as work_count
+    FROM (
+        SELECT a.* FROM authors a
+        WHERE ({where}) AND NOT (a.author_id = ANY(%(seen)s::int[]))
+        {order}
+        LIMIT %(cap)s
+    ) c
+    ORDER BY """ + _order_by("c.name") + """
+    LIMIT %(limit)s
+"""
+
+_USERS_SQL = """
+    SELECT c.user_id, c.username, c.profile_image_url
+    FROM (
+        SELECT u.user_id, u.username, u.profile_image_url FROM users u
+        WHERE ({where}) AND NOT (u.user_id = ANY(%(seen)s::int[]))
+        {order}
+        LIMIT %(cap)s
+    ) c
+    ORDER BY """ + _order_by("c.username") + """
+    LIMIT %(limit)s
+"""
+
+
+def _search_books(cur, query: str, limit: int) -> List[Dict[str, Any]]:
+    return _run_tiers(cur, _BOOKS_SQL, "b.title", 'book_id', query, limit)
+
+
+def _search_authors(cur, query: str, limit: int) -> List[Dict[str, Any]]:
+    # work_count is only computed for the authors we return
+    return _run_tiers(cur, _AUTHORS_SQL, "a.name", 'author_id', query, limit)
+
+
+def _search_users(cur, query: str, limit: int) -> List[Dict[str, Any]]:
+    return _run_tiers(cur, _USERS_SQL, "u.username", 'user_id', query, limit)
+
+
+_SEARCHERS = {
+    'books': _search_books,
+    'authors': _search_authors,
+    'users': _search_users,
+}
+
+
+def search_local(query: str, kinds: Iterable[str] = SEARCH_KINDS, limit: int = 5) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    Search the local database for each requested kind ('books', 'authors', 'users').
+    Returns {kind: [rows...]} with at most `limit` ranked rows per kind, all on one connection.
+    """
+    kinds = [k for k in kinds if k in _SEARCHERS]
+    results = {kind: [] for kind in kinds}
+
+    normalized = normalize_query(query)
+    if not normalized or not kinds:
+        return results
+
+    with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+        if len(normalized) >= MIN_TRIGRAM_QUERY_LENGTH:
+            # SET LOCAL only lasts for this transaction, which get_conn rolls back on exit
+            cur.execute("SET LOCAL pg_trgm.word_similarity_threshold = %s", (FUZZY_WORD_SIMILARITY,))
+        for kind in kinds:
+            results[kind] = _SEARCHERS[kind](cur, normalized, limit)
+
+    return results
@@ -1,21 +1,13 @@
 import os
-import hashlib
-import psycopg2
-import base64
 import uuid
 from dotenv import load_dotenv
 from psycopg2 import Error
 from supabase import create_client, Client
+from backend.db import get_conn
 
 # load environment variables from .env file
 load_dotenv()
 
-USER = os.getenv("user")
-PASSWORD = os.getenv("password")
-HOST = os.getenv("host")
-PORT = os.getenv("port")
-DBNAME = os.getenv("dbname")
-
 # Supabase configuration
 SUPABASE_URL = os.getenv("SUPABASE_URL")
 # This should be your service_role key for server operations
@@ -26,82 +18,51 @@ supabase: Client = create_client(
     SUPABASE_URL, SUPABASE_KEY) if SUPABASE_URL and SUPABASE_KEY else None
 
 
-# create the database connection and return it
-def get_db_connection():
-    try:
-        connection = psycopg2.connect(
-            user=USER,
-            password=PASSWORD,
-            host=HOST,
-            port=PORT,
-            dbname=DBNAME
-        )
-        return connection
-    except Error as e:
-        print(f"Error connecting to database: {e}")
-        return None
-
-
 def delete_user_account(user_id):
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed"
-
-    cursor = connection.cursor()
-
     try:
-        # Check if user exists and get their profile image URL
-        cursor.execute(
-            "SELECT user_id, profile_image_url FROM users WHERE user_id = %s", (user_id,))
-        user_record = cursor.fetchone()
+        with get_conn() as connection, connection.cursor() as cursor:
+            # Check if user exists and get their profile image URL
+            cursor.execute(
+                "SELECT user_id, profile_image_url FROM users WHERE user_id = %s", (user_id,))
+            user_record = cursor.fetchone()
 
-        if not user_record:
-            cursor.close()
-            connection.close()
-            return False, "User not found"
+            if not user_record:
+                return False, "User not found"
 
-        profile_image_url = user_record[1]  # Get the profile_image_url
+            profile_image_url = user_record[1]  # Get the profile_image_url
 
-        # Delete profile image from Supabase storage if it exists
-        if profile_image_url and supabase and "profile_image" in profile_image_url:
-            try:
-                # Extract filename from URL
-                filename = profile_image_url.split('/')[-1]
-                # Remove query parameters if any
-                if '?' in filename:
-                    filename = filename.split('?')[0]
+            # Delete the user account from database
+            delete_query = "DELETE FROM users WHERE user_id = %s"
+            cursor.execute(delete_query, (user_id,))
 
-                # Delete from Supabase storage
-                delete_response = supabase.storage.from_(
-                    "profile_image").remove([filename])
-                print(f"Profile image deleted from storage: {filename}")
-            except Exception as storage_error:
-                # Don't fail the account deletion if image deletion fails
-                print(
-                    f"Warning: Could not delete profile image from storage: {storage_error}")
+            # Check if deletion was successful
+            if cursor.rowcount == 0:
+                connection.rollback()
+                return False, "Failed to delete user account"
 
-        # Delete the user account from database
-        delete_query = "DELETE FROM users WHERE user_id = %s"
-        cursor.execute(delete_query, (user_id,))
+            connection.commit()
 
-        # Check if deletion was successful
-        if cursor.rowcount == 0:
-            connection.rollback()
-            cursor.close()
-            connection.close()
-            return False, "Failed to delete user account"
+    except Error as e:
+        return False, f"Error deleting user account: {e}"
 
-        connection.commit()
-        cursor.close()
-        connection.close()
+    # Delete profile image from Supabase storage if it exists (after releasing the connection)
+    if profile_image_url and supabase and "profile_image" in profile_image_url:
+        try:
+            # Extract filename from URL
+            filename = profile_image_url.split('/')[-1]
+            # Remove query parameters if any
+            if '?' in filename:
+                filename = filename.split('?')[0]
 
-        return True, "User account and profile image deleted successfully"
+            # Delete from Supabase storage
+            supabase.storage.from_("profile_image").remove([filename])
+            print(f"Profile image deleted from storage: {filename}")
+        except Exception as storage_error:
+            # Don't fail the account deletion if image deletion fails
+            print(
+                f"Warning: Could not delete profile image from storage: {storage_error}")
 
-    except Error as e:
-        connection.rollback()
-        cursor.close()
-        connection.close()
-        return False, f"Error deleting user account: {e}"
+    return True, "User account and profile image deleted successfully"
 
 
 def upload_profile_image(user_id, image_content, filename):
@@ -129,25 +90,18 @@ def upload_profile_image(user_id, image_content, filename):
             "profile_image").get_public_url(unique_filename)
 
         # Update the user's profile_image_url in the database
-        connection = get_db_connection()
-        if not connection:
-            return False, "Database connection failed", None
-
-        cursor = connection.cursor()
+        with get_conn() as connection, connection.cursor() as cursor:
+            # Delete old profile image if exists
+            cursor.execute(
+                "SELECT profile_image_url FROM users WHERE user_id = %s", (user_id,))
+            result = cursor.fetchone()
+            old_image_url = result[0] if result else None
 
-        # Delete old profile image if exists
-        cursor.execute(
-            "SELECT profile_image_url FROM users WHERE user_id = %s", (user_id,))
-        result = cursor.fetchone()
-        old_image_url = result[0] if result else None
+            # Update profile_image_url
+            update_query = "UPDATE users SET profile_image_url = %s WHERE user_id = %s"
+            cursor.execute(update_query, (image_url, user_id))
 
-        # Update profile_image_url
-        update_query = "UPDATE users SET profile_image_url = %s WHERE user_id = %s"
-        cursor.execute(update_query, (image_url, user_id))
-
-        connection.commit()
-        cursor.close()
-        connection.close()
+            connection.commit()
 
         # Delete old image from storage if it exists
         if old_image_url and "profile_image" in old_image_url:
@@ -165,19 +119,11 @@ def upload_profile_image(user_id, image_content, filename):
 
 
 def get_user_profile_image_url(user_id):
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed", None
-
-    cursor = connection.cursor()
-
     try:
-        cursor.execute(
-            "SELECT profile_image_url FROM users WHERE user_id = %s", (user_id,))
-        result = cursor.fetchone()
-
-        cursor.close()
-        connection.close()
+        with get_conn() as connection, connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT profile_image_url FROM users WHERE user_id = %s", (user_id,))
+            result = cursor.fetchone()
 
         if result:
             profile_url = result[0]
@@ -191,8 +137,6 @@ def get_user_profile_image_url(user_id):
             return False, "User not found", None
 
     except Error as e:
-        cursor.close()
-        connection.close()
         return False, f"Error retrieving profile image: {e}", None
 
 
@@ -200,32 +144,22 @@ def delete_profile_image(user_id):
     if not supabase:
         return False, "Supabase client not configured"
 
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed"
-
-    cursor = connection.cursor()
-
     try:
-        # Get current profile image URL
-        cursor.execute(
-            "SELECT profile_image_url FROM users WHERE user_id = %s", (user_id,))
-        result = cursor.fetchone()
-
-        if not result or not result[0]:
-            cursor.close()
-            connection.close()
-            return True, "No profile image to delete"
+        with get_conn() as connection, connection.cursor() as cursor:
+            # Get current profile image URL
+            cursor.execute(
+                "SELECT profile_image_url FROM users WHERE user_id = %s", (user_id,))
+            result = cursor.fetchone()
 
-        image_url = result[0]
+            if not result or not result[0]:
+                return True, "No profile image to delete"
 
-        # Remove profile_image_url from database
-        cursor.execute(
-            "UPDATE users SET profile_image_url = NULL WHERE user_id = %s", (user_id,))
-        connection.commit()
+            image_url = result[0]
 
-        cursor.close()
-        connection.close()
+            # Remove profile_image_url from database
+            cursor.execute(
+                "UPDATE users SET profile_image_url = NULL WHERE user_id = %s", (user_id,))
+            connection.commit()
 
         # Delete from Supabase storage
         if "profile_image" in image_url:
@@ -241,29 +175,19 @@ def delete_profile_image(user_id):
         return True, "Profile image deleted successfully"
 
     except Error as e:
-        cursor.close()
-        connection.close()
         return False, f"Error deleting profile image: {e}"
 
 
 def get_updated_user_data(user_id):
     """Get all current user data for session updates"""
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed", None
-
-    cursor = connection.cursor()
-
     try:
-        cursor.execute("""
-            SELECT user_id, username, email, profile_image_url, created_at
-            FROM users 
-            WHERE user_id = %s
-        """, (user_id,))
-        user_record = cursor.fetchone()
-
-        cursor.close()
-        connection.close()
+        with get_conn() as connection, connection.cursor() as cursor:
+            cursor.execute("""
+                SELECT user_id, username, email, profile_image_url, created_at
+                FROM users 
+                WHERE user_id = %s
+            """, (user_id,))
+            user_record = cursor.fetchone()
 
         if user_record:
             user_data = {
@@ -278,48 +202,32 @@ def get_updated_user_data(user_id):
             return False, "User not found", None
 
     except Error as e:
-        cursor.close()
-        connection.close()
         return False, f"Error retrieving user data: {e}", None
 
 
 def update_username(user_id, new_username):
     """Update user's username"""
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed"
+    try:
+        with get_conn() as connection, connection.cursor() as cursor:
+            # Check if new username already exists
+            cursor.execute("SELECT user_id FROM users WHERE username = %s AND user_id != %s",
+                           (new_username, user_id))
+            if cursor.fetchone():
+                return False, "Username already exists"
 
-    cursor = connection.cursor()
+            # Update username
+            cursor.execute("UPDATE users SET username = %s WHERE user_id = %s",
+                           (new_username, user_id))
 
-    try:
-        # Check if new username already exists
-        cursor.execute("SELECT user_id FROM users WHERE username = %s AND user_id != %s",
-                       (new_username, user_id))
-        if cursor.fetchone():
-            cursor.close()
-            connection.close()
-            return False, "Username already exists"
-
-        # Update username
-        cursor.execute("UPDATE users SET username = %s WHERE user_id = %s",
-                       (new_username, user_id))
-
-        if cursor.rowcount == 0:
-            connection.rollback()
-            cursor.close()
-            connection.close()
-            return False, "User not found"
-
-        connection.commit()
-        cursor.close()
-        connection.close()
+            if cursor.rowcount == 0:
+                connection.rollback()
+                return False, "User not found"
+
+            connection.commit()
 
         return True, "Username updated successfully"
 
     except Error as e:
-        connection.rollback()
-        cursor.close()
-        connection.close()
         return False, f"Error updating username: {e}"
 
 
@@ -328,78 +236,52 @@ def update_password(user_id, current_password, new_password):
     # Import here to avoid circular imports
     from backend.login import hash_password
 
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed"
-
-    cursor = connection.cursor()
-
     try:
-        # Verify current password
-        hashed_current = hash_password(current_password)
-        cursor.execute("SELECT user_id FROM users WHERE user_id = %s AND password = %s",
-                       (user_id, hashed_current))
+        with get_conn() as connection, connection.cursor() as cursor:
+            # Verify current password
+            hashed_current = hash_password(current_password)
+            cursor.execute("SELECT user_id FROM users WHERE user_id = %s AND password = %s",
+                           (user_id, hashed_current))
 
-        if not cursor.fetchone():
-            cursor.close()
-            connection.close()
-            return False, "Current password is incorrect"
+            if not cursor.fetchone():
+                return False, "Current password is incorrect"
 
-        # Update password
-        hashed_new = hash_password(new_password)
-        cursor.execute("UPDATE users SET password = %s WHERE user_id = %s",
-                       (hashed_new, user_id))
+            # Update password
+            hashed_new = hash_password(new_password)
+            cursor.execute("UPDATE users SET password = %s WHERE user_id = %s",
+                           (hashed_new, user_id))
 
-        connection.commit()
-        cursor.close()
-        connection.close()
+            connection.commit()
 
         return True, "Password updated successfully"
 
     except Error as e:
-        connection.rollback()
-        cursor.close()
-        connection.close()
         return False, f"Error updating password: {e}"
 
 
 def update_email(user_id, new_email):
     """Update user's email"""
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed"
+    try:
+        with get_conn() as connection, connection.cursor() as cursor:
+            # Check if new email already exists
+            cursor.execute("SELECT user_id FROM users WHERE email = %s AND user_id != %s",
+                           (new_email, user_id))
+            if cursor.fetchone():
+                return False, "Email already exists"
 
-    cursor = connection.cursor()
+            # Update email
+            cursor.execute("UPDATE users SET email = %s WHERE user_id = %s",
+                           (new_email, user_id))
 
-    try:
-        # Check if new email already exists
-        cursor.execute("SELECT user_id FROM users WHERE email = %s AND user_id != %s",
-                       (new_email, user_id))
-        if cursor.fetchone():
-            cursor.close()
-            connection.close()
-            return False, "Email already exists"
-
-        # Update email
-        cursor.execute("UPDATE users SET email = %s WHERE user_id = %s",
-                       (new_email, user_id))
-
-        if cursor.rowcount == 0:
-            connection.rollback()
-            cursor.close()
-            connection.close()
-            return False, "User not found"
-
-        connection.commit()
-        cursor.close()
-        connection.close()
+            if cursor.rowcount == 0:
+                connection.rollback()
+                return False, "User not found"
+
+            connection.commit()
 
         return True, "Email updated successfully"
 
     except Error as e:
-        connection.rollback()
-        cursor.close()
-        connection.close()
         return False, f"Error updating email: {e}"
 
 
@@ -410,31 +292,19 @@ def update_display_mode(user_id, display_mode):
     if display_mode not in ['light', 'dark']:
         return False, "Invalid display mode. Must be 'light' or 'dark'"
 
-    connection = get_db_connection()
-    if not connection:
-        return False, "Database connection failed"
-
-    cursor = connection.cursor()
-
     try:
-        # Update display mode
-        cursor.execute("UPDATE users SET display_mode = %s WHERE user_id = %s",
-                       (display_mode, user_id))
+        with get_conn() as connection, connection.cursor() as cursor:
+            # Update display mode
+            cursor.execute("UPDATE users SET display_mode = %s WHERE user_id = %s",
+                           (display_mode, user_id))
 
-        if cursor.rowcount == 0:
-            connection.rollback()
-            cursor.close()
-            connection.close()
-            return False, "User not found"
+            if cursor.rowcount == 0:
+                connection.rollback()
+                return False, "User not found"
 
-        connection.commit()
-        cursor.close()
-        connection.close()
+            connection.commit()
 
         return True, "Display mode updated successfully"
 
     except Error as e:
-        connection.rollback()
-        cursor.close()
-        connection.close()
         return False, f"Error updating display mode: {e}"
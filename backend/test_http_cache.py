@@ -0,0 +1,203 @@
+# backend/test_http_cache.py
+"""
+Tests for backend/http_cache.py against a local stub server.
+
+    python -m pytest backend/test_http_cache.py
+"""
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from backend.http_cache import HTTPCache, CachingSession, NEGATIVE_TTL
+
+
+class StubServer:
+    """Serves Open Library-shaped URLs and records every request it receives"""
+
+    def __init__(self):
+        self.requests = []
+        self.etag = '"v1"'
+        self.last_modified = None
+        self.body = b'{"title": "Dune"}'
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append((self.path, dict(self.headers)))
+                if self.path.startswith('/authors/OL404A'):
+                    self._reply(404, b'{"error": "notfound"}')
+                elif stub.etag and self.headers.get('If-None-Match') == stub.etag:
+                    self._reply(304, b'')
+                elif stub.last_modified and self.headers.get('If-Modified-Since') == stub.last_modified:
+                    self._reply(304, b'')
+                else:
+                    self._reply(200, stub.body)
+
+            def _reply(self, status, body):
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                if status != 404:
+                    if stub.etag:
+                        self.send_header('ETag', stub.etag)
+                    if stub.last_modified:
+                        self.send_header('Last-Modified', stub.last_modified)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def paths(self):
+        return [path for path, _ in self.requests]
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    server.thread.start()
+    yield server
+    server.server.shutdown()
+    server.server.server_close()
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return HTTPCache(str(tmp_path / 'http_cache.sqlite'))
+
+
+@pytest.fixture
+def session(cache):
+    return CachingSession(cache)
+
+
+def expire(cache, url):
+    with cache._db() as db:
+        db.execute("UPDATE responses SET expires_at = 0 WHERE url = ?", (url,))
+
+
+def test_fresh_entry_is_served_from_cache(stub, cache, session):
+    first = session.get(f"{stub.url}/works/OL1W.json")
+    second = session.get(f"{stub.url}/works/OL1W.json")
+
+    assert first.status_code == second.status_code == 200
+    assert second.json() == {"title": "Dune"}
+    assert stub.paths() == ['/works/OL1W.json']
+    stats = cache.stats()
+    assert (stats['misses'], stats['hits'], stats['stores']) == (1, 1, 1)
+    assert stats['hit_rate'] == 0.5
+
+
+def test_query_parameters_are_part_of_the_key(stub, cache, session):
+    session.get(f"{stub.url}/search.json", params={'q': 'dune'})
+    session.get(f"{stub.url}/search.json", params={'q': 'dune'})
+    session.get(f"{stub.url}/search.json", params={'q': 'emma'})
+
+    assert stub.paths() == ['/search.json?q=dune', '/search.json?q=emma']
+    assert cache.stats()['hits'] == 1
+
+
+def test_stale_entry_is_revalidated_with_etag(stub, cache, session):
+    url = f"{stub.url}/works/OL1W.json"
+    session.get(url)
+    expire(cache, url)
+
+    response = session.get(url)
+
+    assert response.status_code == 200
+    assert response.json() == {"title": "Dune"}
+    assert stub.requests[-1][1].get('If-None-Match') == '"v1"'
+    assert cache.stats()['revalidated'] == 1
+    # The 304 made the entry fresh again
+    session.get(url)
+    assert len(stub.requests) == 2
+    assert cache.stats()['hits'] == 1
+
+
+def test_stale_entry_is_revalidated_with_last_modified(stub, cache, session):
+    stub.etag = None
+    stub.last_modified = 'Wed, 01 Jan 2025 00:00:00 GMT'
+    url = f"{stub.url}/authors/OL1A.json"
+    session.get(url)
+    expire(cache, url)
+
+    response = session.get(url)
+
+    assert response.status_code == 200
+    assert stub.requests[-1][1].get('If-Modified-Since') == stub.last_modified
+    assert 'If-None-Match' not in stub.requests[-1][1]
+    assert cache.stats()['revalidated'] == 1
+
+
+def test_changed_document_replaces_the_entry(stub, cache, session):
+    url = f"{stub.url}/works/OL1W.json"
+    session.get(url)
+    expire(cache, url)
+    stub.etag = '"v2"'
+    stub.body = b'{"title": "Dune Messiah"}'
+
+    assert session.get(url).json() == {"title": "Dune Messiah"}
+    assert session.get(url).json() == {"title": "Dune Messiah"}
+    assert len(stub.requests) == 2
+    assert cache.lookup(url)['etag'] == '"v2"'
+    stats = cache.stats()
+    assert (stats['misses'], stats['revalidated'], stats['stores'], stats['hits']) == (2, 0, 2, 1)
+
+
+def test_404_is_cached(stub, cache, session):
+    url = f"{stub.url}/authors/OL404A.json"
+    first = session.get(url)
+    second = session.get(url)
+
+    assert first.status_code == second.status_code == 404
+    assert len(stub.requests) == 1
+    stats = cache.stats()
+    assert (stats['misses'], stats['negative_hits'], stats['hits']) == (1, 1, 0)
+    entry = cache.lookup(url)
+    assert entry['status'] == 404
+    assert entry['expires_at'] == pytest.approx(time.time() + NEGATIVE_TTL, abs=5)
+
+
+def test_expired_404_is_fetched_again_without_conditions(stub, cache, session):
+    url = f"{stub.url}/authors/OL404A.json"
+    session.get(url)
+    expire(cache, url)
+
+    assert session.get(url).status_code == 404
+    assert len(stub.requests) == 2
+    assert 'If-None-Match' not in stub.requests[-1][1]
+
+
+def test_unlisted_urls_are_not_cached(stub, cache, session):
+    session.get(f"{stub.url}/books/OL1M.json")
+    session.get(f"{stub.url}/books/OL1M.json")
+
+    assert len(stub.requests) == 2
+    assert cache.lookup(f"{stub.url}/books/OL1M.json") is None
+    assert cache.stats()['stores'] == 0
+
+
+def test_entries_survive_a_new_session(stub, cache):
+    url = f"{stub.url}/works/OL1W.json"
+    CachingSession(cache).get(url)
+
+    reopened = HTTPCache(cache.path)
+    response = CachingSession(reopened).get(url)
+
+    assert response.json() == {"title": "Dune"}
+    assert len(stub.requests) == 1
+    assert reopened.stats()['hits'] == 1
+
+
+def test_prune_drops_long_expired_entries(stub, cache, session):
+    url = f"{stub.url}/works/OL1W.json"
+    session.get(url)
+    expire(cache, url)
+
+    cache.prune()
+
+    assert cache.lookup(url) is None
@@ -7,11 +7,10 @@ populated and updates them with the correct keys for future duplicate prevention
 """
 
 import psycopg2.extras
-from backend.openlibrary import OpenLibraryAPI
+from backend.openlibrary import OpenLibraryAPI, normalize_title
 from backend.db import get_conn
 import sys
 import os
-import re
 import time
 from typing import List, Dict, Any, Optional
 
@@ -19,11 +18,6 @@ from typing import List, Dict, Any, Optional
 sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 
 
-def normalize_title(title: str) -> str:
-    """Normalize title for comparison (remove punctuation, lowercase)"""
-    return re.sub(r'[^a-zA-Z0-9]', '', title.lower())
-
-
 def find_best_match(book_title: str, author_name: str, search_results: List[Dict[str, Any]]) -> Optional[str]:
     """
     Find the best matching work from search results.
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark the item-item similarity build in backend/collaborative.py.
+
+Generates synthetic (user, book) interactions with skewed book popularity and
+heavy-tailed user activity in memory (no database needed), then times a full
+neighbour computation and an incremental one for a batch of changed books, with
+the block budget from --chunk-nnz. Prints wall time, the largest block and the
+peak resident memory of the process.
+
+Usage (from the project root):
+    python3 extras/bench_book_neighbors.py --users 100000 --books 200000 --interactions 3000000
+"""
+
+import os
+import sys
+import time
+import resource
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.collaborative import InteractionMatrix  # noqa: E402
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_interactions(rng, users, books, count):
+    # Zipf-like popularity: a few books and a few very active users dominate
+    user_ids = 1 + np.minimum((rng.pareto(1.2, count) * users / 20).astype(np.int64), users - 1)
+    book_ids = 1 + np.minimum((rng.pareto(0.9, count) * books / 50).astype(np.int64), books - 1)
+    pairs = np.unique(np.stack([user_ids, book_ids], axis=1), axis=0)
+    weights = rng.choice(np.array([0.2, 0.3, 0.6, 0.8, 1.0], dtype=np.float32), len(pairs))
+    return pairs[:, 0], pairs[:, 1], weights
+
+
+def compute(matrix, positions, budget):
+    largest, blocks, edges = 0, 0, 0
+    for block in matrix.chunks(positions, budget):
+        largest = max(largest, int(matrix.cost[block].sum()))
+        sources, neighbors, scores = matrix.top_neighbors(block)
+        blocks += 1
+        edges += len(sources)
+    return blocks, largest, edges
+
+
+def run_benchmark(args):
+    rng = np.random.default_rng(7)
+    started = time.perf_counter()
+    user_ids, book_ids, weights = make_interactions(rng, args.users, args.books, args.interactions)
+    print(f"Generated {len(user_ids)} unique interactions in {time.perf_counter() - started:.1f}s "
+          f"(peak RSS {peak_rss_mb():.0f} MB)")
+
+    started = time.perf_counter()
+    matrix = InteractionMatrix(user_ids, book_ids, weights)
+    print(f"Matrix: {matrix.by_user.shape[0]} users x {len(matrix)} books with 2+ readers, "
+          f"built in {time.perf_counter() - started:.2f}s (peak RSS {peak_rss_mb():.0f} MB)")
+
+    started = time.perf_counter()
+    blocks, largest, edges = compute(matrix, np.arange(len(matrix)), args.chunk_nnz)
+    print(f"\nFull build: {time.perf_counter() - started:.1f}s, {blocks} blocks, largest block "
+          f"{largest} entries, {edges} neighbour rows (peak RSS {peak_rss_mb():.0f} MB)")
+
+    changed = np.sort(rng.choice(len(matrix), min(args.changed, len(matrix)), replace=False))
+    started = time.perf_counter()
+    blocks, _, edges = compute(matrix, changed, args.chunk_nnz)
+    print(f"Incremental build for {len(changed)} changed books: {time.perf_counter() - started:.2f}s "
+          f"({edges} neighbour rows)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--books', type=int, default=200_000)
+    parser.add_argument('--interactions', type=int, default=3_000_000, help='generated before deduplication')
+    parser.add_argument('--changed', type=int, default=1000, help='books recomputed incrementally')
+    parser.add_argument('--chunk-nnz', type=int, default=2_000_000, help='similarity entries per block')
+    run_benchmark(parser.parse_args())
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Benchmark book ingestion throughput: the old one-book-at-a-time path
+(save_enhanced_book_to_db per work) against backend.openlibrary.bulk_upsert_books.
+
+Seeds a throwaway schema (default: bench_bulk_insert) with one author that already
+has some books, then saves the same synthetic Open Library works with each path
+(a share of them duplicate existing titles so the merge path is exercised).
+Prints books/sec for each.
+
+Usage (from the project root, with backend/.env pointing at a scratch database):
+    python3 extras/bench_bulk_insert.py --books 2000 --batch 50
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.db import get_conn, request_scope  # noqa: E402
+from backend.openlibrary import save_enhanced_book_to_db, bulk_upsert_books  # noqa: E402
+
+WORDS = [
+    'shadow', 'river', 'king', 'night', 'garden', 'winter', 'stone', 'fire', 'silent', 'empire',
+    'secret', 'lost', 'golden', 'city', 'dragon', 'house', 'ocean', 'storm', 'crown', 'forest',
+]
+
+
+def setup_schema(cur, schema, existing):
+    cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+    cur.execute(f"CREATE SCHEMA {schema}")
+    cur.execute("SHOW search_path")
+    current_path = cur.fetchone()[0]
+    cur.execute(f"SET search_path TO {schema}, {current_path}")
+    cur.execute("""
+        CREATE TABLE authors (author_id serial PRIMARY KEY, name varchar NOT NULL)
+    """)
+    cur.execute("""
+        CREATE TABLE books (
+            book_id serial PRIMARY KEY, title varchar NOT NULL, isbn varchar UNIQUE, genre varchar,
+            release_date date, description text, cover_url varchar, author_id integer REFERENCES authors,
+            average_rating numeric, rating_count integer DEFAULT 0, language varchar DEFAULT 'en',
+            page_count integer, openlibrary_key varchar,
+            normalized_title varchar
+                GENERATED ALWAYS AS (REGEXP_REPLACE(LOWER(title), '[^a-zA-Z0-9]', '', 'g')) STORED
+        )
+    """)
+    cur.execute("CREATE INDEX ON books (author_id, normalized_title)")
+    cur.execute("CREATE INDEX ON books (normalized_title)")
+    cur.execute("INSERT INTO authors (name) VALUES ('Bench Author'), ('Other Author')")
+    # Existing catalogue: some books for our author, plenty for another author
+    cur.execute("""
+        INSERT INTO books (title, author_id)
+        SELECT 'Existing Book ' || g, CASE WHEN g <= %s THEN 1 ELSE 2 END
+        FROM generate_series(1, %s) g
+    """, (existing, existing * 20))
+
+
+def make_works(count, existing, seed):
+    rng = random.Random(seed)
+    works = []
+    for i in range(count):
+        if i % 10 == 0 and existing:
+            # Same title as a book we already have, different punctuation/case
+            title = f"existing book: {rng.randint(1, existing)}"
+        else:
+            title = f"The {rng.choice(WORDS).title()} of {rng.choice(WORDS).title()} {seed}-{i}"
+        works.append({
+            'key': f"/works/OL{seed}{i}W",
+            'title': title,
+            'subjects': [rng.choice(WORDS).title(), 'Accessible book', rng.choice(WORDS).title()],
+            'description': f"A story about {rng.choice(WORDS)} and {rng.choice(WORDS)}.",
+            'publish_date': str(rng.randint(1850, 2024)),
+            'isbn_13': [f"978{seed:02d}{i:08d}"],
+            'cover_id': rng.randint(1, 10_000_000),
+            'language': 'en',
+            'page_count': rng.randint(80, 900),
+        })
+    return works
+
+
+def time_path(label, works, save):
+    started = time.perf_counter()
+    saved = save(works)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:28s} {len(works):6d} works in {elapsed:7.2f}s  "
+          f"{len(works) / elapsed:9.1f} books/sec  ({saved} saved)")
+
+
+def run_benchmark(args):
+    with request_scope():
+        with get_conn() as conn, conn.cursor() as cur:
+            setup_schema(cur, args.schema, args.existing)
+            conn.commit()
+
+            def per_book(works):
+                return sum(1 for work in works if save_enhanced_book_to_db(work, 1))
+
+            def batched(works):
+                saved = 0
+                for i in range(0, len(works), args.batch):
+                    saved += bulk_upsert_books(works[i:i + args.batch], 1)[0]
+                return saved
+
+            print(f"Saving {args.books} works per path ({args.existing} existing books for the author)")
+            time_path("Before (one book at a time)", make_works(args.books, args.existing, 1), per_book)
+            time_path(f"After (batches of {args.batch})", make_works(args.books, args.existing, 2), batched)
+
+            if not args.keep:
+                cur.execute(f"DROP SCHEMA {args.schema} CASCADE")
+                conn.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=2000)
+    parser.add_argument('--existing', type=int, default=500, help="books the author already has")
+    parser.add_argument('--batch', type=int, default=50)
+    parser.add_argument('--schema', default='bench_bulk_insert')
+    parser.add_argument('--keep', action='store_true', help='keep the seeded schema afterwards')
+    run_benchmark(parser.parse_args())
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark the content-based recommender (backend/content_recommender.py).
+
+Builds the TF-IDF index for synthetic books in memory (no database needed), saves and
+reloads it, then times recommendations for users with a handful of seed books, many
+seed books and genres only. Also times an incremental add of newly ingested books.
+Prints p50/p99 latency in milliseconds.
+
+Usage (from the project root):
+    python3 extras/bench_content_recommender.py --books 100000 --runs 200
+"""
+
+import os
+import sys
+import time
+import random
+import shutil
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.content_recommender import ContentIndex, book_terms  # noqa: E402
+
+WORDS = [
+    'shadow', 'river', 'king', 'night', 'garden', 'winter', 'stone', 'fire', 'silent', 'empire',
+    'secret', 'lost', 'golden', 'city', 'dragon', 'house', 'ocean', 'storm', 'crown', 'forest',
+    'memory', 'glass', 'iron', 'wolf', 'star', 'daughter', 'war', 'light', 'dark', 'journey',
+    'island', 'moon', 'blood', 'song', 'tower', 'letter', 'harvest', 'witch', 'machine', 'heart',
+]
+GENRES = ['Fantasy', 'Science Fiction', 'Romance', 'Mystery', 'Thriller', 'History', 'Horror',
+          'Poetry', 'Biography', 'Adventure', 'Young Adult', 'Philosophy', 'Drama', 'Humor']
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def make_books(rng, start_id, count):
+    ids, terms = [], []
+    for book_id in range(start_id, start_id + count):
+        title = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(2, 5)))
+        genre = ', '.join(rng.sample(GENRES, rng.randint(1, 3)))
+        # Vocabulary well beyond WORDS so the matrix has realistic width
+        description = ' '.join(rng.choice(WORDS) if rng.random() < 0.5 else f"w{rng.randint(1, 50000)}"
+                               for _ in range(rng.randint(20, 120)))
+        ids.append(book_id)
+        terms.append(book_terms(title, genre, description))
+    return ids, terms
+
+
+def time_recommend(label, index, rng, runs, books, seeds):
+    samples = []
+    for _ in range(runs):
+        seed_ids = [rng.randint(1, books) for _ in range(seeds)]
+        genres = rng.sample(GENRES, 2)
+        started = time.perf_counter()
+        index.recommend(seed_ids, genres, exclude_ids=seed_ids, k=30)
+        samples.append((time.perf_counter() - started) * 1000)
+    print(f"  {label:28s} p50 {percentile(samples, 50):8.2f} ms   p99 {percentile(samples, 99):8.2f} ms")
+
+
+def run_benchmark(args):
+    rng = random.Random(7)
+    directory = tempfile.mkdtemp(prefix='bench_recommender_')
+    try:
+        started = time.perf_counter()
+        ids, terms = make_books(rng, 1, args.books)
+        print(f"Generated {args.books} synthetic books in {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        index = ContentIndex()
+        index.add(ids, terms)
+        print(f"Built index in {time.perf_counter() - started:.2f}s "
+              f"({index.matrix.nnz} non-zeros, {index.matrix.data.nbytes / 1e6:.1f} MB of weights)")
+
+        started = time.perf_counter()
+        index.save_base(directory)
+        saved = time.perf_counter() - started
+        started = time.perf_counter()
+        index = ContentIndex.load(directory)
+        print(f"Saved in {saved:.2f}s, loaded in {time.perf_counter() - started:.2f}s")
+
+        print(f"\nRecommendation latency ({args.runs} users each)")
+        time_recommend("genres only", index, rng, args.runs, args.books, 0)
+        time_recommend("5 seed books", index, rng, args.runs, args.books, 5)
+        time_recommend("50 seed books", index, rng, args.runs, args.books, 50)
+
+        new_ids, new_terms = make_books(rng, args.books + 1, args.increment)
+        started = time.perf_counter()
+        rows = index.add(new_ids, new_terms)
+        index.save_delta(directory, new_ids, rows)
+        print(f"\nIncremental add of {args.increment} books (incl. delta file): "
+              f"{(time.perf_counter() - started) * 1000:.0f} ms")
+        time_recommend("5 seed books after add", index, rng, args.runs, args.books, 5)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=100_000)
+    parser.add_argument('--runs', type=int, default=200, help='recommendations timed per scenario')
+    parser.add_argument('--increment', type=int, default=1000, help='books added incrementally')
+    run_benchmark(parser.parse_args())
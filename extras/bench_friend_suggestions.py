@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Benchmark the friend suggestion build in backend/friend_suggestions.py.
+
+Generates a synthetic friendship graph in memory (no database needed): a heavy-tailed
+degree distribution with friendships mostly inside communities, so friends of friends
+overlap the way they do in real graphs, plus random shelves for the shared-books term.
+Times building the CSR graph and the full 2-hop suggestion pass with the block budget
+from --chunk-nnz, and prints the largest block and the peak resident memory.
+
+Usage (from the project root):
+    python3 extras/bench_friend_suggestions.py --users 100000 --edges 1000000
+"""
+
+import os
+import sys
+import time
+import resource
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.friend_suggestions import FriendGraph  # noqa: E402
+
+
+def peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def make_friendships(rng, users, edges, community_size):
+    # Pareto activity picks who makes friends; most friends come from the same community.
+    # Oversampled, since repeated pairs collapse, then cut down to `edges` friendships.
+    count = edges * 2
+    a = np.minimum((rng.pareto(1.5, count) * users / 30).astype(np.int64), users - 1)
+    local = rng.random(count) < 0.8
+    community_start = (a // community_size) * community_size
+    b = np.where(local, community_start + rng.integers(0, community_size, count),
+                 rng.integers(0, users, count))
+    b = np.minimum(b, users - 1)
+    pairs = np.unique(np.sort(np.stack([a, b], axis=1)[a != b], axis=1), axis=0)
+    if len(pairs) > edges:
+        pairs = pairs[np.sort(rng.choice(len(pairs), edges, replace=False))]
+    # Stored in both directions, like the friends table
+    return (np.concatenate([pairs[:, 0], pairs[:, 1]]) + 1,
+            np.concatenate([pairs[:, 1], pairs[:, 0]]) + 1)
+
+
+def make_shelves(rng, users, books, count):
+    user_ids = 1 + rng.integers(0, users, count)
+    book_ids = 1 + np.minimum((rng.pareto(0.9, count) * books / 50).astype(np.int64), books - 1)
+    pairs = np.unique(np.stack([user_ids, book_ids], axis=1), axis=0)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def run_benchmark(args):
+    rng = np.random.default_rng(7)
+    started = time.perf_counter()
+    user_ids, friend_ids = make_friendships(rng, args.users, args.edges, args.community_size)
+    shelf_users, shelf_books = make_shelves(rng, args.users, args.books, args.shelved)
+    print(f"Generated {len(user_ids) // 2} friendships ({len(user_ids)} rows) and {len(shelf_users)} shelf rows "
+          f"in {time.perf_counter() - started:.1f}s (peak RSS {peak_rss_mb():.0f} MB)")
+
+    started = time.perf_counter()
+    graph = FriendGraph(user_ids, friend_ids, shelf_users, shelf_books)
+    print(f"Graph: {len(graph)} users, max degree {graph.degree.max()}, "
+          f"built in {time.perf_counter() - started:.2f}s (peak RSS {peak_rss_mb():.0f} MB)")
+
+    started = time.perf_counter()
+    blocks, largest, rows = 0, 0, 0
+    for block in graph.chunks(np.arange(len(graph)), args.chunk_nnz):
+        largest = max(largest, int(graph.cost[block].sum()))
+        users, suggested, mutual, shared, scores = graph.suggestions(block)
+        blocks += 1
+        rows += len(users)
+    print(f"\nFull build: {time.perf_counter() - started:.1f}s, {blocks} blocks, largest block "
+          f"{largest} entries, {rows} suggestion rows (peak RSS {peak_rss_mb():.0f} MB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--edges', type=int, default=1_000_000, help='friendships (each stored as two rows)')
+    parser.add_argument('--community-size', type=int, default=200)
+    parser.add_argument('--books', type=int, default=100_000)
+    parser.add_argument('--shelved', type=int, default=2_000_000, help='shelf rows, before deduplication')
+    parser.add_argument('--chunk-nnz', type=int, default=2_000_000, help='2-hop entries per block')
+    run_benchmark(parser.parse_args())
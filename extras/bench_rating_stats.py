@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+"""
+Benchmark home feed query latency as review volume grows, before and after
+book_rating_stats (extras/migrations/005_book_rating_stats.sql).
+
+Seeds a throwaway schema (default: bench_rating_stats) with books, users, friends and
+bookshelf rows, then for each review volume times the feed queries from backend/home.py
+(friend activity, recent reviews, AI recommendation candidates) with the old per-row
+COUNT/AVG subqueries and with the book_rating_stats join. reviews(book_id) is indexed in
+both phases. Also reports the per-review cost of the maintenance trigger.
+
+Usage (from the project root, with backend/.env pointing at a scratch database):
+    python3 extras/bench_rating_stats.py --reviews 10000,100000,1000000 --runs 20
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.db import get_conn, request_scope  # noqa: E402
+from backend.rating_stats import check_rating_stats  # noqa: E402
+
+MIGRATION_PATH = os.path.join(os.path.dirname(__file__), 'migrations', '005_book_rating_stats.sql')
+
+LEGACY_RATING_COLUMNS = {
+    'b': """(SELECT COUNT(*) FROM reviews WHERE book_id = b.book_id) AS total_ratings,
+            (SELECT ROUND(AVG(rating)::numeric, 1) FROM reviews WHERE book_id = b.book_id) AS avg_rating""",
+    'r': """(SELECT COUNT(*) FROM reviews WHERE book_id = r.book_id) AS total_ratings,
+            (SELECT ROUND(AVG(rating)::numeric, 1) FROM reviews WHERE book_id = r.book_id) AS avg_rating""",
+}
+STATS_RATING_COLUMNS = """COALESCE(rs.review_count, 0) AS total_ratings,
+            ROUND(rs.rating_sum::numeric / NULLIF(rs.rating_count, 0), 1) AS avg_rating"""
+
+# Same shape as the queries in backend/home.py, without the public. prefix
+FEED_QUERIES = {
+    'friend_activity': """
+        SELECT u.user_id, u.username, b.book_id, b.title AS book_title, b.cover_url,
+               bs.shelf_type, bs.added_at, {columns}
+        FROM bookshelf bs
+        JOIN books b ON bs.book_id = b.book_id
+        JOIN users u ON bs.user_id = u.user_id
+        {join}
+        WHERE bs.user_id IN (SELECT friend_id FROM friends WHERE user_id = %(user_id)s)
+        ORDER BY bs.added_at DESC
+        LIMIT 10
+    """,
+    'recent_reviews': """
+        SELECT r.review_id, r.book_id, r.rating, r.review_text, r.created_at,
+               u.user_id, u.username, b.title AS book_title, b.cover_url, {columns}
+        FROM reviews r
+        JOIN users u ON r.user_id = u.user_id
+        JOIN books b ON r.book_id = b.book_id
+        {join}
+        ORDER BY r.created_at DESC
+        LIMIT 10
+    """,
+    'ai_candidates': """
+        SELECT b.book_id, b.title, COALESCE(b.cover_url, '') AS cover_url, b.description, {columns}
+        FROM books b
+        {join}
+    """,
+}
+ALIASES = {'friend_activity': 'b', 'recent_reviews': 'r', 'ai_candidates': 'b'}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def setup_schema(cur, schema, books, users):
+    cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+    cur.execute(f"CREATE SCHEMA {schema}")
+    cur.execute("SHOW search_path")
+    current_path = cur.fetchone()[0]
+    cur.execute(f"SET search_path TO {schema}, {current_path}")
+
+    cur.execute("""
+        CREATE TABLE books (
+            book_id serial PRIMARY KEY, title varchar NOT NULL, description text, cover_url varchar
+        )
+    """)
+    cur.execute("CREATE TABLE users (user_id serial PRIMARY KEY, username varchar NOT NULL)")
+    cur.execute("CREATE TABLE friends (user_id integer NOT NULL, friend_id integer NOT NULL)")
+    cur.execute("""
+        CREATE TABLE bookshelf (
+            shelf_id serial PRIMARY KEY, user_id integer NOT NULL, book_id integer NOT NULL,
+            shelf_type varchar, added_at timestamp DEFAULT now()
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE reviews (
+            review_id serial PRIMARY KEY, user_id integer NOT NULL,
+            book_id integer NOT NULL REFERENCES books(book_id),
+            rating integer CHECK (rating >= 1 AND rating <= 5), review_text text,
+            created_at timestamp DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("CREATE INDEX ON reviews (book_id)")
+    cur.execute("CREATE INDEX ON reviews (created_at)")
+    cur.execute("CREATE INDEX ON friends (user_id)")
+    cur.execute("CREATE INDEX ON bookshelf (user_id)")
+
+    print(f"Seeding {books} books, {users} users, friends and bookshelves...")
+    cur.execute("""
+        INSERT INTO books (title, description, cover_url)
+        SELECT 'Book ' || g, 'About book ' || g, 'https://covers.example/' || g || '.jpg'
+        FROM generate_series(1, %s) g
+    """, (books,))
+    cur.execute("INSERT INTO users (username) SELECT 'user' || g FROM generate_series(1, %s) g", (users,))
+    cur.execute("""
+        INSERT INTO friends (user_id, friend_id)
+        SELECT u, 1 + floor(random() * %s)::int FROM generate_series(1, %s) u, generate_series(1, 20)
+    """, (users, users))
+    cur.execute("""
+        INSERT INTO bookshelf (user_id, book_id, shelf_type, added_at)
+        SELECT 1 + floor(random() * %s)::int, 1 + floor(random() * %s)::int,
+               (ARRAY['completed', 'reading', 'planned'])[1 + floor(random() * 3)::int],
+               now() - random() * interval '365 days'
+        FROM generate_series(1, %s)
+    """, (users, books, users * 10))
+
+
+def add_reviews(cur, count, books, users):
+    cur.execute("""
+        INSERT INTO reviews (user_id, book_id, rating, review_text, created_at)
+        SELECT 1 + floor(random() * %s)::int,
+               -- skewed so a few popular books collect most of the reviews
+               1 + floor(power(random(), 3) * %s)::int,
+               CASE WHEN random() < 0.1 THEN NULL ELSE 1 + floor(random() * 5)::int END,
+               'review', now() - random() * interval '365 days'
+        FROM generate_series(1, %s)
+    """, (users, books, count))
+    cur.execute("ANALYZE")
+
+
+def time_queries(cur, args, with_stats):
+    results = {}
+    for name, template in FEED_QUERIES.items():
+        if with_stats:
+            sql = template.format(columns=STATS_RATING_COLUMNS,
+                                  join=f"LEFT JOIN book_rating_stats rs ON rs.book_id = {ALIASES[name]}.book_id")
+        else:
+            sql = template.format(columns=LEGACY_RATING_COLUMNS[ALIASES[name]], join='')
+        samples = []
+        for i in range(args.runs):
+            started = time.perf_counter()
+            cur.execute(sql, {'user_id': 1 + (i * 7919) % args.users})
+            cur.fetchall()
+            samples.append((time.perf_counter() - started) * 1000)
+        results[name] = samples
+    return results
+
+
+def time_trigger(cur, conn, count, books, users):
+    """Average milliseconds per single-row review insert"""
+    started = time.perf_counter()
+    for i in range(count):
+        cur.execute("INSERT INTO reviews (user_id, book_id, rating) VALUES (%s, %s, %s)",
+                    (1 + i % users, 1 + i % books, 1 + i % 5))
+    conn.commit()
+    return (time.perf_counter() - started) * 1000 / count
+
+
+def run_benchmark(args):
+    volumes = sorted(int(v) for v in args.reviews.split(','))
+
+    with request_scope():
+        with get_conn() as conn, conn.cursor() as cur:
+            setup_schema(cur, args.schema, args.books, args.users)
+            conn.commit()
+
+            # Two copies of each volume: one without the stats table, then the same rows with it
+            total = 0
+            print(f"\n{'reviews':>10s}  {'query':16s} {'before p50':>11s} {'after p50':>11s}"
+                  f" {'before p99':>11s} {'after p99':>11s}")
+            for volume in volumes:
+                add_reviews(cur, volume - total, args.books, args.users)
+                total = volume
+                conn.commit()
+
+                cur.execute("DROP TABLE IF EXISTS book_rating_stats CASCADE")
+                before = time_queries(cur, args, with_stats=False)
+                with open(MIGRATION_PATH) as f:
+                    cur.execute(f.read())   # creates and backfills book_rating_stats
+                conn.commit()
+                after = time_queries(cur, args, with_stats=True)
+                cur.execute("DROP TRIGGER IF EXISTS reviews_book_rating_stats ON reviews")
+                conn.commit()
+
+                for name in FEED_QUERIES:
+                    print(f"{volume:10d}  {name:16s} {percentile(before[name], 50):9.2f}ms "
+                          f"{percentile(after[name], 50):9.2f}ms {percentile(before[name], 99):9.2f}ms "
+                          f"{percentile(after[name], 99):9.2f}ms")
+
+            untriggered = time_trigger(cur, conn, args.inserts, args.books, args.users)
+            with open(MIGRATION_PATH) as f:
+                cur.execute(f.read())
+            conn.commit()
+            triggered = time_trigger(cur, conn, args.inserts, args.books, args.users)
+            print(f"\nReview insert: {untriggered:.3f} ms without the trigger, {triggered:.3f} ms with it")
+            print(f"Consistency check after inserts: {len(check_rating_stats())} drifted books")
+
+            if not args.keep:
+                cur.execute(f"DROP SCHEMA {args.schema} CASCADE")
+                conn.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--reviews', default='10000,100000,1000000', help='comma-separated review volumes')
+    parser.add_argument('--books', type=int, default=50_000)
+    parser.add_argument('--users', type=int, default=20_000)
+    parser.add_argument('--runs', type=int, default=20, help='runs per query and volume')
+    parser.add_argument('--inserts', type=int, default=2000, help='single-row inserts for the trigger cost')
+    parser.add_argument('--schema', default='bench_rating_stats')
+    parser.add_argument('--keep', action='store_true', help='keep the seeded schema afterwards')
+    run_benchmark(parser.parse_args())
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Benchmark local search latency before and after the search indexes.
+
+Seeds a throwaway schema (default: bench_search) with synthetic books, authors and
+users, times the old LOWER(col) LIKE '%q%' queries, applies
+extras/migrations/001_search_indexes.sql and times backend.search.search_local
+on the same queries. Prints p50/p99 latency in milliseconds for each phase.
+
+Usage (from the project root, with backend/.env pointing at a scratch database):
+    python3 extras/bench_search.py --books 1000000 --runs 200
+"""
+
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.db import get_conn, request_scope  # noqa: E402
+from backend.search import search_local  # noqa: E402
+
+MIGRATION_PATH = os.path.join(os.path.dirname(__file__), 'migrations', '001_search_indexes.sql')
+
+WORDS = [
+    'shadow', 'river', 'king', 'night', 'garden', 'winter', 'stone', 'fire', 'silent', 'empire',
+    'secret', 'lost', 'golden', 'city', 'dragon', 'house', 'ocean', 'storm', 'crown', 'forest',
+    'memory', 'glass', 'iron', 'wolf', 'star', 'daughter', 'war', 'light', 'dark', 'journey',
+    'island', 'moon', 'blood', 'song', 'tower', 'letter', 'harvest', 'witch', 'machine', 'heart',
+]
+
+LEGACY_QUERIES = {
+    'books': """
+        SELECT b.book_id, b.title, b.isbn, b.genre, b.release_date,
+               b.description, b.cover_url, b.author_id,
+               a.name as author_name
+        FROM books b
+        LEFT JOIN authors a ON b.author_id = a.author_id
+        WHERE LOWER(b.title) LIKE LOWER(%s)
+        ORDER BY b.title
+        LIMIT 5
+    """,
+    'authors': """
+        SELECT a.author_id, a.name, a.bio, a.birth_date, a.death_date, a.nationality,
+               a.author_image_url, a.created_at,
+               COUNT(b.book_id) as work_count
+        FROM authors a
+        LEFT JOIN books b ON a.author_id = b.author_id
+        WHERE LOWER(a.name) LIKE LOWER(%s)
+        GROUP BY a.author_id, a.name, a.bio, a.birth_date, a.death_date,
+                 a.nationality, a.author_image_url, a.created_at
+        ORDER BY a.name
+        LIMIT 5
+    """,
+    'users': """
+        SELECT user_id, username, profile_image_url
+        FROM users
+        WHERE LOWER(username) LIKE LOWER(%s)
+        ORDER BY username
+        LIMIT 10
+    """,
+}
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def build_queries(count):
+    """Mix of prefixes, whole words, two-word phrases, typos and 2-char queries"""
+    rng = random.Random(42)
+    queries = []
+    for i in range(count):
+        word = rng.choice(WORDS)
+        kind = i % 5
+        if kind == 0:
+            queries.append(word[:rng.randint(2, 4)])
+        elif kind == 1:
+            queries.append(word)
+        elif kind == 2:
+            queries.append(f"{word} {rng.choice(WORDS)}")
+        elif kind == 3:
+            pos = rng.randint(1, len(word) - 2)
+            queries.append(word[:pos] + word[pos + 1:])  # dropped letter
+        else:
+            queries.append(word[:2])
+    return queries
+
+
+def setup_schema(cur, schema, books, authors, users):
+    words_sql = "ARRAY[" + ", ".join(f"'{w}'" for w in WORDS) + "]"
+    pick = f"({words_sql})[1 + floor(random() * {len(WORDS)})::int]"
+
+    cur.execute(f"DROP SCHEMA IF EXISTS {schema} CASCADE")
+    cur.execute(f"CREATE SCHEMA {schema}")
+    cur.execute("SHOW search_path")
+    current_path = cur.fetchone()[0]
+    cur.execute(f"SET search_path TO {schema}, {current_path}")
+
+    cur.execute("""
+        CREATE TABLE authors (
+            author_id serial PRIMARY KEY, name varchar NOT NULL, bio text, birth_date date,
+            death_date date, nationality varchar, author_image_url varchar,
+            created_at timestamp DEFAULT now()
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE books (
+            book_id serial PRIMARY KEY, title varchar NOT NULL, isbn varchar, genre varchar,
+            release_date date, description text, cover_url varchar, author_id integer
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE users (
+            user_id serial PRIMARY KEY, username varchar NOT NULL, profile_image_url varchar
+        )
+    """)
+
+    print(f"Seeding {authors} authors, {books} books, {users} users...")
+    cur.execute(f"""
+        INSERT INTO authors (name)
+        SELECT initcap({pick}) || ' ' || initcap({pick}) || ' ' || g
+        FROM generate_series(1, %s) g
+    """, (authors,))
+    cur.execute(f"""
+        INSERT INTO books (title, author_id)
+        SELECT initcap('the ' || {pick} || ' of the ' || {pick} || ' ' || {pick}) || ' ' || g,
+               1 + floor(random() * %s)::int
+        FROM generate_series(1, %s) g
+    """, (authors, books))
+    cur.execute(f"""
+        INSERT INTO users (username)
+        SELECT {pick} || '_' || {pick} || g
+        FROM generate_series(1, %s) g
+    """, (users,))
+    cur.execute("ANALYZE authors; ANALYZE books; ANALYZE users;")
+
+
+def time_phase(label, queries, runner):
+    timings = {kind: [] for kind in LEGACY_QUERIES}
+    for query in queries:
+        for kind in LEGACY_QUERIES:
+            started = time.perf_counter()
+            runner(kind, query)
+            timings[kind].append((time.perf_counter() - started) * 1000)
+
+    print(f"\n{label}")
+    for kind, samples in timings.items():
+        print(f"  {kind:8s} p50 {percentile(samples, 50):8.2f} ms   p99 {percentile(samples, 99):8.2f} ms")
+
+
+def run_benchmark(args):
+    queries = build_queries(args.runs)
+
+    with request_scope():
+        with get_conn() as conn, conn.cursor() as cur:
+            setup_schema(cur, args.schema, args.books, args.authors, args.users)
+            conn.commit()
+
+            def legacy(kind, query):
+                cur.execute(LEGACY_QUERIES[kind], (f"%{query}%",))
+                cur.fetchall()
+
+            time_phase("Before (LIKE '%q%', no indexes)", queries, legacy)
+
+            print("\nApplying 001_search_indexes.sql...")
+            started = time.perf_counter()
+            with open(MIGRATION_PATH) as f:
+                cur.execute(f.read())
+            cur.execute("ANALYZE authors; ANALYZE books; ANALYZE users;")
+            conn.commit()
+            print(f"  indexes built in {time.perf_counter() - started:.1f}s")
+
+            def ranked(kind, query):
+                limit = 10 if kind == 'users' else 5
+                search_local(query, kinds=(kind,), limit=limit)
+
+            time_phase("After (search_local, indexed)", queries, ranked)
+
+            if not args.keep:
+                cur.execute(f"DROP SCHEMA {args.schema} CASCADE")
+                conn.commit()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--books', type=int, default=1_000_000)
+    parser.add_argument('--authors', type=int, default=50_000)
+    parser.add_argument('--users', type=int, default=100_000)
+    parser.add_argument('--runs', type=int, default=200, help='number of distinct queries per kind')
+    parser.add_argument('--schema', default='bench_search')
+    parser.add_argument('--keep', action='store_true', help='keep the seeded schema afterwards')
+    run_benchmark(parser.parse_args())
@@ -0,0 +1,40 @@
+-- 001_search_indexes.sql
+-- Indexes backing backend/search.py (search_local).
+--
+-- Every expression below must stay identical to the one used in backend/search.py,
+-- otherwise the planner cannot use the index:
+--   LOWER(col)                                  -> exact, prefix (btree) and substring/fuzzy (trigram) matches
+--   to_tsvector('simple', COALESCE(col, ''))    -> word prefix matches ("pot" finds "Harry Potter")
+--
+-- Safe to re-run. On a busy database run each CREATE INDEX with CONCURRENTLY
+-- (outside a transaction) instead.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- books.title
+CREATE INDEX IF NOT EXISTS books_title_lower_pattern_idx
+    ON books (LOWER(title) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS books_title_trgm_idx
+    ON books USING gin (LOWER(title) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS books_title_tsv_idx
+    ON books USING gin (to_tsvector('simple', COALESCE(title, '')));
+
+-- authors.name
+CREATE INDEX IF NOT EXISTS authors_name_lower_pattern_idx
+    ON authors (LOWER(name) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS authors_name_trgm_idx
+    ON authors USING gin (LOWER(name) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS authors_name_tsv_idx
+    ON authors USING gin (to_tsvector('simple', COALESCE(name, '')));
+
+-- users.username
+CREATE INDEX IF NOT EXISTS users_username_lower_pattern_idx
+    ON users (LOWER(username) text_pattern_ops);
+CREATE INDEX IF NOT EXISTS users_username_trgm_idx
+    ON users USING gin (LOWER(username) gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS users_username_tsv_idx
+    ON users USING gin (to_tsvector('simple', COALESCE(username, '')));
+
+-- work_count for matched authors
+CREATE INDEX IF NOT EXISTS books_author_id_idx
+    ON books (author_id);
@@ -0,0 +1,33 @@
+-- Durable queue for background ingestion (see backend/jobs.py).
+-- Any web process can enqueue; workers in any process claim jobs with
+-- FOR UPDATE SKIP LOCKED, so an author is only ingested once across gunicorn workers.
+
+CREATE TABLE IF NOT EXISTS ingestion_jobs (
+    job_id bigserial PRIMARY KEY,
+    kind varchar NOT NULL,
+    dedup_key varchar NOT NULL,
+    payload jsonb NOT NULL DEFAULT '{}'::jsonb,
+    priority smallint NOT NULL DEFAULT 100,            -- lower runs first
+    status varchar NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'done', 'failed')),
+    attempts integer NOT NULL DEFAULT 0,
+    max_attempts integer NOT NULL DEFAULT 5,
+    run_after timestamp NOT NULL DEFAULT now(),        -- retry backoff
+    progress jsonb NOT NULL DEFAULT '{}'::jsonb,
+    last_error text,
+    locked_by varchar,
+    locked_at timestamp,                               -- lease heartbeat while running
+    created_at timestamp NOT NULL DEFAULT now(),
+    updated_at timestamp NOT NULL DEFAULT now(),
+    finished_at timestamp
+);
+
+-- At most one queued/running job per (kind, key)
+CREATE UNIQUE INDEX IF NOT EXISTS ingestion_jobs_active_key_idx
+    ON ingestion_jobs (kind, dedup_key) WHERE status IN ('queued', 'running');
+
+CREATE INDEX IF NOT EXISTS ingestion_jobs_ready_idx
+    ON ingestion_jobs (priority, run_after) WHERE status = 'queued';
+
+CREATE INDEX IF NOT EXISTS ingestion_jobs_key_idx
+    ON ingestion_jobs (dedup_key, created_at DESC);
@@ -0,0 +1,20 @@
+-- Persist the normalized title used for duplicate detection, so dedupe lookups are
+-- index scans instead of REGEXP_REPLACE over every book (or every book of an author).
+-- Must stay in sync with backend.openlibrary.normalize_title.
+--
+-- Adding a STORED generated column rewrites the table, which backfills every existing
+-- row in the same statement; new and updated rows are maintained automatically.
+
+ALTER TABLE books
+    ADD COLUMN IF NOT EXISTS normalized_title varchar
+    GENERATED ALWAYS AS (REGEXP_REPLACE(LOWER(title), '[^a-zA-Z0-9]', '', 'g')) STORED;
+
+-- Same-author duplicate checks (ingestion)
+CREATE INDEX IF NOT EXISTS books_author_normalized_title_idx
+    ON books (author_id, normalized_title);
+
+-- Duplicate checks when the author is unknown
+CREATE INDEX IF NOT EXISTS books_normalized_title_idx
+    ON books (normalized_title);
+
+ANALYZE books;
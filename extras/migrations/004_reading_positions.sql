@@ -0,0 +1,12 @@
+-- Last reading position per user and book (see backend/reading_positions.py).
+-- Positions are buffered in the web processes and upserted in batches, so
+-- updated_at guards against an older batch overwriting a newer position.
+
+CREATE TABLE IF NOT EXISTS reading_positions (
+    user_id integer NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    book_id integer NOT NULL REFERENCES books(book_id) ON DELETE CASCADE,
+    chapter integer NOT NULL DEFAULT 0,                -- index into the reader's chapter fragments
+    anchor varchar,                                    -- element id at the top of the viewport
+    updated_at timestamp NOT NULL DEFAULT now(),
+    PRIMARY KEY (user_id, book_id)
+);
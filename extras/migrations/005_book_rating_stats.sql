@@ -0,0 +1,89 @@
+-- 005_book_rating_stats.sql
+-- Per-book review counts, rating sums and a 1-5 star histogram, maintained by a
+-- trigger on reviews (see backend/rating_stats.py). Feed queries join this table
+-- instead of running COUNT(*)/AVG(rating) subqueries over reviews for every row.
+--
+-- review_count counts every review (ratings are optional); rating_count/rating_sum
+-- only count reviews with a rating, so the average is rating_sum / rating_count.
+-- Safe to re-run: the backfill at the end rebuilds every row from reviews.
+
+CREATE TABLE IF NOT EXISTS book_rating_stats (
+    book_id integer PRIMARY KEY REFERENCES books(book_id) ON DELETE CASCADE,
+    review_count integer NOT NULL DEFAULT 0,
+    rating_count integer NOT NULL DEFAULT 0,
+    rating_sum integer NOT NULL DEFAULT 0,
+    rating_1 integer NOT NULL DEFAULT 0,
+    rating_2 integer NOT NULL DEFAULT 0,
+    rating_3 integer NOT NULL DEFAULT 0,
+    rating_4 integer NOT NULL DEFAULT 0,
+    rating_5 integer NOT NULL DEFAULT 0,
+    updated_at timestamp NOT NULL DEFAULT now()
+);
+
+-- Add (delta = 1) or remove (delta = -1) one review from a book's stats
+CREATE OR REPLACE FUNCTION book_rating_stats_apply(p_book_id integer, p_rating integer, delta integer)
+RETURNS void AS $$
+BEGIN
+    INSERT INTO book_rating_stats AS s (book_id, review_count, rating_count, rating_sum,
+                                        rating_1, rating_2, rating_3, rating_4, rating_5)
+    VALUES (p_book_id, delta,
+            CASE WHEN p_rating IS NULL THEN 0 ELSE delta END,
+            COALESCE(p_rating, 0) * delta,
+            CASE WHEN p_rating = 1 THEN delta ELSE 0 END,
+            CASE WHEN p_rating = 2 THEN delta ELSE 0 END,
+            CASE WHEN p_rating = 3 THEN delta ELSE 0 END,
+            CASE WHEN p_rating = 4 THEN delta ELSE 0 END,
+            CASE WHEN p_rating = 5 THEN delta ELSE 0 END)
+    ON CONFLICT (book_id) DO UPDATE SET
+        review_count = s.review_count + EXCLUDED.review_count,
+        rating_count = s.rating_count + EXCLUDED.rating_count,
+        rating_sum = s.rating_sum + EXCLUDED.rating_sum,
+        rating_1 = s.rating_1 + EXCLUDED.rating_1,
+        rating_2 = s.rating_2 + EXCLUDED.rating_2,
+        rating_3 = s.rating_3 + EXCLUDED.rating_3,
+        rating_4 = s.rating_4 + EXCLUDED.rating_4,
+        rating_5 = s.rating_5 + EXCLUDED.rating_5,
+        updated_at = now();
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION book_rating_stats_on_review()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') THEN
+        IF TG_OP = 'DELETE' OR OLD.book_id IS DISTINCT FROM NEW.book_id
+                            OR OLD.rating IS DISTINCT FROM NEW.rating THEN
+            PERFORM book_rating_stats_apply(OLD.book_id, OLD.rating, -1);
+        END IF;
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        IF TG_OP = 'INSERT' OR OLD.book_id IS DISTINCT FROM NEW.book_id
+                            OR OLD.rating IS DISTINCT FROM NEW.rating THEN
+            PERFORM book_rating_stats_apply(NEW.book_id, NEW.rating, 1);
+        END IF;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS reviews_book_rating_stats ON reviews;
+CREATE TRIGGER reviews_book_rating_stats
+    AFTER INSERT OR UPDATE OF book_id, rating OR DELETE ON reviews
+    FOR EACH ROW EXECUTE FUNCTION book_rating_stats_on_review();
+
+-- Backfill (same statement as backend.rating_stats.rebuild_rating_stats)
+INSERT INTO book_rating_stats (book_id, review_count, rating_count, rating_sum,
+                               rating_1, rating_2, rating_3, rating_4, rating_5, updated_at)
+SELECT book_id, COUNT(*), COUNT(rating), COALESCE(SUM(rating), 0),
+       COUNT(*) FILTER (WHERE rating = 1), COUNT(*) FILTER (WHERE rating = 2),
+       COUNT(*) FILTER (WHERE rating = 3), COUNT(*) FILTER (WHERE rating = 4),
+       COUNT(*) FILTER (WHERE rating = 5), now()
+FROM reviews
+GROUP BY book_id
+ON CONFLICT (book_id) DO UPDATE SET
+    review_count = EXCLUDED.review_count, rating_count = EXCLUDED.rating_count,
+    rating_sum = EXCLUDED.rating_sum, rating_1 = EXCLUDED.rating_1, rating_2 = EXCLUDED.rating_2,
+    rating_3 = EXCLUDED.rating_3, rating_4 = EXCLUDED.rating_4, rating_5 = EXCLUDED.rating_5,
+    updated_at = EXCLUDED.updated_at;
+
+ANALYZE book_rating_stats;
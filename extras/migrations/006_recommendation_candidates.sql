@@ -0,0 +1,19 @@
+-- 006_recommendation_candidates.sql
+-- Indexes for backend.home.get_recommendation_candidates, which narrows the catalog
+-- to a few hundred books in SQL before anything is sent to the LLM.
+--
+-- LOWER(genre) must stay identical to the expression in backend/home.py.
+-- Safe to re-run. On a busy database run each CREATE INDEX with CONCURRENTLY.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- LOWER(genre) LIKE '%fantasy%' for the user's favourite genres
+CREATE INDEX IF NOT EXISTS books_genre_trgm_idx
+    ON books USING gin (LOWER(genre) gin_trgm_ops);
+
+-- Bookshelf popularity, counted per candidate
+CREATE INDEX IF NOT EXISTS bookshelf_book_id_idx
+    ON bookshelf (book_id);
+
+ANALYZE books;
+ANALYZE bookshelf;
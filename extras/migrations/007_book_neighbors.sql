@@ -0,0 +1,29 @@
+-- 007_book_neighbors.sql
+-- Item-item collaborative filtering (see backend/collaborative.py).
+-- book_neighbors holds the top-K most similar books per book, computed from bookshelf
+-- and reviews by a background job; book_neighbors_builds records each run so the next
+-- incremental run only recomputes books with newer activity.
+--
+-- Safe to re-run. On a busy database run each CREATE INDEX with CONCURRENTLY.
+
+CREATE TABLE IF NOT EXISTS book_neighbors (
+    book_id integer NOT NULL REFERENCES books(book_id) ON DELETE CASCADE,
+    neighbor_id integer NOT NULL REFERENCES books(book_id) ON DELETE CASCADE,
+    score real NOT NULL,                               -- cosine similarity, 0..1
+    PRIMARY KEY (book_id, neighbor_id)
+);
+
+CREATE TABLE IF NOT EXISTS book_neighbors_builds (
+    build_id serial PRIMARY KEY,
+    kind varchar NOT NULL CHECK (kind IN ('full', 'incremental')),
+    started_at timestamp NOT NULL,                     -- activity up to here is reflected
+    finished_at timestamp,
+    books_updated integer
+);
+
+-- Activity since the last build, for incremental runs
+CREATE INDEX IF NOT EXISTS bookshelf_added_at_idx
+    ON bookshelf (added_at);
+
+CREATE INDEX IF NOT EXISTS reviews_created_at_idx
+    ON reviews (created_at);
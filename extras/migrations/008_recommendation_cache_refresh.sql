@@ -0,0 +1,18 @@
+-- 008_recommendation_cache_refresh.sql
+-- Background regeneration of home page recommendations (see backend/recommendation_cache.py).
+-- Page loads only read ai_recommendation_cache; a scheduler regenerates entries of recently
+-- active users at their refresh_after, spread over the hours before the 7 PM expiry.
+--
+-- Safe to re-run.
+
+ALTER TABLE ai_recommendation_cache
+    ADD COLUMN IF NOT EXISTS expires_at timestamptz,         -- NULL (older rows): expired
+    ADD COLUMN IF NOT EXISTS refresh_after timestamptz,      -- when the scheduler should regenerate it
+    ADD COLUMN IF NOT EXISTS stale_since timestamptz,        -- shelf/genres changed after it was generated
+    ADD COLUMN IF NOT EXISTS last_served_at timestamptz;     -- last home page view, updated hourly at most
+
+-- Rows from before this migration were generated when the user visited
+UPDATE ai_recommendation_cache SET last_served_at = created_at WHERE last_served_at IS NULL;
+
+CREATE INDEX IF NOT EXISTS ai_recommendation_cache_refresh_idx
+    ON ai_recommendation_cache (COALESCE(refresh_after, created_at));
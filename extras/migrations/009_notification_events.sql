@@ -0,0 +1,40 @@
+-- 009_notification_events.sql
+-- Push notification changes to the web processes (see backend/notification_events.py).
+-- Each trigger sends the affected user's id on the user_notifications channel; every
+-- process LISTENs on it and tells that user's open pages to refetch. Payloads are only
+-- user ids, never notification content.
+--
+-- Safe to re-run.
+
+CREATE OR REPLACE FUNCTION notify_user_notifications() RETURNS trigger AS $$
+DECLARE
+    row_data jsonb;
+BEGIN
+    -- TG_ARGV[0] names the column holding the user whose notifications changed
+    row_data := to_jsonb(CASE WHEN TG_OP = 'DELETE' THEN OLD ELSE NEW END);
+    PERFORM pg_notify('user_notifications', row_data ->> TG_ARGV[0]);
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS friend_requests_notify ON friend_requests;
+CREATE TRIGGER friend_requests_notify
+    AFTER INSERT OR UPDATE OR DELETE ON friend_requests
+    FOR EACH ROW EXECUTE FUNCTION notify_user_notifications('receiver_id');
+
+DROP TRIGGER IF EXISTS recommendations_notify ON recommendations;
+CREATE TRIGGER recommendations_notify
+    AFTER INSERT OR UPDATE OR DELETE ON recommendations
+    FOR EACH ROW EXECUTE FUNCTION notify_user_notifications('receiver_id');
+
+DROP TRIGGER IF EXISTS reading_goals_notify ON reading_goals;
+CREATE TRIGGER reading_goals_notify
+    AFTER INSERT OR UPDATE OR DELETE ON reading_goals
+    FOR EACH ROW EXECUTE FUNCTION notify_user_notifications('user_id');
+
+-- The "verify your email" notification disappears once the address is verified
+DROP TRIGGER IF EXISTS users_email_verified_notify ON users;
+CREATE TRIGGER users_email_verified_notify
+    AFTER UPDATE OF email_verified ON users
+    FOR EACH ROW WHEN (OLD.email_verified IS DISTINCT FROM NEW.email_verified)
+    EXECUTE FUNCTION notify_user_notifications('user_id');
@@ -0,0 +1,21 @@
+-- 010_notification_indexes.sql
+-- Indexes for backend.notifications.get_user_notifications, which reads the newest few
+-- notifications of each kind and counts them all in one statement. Each branch is an
+-- index range scan on the receiving user instead of a scan of the whole table.
+--
+-- Safe to re-run. On a busy database run each CREATE INDEX with CONCURRENTLY.
+
+CREATE INDEX IF NOT EXISTS friend_requests_pending_receiver_idx
+    ON friend_requests (receiver_id, created_at DESC)
+    WHERE status = 'pending';
+
+CREATE INDEX IF NOT EXISTS recommendations_receiver_created_idx
+    ON recommendations (receiver_id, created_at DESC);
+
+CREATE INDEX IF NOT EXISTS reading_goals_reminder_user_idx
+    ON reading_goals (user_id, start_date DESC)
+    WHERE reminder_enabled;
+
+ANALYZE friend_requests;
+ANALYZE recommendations;
+ANALYZE reading_goals;
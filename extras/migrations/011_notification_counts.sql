@@ -0,0 +1,103 @@
+-- 011_notification_counts.sql
+-- Per-user notification counts and a change version, maintained by triggers (see
+-- backend.notifications.get_notification_summary). The header badge reads one row here
+-- instead of building the notification list, and the notifications page skips refetching
+-- while the version is the one it already shows.
+--
+-- pending_friend_requests and recommendations are kept exact. Goal reminders depend on
+-- today's date, so they are counted live (a handful of rows per user); goal changes and
+-- email verification only bump the version.
+-- Safe to re-run: the backfill at the end recounts every user.
+
+CREATE TABLE IF NOT EXISTS notification_counts (
+    user_id integer PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+    pending_friend_requests integer NOT NULL DEFAULT 0,
+    recommendations integer NOT NULL DEFAULT 0,
+    version bigint NOT NULL DEFAULT 0,                 -- bumped on every change for the user
+    updated_at timestamp NOT NULL DEFAULT now()
+);
+
+-- Apply count deltas for one user and bump their version
+CREATE OR REPLACE FUNCTION notification_counts_apply(p_user_id integer, friend_delta integer, rec_delta integer)
+RETURNS void AS $$
+BEGIN
+    INSERT INTO notification_counts AS c (user_id, pending_friend_requests, recommendations, version)
+    VALUES (p_user_id, friend_delta, rec_delta, 1)
+    ON CONFLICT (user_id) DO UPDATE SET
+        pending_friend_requests = c.pending_friend_requests + EXCLUDED.pending_friend_requests,
+        recommendations = c.recommendations + EXCLUDED.recommendations,
+        version = c.version + 1,
+        updated_at = now();
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION notification_counts_on_change()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'friend_requests' THEN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM notification_counts_apply(OLD.receiver_id,
+                CASE WHEN OLD.status = 'pending' THEN -1 ELSE 0 END, 0);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM notification_counts_apply(NEW.receiver_id,
+                CASE WHEN NEW.status = 'pending' THEN 1 ELSE 0 END, 0);
+        END IF;
+    ELSIF TG_TABLE_NAME = 'recommendations' THEN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM notification_counts_apply(OLD.receiver_id, 0, -1);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM notification_counts_apply(NEW.receiver_id, 0, 1);
+        END IF;
+    ELSIF TG_OP = 'DELETE' THEN
+        -- reading_goals
+        PERFORM notification_counts_apply(OLD.user_id, 0, 0);
+    ELSIF TG_TABLE_NAME = 'users' THEN
+        -- Deleted users take their row with them (ON DELETE CASCADE), so only UPDATE gets here
+        PERFORM notification_counts_apply(NEW.user_id, 0, 0);
+    ELSE
+        IF TG_OP = 'UPDATE' AND OLD.user_id IS DISTINCT FROM NEW.user_id THEN
+            PERFORM notification_counts_apply(OLD.user_id, 0, 0);
+        END IF;
+        PERFORM notification_counts_apply(NEW.user_id, 0, 0);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS friend_requests_notification_counts ON friend_requests;
+CREATE TRIGGER friend_requests_notification_counts
+    AFTER INSERT OR UPDATE OR DELETE ON friend_requests
+    FOR EACH ROW EXECUTE FUNCTION notification_counts_on_change();
+
+DROP TRIGGER IF EXISTS recommendations_notification_counts ON recommendations;
+CREATE TRIGGER recommendations_notification_counts
+    AFTER INSERT OR UPDATE OR DELETE ON recommendations
+    FOR EACH ROW EXECUTE FUNCTION notification_counts_on_change();
+
+DROP TRIGGER IF EXISTS reading_goals_notification_counts ON reading_goals;
+CREATE TRIGGER reading_goals_notification_counts
+    AFTER INSERT OR UPDATE OR DELETE ON reading_goals
+    FOR EACH ROW EXECUTE FUNCTION notification_counts_on_change();
+
+DROP TRIGGER IF EXISTS users_email_verified_notification_counts ON users;
+CREATE TRIGGER users_email_verified_notification_counts
+    AFTER UPDATE OF email_verified ON users
+    FOR EACH ROW WHEN (OLD.email_verified IS DISTINCT FROM NEW.email_verified)
+    EXECUTE FUNCTION notification_counts_on_change();
+
+-- Backfill: recount everyone, bumping versions so pages already open refetch once
+INSERT INTO notification_counts AS c (user_id, pending_friend_requests, recommendations, version, updated_at)
+SELECT u.user_id,
+       (SELECT COUNT(*) FROM friend_requests fr WHERE fr.receiver_id = u.user_id AND fr.status = 'pending'),
+       (SELECT COUNT(*) FROM recommendations r WHERE r.receiver_id = u.user_id),
+       1, now()
+FROM users u
+ON CONFLICT (user_id) DO UPDATE SET
+    pending_friend_requests = EXCLUDED.pending_friend_requests,
+    recommendations = EXCLUDED.recommendations,
+    version = c.version + 1,
+    updated_at = EXCLUDED.updated_at;
+
+ANALYZE notification_counts;
@@ -0,0 +1,23 @@
+-- 012_friend_suggestions.sql
+-- "People you may know" (see backend/friend_suggestions.py).
+-- friend_suggestions holds the top suggestions per user, ranked by mutual friends and
+-- shared shelved books, computed from the whole friends graph by a daily background job;
+-- friend_suggestion_builds records each run.
+--
+-- Safe to re-run.
+
+CREATE TABLE IF NOT EXISTS friend_suggestions (
+    user_id integer NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    suggested_id integer NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    mutual_friends integer NOT NULL,
+    shared_books integer NOT NULL,
+    score real NOT NULL,
+    PRIMARY KEY (user_id, suggested_id)
+);
+
+CREATE TABLE IF NOT EXISTS friend_suggestion_builds (
+    build_id serial PRIMARY KEY,
+    started_at timestamp NOT NULL,
+    finished_at timestamp,
+    users_updated integer
+);
@@ -0,0 +1,90 @@
+-- 013_leaderboard_daily.sql
+-- Completed books per user, day and genre, maintained by triggers (see
+-- backend/leaderboards.py). Leaderboards sum these rows for the days in their window
+-- instead of counting bookshelf rows, so a window costs at most one row per user per
+-- active day whatever its length, and a per-genre board is just a filter.
+--
+-- A shelf row counts on the day it was moved to 'completed' (bookshelf.added_at is reset
+-- on every shelf change), under its book's genre ('' when it has none). Rows without
+-- an added_at never showed on a leaderboard and aren't counted.
+-- Safe to re-run: the backfill at the end rebuilds every row from bookshelf.
+
+CREATE TABLE IF NOT EXISTS leaderboard_daily (
+    user_id integer NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+    day date NOT NULL,
+    genre text NOT NULL DEFAULT '',
+    completed integer NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, day, genre)
+);
+
+-- Global boards read a range of days
+CREATE INDEX IF NOT EXISTS leaderboard_daily_day_idx
+    ON leaderboard_daily (day) INCLUDE (user_id, genre, completed);
+
+-- Add (delta = 1) or remove (delta = -1) one completed book
+CREATE OR REPLACE FUNCTION leaderboard_daily_apply(p_user_id integer, p_day date, p_genre text, delta integer)
+RETURNS void AS $$
+BEGIN
+    INSERT INTO leaderboard_daily AS d (user_id, day, genre, completed)
+    VALUES (p_user_id, p_day, COALESCE(p_genre, ''), delta)
+    ON CONFLICT (user_id, day, genre) DO UPDATE SET
+        completed = d.completed + EXCLUDED.completed;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE OR REPLACE FUNCTION leaderboard_daily_on_shelf()
+RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.shelf_type = 'completed'
+            AND OLD.added_at IS NOT NULL THEN
+        PERFORM leaderboard_daily_apply(OLD.user_id, OLD.added_at::date,
+            (SELECT genre FROM books WHERE book_id = OLD.book_id), -1);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.shelf_type = 'completed'
+            AND NEW.added_at IS NOT NULL THEN
+        PERFORM leaderboard_daily_apply(NEW.user_id, NEW.added_at::date,
+            (SELECT genre FROM books WHERE book_id = NEW.book_id), 1);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+-- A book's genre changed: move its completions to the new genre
+CREATE OR REPLACE FUNCTION leaderboard_daily_on_genre()
+RETURNS trigger AS $$
+DECLARE
+    s record;
+BEGIN
+    FOR s IN SELECT user_id, added_at FROM bookshelf
+             WHERE book_id = NEW.book_id AND shelf_type = 'completed' AND added_at IS NOT NULL LOOP
+        PERFORM leaderboard_daily_apply(s.user_id, s.added_at::date, OLD.genre, -1);
+        PERFORM leaderboard_daily_apply(s.user_id, s.added_at::date, NEW.genre, 1);
+    END LOOP;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS bookshelf_leaderboard_daily ON bookshelf;
+CREATE TRIGGER bookshelf_leaderboard_daily
+    AFTER INSERT OR UPDATE OF user_id, book_id, shelf_type, added_at OR DELETE ON bookshelf
+    FOR EACH ROW EXECUTE FUNCTION leaderboard_daily_on_shelf();
+
+DROP TRIGGER IF EXISTS books_genre_leaderboard_daily ON books;
+CREATE TRIGGER books_genre_leaderboard_daily
+    AFTER UPDATE OF genre ON books
+    FOR EACH ROW WHEN (COALESCE(OLD.genre, '') IS DISTINCT FROM COALESCE(NEW.genre, ''))
+    EXECUTE FUNCTION leaderboard_daily_on_genre();
+
+-- Backfill: rebuild from bookshelf, with shelf changes held off until it commits
+BEGIN;
+LOCK TABLE bookshelf IN SHARE MODE;
+DELETE FROM leaderboard_daily;
+INSERT INTO leaderboard_daily (user_id, day, genre, completed)
+SELECT s.user_id, s.added_at::date, COALESCE(b.genre, ''), COUNT(*)
+FROM bookshelf s
+LEFT JOIN books b ON b.book_id = s.book_id
+WHERE s.shelf_type = 'completed' AND s.added_at IS NOT NULL
+GROUP BY 1, 2, 3;
+COMMIT;
+
+ANALYZE leaderboard_daily;
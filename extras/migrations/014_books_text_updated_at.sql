@@ -0,0 +1,33 @@
+-- 014_books_text_updated_at.sql
+-- When a book's indexed text (title, genre, description) last changed, so the content
+-- recommender (backend/content_recommender.py) can re-index edited books instead of
+-- only books with a new id.
+--
+-- Existing rows are left NULL: they are already in the index (or get there on the next
+-- full rebuild). New rows get now() on insert and the trigger bumps it on every edit.
+--
+-- Safe to re-run. On a busy database run the CREATE INDEX with CONCURRENTLY.
+
+ALTER TABLE books ADD COLUMN IF NOT EXISTS text_updated_at timestamptz;
+ALTER TABLE books ALTER COLUMN text_updated_at SET DEFAULT now();
+
+CREATE OR REPLACE FUNCTION books_touch_text_updated_at()
+RETURNS trigger AS $$
+BEGIN
+    NEW.text_updated_at := now();
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS books_text_updated_at ON books;
+CREATE TRIGGER books_text_updated_at
+    BEFORE UPDATE OF title, genre, description ON books
+    FOR EACH ROW
+    WHEN (OLD.title IS DISTINCT FROM NEW.title
+          OR OLD.genre IS DISTINCT FROM NEW.genre
+          OR OLD.description IS DISTINCT FROM NEW.description)
+    EXECUTE FUNCTION books_touch_text_updated_at();
+
+-- Refreshes read the books edited since their watermark
+CREATE INDEX IF NOT EXISTS books_text_updated_at_idx
+    ON books (text_updated_at, book_id) WHERE text_updated_at IS NOT NULL;
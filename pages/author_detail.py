@@ -6,12 +6,8 @@ from backend.db import get_conn
 from backend.favorites import is_author_favorited, toggle_author_favorite
 from backend.authors import get_author_details, get_author_books
 from urllib.parse import unquote, parse_qs
+from backend.ingestion import enqueue_author_ingestion, get_author_ingestion_status
 from typing import Dict, Any
-import time
-
-# Global set to track authors currently having background search running
-# This prevents multiple concurrent searches for the same author
-_background_searches_running = set()
 
 dash.register_page(__name__, path_template="/author/<author_id>")
 
@@ -114,76 +110,18 @@ def layout(author_id=None, **kwargs):
         # Get author's books with error handling
         try:
             books = get_author_books(author_id)
-            time.sleep(0.6)
         except Exception as e:
             print(f"Error getting author books: {e}")
             books = []
 
-        # Search for additional books by this author in the background
+        # Queue background ingestion of this author's works. Deduplicated in the
+        # database, so repeat visits and other workers don't start it again.
         try:
-            from backend.openlibrary import search_additional_books_by_author, get_or_create_author_with_books
-            import threading
-
-            # Check if background search is already running for this author
-            if author_id in _background_searches_running:
-                print(
-                    f"DEBUG AUTHOR_DETAIL: Background search already running for author {author_data['name']} (ID: {author_id})")
-            else:
-                _background_searches_running.add(author_id)
-
-                def background_search():
-                    try:
-                        # Start works fetching in its own thread
-                        def fetch_works():
-                            try:
-                                print(
-                                    f"DEBUG AUTHOR_DETAIL: Starting works fetch for author {author_data['name']}")
-                                get_or_create_author_with_books(author_data)
-                                print(
-                                    f"DEBUG AUTHOR_DETAIL: Completed works fetch for author {author_data['name']}")
-                            except Exception as e:
-                                print(f"Error in works fetch thread: {e}")
-
-                        # Start additional search in its own thread
-                        def additional_search():
-                            try:
-                                print(
-                                    f"DEBUG AUTHOR_DETAIL: Starting additional search for author {author_data['name']}")
-                                search_additional_books_by_author(
-                                    author_data['name'], author_id)
-                                print(
-                                    f"DEBUG AUTHOR_DETAIL: Completed additional search for author {author_data['name']}")
-                            except Exception as e:
-                                print(
-                                    f"Error in additional search thread: {e}")
-
-                        # Start both threads
-                        works_thread = threading.Thread(
-                            target=fetch_works, daemon=True, name=f"works-{author_id}")
-                        search_thread = threading.Thread(
-                            target=additional_search, daemon=True, name=f"search-{author_id}")
-
-                        works_thread.start()
-                        search_thread.start()
-
-                        # Wait for both to complete (optional - could let them run independently)
-                        # works_thread.join()
-                        # search_thread.join()
-
-                    except Exception as e:
-                        print(f"Error in background search: {e}")
-                    finally:
-                        # Remove from running set when done
-                        _background_searches_running.discard(
-                            author_id)                # Start background thread
-                search_thread = threading.Thread(
-                    target=background_search, daemon=True)
-                search_thread.start()
-
+            job_key = enqueue_author_ingestion(author_data)
+            ingestion = get_author_ingestion_status(job_key)
         except Exception as e:
-            print(f"Error starting background search: {e}")
-            # Clean up in case of error
-            _background_searches_running.discard(author_id)
+            print(f"Error queuing author ingestion: {e}")
+            job_key, ingestion = None, {'active': False, 'books_added': 0}
 
         return html.Div([
             # Store for favorite status feedback
@@ -191,12 +129,16 @@ def layout(author_id=None, **kwargs):
                       'author_id': author_id}),
             dcc.Store(id='author-navigation-store',
                       data={'author_id': author_id}),
-            # Interval for refreshing books list after background search
+            # Ingestion progress; the books list only refreshes when books_added changes
+            dcc.Store(id={'type': 'author-ingestion-store', 'author_id': author_id},
+                      data={'job_key': job_key, **ingestion}),
+            # Polls job progress while ingestion is queued/running
             dcc.Interval(
                 id={'type': 'author-books-refresh', 'author_id': author_id},
-                interval=10000,  # Check every 10 seconds
+                interval=5000,  # Check every 5 seconds
                 n_intervals=0,
-                max_intervals=6  # Stop after 1 minute
+                max_intervals=120,  # Give up after 10 minutes
+                disabled=not (job_key and ingestion['active'])
             ),
 
             html.Div([
@@ -444,6 +386,25 @@ def handle_author_favorite_click(n_clicks, session_data):
         )
 
 
+# Poll ingestion job progress; only touches the store (and so the books grid) when something changed
+@callback(
+    [Output({'type': 'author-ingestion-store', 'author_id': dash.dependencies.MATCH}, 'data'),
+     Output({'type': 'author-books-refresh', 'author_id': dash.dependencies.MATCH}, 'disabled')],
+    Input({'type': 'author-books-refresh', 'author_id': dash.dependencies.MATCH}, 'n_intervals'),
+    State({'type': 'author-ingestion-store', 'author_id': dash.dependencies.MATCH}, 'data'),
+    prevent_initial_call=True
+)
+def poll_author_ingestion(n_intervals, ingestion_data):
+    if not ingestion_data or not ingestion_data.get('job_key'):
+        return dash.no_update, True
+
+    status = get_author_ingestion_status(ingestion_data['job_key'])
+    if status['books_added'] == ingestion_data.get('books_added') and status['active']:
+        return dash.no_update, False
+
+    return {**ingestion_data, **status}, not status['active']
+
+
 # Callback to handle pagination clicks and refresh updates
 @callback(
     [Output({'type': 'author-books-page-store', 'author_id': dash.dependencies.MATCH}, 'data'),
@@ -454,20 +415,20 @@ def handle_author_favorite_click(n_clicks, session_data):
      Output({'type': 'author-books-pagination-bottom', 'author_id': dash.dependencies.MATCH}, 'children')],
     [Input({'type': 'pagination-btn', 'author_id': dash.dependencies.MATCH,
            'page': dash.dependencies.ALL}, 'n_clicks'),
-     Input({'type': 'author-books-refresh', 'author_id': dash.dependencies.MATCH}, 'n_intervals')],
+     Input({'type': 'author-ingestion-store', 'author_id': dash.dependencies.MATCH}, 'data')],
     [State({'type': 'author-books-page-store',
            'author_id': dash.dependencies.MATCH}, 'data')],
     prevent_initial_call=True
 )
-def handle_pagination_click(clicks_list, n_intervals, page_data):
+def handle_pagination_click(clicks_list, ingestion_data, page_data):
     """Handle pagination button clicks and automatic refresh updates"""
     triggered = dash.callback_context.triggered[0] if dash.callback_context.triggered else None
 
     if not triggered:
         return dash.no_update, dash.no_update, dash.no_update, dash.no_update
 
-    # Check if this is a refresh interval trigger
-    is_refresh = 'author-books-refresh' in triggered['prop_id']
+    # Check if this is an ingestion progress trigger
+    is_refresh = 'author-ingestion-store' in triggered['prop_id']
 
     if is_refresh:
         # For refresh, stay on current page but update book count
@@ -488,8 +449,8 @@ def handle_pagination_click(clicks_list, n_intervals, page_data):
 
     # Extract author_id from the triggered component
     triggered_id = triggered['prop_id'].split('.')[0]
-    if 'author-books-refresh' in triggered_id:
-        # For refresh interval, extract author_id from the ID
+    if 'author-ingestion-store' in triggered_id:
+        # For ingestion progress, extract author_id from the ID
         try:
             id_dict = eval(triggered_id)
             author_id = id_dict['author_id']
@@ -518,7 +479,7 @@ def handle_pagination_click(clicks_list, n_intervals, page_data):
 
     # Check if this is a refresh and no new books
     previous_total = page_data.get('total_books', 0)
-    is_refresh = 'author-books-refresh' in triggered['prop_id']
+    is_refresh = 'author-ingestion-store' in triggered['prop_id']
     if is_refresh and total_books == previous_total:
         # No new books, don't update the grid to avoid unnecessary loading
         return dash.no_update, dash.no_update, dash.no_update, dash.no_update
@@ -541,5 +502,4 @@ def handle_pagination_click(clicks_list, n_intervals, page_data):
     pagination_controls = create_pagination_controls(
         new_page, total_pages, total_books, author_id)
 
-    time.sleep(0.6)
     return updated_page_data, book_cards, pagination_controls, pagination_controls
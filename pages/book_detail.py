@@ -8,8 +8,10 @@ from backend.reviews import get_user_review, create_or_update_review
 from backend.friends import get_friends_list
 from backend.recommendations import create_book_recommendation
 from backend.rewards import award_completion_rating, award_review, award_recommendation
-from backend.gutenberg import search_and_download_gutenberg_html
+from backend.ingestion import enqueue_gutenberg_fetch, get_gutenberg_fetch_status
+from backend.collaborative import get_similar_books
 from backend.rentals import check_book_rental_status, rent_book, get_rental_info_for_confirmation
+from backend.rating_stats import get_book_rating_stats
 from urllib.parse import unquote, parse_qs
 
 dash.register_page(__name__, path_template="/book/<book_id>")
@@ -65,12 +67,18 @@ def layout(book_id=None, **kwargs):
         if not book_data:
             return html.Div("Book not found", className="error-message")
 
-        # Check if HTML is available from Gutenberg
+        # Average and count from the trigger-maintained book_rating_stats row
+        rating_stats = get_book_rating_stats(book_id)
+
+        # Look for a Gutenberg HTML version in the background; the Read/Rent
+        # button appears once the lookup finds one
+        gutenberg_pending = False
         if not book_data.get('html_path'):
-            search_and_download_gutenberg_html(
-                book_data['title'], book_data['author_name'], book_id)
-            # Refresh book data after potential update
-            book_data = get_book_details(book_id)
+            try:
+                enqueue_gutenberg_fetch(book_id)
+                gutenberg_pending = get_gutenberg_fetch_status(book_id)['state'] == 'pending'
+            except Exception as e:
+                print(f"Error queuing Gutenberg lookup for book {book_id}: {e}")
 
         # Check rental status (will be updated by callback)
         rental_status = None  # Will be set by callback
@@ -85,6 +93,12 @@ def layout(book_id=None, **kwargs):
                       'book_id': book_id}, data=False),
             dcc.Store(id={'type': 'rental-status-store',
                       'book_id': book_id}, data=None),
+            # Polls the background Gutenberg lookup while it is queued/running
+            dcc.Store(id={'type': 'gutenberg-status-store', 'book_id': book_id},
+                      data={'state': 'pending' if gutenberg_pending else None}),
+            dcc.Interval(id={'type': 'gutenberg-poll', 'book_id': book_id},
+                         interval=3000, n_intervals=0, max_intervals=100,
+                         disabled=not gutenberg_pending),
 
             html.Div([
                 html.Div([
@@ -131,10 +145,10 @@ def layout(book_id=None, **kwargs):
                         html.Div([
                             html.Strong("Rating: "),
                             dcc.Link(
-                                f"{book_data.get('average_rating', 0):.1f}/5.0 ({book_data.get('rating_count', 0)})",
+                                f"{rating_stats['avg_rating']:.1f}/5.0 ({rating_stats['rating_count']})",
                                 href=f"/reviews/{book_id}",
                                 className='rating-color rating-link'
-                            ) if book_data.get('average_rating') and book_data.get('average_rating') > 0 and book_data.get('rating_count', 0) > 0 else html.Span(
+                            ) if rating_stats['avg_rating'] else html.Span(
                                 "No ratings yet",
                                 style={'color': 'var(--text-color-secondary)'}
                             )
@@ -463,7 +477,10 @@ def layout(book_id=None, **kwargs):
                 # Other editions/versions section
                 html.Div(id='other-editions-section', children=[
                     # This will be populated by a callback
-                ], className="other-editions-section")
+                ], className="other-editions-section"),
+
+                # Books the same readers shelved/rated, from backend.collaborative
+                html.Div(id='similar-books-section', children=[], className="other-editions-section")
 
             ], className="page-container")
         ])
@@ -525,6 +542,39 @@ def populate_other_editions(nav_data):
     ], className='secondary-bg other-editions-container')
 
 
+# Callback to populate the similar books section
+@callback(
+    Output('similar-books-section', 'children'),
+    [Input('book-navigation-store', 'data')],
+    prevent_initial_call=False
+)
+def populate_similar_books(nav_data):
+    """Show books most often read by readers of this one, if there are any yet"""
+    if not nav_data or not nav_data.get('book_id'):
+        return []
+
+    similar_books = get_similar_books(nav_data['book_id'])
+    if not similar_books:
+        return []
+
+    return html.Div([
+        html.H3("Readers Also Enjoyed", className="other-editions-header"),
+        html.Div([
+            dcc.Link([
+                html.Div([
+                    html.Img(src=book.get('cover_url') or '/assets/svg/default-book.svg',
+                             className="other-editions-image"),
+                    html.Div([
+                        html.H4(book['title'], className="other-editions-title"),
+                        html.P(f"by {book['author_name']}", className="other-editions-author"),
+                    ], style={'flex': '1'})
+                ], className="other-editions-item")
+            ], href=f"/book/{book['book_id']}", className="other-editions-item-link")
+            for book in similar_books
+        ])
+    ], className='secondary-bg other-editions-container')
+
+
 # Callback to set initial favorite button state
 @callback(
     [Output({'type': 'book-favorite-btn', 'book_id': dash.dependencies.MATCH}, 'children'),
@@ -1348,16 +1398,32 @@ def close_error_modal(n_clicks):
     return dash.no_update, dash.no_update
 
 
+# Poll the background Gutenberg lookup; the status store only changes once it finishes
+@callback(
+    [Output({'type': 'gutenberg-status-store', 'book_id': dash.dependencies.MATCH}, 'data'),
+     Output({'type': 'gutenberg-poll', 'book_id': dash.dependencies.MATCH}, 'disabled')],
+    Input({'type': 'gutenberg-poll', 'book_id': dash.dependencies.MATCH}, 'n_intervals'),
+    State({'type': 'gutenberg-poll', 'book_id': dash.dependencies.MATCH}, 'id'),
+    prevent_initial_call=True
+)
+def poll_gutenberg_status(n_intervals, poll_id):
+    status = get_gutenberg_fetch_status(poll_id['book_id'])
+    if status['state'] == 'pending':
+        return dash.no_update, False
+    return {'state': status['state']}, True
+
+
 # Callback to set initial rental status and Read/Rent button
 @callback(
     [Output({'type': 'read-rent-button-container', 'book_id': dash.dependencies.MATCH}, 'children'),
      Output({'type': 'rental-status-store', 'book_id': dash.dependencies.MATCH}, 'data')],
     [Input({'type': 'rental-status-store', 'book_id': dash.dependencies.MATCH}, 'id'),
-     Input('user-session', 'data')],
+     Input('user-session', 'data'),
+     Input({'type': 'gutenberg-status-store', 'book_id': dash.dependencies.MATCH}, 'data')],
     [State({'type': 'book-favorite-store', 'book_id': dash.dependencies.MATCH}, 'id')],
     prevent_initial_call=False
 )
-def set_initial_rental_status(store_id, session_data, book_store_id):
+def set_initial_rental_status(store_id, session_data, gutenberg_status, book_store_id):
     """Set the initial rental status and show appropriate Read/Rent button"""
     book_id = store_id['book_id']
 
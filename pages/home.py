@@ -47,7 +47,9 @@ def homefeed_layout():
                     })
                 ], style={'display': 'flex', 'alignItems': 'center', 'marginBottom': '10px'}),
                 html.Div(id="ai-recommendations-container",
-                         className="home-section-container")
+                         className="home-section-container"),
+                # Re-checks the cache while a first set of recommendations is generated in the background
+                dcc.Interval(id="ai-recommendations-poll", interval=5000, max_intervals=36, disabled=True)
             ], className="home-section"),
 
             html.Div([
@@ -225,15 +227,22 @@ def load_home_data(user_session):
 
 
 @dash.callback(
-    Output("ai-recommendations-container", "children"),
-    Input("user-session", "data")
+    [Output("ai-recommendations-container", "children"),
+     Output("ai-recommendations-poll", "disabled")],
+    [Input("user-session", "data"),
+     Input("ai-recommendations-poll", "n_intervals")]
 )
-def load_ai_recommendations(user_session):
+def load_ai_recommendations(user_session, n_intervals):
+    return _ai_recommendations_content(user_session)
+
+
+def _ai_recommendations_content(user_session):
+    """(recommendations section, whether to stop polling for them)"""
     if not user_session or not user_session.get("logged_in"):
         return html.P(
             "Log in to see AI-powered book recommendations.",
             className="home-empty-message"
-        )
+        ), True
 
     user_id = user_session.get("user_id")
     user_genres = user_session.get("favorite_genres", [])
@@ -242,7 +251,7 @@ def load_ai_recommendations(user_session):
         return html.P(
             "Add some favorite genres in your profile to receive recommendations.",
             className="home-empty-message"
-        )
+        ), True
 
     recs = home_backend.get_ai_recommendations_with_cache(
         user_id=user_id,
@@ -250,11 +259,17 @@ def load_ai_recommendations(user_session):
         limit=10
     )
 
+    if recs is None:
+        return html.P(
+            "Picking out some books for you...",
+            className="home-empty-message"
+        ), False
+
     if not recs:
         return html.P(
             "No recommendations available right now.",
             className="home-empty-message"
-        )
+        ), True
 
     # build recommendation cards
     rec_cards = []
@@ -308,7 +323,7 @@ def load_ai_recommendations(user_session):
     
     return html.Div([
         html.Div(rec_cards, className="rec-scroll-container")
-    ])
+    ]), True
 
 # Register chatbot callbacks
 register_chatbot_callbacks('home')
\ No newline at end of file
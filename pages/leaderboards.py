@@ -48,7 +48,8 @@ def leaderboards_layout():
                         options=[
                             {'label': 'Week', 'value': 'week'},
                             {'label': 'Month', 'value': 'month'},
-                            {'label': 'Year', 'value': 'year'}
+                            {'label': 'Year', 'value': 'year'},
+                            {'label': 'All Time', 'value': 'all'}
                         ],
                         value='month',
                         clearable=False,
@@ -124,14 +125,18 @@ def update_leaderboard(time_window, scope, user_session):
     # Load leaderboard data
     data = (leaderboard_backend.get_friend_leaderboard(user_id, time_window)
             if scope == 'friends'
-            else leaderboard_backend.get_global_leaderboard(time_window))
+            else leaderboard_backend.get_global_leaderboard(time_window, user_id))
 
     if not data:
         return html.P("No reading data found for this period.", className="empty-message")
 
     # Build leaderboard list
     rows = []
-    for rank, entry in enumerate(data, start=1):
+    for position, entry in enumerate(data, start=1):
+        # The viewer's own row, appended after the top when they're further down
+        if scope != 'friends' and position > leaderboard_backend.LEADERBOARD_SIZE:
+            rows.append(html.Div("…", className="leaderboard-gap"))
+        rank = entry.get('rank', position)
         is_current_user = entry.get("user_id") == user_id
         row_class = "leaderboard-row current-user-row" if is_current_user else "leaderboard-row"
         username = entry.get('username', 'Unknown')
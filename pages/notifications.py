@@ -55,6 +55,9 @@ def layout():
         # Store for notification data
         dcc.Store(id='notifications-data',
                   data={'count': 0, 'notifications': []}),
+        # How many notifications to show; "Show more" raises it a page at a time
+        dcc.Store(id='notifications-limit',
+                  data=notifications_backend.NOTIFICATIONS_PAGE_SIZE),
 
         # Store for resend email feedback
         dcc.Store(id='resend-feedback-store', data=None),
@@ -68,12 +71,26 @@ def layout():
         dcc.Store(id='bookshelf-selected-status',
                   data='want-to-read'),  # selected status
 
-        # Auto-refresh interval (4 seconds)
+        # Refetch trigger: the actions below bump n_intervals after changing a notification
         dcc.Interval(
             id='notifications-refresh-interval',
-            interval=4*1000,
+            interval=60*1000,
+            n_intervals=0,
+            disabled=True
+        ),
+        # Fallback refresh for when the push stream (assets/notification_stream.js) is down
+        dcc.Interval(
+            id='notifications-poll-interval',
+            interval=60*1000,
             n_intervals=0
         ),
+        # Ticks the resend email countdown; only enabled while it runs
+        dcc.Interval(
+            id='resend-countdown-interval',
+            interval=4*1000,
+            n_intervals=0,
+            disabled=True
+        ),
 
         # Page header
         html.Div([
@@ -84,6 +101,8 @@ def layout():
 
         # Notifications list
         html.Div(id='notifications-list', className='card notifications-list'),
+        html.Button("Show more", id='notifications-show-more', n_clicks=0,
+                    className='notifications-show-more', style={'display': 'none'}),
 
         # Bookshelf modal
         html.Div([
@@ -154,9 +173,15 @@ def layout():
 @callback(
     Output('notifications-data', 'data'),
     [Input('notifications-refresh-interval', 'n_intervals'),
-     Input('user-session', 'data')]
+     Input('notifications-poll-interval', 'n_intervals'),
+     Input('notifications-push', 'data'),
+     Input('notifications-limit', 'data'),
+     Input('user-session', 'data')],
+    [State('notifications-stream-status', 'data'),
+     State('notifications-data', 'data')]
 )
-def refresh_notifications(n_intervals, user_session):
+def refresh_notifications(n_intervals, n_polls, notifications_push, limit, user_session, stream_status,
+                          current_data):
     if not user_session or not user_session.get('logged_in', False):
         return {'count': 0, 'notifications': []}
 
@@ -164,34 +189,47 @@ def refresh_notifications(n_intervals, user_session):
     if not user_id:
         return {'count': 0, 'notifications': []}
 
-    # Use session cache only for initial load (n_intervals == 0)
-    # For interval-triggered refreshes, always fetch fresh data
-    if n_intervals == 0 and 'notifications' in user_session and user_session['notifications']:
-        return user_session['notifications']
-
-    # check email_verified status from database (in case it was just verified)
-    email_verified = user_session.get('email_verified', False)
-
-    # if showing unverified notification, check database for updates
-    if not email_verified:
-        try:
-            from backend.db import get_conn
-            import psycopg2.extras
-            with get_conn() as conn, conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor) as cur:
-                cur.execute(
-                    "SELECT email_verified FROM users WHERE user_id = %s", (int(user_id),))
-                result = cur.fetchone()
-                if result and result['email_verified']:
-                    email_verified = True
-        except Exception as e:
-            pass
+    triggered = dash.ctx.triggered_id
+    current_version = (current_data or {}).get('version')
+    # Changes are pushed while the stream is up; the poll only covers for it when it's down
+    if triggered == 'notifications-poll-interval' and (stream_status or {}).get('connected'):
+        return no_update
+
+    # Session changes (including the one made below) use the session cache; actions, pushes,
+    # polls and "Show more" fetch
+    if triggered not in ('notifications-refresh-interval', 'notifications-poll-interval',
+                         'notifications-push', 'notifications-limit') \
+            and user_session.get('notifications'):
+        cached = user_session['notifications']
+        if current_version is not None and cached.get('version') == current_version:
+            return no_update
+        return cached
+
+    # Only build the list when the version moved since what's shown (email verification included)
+    summary = notifications_backend.get_notification_summary(user_id)
+    if summary is not None and triggered != 'notifications-limit' \
+            and summary['version'] == current_version:
+        return no_update
+    email_verified = summary['email_verified'] if summary else user_session.get('email_verified', False)
 
     # Fetch fresh notifications (pass email_verified status)
     new_data = notifications_backend.get_user_notifications(
-        str(user_id), email_verified=email_verified)
+        str(user_id), email_verified=email_verified, limit=limit)
     return new_data
 
 
+@callback(
+    Output('notifications-limit', 'data'),
+    Input('notifications-show-more', 'n_clicks'),
+    State('notifications-limit', 'data'),
+    prevent_initial_call=True
+)
+def show_more_notifications(n_clicks, limit):
+    if not n_clicks:
+        return no_update
+    return (limit or 0) + notifications_backend.NOTIFICATIONS_PAGE_SIZE
+
+
 # Callback to update session with fresh notifications and email_verified status
 @callback(
     Output('user-session', 'data', allow_duplicate=True),
@@ -203,6 +241,10 @@ def update_session_notifications(notifications_data, user_session):
     if not user_session:
         return dash.no_update
 
+    # Writing the session re-triggers the callbacks that read it, so only write real changes
+    if notifications_data == user_session.get('notifications'):
+        return dash.no_update
+
     # Update session with latest notifications
     user_session['notifications'] = notifications_data
 
@@ -231,13 +273,14 @@ def update_session_notifications(notifications_data, user_session):
 # Callback to update the notifications display
 @callback(
     [Output('notifications-list', 'children'),
-     Output('notification-count-display', 'children')],
-    [Input('notifications-data', 'data'),
-     Input('user-session', 'data')]
+     Output('notification-count-display', 'children'),
+     Output('notifications-show-more', 'style')],
+    [Input('notifications-data', 'data')],
+    [State('user-session', 'data')]
 )
 def update_notifications_display(notifications_data, user_session):
     if not user_session or not user_session.get('logged_in', False):
-        return [], ""
+        return [], "", {'display': 'none'}
 
     # Use cached notifications in session if store is empty
     if not notifications_data.get('notifications') and 'notifications' in user_session:
@@ -258,9 +301,10 @@ def update_notifications_display(notifications_data, user_session):
 
     # Update header count
     count_display = f"{count} notification{'s' if count != 1 else ''}"
+    show_more_style = {'display': 'block'} if notifications_data.get('has_more') else {'display': 'none'}
 
     if not notifications:
-        return [], count_display
+        return [], count_display, show_more_style
 
     # Create notification items
     notification_items = []
@@ -569,7 +613,7 @@ def update_notifications_display(notifications_data, user_session):
             
             notification_items.append(item)
 
-    return notification_items, count_display
+    return notification_items, count_display, show_more_style
 
 
 # Callback to handle notification responses (non-resend actions)
@@ -954,12 +998,23 @@ def handle_resend_verification(n_clicks, user_session, last_resend_time, current
         return {'success': False, 'message': result.get('message', 'Failed to send email')}, dash.no_update, dash.no_update
 
 
+# Run the countdown ticker only while a resend is rate limited
+@callback(
+    Output('resend-countdown-interval', 'disabled'),
+    [Input('last-resend-time', 'data'),
+     Input('resend-countdown-interval', 'n_intervals')]
+)
+def toggle_resend_countdown(last_resend_time, n_intervals):
+    import time
+    return not last_resend_time or time.time() - last_resend_time >= 90
+
+
 # Callback to update button state based on rate limiting
 @callback(
     [Output('resend-verification-btn', 'disabled'),
      Output('resend-verification-btn', 'children')],
     [Input('last-resend-time', 'data'),
-     Input('notifications-refresh-interval', 'n_intervals')],
+     Input('resend-countdown-interval', 'n_intervals')],
     prevent_initial_call=False
 )
 def update_resend_button_state(last_resend_time, n_intervals):
@@ -983,7 +1038,7 @@ def update_resend_button_state(last_resend_time, n_intervals):
     Output('resend-email-feedback', 'children'),
     [Input('resend-feedback-store', 'data'),
      Input('last-resend-time', 'data'),
-     Input('notifications-refresh-interval', 'n_intervals')],
+     Input('resend-countdown-interval', 'n_intervals')],
     prevent_initial_call=False
 )
 def display_resend_feedback(feedback_data, last_resend_time, n_intervals):
@@ -3,6 +3,7 @@ from dash import html, dcc, Input, Output, State, callback
 import dash_cytoscape as cyto
 import backend.profile as profile_backend
 import backend.friends as friends_backend
+import backend.friend_network as friend_network_backend
 import backend.rewards as rewards_backend
 import backend.bookshelf as bookshelf_backend
 import backend.reading_goals as reading_goals_backend
@@ -1402,14 +1403,12 @@ def create_friends_tab_content(user_data, is_own_profile):
                    style={'text-align': 'center', 'margin-top': '50px'})
         ])
 
-    # Build Cytoscape elements
+    # Build Cytoscape elements from the 2-hop neighbourhood (one query, cached per user)
+    network = friend_network_backend.get_friend_network(user_data['user_id']) or {
+        'friends': [], 'friends_of_friends': [], 'edges': []}
+    center_x, center_y = friend_network_backend.NETWORK_CENTER
     elements = []
 
-    # Calculate positions for circular layout
-    import math
-    center_x, center_y = 300, 300  # center of graph
-    radius = 120  # radius of circle for friends
-
     # Central node (current user) - positioned at center
     profile_img = user_data.get(
         'profile_image_url') or '/assets/svg/default-profile.svg'
@@ -1423,30 +1422,17 @@ def create_friends_tab_content(user_data, is_own_profile):
         'position': {'x': center_x, 'y': center_y}
     })
 
-    # Create a set of friend user IDs for quick lookup
-    friend_user_ids = {friend['user_id'] for friend in friends}
-    friend_usernames = {friend['username'] for friend in friends}
-
-    # Friend nodes and edges from center to friends - arranged in circle
-    for i, friend in enumerate(friends):
-        # Calculate angle for this friend (evenly distributed around circle)
-        angle = (2 * math.pi * i) / len(friends)
-        x = center_x + radius * math.cos(angle)
-        y = center_y + radius * math.sin(angle)
-
-        friend_img = friend.get(
-            'profile_image_url') or '/assets/svg/default-profile.svg'
+    # Friend nodes (arranged in a circle) and edges from center to friends
+    for friend in network['friends']:
         elements.append({
             'data': {
                 'id': friend['username'],
                 'label': friend['username'],
-                'image': friend_img,
+                'image': friend.get('profile_image_url') or '/assets/svg/default-profile.svg',
                 'type': 'friend'
             },
-            'position': {'x': x, 'y': y}
+            'position': {'x': friend['x'], 'y': friend['y']}
         })
-
-        # Edge from center user to this friend
         elements.append({
             'data': {
                 'source': user_data['username'],
@@ -1454,109 +1440,21 @@ def create_friends_tab_content(user_data, is_own_profile):
             }
         })
 
-    # Collect friends of friends
-    friends_of_friends_usernames = set()
-    fof_data = {}
-    fof_connections = {}  # fof_username -> list of direct friend usernames
-    for friend in friends:
-        try:
-            friend_friends_data = friends_backend.get_friends_list(
-                str(friend['user_id']))
-            for f in friend_friends_data:
-                fof_username = f['username']
-                if fof_username not in friend_usernames and fof_username != user_data['username']:
-                    friends_of_friends_usernames.add(fof_username)
-                    fof_data[fof_username] = f['profile_image_url'] or '/assets/svg/default-profile.svg'
-                    if fof_username not in fof_connections:
-                        fof_connections[fof_username] = []
-                    fof_connections[fof_username].append(friend['username'])
-        except Exception as e:
-            print(f"Error fetching friends for {friend['username']}: {e}")
-
-    # Add friends of friends nodes positioned near their connected friends
-    outer_radius = 180
-    angle_groups = {}
-    for username in friends_of_friends_usernames:
-        connected_friends = fof_connections.get(username, [])
-        if connected_friends:
-            # Calculate average angle of connected direct friends
-            angles = []
-            for cf_username in connected_friends:
-                idx = next((i for i, fr in enumerate(friends)
-                           if fr['username'] == cf_username), 0)
-                angle = (2 * math.pi * idx) / len(friends) if friends else 0
-                angles.append(angle)
-            avg_angle = sum(angles) / len(angles)
-        else:
-            avg_angle = 0
-        if avg_angle not in angle_groups:
-            angle_groups[avg_angle] = []
-        angle_groups[avg_angle].append(username)
-
-    for avg_angle, group in angle_groups.items():
-        n = len(group)
-        for i, username in enumerate(group):
-            if n == 1:
-                angle = avg_angle
-            else:
-                # Spread over a small arc of 0.5 radians
-                spread = 0.5
-                angle = avg_angle + (i - (n-1)/2) * (spread / max(1, n-1))
-            x = center_x + outer_radius * math.cos(angle)
-            y = center_y + outer_radius * math.sin(angle)
-            elements.append({
-                'data': {
-                    'id': username,
-                    'label': username,
-                    'image': fof_data[username],
-                    'type': 'friend_of_friend'
-                },
-                'position': {'x': x, 'y': y}
-            })
-
-    # Add edges between friends who are also friends with each other (mutual friends)
-    for i, friend1 in enumerate(friends):
-        # Get this friend's friends list from backend
-        try:
-            friend1_friends_data = friends_backend.get_friends_list(
-                str(friend1['user_id']))
-            # Extract friend IDs for comparison
-            friend1_friend_ids = {f['friend_id'] for f in friend1_friends_data}
-        except Exception as e:
-            print(f"Error fetching friends for {friend1['username']}: {e}")
-            friend1_friend_ids = set()
-
-        # Check if any of the center user's friends are also friends with friend1
-        # Only check friends after this one to avoid duplicates
-        for friend2 in friends[i+1:]:
-            # Check if friend2's user_id is in friend1's friend list
-            if friend2['user_id'] in friend1_friend_ids:
-                # Add edge between the two mutual friends
-                elements.append({
-                    'data': {
-                        'source': friend1['username'],
-                        'target': friend2['username'],
-                        'type': 'mutual'
-                    }
-                })
+    # Friends of friends, positioned near their connected friends
+    for fof in network['friends_of_friends']:
+        elements.append({
+            'data': {
+                'id': fof['username'],
+                'label': fof['username'],
+                'image': fof.get('profile_image_url') or '/assets/svg/default-profile.svg',
+                'type': 'friend_of_friend'
+            },
+            'position': {'x': fof['x'], 'y': fof['y']}
+        })
 
-    # Add edges from friends to their friends of friends
-    for friend in friends:
-        try:
-            friend_friends_data = friends_backend.get_friends_list(
-                str(friend['user_id']))
-            for f in friend_friends_data:
-                fof_username = f['username']
-                if fof_username in friends_of_friends_usernames:
-                    elements.append({
-                        'data': {
-                            'source': friend['username'],
-                            'target': fof_username,
-                            'type': 'friend_to_fof'
-                        }
-                    })
-        except Exception as e:
-            print(f"Error fetching friends for {friend['username']}: {e}")
+    # Edges between mutual friends and from friends to their friends of friends
+    for edge in network['edges']:
+        elements.append({'data': dict(edge)})
 
     # Create Cytoscape graph without labels
     cytoscape_graph = cyto.Cytoscape(
@@ -1669,9 +1567,39 @@ def create_friends_tab_content(user_data, is_own_profile):
         ]
     )
 
+    children = [html.Div(cytoscape_graph, className="friends-network-container")]
+    if is_own_profile:
+        children.append(create_friend_suggestions_section(user_data))
+    return html.Div(children, className="tab-content-wrapper")
+
+
+def create_friend_suggestions_section(user_data):
+    """"People you may know" under the friends graph on your own profile"""
+    suggestions = friends_backend.get_friend_suggestions(str(user_data['user_id']), limit=8)
+    if not suggestions:
+        return html.Div()
+
+    items = []
+    for suggestion in suggestions:
+        mutual = suggestion['mutual_friends']
+        details = f"{mutual} mutual friend{'s' if mutual != 1 else ''}"
+        if suggestion['shared_books']:
+            shared = suggestion['shared_books']
+            details += f" · {shared} book{'s' if shared != 1 else ''} in common"
+        items.append(dcc.Link(html.Div([
+            html.Img(src=suggestion.get('profile_image_url') or '/assets/svg/default-profile.svg',
+                     className="friend-suggestion-image"),
+            html.Div([
+                html.Div(suggestion['username'], className="friend-suggestion-name"),
+                html.Div(details, className="friend-suggestion-details")
+            ])
+        ], className="friend-suggestion"), href=f"/profile/view/{suggestion['username']}",
+            className="friend-suggestion-link"))
+
     return html.Div([
-        html.Div(cytoscape_graph, className="friends-network-container")
-    ], className="tab-content-wrapper")
+        html.H3("People You May Know", className="section-title-showcase"),
+        html.Div(items, className="friend-suggestions-list")
+    ], className="friend-suggestions-section")
 
 
 def create_bookshelf_tab_content(user_data, is_own_profile):